@@ -1,97 +1,327 @@
-import urllib3
 import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import urllib3
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Count, F, Q, Sum
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_http = None
+_http_lock = threading.Lock()
+
+
+def get_http_client():
+    """
+    进程内共享的 HTTP 连接池
+
+    连接池复用 TCP/TLS 连接（keep-alive），避免每次查询重新握手。
+    """
+    global _http
+    if _http is None:
+        with _http_lock:
+            if _http is None:
+                _http = urllib3.PoolManager(
+                    num_pools=4,
+                    maxsize=getattr(settings, 'ALI_BARCODE_POOL_SIZE', 10),
+                    block=False,
+                    retries=urllib3.Retry(total=1, connect=1, read=0, backoff_factor=0.2),
+                    timeout=urllib3.Timeout(connect=2.0, read=5.0),
+                )
+    return _http
+
 
 class AliBarcodeService:
     """
     阿里云条形码查询API服务类
     使用APPCODE认证方式
+
+    查询结果保存在 BarcodeLookupCache 中：
+    - 查到商品缓存 ALI_BARCODE_HIT_TTL 秒（None 表示永久）；
+    - 确认不存在缓存 ALI_BARCODE_MISS_TTL 秒；
+    - 接口出错按连续失败次数指数退避，退避期间不再请求，已有的商品信息继续使用。
     """
     BASE_URL = "https://ali-barcode.showapi.com/barcode"
-    
+    HIT_TTL = 30 * 24 * 3600
+    MISS_TTL = 24 * 3600
+    ERROR_BACKOFF = 60
+    ERROR_BACKOFF_MAX = 3600
+
+    @classmethod
+    def api_url(cls):
+        """接口地址，可通过 ALI_BARCODE_URL 配置（测试时指向本地桩服务）"""
+        return getattr(settings, 'ALI_BARCODE_URL', '') or cls.BASE_URL
+
     @classmethod
-    def search_barcode(cls, barcode):
+    def search_barcode(cls, barcode, use_cache=True):
         """
         根据条码查询商品信息
         
         Args:
             barcode: 商品条码
+            use_cache: 是否使用缓存，False 时强制请求接口并刷新缓存
             
         Returns:
             dict: 包含商品信息的字典，如果未找到则返回None
         """
+        from inventory.models import BarcodeLookupCache
+
+        # 获取阿里云API的APPCODE
+        appcode = getattr(settings, 'ALI_BARCODE_APPCODE', '')
+        now = timezone.now()
+        entry = BarcodeLookupCache.objects.filter(barcode=barcode).first()
+
+        if use_cache and entry is not None and entry.is_fresh(now):
+            BarcodeLookupCache.objects.filter(pk=entry.pk).update(hit_count=F('hit_count') + 1)
+            return entry.data if entry.status == BarcodeLookupCache.STATUS_HIT else None
+
+        if not appcode:
+            logger.warning("未配置阿里云条形码API的APPCODE")
+            # 未配置接口时仍可使用过期的缓存商品信息
+            if entry is not None and entry.status == BarcodeLookupCache.STATUS_HIT:
+                return entry.data
+            return None
+
+        status, data, error, latency_ms = cls.fetch(barcode, appcode)
+        if entry is None:
+            entry = BarcodeLookupCache(barcode=barcode)
+        cls._apply_result(entry, status, data, error, latency_ms, now)
+
+        try:
+            with transaction.atomic():
+                entry.save()
+        except IntegrityError:
+            # 并发查询同一新条码时由另一请求写入缓存
+            pass
+
+        return entry.data if entry.status == BarcodeLookupCache.STATUS_HIT else None
+
+    @classmethod
+    def lookup_many(cls, barcodes, max_workers=4, rate_limiter=None):
+        """
+        批量查询条码，缓存一次读出，未命中的条码并发请求接口后批量写回缓存
+
+        Args:
+            barcodes: 条码列表
+            max_workers: 并发请求数
+            rate_limiter: 可选的 RateLimiter，限制请求接口的速率
+
+        Returns:
+            dict: {条码: 商品信息或None}
+        """
+        from inventory.models import BarcodeLookupCache
+
+        barcodes = list(dict.fromkeys(b for b in barcodes if b))
+        now = timezone.now()
+        entries = BarcodeLookupCache.objects.in_bulk(barcodes, field_name='barcode')
+        results = {}
+        fresh_ids = []
+        to_fetch = []
+        for barcode in barcodes:
+            entry = entries.get(barcode)
+            if entry is not None and entry.is_fresh(now):
+                fresh_ids.append(entry.pk)
+                results[barcode] = entry.data if entry.status == BarcodeLookupCache.STATUS_HIT else None
+            else:
+                to_fetch.append(barcode)
+        if fresh_ids:
+            BarcodeLookupCache.objects.filter(pk__in=fresh_ids).update(hit_count=F('hit_count') + 1)
+
+        appcode = getattr(settings, 'ALI_BARCODE_APPCODE', '')
+        if not to_fetch:
+            return results
+        if not appcode:
+            logger.warning("未配置阿里云条形码API的APPCODE")
+            for barcode in to_fetch:
+                entry = entries.get(barcode)
+                results[barcode] = entry.data if entry and entry.status == BarcodeLookupCache.STATUS_HIT else None
+            return results
+
+        def fetch(barcode):
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+            return cls.fetch(barcode, appcode)
+
+        # 工作线程只做 HTTP 请求，数据库读写都在当前线程批量完成
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            fetched = dict(zip(to_fetch, executor.map(fetch, to_fetch)))
+
+        created, updated = [], []
+        for barcode, (status, data, error, latency_ms) in fetched.items():
+            entry = entries.get(barcode)
+            if entry is None:
+                entry = BarcodeLookupCache(barcode=barcode)
+                created.append(entry)
+            else:
+                updated.append(entry)
+            cls._apply_result(entry, status, data, error, latency_ms, now)
+            results[barcode] = entry.data if entry.status == BarcodeLookupCache.STATUS_HIT else None
+        BarcodeLookupCache.objects.bulk_create(created, ignore_conflicts=True)
+        BarcodeLookupCache.objects.bulk_update(updated, [
+            'status', 'data', 'error_message', 'failure_count', 'fetch_count',
+            'latency_ms', 'fetched_at', 'expires_at',
+        ])
+        return results
+
+    @classmethod
+    def fetch(cls, barcode, appcode):
+        """
+        请求外部接口并计时，不访问数据库
+
+        Returns:
+            tuple: (状态, 商品信息或None, 错误信息, 耗时毫秒)
+        """
+        started = time.monotonic()
+        status, data, error = cls._fetch(barcode, appcode)
+        return status, data, error, int((time.monotonic() - started) * 1000)
+
+    @classmethod
+    def _apply_result(cls, entry, status, data, error, latency_ms, now):
+        """把一次接口请求的结果写入缓存条目（不保存）"""
+        from inventory.models import BarcodeLookupCache
+
+        entry.fetch_count += 1
+        entry.latency_ms = latency_ms
+        entry.fetched_at = now
+
+        if status == BarcodeLookupCache.STATUS_ERROR:
+            entry.failure_count += 1
+            entry.error_message = error[:255]
+            backoff = min(
+                cls._setting('ALI_BARCODE_ERROR_BACKOFF', cls.ERROR_BACKOFF) * 2 ** (entry.failure_count - 1),
+                cls._setting('ALI_BARCODE_ERROR_BACKOFF_MAX', cls.ERROR_BACKOFF_MAX),
+            )
+            entry.expires_at = now + timedelta(seconds=backoff)
+            # 已缓存的商品信息在接口故障期间继续使用
+            if entry.status != BarcodeLookupCache.STATUS_HIT:
+                entry.status = status
+                entry.data = None
+        else:
+            ttl_name, ttl_default = (
+                ('ALI_BARCODE_HIT_TTL', cls.HIT_TTL) if status == BarcodeLookupCache.STATUS_HIT
+                else ('ALI_BARCODE_MISS_TTL', cls.MISS_TTL)
+            )
+            ttl = cls._setting(ttl_name, ttl_default)
+            entry.status = status
+            entry.data = data
+            entry.error_message = error[:255]
+            entry.failure_count = 0
+            entry.expires_at = None if ttl is None else now + timedelta(seconds=ttl)
+        return entry
+
+    @staticmethod
+    def _setting(name, default):
+        return getattr(settings, name, default)
+
+    @classmethod
+    def _fetch(cls, barcode, appcode):
+        """
+        请求外部接口
+
+        Returns:
+            tuple: (状态, 商品信息或None, 错误信息)
+        """
+        from inventory.models import BarcodeLookupCache
+
         try:
-            # 获取阿里云API的APPCODE
-            appcode = getattr(settings, 'ALI_BARCODE_APPCODE', '')
-            
-            if not appcode:
-                print("未配置阿里云条形码API的APPCODE")
-                return None
-                
             # 设置请求头，添加APPCODE认证
             headers = {
                 "Authorization": f"APPCODE {appcode}"
             }
-            
-            # 构建查询URL
-            url = f"{cls.BASE_URL}?code={barcode}"
-            
-            # 创建连接池管理器并发送请求
-            http = urllib3.PoolManager()
-            response = http.request(
+            response = get_http_client().request(
                 'GET',
-                url,
+                cls.api_url(),
+                fields={'code': barcode},
                 headers=headers,
-                timeout=5.0
             )
-            
-            # 检查响应状态码
-            if response.status == 200:
-                # 解析JSON响应
-                data = json.loads(response.data.decode('utf-8'))
-                # 检查API返回结果
-                if data.get('showapi_res_code') == 0:
-                    # 获取商品信息
-                    res_body = data.get('showapi_res_body', {})
-                    
-                    # 检查是否查询成功
-                    # 注意：API返回的flag可能是字符串'true'或布尔值True
-                    if res_body.get('flag') == 'true' or res_body.get('flag') is True:
-                        # 将价格字符串转换为浮点数，如果转换失败则默认为0
-                        price = 0
-                        try:
-                            if res_body.get('price'):
-                                price = float(res_body.get('price'))
-                        except (ValueError, TypeError):
-                            pass
-                            
-                        return {
-                            'name': res_body.get('goodsName', ''),
-                            'specification': res_body.get('spec', ''),
-                            'manufacturer': res_body.get('manuName', ''),
-                            'category': res_body.get('goodsType', ''),
-                            'suggested_price': price,
-                            'image_url': res_body.get('img', ''),
-                            'description': res_body.get('note', ''),
-                            'trademark': res_body.get('trademark', ''),
-                            'origin': res_body.get('ycg', ''),
-                            'barcode_image': res_body.get('sptmImg', ''),
-                            'barcode': res_body.get('code', ''),
-                            'english_name': res_body.get('engName', '')
-                        }
-                    else:
-                        print(f"条码查询失败: {res_body.get('remark')}")
-                        print(f"完整响应体: {res_body}")
-                else:
-                    print(f"API调用失败: {data.get('showapi_res_error')}")
-                    print(f"完整响应: {data}")
-            else:
-                print(f"HTTP请求失败，状态码: {response.status}")
-                print(f"响应内容: {response.data.decode('utf-8', errors='replace')}")
-                
-            return None
-        except Exception as e:
-            print(f"条码查询出错: {e}")
-            import traceback
-            print(f"详细错误信息: {traceback.format_exc()}")
-            return None
\ No newline at end of file
+        except urllib3.exceptions.HTTPError as e:
+            logger.warning("条码查询出错: %s", e)
+            return BarcodeLookupCache.STATUS_ERROR, None, str(e)
+
+        # 检查响应状态码
+        if response.status != 200:
+            logger.warning("HTTP请求失败，状态码: %s", response.status)
+            return BarcodeLookupCache.STATUS_ERROR, None, f"HTTP {response.status}"
+
+        try:
+            # 解析JSON响应
+            data = json.loads(response.data.decode('utf-8'))
+        except ValueError as e:
+            logger.warning("条码查询响应无法解析: %s", e)
+            return BarcodeLookupCache.STATUS_ERROR, None, f"响应无法解析: {e}"
+
+        # 检查API返回结果
+        if data.get('showapi_res_code') != 0:
+            error = str(data.get('showapi_res_error') or '')
+            logger.warning("API调用失败: %s", error)
+            return BarcodeLookupCache.STATUS_ERROR, None, error
+
+        # 获取商品信息
+        res_body = data.get('showapi_res_body', {})
+
+        # 检查是否查询成功
+        # 注意：API返回的flag可能是字符串'true'或布尔值True
+        if not (res_body.get('flag') == 'true' or res_body.get('flag') is True):
+            return BarcodeLookupCache.STATUS_MISS, None, str(res_body.get('remark') or '')
+
+        # 将价格字符串转换为浮点数，如果转换失败则默认为0
+        price = 0
+        try:
+            if res_body.get('price'):
+                price = float(res_body.get('price'))
+        except (ValueError, TypeError):
+            pass
+
+        return BarcodeLookupCache.STATUS_HIT, {
+            'name': res_body.get('goodsName', ''),
+            'specification': res_body.get('spec', ''),
+            'manufacturer': res_body.get('manuName', ''),
+            'category': res_body.get('goodsType', ''),
+            'suggested_price': price,
+            'image_url': res_body.get('img', ''),
+            'description': res_body.get('note', ''),
+            'trademark': res_body.get('trademark', ''),
+            'origin': res_body.get('ycg', ''),
+            'barcode_image': res_body.get('sptmImg', ''),
+            'barcode': res_body.get('code', ''),
+            'english_name': res_body.get('engName', '')
+        }, ''
+
+    @staticmethod
+    def stats():
+        """
+        缓存统计
+
+        Returns:
+            dict: 缓存条目数（按状态）、缓存命中次数、接口请求次数、命中率和平均接口耗时
+        """
+        from inventory.models import BarcodeLookupCache
+
+        row = BarcodeLookupCache.objects.aggregate(
+            entries=Count('id'),
+            hits=Count('id', filter=Q(status=BarcodeLookupCache.STATUS_HIT)),
+            misses=Count('id', filter=Q(status=BarcodeLookupCache.STATUS_MISS)),
+            errors=Count('id', filter=Q(status=BarcodeLookupCache.STATUS_ERROR)),
+            cache_hits=Sum('hit_count'),
+            upstream_requests=Sum('fetch_count'),
+            avg_latency_ms=Avg('latency_ms'),
+        )
+        cache_hits = row['cache_hits'] or 0
+        upstream = row['upstream_requests'] or 0
+        lookups = cache_hits + upstream
+        return {
+            'entries': row['entries'],
+            'hit_entries': row['hits'],
+            'miss_entries': row['misses'],
+            'error_entries': row['errors'],
+            'cache_hits': cache_hits,
+            'upstream_requests': upstream,
+            'hit_rate': cache_hits / lookups if lookups else 0.0,
+            'avg_latency_ms': round(row['avg_latency_ms'], 1) if row['avg_latency_ms'] is not None else None,
+        }
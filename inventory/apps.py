@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class InventoryConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'inventory'
+    verbose_name = '库存管理'
+
+    def ready(self):
+        # 注册信号处理器
+        from . import signals  # noqa: F401
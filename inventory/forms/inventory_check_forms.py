@@ -19,6 +19,17 @@ class InventoryCheckForm(forms.ModelForm):
         })
     )
     
+    changed_only = forms.BooleanField(
+        required=False,
+        label='仅盘点有变动的商品',
+        help_text='可选，仅盘点上次盘点后库存发生变动或新增的商品',
+        widget=forms.CheckboxInput(attrs={
+            'class': 'form-check-input',
+            'aria-label': '仅盘点有变动的商品',
+            'data-mobile-friendly': 'true'  # 标记为移动友好元素
+        })
+    )
+    
     scheduled_date = forms.DateField(
         label='计划盘点日期',
         required=False,
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from inventory.ali_barcode_service import AliBarcodeService
+
+
+class Command(BaseCommand):
+    help = '显示条码查询缓存的命中率和外部接口耗时'
+
+    def handle(self, *args, **options):
+        stats = AliBarcodeService.stats()
+        latency = '-' if stats['avg_latency_ms'] is None else f"{stats['avg_latency_ms']} 毫秒"
+        self.stdout.write(f"缓存条目：{stats['entries']}（已找到 {stats['hit_entries']}，"
+                          f"未找到 {stats['miss_entries']}，出错 {stats['error_entries']}）")
+        self.stdout.write(f"缓存命中：{stats['cache_hits']} 次，接口请求：{stats['upstream_requests']} 次")
+        self.stdout.write(self.style.SUCCESS(
+            f"命中率：{stats['hit_rate']:.1%}，平均接口耗时：{latency}"
+        ))
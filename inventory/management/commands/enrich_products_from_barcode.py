@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.services.barcode_enrichment_service import (
+    BarcodeEnrichmentService,
+    default_checkpoint_path,
+)
+
+
+class Command(BaseCommand):
+    help = '通过条码接口批量补全商品名称、规格、厂商等信息，支持断点续跑，可由定时任务在后台执行'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='每批处理的商品数量')
+        parser.add_argument('--workers', type=int, default=4, help='并发请求条码接口的线程数')
+        parser.add_argument('--rate', type=float, default=5.0, help='每秒最多请求接口次数，0 表示不限')
+        parser.add_argument('--limit', type=int, help='本次最多处理的商品数量')
+        parser.add_argument('--checkpoint', default=None, help='断点文件路径，默认写入 TEMP_DIR')
+        parser.add_argument('--restart', action='store_true', help='忽略已有断点，从头开始')
+        parser.add_argument('--overwrite', action='store_true', help='覆盖已有的商品信息')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0 or options['workers'] <= 0:
+            raise CommandError('批量大小和线程数必须大于0')
+        checkpoint = options['checkpoint'] or default_checkpoint_path()
+
+        def progress(state):
+            self.stdout.write(
+                f"已处理 {state['processed']} 个商品，补全 {state['updated']} 个，"
+                f"未找到 {state['not_found']} 个（断点ID {state['last_id']}）"
+            )
+
+        state = BarcodeEnrichmentService.enrich(
+            batch_size=options['batch_size'],
+            max_workers=options['workers'],
+            rate=options['rate'],
+            checkpoint=checkpoint,
+            resume=not options['restart'],
+            limit=options['limit'],
+            overwrite=options['overwrite'],
+            progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"条码补全完成：共处理 {state['processed']} 个商品，补全 {state['updated']} 个"
+        ))
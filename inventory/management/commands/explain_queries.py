@@ -0,0 +1,55 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from inventory.models import Member, Product, Sale, SaleItem
+from inventory.utils.query_plan import HOT_QUERIES, explain_hot_queries, hot_queries, plan_regressions
+
+
+class Command(BaseCommand):
+    help = '记录报表和列表热点查询的执行计划，与基线比较发现新增的全表扫描'
+
+    def add_arguments(self, parser):
+        parser.add_argument('queries', nargs='*', help=f'要检查的查询，默认全部: {", ".join(HOT_QUERIES)}')
+        parser.add_argument('--repeat', type=int, default=0, help='每个查询实际执行的次数，用于计时；默认只取执行计划')
+        parser.add_argument('--output', help='将执行计划写入 JSON 文件，可作为以后比较的基线')
+        parser.add_argument('--baseline', help='基线 JSON 文件，出现新增全表扫描时命令失败')
+
+    def handle(self, *args, **options):
+        names = options['queries'] or None
+        queries = hot_queries(connections['default'].vendor)
+        unknown = [name for name in names or [] if name not in queries]
+        if unknown:
+            raise CommandError(f'未登记的查询: {", ".join(unknown)}')
+
+        results = explain_hot_queries(names, repeat=options['repeat'])
+        for name, result in results.items():
+            timing = f", p50 {result['p50_ms']}ms" if 'p50_ms' in result else ''
+            scans = ', '.join(result['full_scans']) or '无'
+            self.stdout.write(f'{name}: 全表扫描 {scans}{timing}')
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {result['plan']}".replace('\n', '\n  '))
+
+        if options['output']:
+            report = {
+                'vendor': connections['default'].vendor,
+                # 执行计划与数据量有关，记录行数便于比较不同时间的结果
+                'rows': {
+                    model._meta.label: model.objects.count()
+                    for model in (Sale, SaleItem, Product, Member)
+                },
+                'queries': results,
+            }
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f"执行计划已写入 {options['output']}")
+
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as f:
+                baseline = json.load(f)
+            regressions = plan_regressions(baseline['queries'], results)
+            if regressions:
+                details = '; '.join(f'{name}: {", ".join(tables)}' for name, tables in regressions.items())
+                raise CommandError(f'执行计划退化，新增全表扫描 - {details}')
+            self.stdout.write(self.style.SUCCESS('执行计划与基线一致，没有新增全表扫描'))
@@ -0,0 +1,49 @@
+import os
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.services.member_service import import_members_from_csv
+
+
+class Command(BaseCommand):
+    help = '从CSV文件流式批量导入会员（表头需包含 name、phone），用于旧系统会员迁移'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV文件路径')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='每批写入的会员数量')
+        parser.add_argument('--encoding', default='utf-8-sig', help='文件编码，例如 gb18030')
+        parser.add_argument('--user', help='记录为创建人的用户名')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f'文件不存在: {path}')
+        if options['chunk_size'] <= 0:
+            raise CommandError('批量大小必须大于0')
+
+        operator = None
+        if options['user']:
+            operator = User.objects.filter(username=options['user']).first()
+            if operator is None:
+                raise CommandError(f"用户不存在: {options['user']}")
+
+        def progress(rows_read, result):
+            self.stdout.write(
+                f"已读取 {rows_read} 行：成功 {result['success']}，跳过 {result['skipped']}，失败 {result['failed']}"
+            )
+
+        with open(path, 'rb') as csv_file:
+            try:
+                result = import_members_from_csv(
+                    csv_file, operator, chunk_size=options['chunk_size'],
+                    encoding=options['encoding'], progress=progress,
+                )
+            except (ValueError, UnicodeDecodeError) as e:
+                raise CommandError(str(e))
+
+        for row_num, error in result['failed_rows'][:20]:
+            self.stdout.write(self.style.WARNING(f'行 {row_num}: {error}'))
+        self.stdout.write(self.style.SUCCESS(
+            f"导入完成：成功 {result['success']} 个，跳过 {result['skipped']} 个，失败 {result['failed']} 个"
+        ))
@@ -0,0 +1,34 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.services.sales_rollup_service import SalesRollupService
+
+
+class Command(BaseCommand):
+    help = '从销售明细重建每日销售汇总表'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='重建起始日期 (YYYY-MM-DD)，默认全部历史')
+        parser.add_argument('--end', help='重建结束日期 (YYYY-MM-DD，含当天)，默认至今')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='每批读取的销售明细行数')
+
+    def handle(self, *args, **options):
+        start_date = self.parse_date(options['start'])
+        end_date = self.parse_date(options['end'])
+        if start_date and end_date and start_date > end_date:
+            raise CommandError('起始日期不能晚于结束日期')
+
+        count = SalesRollupService.rebuild(start_date, end_date, chunk_size=options['chunk_size'])
+        state = SalesRollupService.get_state()
+        self.stdout.write(self.style.SUCCESS(
+            f'已写入 {count} 行汇总数据，报表汇总覆盖自 {state.covered_from or "-"}'
+        ))
+
+    def parse_date(self, value):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'日期格式无效: {value}，应为 YYYY-MM-DD')
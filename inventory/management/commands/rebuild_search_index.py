@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from inventory.services.search_service import ProductSearchService
+
+
+class Command(BaseCommand):
+    help = '重建商品检索文档及全文索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='每批处理的商品数量')
+
+    def handle(self, *args, **options):
+        total = ProductSearchService.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'商品检索索引已重建：{total} 个商品，检索后端 {ProductSearchService.backend()}'
+        ))
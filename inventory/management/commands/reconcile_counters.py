@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.services.counter_service import COUNTED_MODELS, CounterService
+
+
+class Command(BaseCommand):
+    help = '将列表页使用的行数计数与 COUNT(*) 对账，建议由定时任务定期执行'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models', nargs='*',
+            help=f'要对账的模型，默认全部: {", ".join(COUNTED_MODELS)}',
+        )
+
+    def handle(self, *args, **options):
+        labels = options['models'] or None
+        unknown = [label for label in labels or [] if label not in COUNTED_MODELS]
+        if unknown:
+            raise CommandError(f'不维护计数的模型: {", ".join(unknown)}')
+
+        drift = CounterService.reconcile(labels)
+        for key, (stored, actual) in sorted(drift.items()):
+            self.stdout.write(f'{key}: {"-" if stored is None else stored} -> {actual}')
+        self.stdout.write(self.style.SUCCESS(f'对账完成，修正 {len(drift)} 个计数'))
@@ -0,0 +1,73 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from inventory.utils.benchmark import DEFAULT_BASKET_SIZES, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = '在生成的数据集上测量结算、报表、搜索、首页和盘点的耗时分位数与查询次数，结果输出为 JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'scenarios', nargs='*',
+            help='要运行的场景或场景前缀，如 sale_create、report、index[cold]，默认全部',
+        )
+        parser.add_argument('--iterations', type=int, default=20, help='每个场景计入统计的执行次数')
+        parser.add_argument('--warmup', type=int, default=2, help='每个场景的预热次数')
+        parser.add_argument(
+            '--basket-sizes', default=','.join(map(str, DEFAULT_BASKET_SIZES)),
+            help='结算场景的购物车商品数，逗号分隔',
+        )
+        parser.add_argument('--label', default='', help='写入结果的标签，如提交号')
+        parser.add_argument('--output', help='结果 JSON 文件路径')
+        parser.add_argument('--compare', help='与之前的结果 JSON 比较并输出变化')
+
+    def handle(self, *args, **options):
+        try:
+            basket_sizes = sorted({int(size) for size in options['basket_sizes'].split(',') if size.strip()})
+        except ValueError:
+            raise CommandError(f"购物车商品数无效: {options['basket_sizes']}")
+        if options['iterations'] < 1 or not basket_sizes or basket_sizes[0] < 1:
+            raise CommandError('执行次数和购物车商品数必须大于 0')
+
+        def progress(name, result):
+            self.stdout.write(
+                f"{name}: p50 {result['p50_ms']}ms, p95 {result['p95_ms']}ms, 查询 {result['queries']} 次"
+            )
+
+        try:
+            report = run_benchmarks(
+                options['scenarios'] or None,
+                iterations=options['iterations'],
+                warmup=options['warmup'],
+                basket_sizes=basket_sizes,
+                progress=progress,
+            )
+        except (RuntimeError, ValueError) as e:
+            raise CommandError(str(e))
+        report = {'label': options['label'], 'created_at': timezone.now().isoformat(), **report}
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"基准测试结果已写入 {options['output']}"))
+
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as f:
+                baseline = json.load(f)
+            if baseline.get('dataset') != report['dataset']:
+                self.stdout.write(self.style.WARNING('数据集规模与基准结果不同，比较结果仅供参考'))
+            for name, result in report['scenarios'].items():
+                before = baseline.get('scenarios', {}).get(name)
+                if before:
+                    self.stdout.write(f'{name}: {self.describe_change(before, result)}')
+
+    def describe_change(self, before, after):
+        parts = []
+        for key in ('p50_ms', 'p95_ms'):
+            change = (after[key] - before[key]) / before[key] * 100 if before[key] else 0
+            parts.append(f'{key[:3]} {before[key]} -> {after[key]}ms ({change:+.1f}%)')
+        parts.append(f"查询 {before['queries']} -> {after['queries']}")
+        return '，'.join(parts)
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from inventory.services.export_job_service import ExportJobService, default_worker_name
+
+
+class Command(BaseCommand):
+    help = '后台导出工作进程：从导出任务表领取任务并生成文件，同时清理过期文件。可同时运行多个进程'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='处理完当前队列后退出')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='队列为空时的轮询间隔（秒）')
+        parser.add_argument('--max-jobs', type=int, default=None, help='最多处理的任务数，达到后退出')
+        parser.add_argument('--name', default=None, help='工作进程名称，默认 主机名:进程号')
+
+    def handle(self, *args, **options):
+        worker = options['name'] or default_worker_name()
+        max_jobs = options['max_jobs']
+        processed = 0
+        self.stdout.write(f'导出工作进程 {worker} 已启动')
+
+        while max_jobs is None or processed < max_jobs:
+            close_old_connections()
+            requeued = ExportJobService.requeue_stale()
+            if requeued:
+                self.stdout.write(self.style.WARNING(f'{requeued} 个超时任务已重新排队'))
+            cleaned = ExportJobService.cleanup_expired()
+            if cleaned:
+                self.stdout.write(f'已清理 {cleaned} 个过期导出文件')
+
+            job = ExportJobService.claim_next(worker)
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            job = ExportJobService.run(job)
+            processed += 1
+            if job.status == job.STATUS_SUCCESS:
+                self.stdout.write(self.style.SUCCESS(
+                    f'任务 #{job.pk} ({job.kind}) 完成，共 {job.processed_rows} 行: {job.file.name}'
+                ))
+            else:
+                self.stdout.write(self.style.ERROR(f'任务 #{job.pk} ({job.kind}) 失败: {job.error_message}'))
+
+        self.stdout.write(self.style.SUCCESS(f'导出工作进程 {worker} 退出，共处理 {processed} 个任务'))
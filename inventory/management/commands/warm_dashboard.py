@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from inventory.services.dashboard_service import DashboardService
+
+
+class Command(BaseCommand):
+    help = '预热首页仪表盘快照缓存，可由定时任务周期执行'
+
+    def handle(self, *args, **options):
+        snapshot = DashboardService.warm()
+        self.stdout.write(self.style.SUCCESS(
+            f"仪表盘快照已更新：今日销售 {snapshot['today_sales']} 单，"
+            f"低库存商品 {snapshot['low_stock_products']} 个"
+        ))
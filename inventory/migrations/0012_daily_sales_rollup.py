@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0011_sale_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesRollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('covered_from', models.DateField(blank=True, null=True, verbose_name='覆盖起始日期')),
+                ('rebuilt_at', models.DateTimeField(blank=True, null=True, verbose_name='最近重建时间')),
+            ],
+            options={
+                'verbose_name': '销售汇总状态',
+                'verbose_name_plural': '销售汇总状态',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='日期')),
+                ('payment_method', models.CharField(max_length=20, verbose_name='支付方式')),
+                ('quantity', models.IntegerField(default=0, verbose_name='销售数量')),
+                ('item_count', models.IntegerField(default=0, verbose_name='明细行数')),
+                ('order_count', models.IntegerField(default=0, verbose_name='销售单数')),
+                ('sales_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='销售额')),
+                ('discount_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='折扣金额')),
+                ('final_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='实收金额')),
+                ('cost_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='成本金额')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='inventory.category', verbose_name='分类')),
+                ('operator', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='收银员')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to='inventory.product', verbose_name='商品')),
+            ],
+            options={
+                'verbose_name': '每日销售汇总',
+                'verbose_name_plural': '每日销售汇总',
+                'indexes': [models.Index(fields=['date', 'product'], name='rollup_date_product_idx'), models.Index(fields=['date', 'category'], name='rollup_date_category_idx')],
+            },
+        ),
+    ]
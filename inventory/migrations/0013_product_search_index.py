@@ -0,0 +1,111 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:27
+# 商品检索文档；SQLite 下建立 FTS5 外部内容索引及同步触发器，PostgreSQL 下建立 trigram 索引。
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.utils import DatabaseError
+
+from inventory.utils.search_utils import build_search_document
+
+FTS_TABLE = 'inventory_productsearch_fts'
+DOC_TABLE = 'inventory_productsearchdocument'
+
+SQLITE_FORWARD = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        content, content='{DOC_TABLE}', content_rowid='product_id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {DOC_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.product_id, new.content);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {DOC_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.product_id, old.content);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON {DOC_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.product_id, old.content);
+        INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.product_id, new.content);
+    END""",
+]
+SQLITE_BACKWARD = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+POSTGRES_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    f'CREATE INDEX IF NOT EXISTS {DOC_TABLE}_trgm ON {DOC_TABLE} USING gin (content gin_trgm_ops)',
+]
+POSTGRES_BACKWARD = [
+    f'DROP INDEX IF EXISTS {DOC_TABLE}_trgm',
+]
+
+
+def create_search_backend(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            with schema_editor.connection.cursor() as cursor:
+                for sql in SQLITE_FORWARD:
+                    cursor.execute(sql)
+        except DatabaseError:
+            # SQLite 未编译 FTS5 时退化为 LIKE 检索
+            pass
+    elif vendor == 'postgresql':
+        for sql in POSTGRES_FORWARD:
+            schema_editor.execute(sql)
+
+
+def drop_search_backend(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}.get(vendor, [])
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def populate_documents(apps, schema_editor):
+    Product = apps.get_model('inventory', 'Product')
+    ProductSearchDocument = apps.get_model('inventory', 'ProductSearchDocument')
+    batch = []
+    for product in Product.objects.select_related('category').iterator(chunk_size=2000):
+        batch.append(ProductSearchDocument(
+            product_id=product.pk,
+            content=build_search_document(
+                name=product.name,
+                barcode=product.barcode,
+                specification=product.specification,
+                manufacturer=product.manufacturer,
+                category=product.category.name if product.category_id else '',
+                color=product.get_color_display() if product.color else '',
+                size=product.size,
+            ),
+        ))
+        if len(batch) >= 2000:
+            ProductSearchDocument.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        ProductSearchDocument.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0012_daily_sales_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchDocument',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='inventory.product', verbose_name='商品')),
+                ('content', models.TextField(verbose_name='检索词')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '商品检索文档',
+                'verbose_name_plural': '商品检索文档',
+            },
+        ),
+        migrations.RunPython(create_search_backend, drop_search_backend),
+        migrations.RunPython(populate_documents, migrations.RunPython.noop),
+    ]
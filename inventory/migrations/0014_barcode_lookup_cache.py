@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0013_product_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BarcodeLookupCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('barcode', models.CharField(max_length=100, unique=True, verbose_name='条码')),
+                ('status', models.CharField(choices=[('HIT', '已找到'), ('MISS', '未找到'), ('ERROR', '查询出错')], max_length=10, verbose_name='状态')),
+                ('data', models.JSONField(blank=True, null=True, verbose_name='商品信息')),
+                ('error_message', models.CharField(blank=True, default='', max_length=255, verbose_name='错误信息')),
+                ('failure_count', models.PositiveIntegerField(default=0, verbose_name='连续失败次数')),
+                ('hit_count', models.PositiveIntegerField(default=0, verbose_name='缓存命中次数')),
+                ('fetch_count', models.PositiveIntegerField(default=0, verbose_name='接口请求次数')),
+                ('latency_ms', models.PositiveIntegerField(blank=True, null=True, verbose_name='最近接口耗时(毫秒)')),
+                ('fetched_at', models.DateTimeField(verbose_name='最近请求时间')),
+                ('expires_at', models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='过期时间')),
+            ],
+            options={
+                'verbose_name': '条码查询缓存',
+                'verbose_name_plural': '条码查询缓存',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0014_barcode_lookup_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventorycheck',
+            name='summary',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='汇总缓存'),
+        ),
+    ]
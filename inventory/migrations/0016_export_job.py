@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0015_inventory_check_summary_cache'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=50, verbose_name='导出类型')),
+                ('export_format', models.CharField(choices=[('csv', 'CSV'), ('xlsx', 'Excel')], default='csv', max_length=10, verbose_name='文件格式')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='导出参数')),
+                ('status', models.CharField(choices=[('PENDING', '等待中'), ('RUNNING', '导出中'), ('SUCCESS', '已完成'), ('FAILED', '失败'), ('EXPIRED', '已过期')], default='PENDING', max_length=20, verbose_name='状态')),
+                ('total_rows', models.PositiveIntegerField(blank=True, null=True, verbose_name='总行数')),
+                ('processed_rows', models.PositiveIntegerField(default=0, verbose_name='已导出行数')),
+                ('file', models.FileField(blank=True, upload_to='exports/', verbose_name='导出文件')),
+                ('error_message', models.TextField(blank=True, verbose_name='错误信息')),
+                ('worker', models.CharField(blank=True, max_length=100, verbose_name='处理进程')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='执行次数')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='开始时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='完成时间')),
+                ('expires_at', models.DateTimeField(blank=True, null=True, verbose_name='过期时间')),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='export_jobs', to=settings.AUTH_USER_MODEL, verbose_name='创建人')),
+            ],
+            options={
+                'verbose_name': '导出任务',
+                'verbose_name_plural': '导出任务',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='exportjob_status_created_idx')],
+            },
+        ),
+    ]
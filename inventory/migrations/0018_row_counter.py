@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0017_list_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RowCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True, verbose_name='计数键')),
+                ('count', models.BigIntegerField(default=0, verbose_name='行数')),
+                ('reconciled_at', models.DateTimeField(blank=True, null=True, verbose_name='最近对账时间')),
+            ],
+            options={
+                'verbose_name': '行数计数器',
+                'verbose_name_plural': '行数计数器',
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:40
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0018_row_counter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventorycheckitem',
+            index=models.Index(fields=['inventory_check', 'actual_quantity'], name='checkitem_check_actual_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorytransaction',
+            index=models.Index(fields=['product', 'created_at'], name='invtxn_product_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(django.db.models.functions.datetime.ExtractMonth('birthday'), django.db.models.functions.datetime.ExtractDay('birthday'), name='member_birthday_md_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='operationlog',
+            index=models.Index(fields=['timestamp'], name='oplog_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active', 'updated_at', 'id'], name='product_active_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['member', 'created_at'], name='sale_member_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saleitem',
+            index=models.Index(fields=['sale', 'product'], name='saleitem_sale_product_idx'),
+        ),
+    ]
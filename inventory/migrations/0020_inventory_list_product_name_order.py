@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:19
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0019_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='inventory',
+            name='inventory_updated_idx',
+        ),
+    ]
@@ -0,0 +1,36 @@
+# 生日报表的函数索引只在 PostgreSQL 上保留：SQLite 中月份以参数传入 django_date_extract，
+# 查询无法匹配该索引，只会拖慢会员写入。
+
+from django.db import migrations, models
+from django.db.models.functions import ExtractDay, ExtractMonth
+
+INDEX_NAME = 'member_birthday_md_idx'
+
+
+def birthday_index():
+    return models.Index(ExtractMonth('birthday'), ExtractDay('birthday'), name=INDEX_NAME)
+
+
+def drop_unless_postgresql(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.remove_index(apps.get_model('inventory', 'Member'), birthday_index())
+
+
+def create_unless_postgresql(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.add_index(apps.get_model('inventory', 'Member'), birthday_index())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0021_exportjob_heartbeat'),
+    ]
+
+    operations = [
+        # PostgreSQL 上索引由 0019 建立后不再变动，模型中不再声明，迁移状态随之移除
+        migrations.SeparateDatabaseAndState(
+            state_operations=[migrations.RemoveIndex(model_name='member', name=INDEX_NAME)],
+            database_operations=[migrations.RunPython(drop_unless_postgresql, create_unless_postgresql)],
+        ),
+    ]
@@ -3,10 +3,16 @@
 # 产品相关模型
 from .product import Product, Category, Color, Size, Store, ProductImage, ProductBatch, Supplier
 
+# 商品检索模型
+from .search import ProductSearchDocument
+
+# 条码查询缓存模型
+from .barcode import BarcodeLookupCache
+
 # 库存相关模型
 from .inventory import (
     Inventory, InventoryTransaction, 
-    check_inventory, update_inventory, StockAlert
+    check_inventory, update_inventory, change_stock, StockAlert
 )
 
 # 库存盘点相关模型
@@ -18,6 +24,15 @@ from .member import Member, MemberLevel, RechargeRecord, MemberTransaction
 # 销售相关模型
 from .sales import Sale, SaleItem
 
+# 报表汇总模型
+from .report import DailySalesRollup, SalesRollupState
+
+# 后台导出任务模型
+from .export import ExportJob
+
+# 行数计数器模型
+from .counter import RowCounter
+
 # 通用模型
 from .common import OperationLog, SystemConfig
 
@@ -26,9 +41,15 @@ __all__ = [
     # 产品模型
     'Product', 'Category', 'Color', 'Size', 'Store', 'ProductImage', 'ProductBatch', 'Supplier','Category',
     
+    # 商品检索模型
+    'ProductSearchDocument',
+    
+    # 条码查询缓存模型
+    'BarcodeLookupCache',
+    
     # 库存模型
     'Inventory', 'InventoryTransaction', 'check_inventory', 
-    'update_inventory', 'StockAlert',
+    'update_inventory', 'change_stock', 'StockAlert',
     
     # 库存盘点模型
     'InventoryCheck', 'InventoryCheckItem',
@@ -39,6 +60,15 @@ __all__ = [
     # 销售模型
     'Sale', 'SaleItem',
     
+    # 报表汇总模型
+    'DailySalesRollup', 'SalesRollupState',
+    
+    # 后台导出任务模型
+    'ExportJob',
+    
+    # 行数计数器模型
+    'RowCounter',
+    
     # 通用模型
     'OperationLog', 'SystemConfig',
 ] 
\ No newline at end of file
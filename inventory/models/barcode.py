@@ -0,0 +1,41 @@
+from django.db import models
+from django.utils import timezone
+
+
+class BarcodeLookupCache(models.Model):
+    """
+    外部条码查询结果缓存
+
+    查到商品（HIT）、确认不存在（MISS）和接口出错（ERROR）都会记录，
+    在 expires_at 之前直接使用缓存结果，不再请求外部接口。
+    """
+    STATUS_HIT = 'HIT'
+    STATUS_MISS = 'MISS'
+    STATUS_ERROR = 'ERROR'
+    STATUS_CHOICES = [
+        (STATUS_HIT, '已找到'),
+        (STATUS_MISS, '未找到'),
+        (STATUS_ERROR, '查询出错'),
+    ]
+
+    barcode = models.CharField(max_length=100, unique=True, verbose_name='条码')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, verbose_name='状态')
+    data = models.JSONField(null=True, blank=True, verbose_name='商品信息')
+    error_message = models.CharField(max_length=255, blank=True, default='', verbose_name='错误信息')
+    failure_count = models.PositiveIntegerField(default=0, verbose_name='连续失败次数')
+    hit_count = models.PositiveIntegerField(default=0, verbose_name='缓存命中次数')
+    fetch_count = models.PositiveIntegerField(default=0, verbose_name='接口请求次数')
+    latency_ms = models.PositiveIntegerField(null=True, blank=True, verbose_name='最近接口耗时(毫秒)')
+    fetched_at = models.DateTimeField(verbose_name='最近请求时间')
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True, verbose_name='过期时间')
+
+    class Meta:
+        verbose_name = '条码查询缓存'
+        verbose_name_plural = '条码查询缓存'
+
+    def __str__(self):
+        return f'{self.barcode} - {self.get_status_display()}'
+
+    def is_fresh(self, now=None):
+        """缓存是否仍在有效期内，expires_at 为空表示永不过期"""
+        return self.expires_at is None or self.expires_at > (now or timezone.now())
@@ -26,6 +26,9 @@ class OperationLog(models.Model):
         verbose_name = '操作日志'
         verbose_name_plural = '操作日志'
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['timestamp'], name='oplog_timestamp_idx'),
+        ]
 
     def __str__(self):
         return f'{self.operator.username} - {self.get_operation_type_display()} - {self.timestamp}'
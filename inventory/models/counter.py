@@ -0,0 +1,20 @@
+from django.db import models
+
+
+class RowCounter(models.Model):
+    """
+    表行数计数器
+
+    key 为 "app_label.Model" 表示整表行数，"app_label.Model:字段=值" 表示按状态字段分组的行数。
+    由信号处理器增量维护，定期与 COUNT(*) 结果对账，列表页直接读取，不再扫描整表。
+    """
+    key = models.CharField(max_length=100, unique=True, verbose_name='计数键')
+    count = models.BigIntegerField(default=0, verbose_name='行数')
+    reconciled_at = models.DateTimeField(null=True, blank=True, verbose_name='最近对账时间')
+
+    class Meta:
+        verbose_name = '行数计数器'
+        verbose_name_plural = '行数计数器'
+
+    def __str__(self):
+        return f'{self.key} = {self.count}'
@@ -0,0 +1,65 @@
+from django.db import models
+from django.contrib.auth.models import User
+
+
+class ExportJob(models.Model):
+    """
+    后台导出任务
+
+    网页只负责提交任务，导出工作进程（run_export_worker 命令）以本表为队列
+    领取待处理任务，把结果写入 MEDIA_ROOT 下的文件；文件过期后由清理流程删除。
+    """
+    STATUS_PENDING = 'PENDING'
+    STATUS_RUNNING = 'RUNNING'
+    STATUS_SUCCESS = 'SUCCESS'
+    STATUS_FAILED = 'FAILED'
+    STATUS_EXPIRED = 'EXPIRED'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, '等待中'),
+        (STATUS_RUNNING, '导出中'),
+        (STATUS_SUCCESS, '已完成'),
+        (STATUS_FAILED, '失败'),
+        (STATUS_EXPIRED, '已过期'),
+    ]
+
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('xlsx', 'Excel'),
+    ]
+
+    kind = models.CharField(max_length=50, verbose_name='导出类型')
+    export_format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='csv', verbose_name='文件格式')
+    params = models.JSONField(default=dict, blank=True, verbose_name='导出参数')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name='状态')
+    total_rows = models.PositiveIntegerField(null=True, blank=True, verbose_name='总行数')
+    processed_rows = models.PositiveIntegerField(default=0, verbose_name='已导出行数')
+    file = models.FileField(upload_to='exports/', blank=True, verbose_name='导出文件')
+    error_message = models.TextField(blank=True, verbose_name='错误信息')
+    worker = models.CharField(max_length=100, blank=True, verbose_name='处理进程')
+    attempts = models.PositiveIntegerField(default=0, verbose_name='执行次数')
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='export_jobs', verbose_name='创建人')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='开始时间')
+    heartbeat_at = models.DateTimeField(null=True, blank=True, verbose_name='心跳时间')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='完成时间')
+    expires_at = models.DateTimeField(null=True, blank=True, verbose_name='过期时间')
+
+    class Meta:
+        verbose_name = '导出任务'
+        verbose_name_plural = '导出任务'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='exportjob_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} #{self.pk} - {self.get_status_display()}'
+
+    @property
+    def progress(self):
+        """导出进度百分比，总行数未知时返回 None"""
+        if self.status == self.STATUS_SUCCESS:
+            return 100
+        if not self.total_rows:
+            return None
+        return min(99, self.processed_rows * 100 // self.total_rows)
@@ -1,8 +1,11 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, IntegerField, Value, When
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 
 from .product import Product
+from inventory.signals import stock_changed
 
 
 class Inventory(models.Model):
@@ -62,6 +65,11 @@ class InventoryTransaction(models.Model):
     class Meta:
         verbose_name = '库存交易记录'
         verbose_name_plural = '库存交易记录'
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='invtxn_created_idx'),
+            # 单个商品的出入库记录
+            models.Index(fields=['product', 'created_at'], name='invtxn_product_created_idx'),
+        ]
     
     def __str__(self):
         return f'{self.product.name} - {self.get_transaction_type_display()} - {self.quantity}'
@@ -77,24 +85,98 @@ def check_inventory(product, quantity):
         return False
 
 
+class _StockChangeRejected(Exception):
+    """内部使用：条件更新未全部命中时回滚保存点"""
+
+
+def change_stock(deltas, create_missing=False):
+    """
+    用一条条件 UPDATE 同时变更一个或多个商品的库存
+
+    UPDATE ... SET quantity = quantity + delta WHERE product_id IN (...) AND quantity + delta >= 0，
+    不需要先读后写，也不需要 select_for_update。全部商品要么一起生效，要么都不生效。
+
+    Args:
+        deltas: {product_id: 变化量}，负数表示扣减
+        create_missing: 为没有库存记录的商品先补建数量为0的库存记录
+
+    Returns:
+        list: 未能生效的商品 [{'product_id', 'change', 'current_stock'}]，
+            current_stock 为 None 表示没有库存记录；空列表表示全部成功
+    """
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+    if not deltas:
+        return []
+
+    change = Case(
+        *[When(product_id=product_id, then=Value(delta)) for product_id, delta in deltas.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+    for _ in range(3):
+        try:
+            with transaction.atomic():
+                updated = (
+                    Inventory.objects.filter(product_id__in=deltas)
+                    .alias(new_quantity=F('quantity') + change)
+                    .filter(new_quantity__gte=0)
+                    .update(quantity=F('quantity') + change, updated_at=timezone.now())
+                )
+                if updated != len(deltas):
+                    raise _StockChangeRejected
+            stock_changed.send(sender=Inventory, product_ids=list(deltas))
+            return []
+        except _StockChangeRejected:
+            pass
+
+        # 失败路径才读取当前库存，用于报告具体哪些商品不满足条件
+        current = dict(
+            Inventory.objects.filter(product_id__in=deltas).values_list('product_id', 'quantity')
+        )
+        missing = [product_id for product_id in deltas if product_id not in current]
+        if create_missing and missing and all(deltas[product_id] > 0 for product_id in missing):
+            Inventory.objects.bulk_create(
+                [Inventory(product_id=product_id, quantity=0) for product_id in missing],
+                ignore_conflicts=True,
+            )
+            continue
+
+        failed = [
+            {
+                'product_id': product_id,
+                'change': delta,
+                'current_stock': current.get(product_id),
+            }
+            for product_id, delta in deltas.items()
+            if product_id not in current or current[product_id] + delta < 0
+        ]
+        if failed:
+            return failed
+        # 读取时其他收银台已补货，重试一次条件更新
+
+    return [
+        {'product_id': product_id, 'change': delta, 'current_stock': None}
+        for product_id, delta in deltas.items()
+    ]
+
+
 def update_inventory(product, quantity, transaction_type, operator, notes=''):
     """更新库存并记录交易"""
     try:
-        # 获取或创建库存记录
-        inventory, created = Inventory.objects.get_or_create(
-            product=product,
-            defaults={'quantity': 0}
-        )
-        
-        # 更新库存数量
-        old_quantity = inventory.quantity
-        inventory.quantity += quantity
-        
-        # 确保库存不为负数
-        if inventory.quantity < 0:
-            raise ValidationError(f"库存不足: {product.name}, 当前库存: {old_quantity}, 请求数量: {abs(quantity)}")
-        
-        inventory.save()
+        # 条件更新库存数量，扣减后库存不能为负数
+        failed = change_stock({product.id: quantity}, create_missing=quantity > 0)
+        if failed:
+            current = failed[0]['current_stock'] or 0
+            raise ValidationError(f"库存不足: {product.name}, 当前库存: {current}, 请求数量: {abs(quantity)}")
+
+        if quantity:
+            inventory = Inventory.objects.get(product=product)
+        else:
+            inventory, created = Inventory.objects.get_or_create(
+                product=product,
+                defaults={'quantity': 0}
+            )
         
         # 记录库存交易
         transaction = InventoryTransaction.objects.create(
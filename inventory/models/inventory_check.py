@@ -30,6 +30,8 @@ class InventoryCheck(models.Model):
         verbose_name='审核人'
     )
     approved_at = models.DateTimeField(null=True, blank=True, verbose_name='审核时间')
+    # 已完成/已审核的盘点单汇总结果缓存，盘点项变动时清空
+    summary = models.JSONField(null=True, blank=True, editable=False, verbose_name='汇总缓存')
     
     class Meta:
         verbose_name = '库存盘点'
@@ -57,6 +59,10 @@ class InventoryCheckItem(models.Model):
         verbose_name = '盘点项目'
         verbose_name_plural = '盘点项目'
         unique_together = ('inventory_check', 'product')
+        indexes = [
+            # 统计盘点单中已盘点 / 未盘点的项目
+            models.Index(fields=['inventory_check', 'actual_quantity'], name='checkitem_check_actual_idx'),
+        ]
     
     def __str__(self):
         return f'{self.product.name} - 系统:{self.system_quantity} 实际:{self.actual_quantity or "未盘点"}'
@@ -61,6 +61,7 @@ class Member(models.Model):
     class Meta:
         verbose_name = '会员'
         verbose_name_plural = '会员'
+        # 生日报表使用的 member_birthday_md_idx 函数索引只在 PostgreSQL 上建立，见迁移 0022
 
     def __str__(self):
         return self.name
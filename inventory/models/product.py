@@ -82,6 +82,15 @@ class Product(models.Model):
     class Meta:
         verbose_name = '商品'
         verbose_name_plural = '商品'
+        indexes = [
+            # 商品列表各排序方式的键集分页
+            models.Index(fields=['updated_at', 'id'], name='product_updated_idx'),
+            models.Index(fields=['created_at', 'id'], name='product_created_idx'),
+            models.Index(fields=['name', 'id'], name='product_name_idx'),
+            models.Index(fields=['price', 'id'], name='product_price_idx'),
+            # 默认只列出启用的商品，按更新时间倒序
+            models.Index(fields=['is_active', 'updated_at', 'id'], name='product_active_updated_idx'),
+        ]
     
     def __str__(self):
         return self.name
@@ -0,0 +1,54 @@
+from django.db import models
+from django.contrib.auth.models import User
+
+from .product import Product, Category
+
+
+class DailySalesRollup(models.Model):
+    """
+    每日销售汇总，粒度为 日期 × 商品 × 分类 × 支付方式 × 收银员
+
+    销售单完成时增量累加，报表直接对本表求和，无需再扫描销售明细。
+    同一粒度允许存在多行（并发收银时可能出现），读取时一律按 Sum 汇总。
+    """
+    date = models.DateField(verbose_name='日期')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='sales_rollups', verbose_name='商品')
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='分类')
+    payment_method = models.CharField(max_length=20, verbose_name='支付方式')
+    operator = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='收银员')
+    quantity = models.IntegerField(default=0, verbose_name='销售数量')
+    item_count = models.IntegerField(default=0, verbose_name='明细行数')
+    order_count = models.IntegerField(default=0, verbose_name='销售单数')
+    sales_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='销售额')
+    discount_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='折扣金额')
+    final_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='实收金额')
+    cost_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='成本金额')
+
+    class Meta:
+        verbose_name = '每日销售汇总'
+        verbose_name_plural = '每日销售汇总'
+        indexes = [
+            models.Index(fields=['date', 'product'], name='rollup_date_product_idx'),
+            models.Index(fields=['date', 'category'], name='rollup_date_category_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.date} - {self.product_id} - {self.final_amount}'
+
+
+class SalesRollupState(models.Model):
+    """
+    每日销售汇总的覆盖范围
+
+    covered_from 之后（含）的所有已完成销售都已计入汇总表；
+    为空表示汇总表尚未重建过，报表仍读取原始销售数据。
+    """
+    covered_from = models.DateField(null=True, blank=True, verbose_name='覆盖起始日期')
+    rebuilt_at = models.DateTimeField(null=True, blank=True, verbose_name='最近重建时间')
+
+    class Meta:
+        verbose_name = '销售汇总状态'
+        verbose_name_plural = '销售汇总状态'
+
+    def __str__(self):
+        return f'销售汇总覆盖自 {self.covered_from or "-"}'
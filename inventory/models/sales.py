@@ -59,6 +59,11 @@ class Sale(models.Model):
     class Meta:
         verbose_name = '销售单'
         verbose_name_plural = '销售单'
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='sale_created_idx'),
+            # 会员消费记录、会员分析按会员和时间筛选
+            models.Index(fields=['member', 'created_at'], name='sale_member_created_idx'),
+        ]
 
     def __str__(self):
         return f'销售单 #{self.id} - {self.created_at.strftime("%Y-%m-%d %H:%M")}'
@@ -105,6 +110,9 @@ class SaleItem(models.Model):
     class Meta:
         verbose_name = '销售明细'
         verbose_name_plural = '销售明细'
+        indexes = [
+            models.Index(fields=['sale', 'product'], name='saleitem_sale_product_idx'),
+        ]
     
     def __str__(self):
         return f'{self.product.name} x {self.quantity}' 
\ No newline at end of file
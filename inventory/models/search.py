@@ -0,0 +1,24 @@
+from django.db import models
+
+from .product import Product
+
+
+class ProductSearchDocument(models.Model):
+    """
+    商品检索文档，由 ProductSearchService 根据商品字段生成
+
+    SQLite 下由触发器同步到 FTS5 全文索引表，PostgreSQL 下 content 字段带 trigram 索引。
+    """
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True,
+        related_name='search_document', verbose_name='商品'
+    )
+    content = models.TextField(verbose_name='检索词')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+
+    class Meta:
+        verbose_name = '商品检索文档'
+        verbose_name_plural = '商品检索文档'
+
+    def __str__(self):
+        return f'{self.product_id} - {self.content[:50]}'
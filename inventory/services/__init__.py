@@ -11,6 +11,13 @@ from . import report_service
 from . import inventory_check_service
 from . import backup_service
 from . import inventory_service
+from . import sales_rollup_service
+from . import checkout_service
+from . import dashboard_service
+from . import search_service
+from . import barcode_enrichment_service
+from . import export_job_service
+from . import counter_service
 
 # 导出服务模块，方便直接访问
 __all__ = [
@@ -21,4 +28,11 @@ __all__ = [
     'inventory_check_service',
     'backup_service',
     'inventory_service',
+    'sales_rollup_service',
+    'checkout_service',
+    'dashboard_service',
+    'search_service',
+    'barcode_enrichment_service',
+    'export_job_service',
+    'counter_service',
 ] 
\ No newline at end of file
@@ -1,19 +1,173 @@
 import os
 import datetime
+import gzip
+import hashlib
+import io
 import shutil
 import json
-import glob
 import logging
-from pathlib import Path
+import sqlite3
+import subprocess
+import tarfile
+import tempfile
+import zlib
+from django.apps import apps
 from django.conf import settings
 from django import get_version
+from django.core import serializers
 from django.core.management import call_command
-from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from inventory.exceptions import InventoryValidationError
+from inventory.models import Product, Sale
+from inventory.services.counter_service import CounterService
+from inventory.services.sales_rollup_service import SalesRollupService
+from inventory.services.search_service import ProductSearchService
+
+try:
+    import zstandard
+except ImportError:  # zstd 为可选依赖，未安装时使用 gzip
+    zstandard = None
 
 logger = logging.getLogger(__name__)
 
+MANIFEST_VERSION = 2
+MANIFEST_FILE = 'manifest.json'
+# 备份列表页读取的信息文件
+INFO_FILE = 'backup_info.json'
+# 旧版备份：dumpdata 生成的 JSON 和元数据
+LEGACY_FIXTURE_FILE = 'db.json'
+LEGACY_METADATA_FILE = 'metadata.json'
+
+COPY_CHUNK_SIZE = 1024 * 1024
+# SQLite 在线备份每步复制的页数，步与步之间释放锁，不阻塞收银写入
+SQLITE_BACKUP_PAGES = 4096
+SERIALIZE_CHUNK_SIZE = 2000
+
+# 只追加的表：增量备份只导出上次备份之后新增的行（按自增ID）。
+# 已有行的修改（如销售单状态）由下一次完整备份覆盖。
+INCREMENTAL_MODELS = (
+    'inventory.Sale',
+    'inventory.SaleItem',
+    'inventory.InventoryTransaction',
+    'inventory.OperationLog',
+    # 会员余额和积分的流水，与恢复的会员余额、积分保持一致
+    'inventory.MemberTransaction',
+    'inventory.RechargeRecord',
+)
+
+# 增量行引用的表：每个增量导出基础备份之后新增、修改或被增量行引用的行（按主键覆盖），
+# 使新销售单引用的新商品、会员、用户在恢复后存在，库存数量和会员累计与增量中的单据一致
+REFERENCED_MODELS = (
+    'auth.User',
+    'inventory.Category',
+    'inventory.MemberLevel',
+    'inventory.Product',
+    'inventory.Inventory',
+    'inventory.Member',
+)
+
+# (被引用的表, 随之变化的表) -> 关联字段：新的出入库和销售明细引用的商品，其库存行的数量也已变化
+INDIRECT_REFERENCES = {
+    ('inventory.Product', 'inventory.Inventory'): 'product_id',
+}
+
+# 恢复增量备份链时在临时 SQLite 文件中组装，使用的数据库连接别名
+STAGING_ALIAS = 'backup_staging'
+
+DUMPDATA_EXCLUDES = ('contenttypes', 'auth.Permission', 'sessions.session')
+
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+
+
+def _compression():
+    """配置的压缩算法；配置为 zstd 但未安装 zstandard 时退回 gzip"""
+    method = getattr(settings, 'BACKUP_COMPRESSION', 'gzip')
+    if method == 'zstd' and zstandard is None:
+        logger.warning("未安装 zstandard，备份改用 gzip 压缩")
+        method = 'gzip'
+    if method not in COMPRESSION_SUFFIXES:
+        raise InventoryValidationError(f"不支持的压缩算法: {method}")
+    return method
+
+
+def _open_compressed(path, method):
+    """以流的方式写入压缩文件"""
+    if method == 'zstd':
+        return zstandard.ZstdCompressor(level=3, threads=-1).stream_writer(open(path, 'wb'))
+    return gzip.open(path, 'wb', compresslevel=6)
+
+
+def _open_decompressed(path):
+    """按扩展名以流的方式读取压缩文件"""
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise InventoryValidationError("该备份使用 zstd 压缩，需要安装 zstandard")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def _referenced_rows(model, base_marks, high_water, since):
+    """
+    增量中需要导出的被引用表的行：基础备份之后新增或修改的行，以及被新增的只追加行引用的行。
+    销售扣减库存、会员累计等通过 UPDATE 修改，不一定更新 updated_at，因此按引用关系补充。
+    """
+    label = model._meta.label
+    condition = Q(pk__gt=base_marks.get(label, 0))
+    if any(f.name == 'updated_at' for f in model._meta.concrete_fields):
+        condition |= Q(updated_at__gte=since)
+    for source_label in INCREMENTAL_MODELS:
+        source = apps.get_model(source_label)
+        new_rows = source.objects.filter(
+            pk__gt=base_marks.get(source_label, 0), pk__lte=high_water[source_label]
+        )
+        for field in source._meta.concrete_fields:
+            if not field.is_relation:
+                continue
+            if field.related_model is model:
+                condition |= Q(pk__in=new_rows.values(field.attname))
+            elif (field.related_model._meta.label, label) in INDIRECT_REFERENCES:
+                lookup = INDIRECT_REFERENCES[field.related_model._meta.label, label]
+                condition |= Q(**{f'{lookup}__in': new_rows.values(field.attname)})
+    return model.objects.filter(condition).order_by('pk')
+
+
+def _file_digest(path):
+    """文件的 SHA-256、大小和 CRC32（下载时生成 zip 包使用）"""
+    digest = hashlib.sha256()
+    size = 0
+    crc = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b''):
+            digest.update(chunk)
+            size += len(chunk)
+            crc = zlib.crc32(chunk, crc)
+    return digest.hexdigest(), size, crc
+
+
+def _high_water_marks():
+    """只追加表和增量行引用的表当前的最大ID"""
+    marks = {}
+    for label in INCREMENTAL_MODELS + REFERENCED_MODELS:
+        model = apps.get_model(label)
+        marks[label] = model.objects.aggregate(max_id=Max('pk'))['max_id'] or 0
+    return marks
+
+
 class BackupService:
-    """数据库备份和恢复服务"""
+    """
+    数据库备份和恢复服务
+
+    完整备份：SQLite 使用在线备份 API 复制数据库文件，PostgreSQL 使用 pg_dump 自定义格式，
+    其他数据库退回 dumpdata；结果以流的方式压缩（gzip，或安装 zstandard 后使用 zstd）。
+    增量备份：导出只追加表中 ID 大于上一次备份记录的最大ID的行，以及这些行引用的商品、会员等表中
+    新增或修改的行；恢复时在临时文件中沿备份链依次应用并检查外键，通过后才覆盖当前数据库。
+    每个备份目录有一个 manifest.json，记录每个文件的 SHA-256，恢复前校验。
+    """
     
     @staticmethod
     def get_backup_directory():
@@ -23,53 +177,76 @@ class BackupService:
         return backup_dir
 
     @staticmethod
-    def create_backup(backup_name=None, user=None):
+    def create_backup(backup_name=None, user=None, incremental=False, include_media=True, description=''):
         """
         创建数据库备份
         :param backup_name: 备份名称，如果为None则使用当前日期时间
         :param user: 执行备份的用户
+        :param incremental: 是否只备份上一次备份之后只追加表新增的行
+        :param include_media: 完整备份是否打包媒体文件
+        :param description: 备份描述
         :return: 备份文件路径
         """
+        now = datetime.datetime.now()
         if not backup_name:
-            now = datetime.datetime.now()
             backup_name = f"backup_{now.strftime('%Y%m%d_%H%M%S')}"
         
-        # 创建备份目录
+        base = None
+        if incremental:
+            base = BackupService.latest_backup()
+            if base is None:
+                raise InventoryValidationError("没有可作为基础的备份，请先创建完整备份")
+
         backup_dir = BackupService.get_backup_directory()
         backup_path = os.path.join(backup_dir, backup_name)
         os.makedirs(backup_path, exist_ok=True)
         
         try:
-            # 导出数据库为JSON fixtures
-            fixtures_path = os.path.join(backup_path, 'db.json')
-            with open(fixtures_path, 'w', encoding='utf-8') as f:
-                call_command('dumpdata', '--exclude', 'contenttypes', '--exclude', 'auth.Permission',
-                            '--exclude', 'sessions.session', '--indent', '2', stdout=f)
+            method = _compression()
+            # 先记录最大ID再复制数据：两者之间新增的行会在下一次增量中再导出一次，恢复时按主键覆盖，不会丢失
+            high_water = _high_water_marks()
+            if incremental:
+                artifacts = BackupService._dump_increments(backup_path, base, high_water, method)
+                include_media = False
+            else:
+                artifacts = [BackupService._dump_database(backup_path, method)]
+                if include_media and os.path.isdir(settings.MEDIA_ROOT):
+                    artifacts.append(BackupService._dump_media(backup_path, method))
+                else:
+                    include_media = False
             
-            # 备份媒体文件
-            media_dir = os.path.join(settings.BASE_DIR, 'media')
-            if os.path.exists(media_dir):
-                media_backup_dir = os.path.join(backup_path, 'media')
-                os.makedirs(media_backup_dir, exist_ok=True)
-                for item in os.listdir(media_dir):
-                    source = os.path.join(media_dir, item)
-                    target = os.path.join(media_backup_dir, item)
-                    if os.path.isdir(source):
-                        shutil.copytree(source, target, dirs_exist_ok=True)
-                    else:
-                        shutil.copy2(source, target)
+            for artifact in artifacts:
+                artifact['sha256'], artifact['size'], artifact['crc32'] = _file_digest(
+                    os.path.join(backup_path, artifact['path'])
+                )
             
-            # 记录备份元数据
-            metadata = {
-                'backup_name': backup_name,
-                'created_at': datetime.datetime.now().isoformat(),
+            manifest = {
+                'version': MANIFEST_VERSION,
+                'name': backup_name,
+                'type': 'incremental' if incremental else 'full',
+                'base': base['name'] if base else None,
+                'created_at': now.isoformat(),
                 'created_by': user.username if user else 'system',
                 'django_version': get_version(),
                 'database_engine': settings.DATABASES['default']['ENGINE'],
+                'compression': method,
+                'high_water': high_water,
+                'artifacts': artifacts,
             }
+            with open(os.path.join(backup_path, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2, ensure_ascii=False)
             
-            with open(os.path.join(backup_path, 'metadata.json'), 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, indent=2)
+            backup_info = {
+                'name': backup_name,
+                'created_at': manifest['created_at'],
+                'created_by': manifest['created_by'],
+                'description': description,
+                'includes_media': include_media,
+                'type': manifest['type'],
+                'base': manifest['base'],
+            }
+            with open(os.path.join(backup_path, INFO_FILE), 'w', encoding='utf-8') as f:
+                json.dump(backup_info, f, indent=4, ensure_ascii=False)
             
             logger.info(f"备份创建成功: {backup_name}")
             return backup_path
@@ -81,54 +258,412 @@ class BackupService:
             raise
 
     @staticmethod
-    def restore_backup(backup_name, user=None):
+    def _dump_database(backup_path, method):
+        """完整备份数据库，返回清单条目"""
+        vendor = connection.vendor
+        if vendor == 'sqlite':
+            path = 'db.sqlite3' + COMPRESSION_SUFFIXES[method]
+            BackupService._dump_sqlite(os.path.join(backup_path, path), method)
+            return {'path': path, 'kind': 'database', 'format': 'sqlite'}
+        if vendor == 'postgresql':
+            # 自定义格式自带压缩，且可用 pg_restore 并行恢复
+            path = 'db.dump'
+            BackupService._run_pg_tool('pg_dump', '--format=custom', '--no-owner',
+                                       f'--file={os.path.join(backup_path, path)}')
+            return {'path': path, 'kind': 'database', 'format': 'pg_dump'}
+
+        path = 'db.jsonl' + COMPRESSION_SUFFIXES[method]
+        with _open_compressed(os.path.join(backup_path, path), method) as raw:
+            with io.TextIOWrapper(raw, encoding='utf-8') as out:
+                args = ['dumpdata', '--format', 'jsonl']
+                for exclude in DUMPDATA_EXCLUDES:
+                    args += ['--exclude', exclude]
+                call_command(*args, stdout=out)
+        return {'path': path, 'kind': 'database', 'format': 'jsonl'}
+
+    @staticmethod
+    def _dump_sqlite(target, method):
+        """用 SQLite 在线备份 API 复制到临时文件，再流式压缩"""
+        BackupService._check_not_in_transaction()
+        connection.ensure_connection()
+        fd, snapshot = tempfile.mkstemp(suffix='.sqlite3', dir=settings.TEMP_DIR)
+        os.close(fd)
+        try:
+            dest = sqlite3.connect(snapshot)
+            try:
+                connection.connection.backup(dest, pages=SQLITE_BACKUP_PAGES)
+            finally:
+                dest.close()
+            with open(snapshot, 'rb') as src, _open_compressed(target, method) as out:
+                shutil.copyfileobj(src, out, COPY_CHUNK_SIZE)
+        finally:
+            os.remove(snapshot)
+
+    @staticmethod
+    def _check_not_in_transaction():
+        """在线备份 API 在连接持有未提交的写事务时会一直等待锁，必须在事务外调用"""
+        if connection.in_atomic_block:
+            raise InventoryValidationError("SQLite 在线备份不能在事务中执行")
+
+    @staticmethod
+    def _run_pg_tool(tool, *args):
+        """调用 pg_dump / pg_restore，连接参数取自 DATABASES 配置"""
+        db = settings.DATABASES['default']
+        env = dict(os.environ)
+        if db.get('PASSWORD'):
+            env['PGPASSWORD'] = db['PASSWORD']
+        command = [tool, *args, f"--dbname={db['NAME']}"]
+        if db.get('HOST'):
+            command.append(f"--host={db['HOST']}")
+        if db.get('PORT'):
+            command.append(f"--port={db['PORT']}")
+        if db.get('USER'):
+            command.append(f"--username={db['USER']}")
+        result = subprocess.run(command, env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"{tool} 执行失败: {result.stderr.strip()}")
+
+    @staticmethod
+    def _dump_increments(backup_path, base, high_water, method):
         """
-        从备份恢复数据库
+        导出只追加表中 (上次最大ID, 当前最大ID] 范围内的行，以及被引用表中新增、修改或被引用的行，
+        每张表一个文件
+        """
+        base_marks = base['high_water']
+        # 基础备份开始的时间，早于其复制数据的时间，两者之间修改的行会再导出一次
+        since = datetime.datetime.fromisoformat(base['created_at'])
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+
+        artifacts = []
+        for label in REFERENCED_MODELS:
+            model = apps.get_model(label)
+            rows = _referenced_rows(model, base_marks, high_water, since)
+            artifacts.append(BackupService._dump_rows(backup_path, model, rows, method))
+        for label in INCREMENTAL_MODELS:
+            model = apps.get_model(label)
+            min_id = base_marks.get(label, 0)
+            max_id = high_water[label]
+            rows = model.objects.filter(pk__gt=min_id, pk__lte=max_id).order_by('pk')
+            artifact = BackupService._dump_rows(backup_path, model, rows, method)
+            artifact.update(min_id=min_id, max_id=max_id)
+            artifacts.append(artifact)
+        return artifacts
+
+    @staticmethod
+    def _dump_rows(backup_path, model, rows, method):
+        """把查询集的行写入一个压缩的 jsonl 文件，返回清单条目"""
+        path = f"{model._meta.model_name}.jsonl{COMPRESSION_SUFFIXES[method]}"
+        with _open_compressed(os.path.join(backup_path, path), method) as raw:
+            with io.TextIOWrapper(raw, encoding='utf-8') as out:
+                serializers.serialize('jsonl', rows.iterator(chunk_size=SERIALIZE_CHUNK_SIZE), stream=out)
+        return {
+            'path': path,
+            'kind': 'table',
+            'model': model._meta.label,
+            'rows': rows.count(),
+        }
+
+    @staticmethod
+    def _dump_media(backup_path, method):
+        """媒体文件打包为压缩 tar"""
+        path = 'media.tar' + COMPRESSION_SUFFIXES[method]
+        with _open_compressed(os.path.join(backup_path, path), method) as out:
+            with tarfile.open(fileobj=out, mode='w|') as tar:
+                for item in sorted(os.listdir(settings.MEDIA_ROOT)):
+                    tar.add(os.path.join(settings.MEDIA_ROOT, item), arcname=item)
+        return {'path': path, 'kind': 'media'}
+
+    @staticmethod
+    def read_manifest(backup_name):
+        """读取备份清单，旧版备份没有清单时返回 None"""
+        manifest_path = os.path.join(BackupService.get_backup_directory(), backup_name, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def latest_backup():
+        """最近一次有清单的备份，作为增量备份的基础"""
+        latest = None
+        backup_dir = BackupService.get_backup_directory()
+        for backup_name in os.listdir(backup_dir):
+            manifest = BackupService.read_manifest(backup_name)
+            if manifest and (latest is None or manifest['created_at'] > latest['created_at']):
+                latest = manifest
+        return latest
+
+    @staticmethod
+    def backup_chain(backup_name):
+        """
+        恢复某个备份所需的备份链，从完整备份开始依次排列
+        :return: 清单列表
+        """
+        chain = []
+        name = backup_name
+        while name:
+            manifest = BackupService.read_manifest(name)
+            if manifest is None:
+                raise InventoryValidationError(f"备份 {name} 不存在或缺少清单")
+            if any(m['name'] == name for m in chain):
+                raise InventoryValidationError(f"备份链存在循环: {name}")
+            chain.append(manifest)
+            name = manifest.get('base')
+        chain.reverse()
+        if chain[0]['type'] != 'full':
+            raise InventoryValidationError(f"备份 {backup_name} 的备份链缺少完整备份")
+        return chain
+
+    @staticmethod
+    def archive_entries(backup_name):
+        """
+        下载备份时 zip 包的文件列表，清单中已记录的 CRC 直接使用
+        :return: [(文件路径, 包内名称, CRC32 或 None), ...]
+        """
+        backup_dir = BackupService.get_backup_directory()
+        backup_path = os.path.join(backup_dir, backup_name)
+        manifest = BackupService.read_manifest(backup_name) or {}
+        known_crcs = {a['path']: a.get('crc32') for a in manifest.get('artifacts', [])}
+        entries = []
+        for dirpath, dirnames, filenames in os.walk(backup_path):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                relative = os.path.relpath(path, backup_path).replace(os.sep, '/')
+                entries.append((path, f"{backup_name}/{relative}", known_crcs.get(relative)))
+        return entries
+
+    @staticmethod
+    def verify_backup(backup_name):
+        """
+        按清单校验备份链中每个文件的大小和 SHA-256
+        :return: 问题列表，为空表示校验通过
+        """
+        problems = []
+        backup_dir = BackupService.get_backup_directory()
+        for manifest in BackupService.backup_chain(backup_name):
+            for artifact in manifest['artifacts']:
+                path = os.path.join(backup_dir, manifest['name'], artifact['path'])
+                if not os.path.exists(path):
+                    problems.append(f"{manifest['name']}/{artifact['path']} 不存在")
+                    continue
+                sha256, size, _ = _file_digest(path)
+                if (sha256, size) != (artifact['sha256'], artifact['size']):
+                    problems.append(f"{manifest['name']}/{artifact['path']} 校验失败")
+        return problems
+
+    @staticmethod
+    def restore(backup_name, restore_media=True):
+        """
+        从备份恢复数据库，失败时抛出异常
         :param backup_name: 备份名称
-        :param user: 执行恢复的用户
-        :return: 成功返回True，失败返回False
+        :param restore_media: 是否恢复媒体文件
         """
         backup_dir = BackupService.get_backup_directory()
         backup_path = os.path.join(backup_dir, backup_name)
-        
         if not os.path.exists(backup_path):
-            logger.error(f"备份不存在: {backup_name}")
-            return False
-        
+            raise InventoryValidationError(f"备份不存在: {backup_name}")
+
+        if BackupService.read_manifest(backup_name) is None:
+            BackupService._restore_legacy(backup_path, restore_media)
+            CounterService.reconcile()
+            return
+
+        problems = BackupService.verify_backup(backup_name)
+        if problems:
+            raise InventoryValidationError("备份文件校验失败: " + "; ".join(problems))
+
+        chain = BackupService.backup_chain(backup_name)
+        full = chain[0]
+        increments = [
+            os.path.join(backup_dir, manifest['name'], artifact['path'])
+            for manifest in chain[1:]
+            for artifact in manifest['artifacts']
+        ]
+        database = next(a for a in full['artifacts'] if a['kind'] == 'database')
+        database_path = os.path.join(backup_dir, full['name'], database['path'])
+        if database['format'] == 'sqlite':
+            restored = BackupService._restore_sqlite_chain(database_path, increments)
+        else:
+            BackupService._restore_database(database_path, database['format'])
+            restored = {}
+            with transaction.atomic():
+                for path in increments:
+                    for label, pks in BackupService._load_jsonl(path).items():
+                        restored.setdefault(label, []).extend(pks)
+                BackupService._check_constraints(connection)
+        BackupService._refresh_derived(restored)
+
+        # 数据库恢复成功后才替换媒体文件
+        for artifact in full['artifacts']:
+            if artifact['kind'] == 'media' and restore_media:
+                BackupService._restore_media(os.path.join(backup_dir, full['name'], artifact['path']))
+
+        # 恢复的数据不经过信号，重新统计列表页使用的行数计数
+        CounterService.reconcile()
+
+    @staticmethod
+    def _refresh_derived(restored):
+        """
+        增量按主键写入，不经过信号：从增量中最早的销售日期起重建每日销售汇总，
+        重建增量中的商品及其分类下商品的检索文档
+
+        Args:
+            restored: 增量写入的行 {模型: [主键, ...]}
+        """
+        sale_ids = restored.get('inventory.Sale')
+        if sale_ids:
+            first_sale = Sale.objects.filter(pk__gte=min(sale_ids)).aggregate(first=Min('created_at'))['first']
+            if first_sale is not None:
+                SalesRollupService.rebuild(start_date=timezone.localdate(first_sale))
+
+        product_ids = set(restored.get('inventory.Product', ()))
+        category_ids = restored.get('inventory.Category', ())
+        for start in range(0, len(category_ids), SERIALIZE_CHUNK_SIZE):
+            product_ids.update(Product.objects.filter(
+                category_id__in=category_ids[start:start + SERIALIZE_CHUNK_SIZE]
+            ).values_list('id', flat=True))
+        product_ids = sorted(product_ids)
+        for start in range(0, len(product_ids), SERIALIZE_CHUNK_SIZE):
+            ProductSearchService.index_products(product_ids[start:start + SERIALIZE_CHUNK_SIZE])
+
+    @staticmethod
+    def _check_constraints(db):
+        """检查外键；增量备份缺少被引用的行时拒绝恢复"""
         try:
-            # 恢复数据库
-            fixtures_path = os.path.join(backup_path, 'db.json')
-            if os.path.exists(fixtures_path):
-                # 先清空数据库，但保留超级用户
-                superusers = list(User.objects.filter(is_superuser=True).values_list('username', flat=True))
-                call_command('flush', '--noinput')
-                call_command('loaddata', fixtures_path)
-                
-                # 记录恢复操作
-                with open(os.path.join(backup_path, 'restore_log.json'), 'w', encoding='utf-8') as f:
-                    restore_log = {
-                        'restored_at': datetime.datetime.now().isoformat(),
-                        'restored_by': user.username if user else 'system',
-                    }
-                    json.dump(restore_log, f, indent=2)
-                
-                # 恢复媒体文件
-                media_backup_dir = os.path.join(backup_path, 'media')
-                if os.path.exists(media_backup_dir):
-                    media_dir = os.path.join(settings.BASE_DIR, 'media')
-                    if os.path.exists(media_dir):
-                        # 先备份当前的媒体文件
-                        media_backup = os.path.join(settings.BASE_DIR, f"media_backup_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}")
-                        shutil.move(media_dir, media_backup)
-                    
-                    # 复制备份的媒体文件
-                    shutil.copytree(media_backup_dir, media_dir)
-                
-                logger.info(f"备份恢复成功: {backup_name}")
-                return True
-            else:
-                logger.error(f"备份文件不完整，缺少db.json: {backup_name}")
-                return False
+            db.check_constraints()
+        except IntegrityError as e:
+            raise InventoryValidationError(f"增量备份链无法一致地恢复: {e}")
+
+    @staticmethod
+    def _restore_sqlite_chain(path, increments):
+        """
+        在临时 SQLite 文件中解压完整快照并依次应用增量，外键检查通过后才用在线备份 API 覆盖当前数据库；
+        检查失败时当前数据库保持不变
+
+        Returns:
+            dict: 增量写入的行 {模型: [主键, ...]}
+        """
+        fd, staging = tempfile.mkstemp(suffix='.sqlite3', dir=settings.TEMP_DIR)
+        restored = {}
+        try:
+            with os.fdopen(fd, 'wb') as out, _open_decompressed(path) as src:
+                shutil.copyfileobj(src, out, COPY_CHUNK_SIZE)
+            if increments:
+                restored = BackupService._apply_increments(staging, increments)
+            BackupService._check_not_in_transaction()
+            connection.ensure_connection()
+            source = sqlite3.connect(staging)
+            try:
+                source.backup(connection.connection, pages=SQLITE_BACKUP_PAGES)
+            finally:
+                source.close()
+        finally:
+            os.remove(staging)
+        return restored
+
+    @staticmethod
+    def _apply_increments(staging, increments):
+        """通过临时的数据库连接把增量写入组装用的 SQLite 文件并检查外键，返回写入的行"""
+        live = connections['default']
+        db = live.__class__({**live.settings_dict, 'NAME': staging}, alias=STAGING_ALIAS)
+        connections[STAGING_ALIAS] = db
+        restored = {}
+        try:
+            with transaction.atomic(using=STAGING_ALIAS):
+                for path in increments:
+                    for label, pks in BackupService._load_jsonl(path, using=STAGING_ALIAS).items():
+                        restored.setdefault(label, []).extend(pks)
+                BackupService._check_constraints(db)
+        finally:
+            db.close()
+            del connections[STAGING_ALIAS]
+        return restored
+
+    @staticmethod
+    def _restore_database(path, fmt):
+        if fmt == 'sqlite':
+            BackupService._restore_sqlite_chain(path, [])
+        elif fmt == 'pg_dump':
+            BackupService._run_pg_tool('pg_restore', '--clean', '--if-exists', '--no-owner',
+                                       '--single-transaction', path)
+        else:
+            with transaction.atomic():
+                call_command('flush', '--noinput', verbosity=0)
+                BackupService._load_jsonl(path)
+
+    @staticmethod
+    def _load_jsonl(path, using='default'):
+        """
+        逐行反序列化并按主键写入（与 loaddata 相同，不调用模型的 save 方法）
+
+        Returns:
+            dict: 写入的行 {模型: [主键, ...]}
+        """
+        deferred = []
+        loaded = {}
+        with _open_decompressed(path) as raw, connections[using].constraint_checks_disabled():
+            stream = io.TextIOWrapper(raw, encoding='utf-8')
+            for obj in serializers.deserialize('jsonl', stream, using=using, handle_forward_references=True):
+                obj.save(using=using)
+                loaded.setdefault(obj.object._meta.label, []).append(obj.object.pk)
+                if obj.deferred_fields:
+                    deferred.append(obj)
+            for obj in deferred:
+                obj.save_deferred_fields(using=using)
+        return loaded
+
+    @staticmethod
+    def _restore_media(path):
+        """清空媒体目录后解压备份中的媒体文件"""
+        media_root = settings.MEDIA_ROOT
+        if os.path.exists(media_root):
+            shutil.rmtree(media_root)
+        os.makedirs(media_root, exist_ok=True)
+        with _open_decompressed(path) as src:
+            with tarfile.open(fileobj=src, mode='r|') as tar:
+                tar.extractall(media_root, filter='data')
+
+    @staticmethod
+    def _restore_legacy(backup_path, restore_media):
+        """恢复旧版 dumpdata 备份"""
+        fixtures_path = os.path.join(backup_path, LEGACY_FIXTURE_FILE)
+        if not os.path.exists(fixtures_path):
+            raise InventoryValidationError(f"备份文件不完整，缺少{LEGACY_FIXTURE_FILE}")
+        # 先清空数据库再加载快照；loaddata 只会 upsert，不能删除备份后新增的数据。
+        with transaction.atomic():
+            call_command('flush', '--noinput', verbosity=0)
+            call_command('loaddata', fixtures_path, verbosity=0)
+
+        media_backup_dir = os.path.join(backup_path, 'media')
+        if restore_media and os.path.exists(media_backup_dir):
+            if os.path.exists(settings.MEDIA_ROOT):
+                # 先备份当前的媒体文件
+                media_backup = f"{settings.MEDIA_ROOT}_backup_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                shutil.move(settings.MEDIA_ROOT, media_backup)
+            shutil.copytree(media_backup_dir, settings.MEDIA_ROOT)
+
+    @staticmethod
+    def restore_backup(backup_name, user=None, restore_media=True):
+        """
+        从备份恢复数据库
+        :param backup_name: 备份名称
+        :param user: 执行恢复的用户
+        :param restore_media: 是否恢复媒体文件
+        :return: 成功返回True，失败返回False
+        """
+        try:
+            BackupService.restore(backup_name, restore_media=restore_media)
+            with open(os.path.join(BackupService.get_backup_directory(), backup_name, 'restore_log.json'),
+                      'w', encoding='utf-8') as f:
+                restore_log = {
+                    'restored_at': datetime.datetime.now().isoformat(),
+                    'restored_by': user.username if user else 'system',
+                }
+                json.dump(restore_log, f, indent=2)
+            logger.info(f"备份恢复成功: {backup_name}")
+            return True
         except Exception as e:
             logger.error(f"备份恢复失败: {str(e)}")
             return False
@@ -147,7 +682,9 @@ class BackupService:
         for backup_name in os.listdir(backup_dir):
             backup_path = os.path.join(backup_dir, backup_name)
             if os.path.isdir(backup_path):
-                metadata_path = os.path.join(backup_path, 'metadata.json')
+                metadata_path = os.path.join(backup_path, INFO_FILE)
+                if not os.path.exists(metadata_path):
+                    metadata_path = os.path.join(backup_path, LEGACY_METADATA_FILE)
                 if os.path.exists(metadata_path):
                     try:
                         with open(metadata_path, 'r', encoding='utf-8') as f:
@@ -167,6 +704,7 @@ class BackupService:
                             'created_by': metadata.get('created_by', 'unknown'),
                             'size': f"{size_mb:.2f} MB",
                             'size_bytes': size_bytes,
+                            'type': metadata.get('type', 'full'),
                             'metadata': metadata
                         })
                     except Exception as e:
@@ -178,12 +716,22 @@ class BackupService:
                             'created_by': 'unknown',
                             'size': '未知',
                             'size_bytes': 0,
+                            'type': 'full',
                             'metadata': {}
                         })
         
         # 按创建时间排序，最新的在前面
         backups.sort(key=lambda x: x['created_at'], reverse=True)
         return backups
+
+    @staticmethod
+    def dependent_backups(backup_name):
+        """以指定备份为基础的增量备份名称"""
+        backup_dir = BackupService.get_backup_directory()
+        return sorted(
+            name for name in os.listdir(backup_dir)
+            if (BackupService.read_manifest(name) or {}).get('base') == backup_name
+        )
     
     @staticmethod
     def delete_backup(backup_name):
@@ -198,6 +746,11 @@ class BackupService:
         if not os.path.exists(backup_path):
             logger.error(f"备份不存在: {backup_name}")
             return False
+
+        dependents = BackupService.dependent_backups(backup_name)
+        if dependents:
+            logger.error(f"备份 {backup_name} 是增量备份 {', '.join(dependents)} 的基础，不能删除")
+            return False
         
         try:
             shutil.rmtree(backup_path)
@@ -0,0 +1,157 @@
+"""
+条码信息补全服务 - 批量调用条码接口补全商品名称、规格、厂商等信息
+"""
+import json
+import logging
+import os
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from inventory.ali_barcode_service import AliBarcodeService
+from inventory.models import Product
+from inventory.services.search_service import ProductSearchService
+from inventory.utils.rate_limit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# 商品字段与条码接口返回字段的对应关系
+ENRICH_FIELDS = {
+    'name': 'name',
+    'specification': 'specification',
+    'manufacturer': 'manufacturer',
+    'description': 'description',
+}
+
+
+def default_checkpoint_path():
+    """默认断点文件位置"""
+    return os.path.join(getattr(settings, 'TEMP_DIR', settings.BASE_DIR), 'barcode_enrichment.json')
+
+
+class BarcodeEnrichmentService:
+    """
+    商品条码信息批量补全
+
+    按商品ID顺序分批处理，每批：
+    1. 通过 AliBarcodeService.lookup_many 读取缓存并并发请求未缓存的条码；
+    2. 只填写为空的字段（overwrite=True 时覆盖），bulk_update 写回；
+    3. 更新检索文档并写入断点文件，中断后可从断点继续。
+    """
+
+    @staticmethod
+    def candidates(overwrite=False):
+        """需要补全的商品：名称为空或等于条码，或规格、厂商为空"""
+        queryset = Product.objects.exclude(barcode='')
+        if not overwrite:
+            queryset = queryset.filter(
+                Q(name='') | Q(name=F('barcode')) | Q(specification='') | Q(manufacturer='')
+            )
+        return queryset.order_by('id')
+
+    @staticmethod
+    def load_checkpoint(path):
+        """读取断点，文件不存在时返回初始状态"""
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                state = json.load(f)
+            state.pop('saved_at', None)
+            return state
+        return {'last_id': 0, 'processed': 0, 'updated': 0, 'not_found': 0}
+
+    @staticmethod
+    def save_checkpoint(path, state):
+        """原子写入断点文件"""
+        if not path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(state, saved_at=timezone.now().isoformat()), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def apply(product, data, overwrite=False):
+        """
+        把条码接口返回的信息写到商品上（不保存）
+
+        Returns:
+            list: 修改过的字段名
+        """
+        changed = []
+        for field, key in ENRICH_FIELDS.items():
+            value = (data.get(key) or '').strip()
+            if not value:
+                continue
+            value = value[:Product._meta.get_field(field).max_length or len(value)]
+            current = getattr(product, field)
+            blank = not current or (field == 'name' and current == product.barcode)
+            if (blank or overwrite) and current != value:
+                setattr(product, field, value)
+                changed.append(field)
+        return changed
+
+    @staticmethod
+    def enrich(batch_size=100, max_workers=4, rate=5.0, checkpoint=None, resume=True,
+               limit=None, overwrite=False, progress=None):
+        """
+        批量补全商品信息
+
+        Args:
+            batch_size: 每批商品数量
+            max_workers: 并发请求条码接口的线程数
+            rate: 每秒最多请求接口次数，0 表示不限
+            checkpoint: 断点文件路径，None 表示不记录断点
+            resume: 是否从断点继续
+            limit: 最多处理的商品数量
+            overwrite: 是否覆盖已有字段
+            progress: 每批完成后的回调，参数为当前状态字典
+
+        Returns:
+            dict: 处理统计 last_id、processed、updated、not_found
+        """
+        state = BarcodeEnrichmentService.load_checkpoint(checkpoint) if resume else {
+            'last_id': 0, 'processed': 0, 'updated': 0, 'not_found': 0,
+        }
+        limiter = RateLimiter(rate, burst=max_workers)
+        queryset = BarcodeEnrichmentService.candidates(overwrite)
+        handled = 0
+
+        while limit is None or handled < limit:
+            size = batch_size if limit is None else min(batch_size, limit - handled)
+            products = list(queryset.filter(id__gt=state['last_id'])[:size])
+            if not products:
+                break
+
+            results = AliBarcodeService.lookup_many(
+                [p.barcode for p in products], max_workers=max_workers, rate_limiter=limiter
+            )
+            changed_products = []
+            changed_fields = set()
+            for product in products:
+                data = results.get(product.barcode)
+                if not data:
+                    state['not_found'] += 1
+                    continue
+                fields = BarcodeEnrichmentService.apply(product, data, overwrite)
+                if fields:
+                    product.updated_at = timezone.now()
+                    changed_products.append(product)
+                    changed_fields.update(fields)
+
+            if changed_products:
+                Product.objects.bulk_update(changed_products, sorted(changed_fields) + ['updated_at'])
+                # bulk_update 不触发 post_save，需手动更新检索文档
+                ProductSearchService.index_products(p.id for p in changed_products)
+
+            handled += len(products)
+            state['last_id'] = products[-1].id
+            state['processed'] += len(products)
+            state['updated'] += len(changed_products)
+            BarcodeEnrichmentService.save_checkpoint(checkpoint, state)
+            logger.info("条码补全进度: %s", state)
+            if progress is not None:
+                progress(dict(state))
+
+        return state
@@ -0,0 +1,302 @@
+"""
+收银结算服务 - 以固定次数的批量查询完成一次收银
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.contrib.contenttypes.models import ContentType
+
+from inventory.models import (
+    Inventory,
+    InventoryTransaction,
+    Member,
+    MemberTransaction,
+    OperationLog,
+    Product,
+    Sale,
+    SaleItem,
+    change_stock,
+)
+from inventory.exceptions import InsufficientStockError, InventoryValidationError
+from inventory.utils.logging import log_exception
+from inventory.services.member_service import apply_member_balance_change
+from inventory.services.sales_rollup_service import SalesRollupService
+
+
+class CheckoutService:
+    """收银结算服务。
+
+    查询次数与购物车行数无关：商品、价格和库存一次读取，库存用一条
+    条件 UPDATE 扣减，销售明细、库存流水和操作日志各一次 bulk_create。
+    """
+
+    @staticmethod
+    def parse_cart(data):
+        """
+        从收银台提交的表单中解析购物车行
+
+        Args:
+            data: 形如 products[<i>][id|quantity|price] 的 QueryDict
+
+        Returns:
+            list: [{'product_id', 'quantity', 'price'}]，按提交顺序排列
+        """
+        cart = []
+        for key, value in data.items():
+            if key.startswith('products[') and key.endswith('][id]'):
+                index = key[9:-5]
+                cart.append({
+                    'product_id': value,
+                    'quantity': data.get(f'products[{index}][quantity]', 1),
+                    'price': data.get(f'products[{index}][price]', 0),
+                })
+        return cart
+
+    @staticmethod
+    def prepare_lines(cart):
+        """
+        用一次查询加载购物车内所有商品及其库存，并校验数量、价格和库存
+
+        Args:
+            cart: parse_cart 的返回值
+
+        Returns:
+            tuple: (lines, errors)
+                lines 为可结算的行 [{'product', 'quantity', 'price', 'subtotal'}]；
+                errors 为被跳过的行 [{'level': 'error'|'warning', 'message'}]
+        """
+        errors = []
+        product_ids = set()
+        for item in cart:
+            try:
+                product_ids.add(int(item['product_id']))
+            except (TypeError, ValueError):
+                pass
+
+        products = {
+            product.id: product
+            for product in Product.objects.filter(id__in=product_ids).select_related('inventory')
+        }
+
+        lines = []
+        requested = {}
+        for item in cart:
+            try:
+                product = products[int(item['product_id'])]
+            except (KeyError, TypeError, ValueError):
+                errors.append({
+                    'level': 'error',
+                    'message': f"处理商品时出错：无效的商品 ID {item['product_id']}。",
+                })
+                continue
+
+            try:
+                quantity = int(item['quantity'])
+                if quantity <= 0:
+                    raise ValueError
+            except (TypeError, ValueError):
+                errors.append({
+                    'level': 'error',
+                    'message': f"商品 {product.name} 的数量 '{item['quantity']}' 无效。",
+                })
+                continue
+
+            # 前端价格优先，无效时回退到商品售价
+            try:
+                price = Decimal(str(item['price']).replace(',', '.'))
+                # NaN 无法与 0 比较，Infinity 无法保留两位小数，均按无效价格处理
+                if not price.is_finite():
+                    raise ValueError
+            except (InvalidOperation, ValueError, TypeError):
+                price = Decimal('0')
+            if price <= 0:
+                price = Decimal(product.price or 0)
+            if price <= 0:
+                errors.append({
+                    'level': 'error',
+                    'message': f"商品 {product.name} 的价格解析错误，请联系管理员。",
+                })
+                continue
+
+            try:
+                available = product.inventory.quantity
+            except Inventory.DoesNotExist:
+                errors.append({
+                    'level': 'error',
+                    'message': f"处理商品 {product.name} 时出错：找不到库存记录。",
+                })
+                continue
+
+            # 同一商品出现在多行时按累计数量校验
+            if requested.get(product.id, 0) + quantity > available:
+                errors.append({
+                    'level': 'warning',
+                    'message': f"商品 {product.name} 库存不足 (需要 {quantity}, 可用 {available})。该商品未添加到销售单。",
+                })
+                continue
+
+            requested[product.id] = requested.get(product.id, 0) + quantity
+            lines.append({
+                'product': product,
+                'quantity': quantity,
+                'price': price,
+                'subtotal': price * quantity,
+            })
+
+        return lines, errors
+
+    @staticmethod
+    @log_exception
+    def checkout(lines, operator, member_id=None, payment_method='cash', remark=''):
+        """
+        在一个事务内完成结算：创建已完成的销售单、扣减库存、写入明细、
+        库存流水、会员变动和操作日志
+
+        Args:
+            lines: prepare_lines 返回的可结算行
+            operator: 收银员
+            member_id: 会员ID，可为空
+            payment_method: 支付方式，兼容旧前端的 account
+            remark: 销售备注
+
+        Returns:
+            Sale: 已完成的销售单
+
+        Raises:
+            InventoryValidationError: 购物车为空、余额支付无会员或余额不足
+            InsufficientStockError: 扣减时库存不足，extra['lines'] 列出不足的商品
+        """
+        if not lines:
+            raise InventoryValidationError('销售单创建失败，未能添加任何有效商品。')
+
+        if payment_method == 'account':
+            payment_method = 'balance'
+
+        quantities = {}
+        for line in lines:
+            product_id = line['product'].id
+            quantities[product_id] = quantities.get(product_id, 0) + line['quantity']
+
+        total_amount = sum((line['subtotal'] for line in lines), Decimal('0'))
+
+        with transaction.atomic():
+            member = None
+            discount_rate = Decimal('1.0')
+            if member_id:
+                member = (
+                    Member.objects.select_for_update(of=('self',))
+                    .select_related('level')
+                    .filter(pk=member_id)
+                    .first()
+                )
+                if member and member.level and member.level.discount is not None:
+                    discount_rate = Decimal(str(member.level.discount))
+
+            discount_amount = (total_amount * (Decimal('1.0') - discount_rate)).quantize(Decimal('0.01'))
+            final_amount = total_amount - discount_amount
+
+            balance_paid = Decimal('0')
+            if payment_method == 'balance':
+                if member is None:
+                    raise InventoryValidationError('余额支付需要选择会员')
+                if member.balance < final_amount:
+                    raise InventoryValidationError('会员余额不足')
+                balance_paid = final_amount
+
+            # 一条条件 UPDATE 扣减全部商品库存，任一商品不足则整体不生效
+            shortages = change_stock({product_id: -needed for product_id, needed in quantities.items()})
+            if shortages:
+                names = {line['product'].id: line['product'].name for line in lines}
+                for shortage in shortages:
+                    shortage['needed'] = quantities[shortage['product_id']]
+                    shortage['current_stock'] = shortage['current_stock'] or 0
+                detail = '、'.join(
+                    f"{names[s['product_id']]} (需要 {s['needed']}, 可用 {s['current_stock']})"
+                    for s in shortages
+                )
+                raise InsufficientStockError(f'库存不足: {detail}', extra={'lines': shortages})
+
+            sale = Sale(
+                member=member,
+                total_amount=total_amount,
+                discount_amount=discount_amount,
+                final_amount=final_amount,
+                points_earned=int(final_amount),
+                payment_method=payment_method,
+                balance_paid=balance_paid,
+                status='COMPLETED',
+                operator=operator,
+                remark=remark or '',
+            )
+            sale.save()
+
+            now = timezone.now()
+
+            # bulk_create 不触发 SaleItem.save，库存已在上面统一扣减
+            items = SaleItem.objects.bulk_create([
+                SaleItem(
+                    sale=sale,
+                    product=line['product'],
+                    quantity=line['quantity'],
+                    price=line['price'],
+                    actual_price=line['price'],
+                    subtotal=line['subtotal'],
+                )
+                for line in lines
+            ])
+            InventoryTransaction.objects.bulk_create([
+                InventoryTransaction(
+                    product=line['product'],
+                    transaction_type='OUT',
+                    quantity=line['quantity'],
+                    operator=operator,
+                    notes=f'销售单号：{sale.id}',
+                )
+                for line in lines
+            ])
+
+            if member is not None:
+                if payment_method == 'balance':
+                    apply_member_balance_change(member, -final_amount)
+                    MemberTransaction.objects.create(
+                        member=member,
+                        transaction_type='PURCHASE',
+                        balance_change=-final_amount,
+                        points_change=0,
+                        description=f'销售单 #{sale.id} 余额支付',
+                        created_by=operator,
+                        related_object_id=sale.id,
+                        related_object_type='Sale',
+                    )
+                Member.objects.filter(pk=member.pk).update(
+                    points=F('points') + sale.points_earned,
+                    purchase_count=F('purchase_count') + 1,
+                    total_spend=F('total_spend') + final_amount,
+                    updated_at=now,
+                )
+
+            sale_type = ContentType.objects.get_for_model(Sale)
+            logs = [
+                OperationLog(
+                    operator=operator,
+                    operation_type='SALE',
+                    details=f"销售商品 {line['product'].name} 数量 {line['quantity']}",
+                    related_object_id=sale.id,
+                    related_content_type=sale_type,
+                )
+                for line in lines
+            ]
+            logs.append(OperationLog(
+                operator=operator,
+                operation_type='SALE',
+                details=f'完成销售单 #{sale.id}，总金额: {sale.final_amount}，支付方式: {sale.get_payment_method_display()}',
+                related_object_id=sale.id,
+                related_content_type=sale_type,
+            ))
+            OperationLog.objects.bulk_create(logs)
+
+            SalesRollupService.apply_sale(sale, items=items)
+
+        return sale
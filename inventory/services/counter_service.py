@@ -0,0 +1,190 @@
+"""
+行数计数服务 - 增量维护各表及各状态的行数，列表页不再对大表执行 COUNT(*)
+"""
+import json
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from inventory.models import RowCounter
+
+# 维护计数的模型及其分组字段（只选取取值很少、很少变化的状态字段）
+COUNTED_MODELS = {
+    'inventory.Product': ('is_active',),
+    'inventory.Member': ('is_active',),
+    'inventory.Sale': (),
+    'admin.LogEntry': ('action_flag',),
+}
+
+
+def counter_key(label, field=None, value=None):
+    """计数键：整表为 "app_label.Model"，分组为 "app_label.Model:字段=值" """
+    if field is None:
+        return label
+    return f'{label}:{field}={value}'
+
+
+class CounterService:
+    """行数计数服务
+
+    新增、删除和状态字段变化由信号处理器在事务提交后以 UPDATE count = count + n 累加，
+    bulk_create 写入的行由调用方通过 record_bulk_create 计入；其它不经过信号的批量操作
+    （QuerySet.update 等）造成的偏差由 reconcile 定期修正。
+    """
+
+    @staticmethod
+    def estimate_threshold():
+        """估计行数不低于该值时直接使用估计值，可通过 COUNT_ESTIMATE_THRESHOLD 配置"""
+        return getattr(settings, 'COUNT_ESTIMATE_THRESHOLD', 10000)
+
+    @staticmethod
+    def count(model, **filters):
+        """
+        读取计数，计数行不存在时执行一次 COUNT(*) 并保存
+
+        Args:
+            model: 模型类
+            filters: 至多一个分组字段条件，如 is_active=True；其它条件直接执行 COUNT(*)
+
+        Returns:
+            int: 行数
+        """
+        label = model._meta.label
+        fields = COUNTED_MODELS.get(label)
+        if fields is None or len(filters) > 1 or any(field not in fields for field in filters):
+            return model._default_manager.filter(**filters).count()
+
+        key = counter_key(label, *next(iter(filters.items()))) if filters else label
+        value = RowCounter.objects.filter(key=key).values_list('count', flat=True).first()
+        if value is None:
+            value = model._default_manager.filter(**filters).count()
+            RowCounter.objects.get_or_create(key=key, defaults={'count': value, 'reconciled_at': timezone.now()})
+        return value
+
+    @staticmethod
+    def estimated_count(queryset):
+        """
+        查询结果的行数，用于不需要精确总数的分页
+
+        PostgreSQL 上先读取查询计划的估计行数，估计值较大时直接返回，否则执行精确 COUNT(*)；
+        其它数据库始终精确统计。
+
+        Returns:
+            (行数, 是否为估计值)
+        """
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql':
+            sql, params = queryset.order_by().query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+                plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            estimate = int(plan[0]['Plan']['Plan Rows'])
+            if estimate >= CounterService.estimate_threshold():
+                return estimate, True
+        return queryset.count(), False
+
+    @staticmethod
+    def adjust(deltas):
+        """事务提交后累加计数，尽量缩短计数行被锁定的时间；计数行尚不存在时跳过"""
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        def apply():
+            for key, delta in deltas.items():
+                RowCounter.objects.filter(key=key).update(count=F('count') + delta)
+
+        transaction.on_commit(apply)
+
+    @staticmethod
+    def remember_state(instance, update_fields=None):
+        """保存前记录分组字段的原值，供保存后计算状态变化"""
+        fields = COUNTED_MODELS.get(instance._meta.label, ())
+        if update_fields is not None:
+            fields = [field for field in fields if field in update_fields]
+        if not fields or instance._state.adding or instance.pk is None:
+            return
+        instance._counter_state = type(instance)._default_manager.filter(pk=instance.pk).values(*fields).first()
+
+    @staticmethod
+    def record_save(instance, created):
+        label = instance._meta.label
+        fields = COUNTED_MODELS.get(label, ())
+        deltas = {}
+        if created:
+            deltas[label] = 1
+            for field in fields:
+                deltas[counter_key(label, field, getattr(instance, field))] = 1
+        else:
+            previous = instance.__dict__.pop('_counter_state', None) or {}
+            for field, old in previous.items():
+                new = getattr(instance, field)
+                if new != old:
+                    deltas[counter_key(label, field, old)] = -1
+                    deltas[counter_key(label, field, new)] = 1
+        CounterService.adjust(deltas)
+
+    @staticmethod
+    def record_bulk_create(instances):
+        """bulk_create 不发送 post_save，按写入的行累加整表和分组计数"""
+        deltas = {}
+        for instance in instances:
+            label = instance._meta.label
+            if label not in COUNTED_MODELS:
+                continue
+            deltas[label] = deltas.get(label, 0) + 1
+            for field in COUNTED_MODELS[label]:
+                key = counter_key(label, field, getattr(instance, field))
+                deltas[key] = deltas.get(key, 0) + 1
+        CounterService.adjust(deltas)
+
+    @staticmethod
+    def record_delete(instance):
+        label = instance._meta.label
+        deltas = {label: -1}
+        for field in COUNTED_MODELS.get(label, ()):
+            deltas[counter_key(label, field, getattr(instance, field))] = -1
+        CounterService.adjust(deltas)
+
+    @staticmethod
+    def reconcile(labels=None):
+        """
+        与 COUNT(*) 对账并修正计数
+
+        统计期间并发写入的行可能造成少量偏差，留待下次对账修正。
+
+        Args:
+            labels: 要对账的模型，如 ['inventory.Sale']，默认全部
+
+        Returns:
+            dict: 有偏差的计数 {计数键: (原计数, 实际行数)}，原计数为 None 表示新建
+        """
+        drift = {}
+        now = timezone.now()
+        for label in labels or COUNTED_MODELS:
+            model = apps.get_model(label)
+            exact = {label: model._default_manager.count()}
+            for field in COUNTED_MODELS[label]:
+                rows = model._default_manager.order_by().values(field).annotate(rows=Count('pk'))
+                for row in rows:
+                    exact[counter_key(label, field, row[field])] = row['rows']
+
+            with transaction.atomic():
+                stored = dict(
+                    RowCounter.objects.select_for_update()
+                    .filter(Q(key=label) | Q(key__startswith=f'{label}:'))
+                    .values_list('key', 'count')
+                )
+                # 已没有任何行的分组归零
+                for key in stored:
+                    exact.setdefault(key, 0)
+                for key, value in exact.items():
+                    if stored.get(key) != value:
+                        drift[key] = (stored.get(key), value)
+                    RowCounter.objects.update_or_create(key=key, defaults={'count': value, 'reconciled_at': now})
+        return drift
@@ -0,0 +1,151 @@
+"""
+仪表盘服务 - 计算并缓存首页 KPI 快照
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from inventory.models import Inventory, Member, OperationLog, Product, Sale, SaleItem
+
+DASHBOARD_CACHE_KEY = 'inventory:dashboard:snapshot'
+
+
+class DashboardService:
+    """仪表盘 KPI 快照服务
+
+    快照只包含基础类型（字典、列表、数字、日期），可直接放入任意缓存后端；
+    销售完成或库存变化后由信号处理器使其失效。
+    """
+
+    @staticmethod
+    def cache_timeout():
+        """快照缓存时间（秒），可通过 DASHBOARD_CACHE_TIMEOUT 配置"""
+        return getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 60)
+
+    @staticmethod
+    def compute_snapshot(today=None):
+        """
+        计算仪表盘快照，查询次数固定
+
+        Args:
+            today: 统计基准日期，默认当地今天
+
+        Returns:
+            dict: 首页模板所需的全部统计数据
+        """
+        today = today or timezone.localdate()
+        yesterday = today - timedelta(days=1)
+        week_ago = today - timedelta(days=7)
+        month_ago = today - timedelta(days=30)
+        trend_start = timezone.make_aware(datetime.combine(today - timedelta(days=6), time.min))
+
+        # 商品统计
+        products = Product.objects.aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(is_active=True)),
+        )
+        stock = Inventory.objects.aggregate(
+            low=Count('id', filter=Q(quantity__lte=10)),
+            out=Count('id', filter=Q(quantity=0)),
+        )
+
+        # 销售统计：近7天按日分组一次查询，今日/昨日数据从中取得
+        total_sales = Sale.objects.count()
+        daily = {
+            row['day']: row
+            for row in Sale.objects.filter(created_at__gte=trend_start)
+            .annotate(day=TruncDate('created_at'))
+            .values('day')
+            .annotate(count=Count('id'), amount=Sum('total_amount'))
+        }
+        sales_trend = []
+        for offset in range(6, -1, -1):
+            day = today - timedelta(days=offset)
+            sales_trend.append({
+                'date': day.strftime('%m-%d'),
+                'amount': float(daily.get(day, {}).get('amount') or 0),
+            })
+
+        # 会员统计
+        members = Member.objects.aggregate(
+            total=Count('id'),
+            new_month=Count('id', filter=Q(created_at__gte=month_ago)),
+        )
+
+        # 热销商品
+        top_products = list(
+            SaleItem.objects.filter(sale__created_at__gte=week_ago)
+            .values('product__name')
+            .annotate(total_qty=Sum('quantity'), total_amount=Sum('subtotal'))
+            .order_by('-total_qty')[:5]
+        )
+
+        # 最近操作日志
+        recent_logs = [
+            {
+                'operation_type': log['operation_type'],
+                'details': log['details'],
+                'timestamp': log['timestamp'],
+                'operator': {'username': log['operator__username']},
+            }
+            for log in OperationLog.objects.order_by('-timestamp')
+            .values('operation_type', 'details', 'timestamp', 'operator__username')[:10]
+        ]
+
+        # 当月生日会员
+        birthday_members = list(
+            Member.objects.filter(
+                birthday__isnull=False,
+                birthday__month=today.month,
+                is_active=True,
+            )
+            .order_by('birthday__day')
+            .values('id', 'name', 'phone', 'birthday')[:10]
+        )
+
+        today_row = daily.get(today, {})
+        yesterday_row = daily.get(yesterday, {})
+        return {
+            'total_products': products['total'],
+            'active_products': products['active'],
+            'low_stock_products': stock['low'],
+            'out_of_stock_products': stock['out'],
+            'total_sales': total_sales,
+            'today_sales': today_row.get('count', 0),
+            'today_sales_amount': today_row.get('amount') or 0,
+            'yesterday_sales': yesterday_row.get('count', 0),
+            'yesterday_sales_amount': yesterday_row.get('amount') or 0,
+            'total_members': members['total'],
+            'active_members': members['total'],
+            'new_members_month': members['new_month'],
+            'sales_trend': sales_trend,
+            'top_products': top_products,
+            'recent_logs': recent_logs,
+            'birthday_members': birthday_members,
+            'current_month': today.month,
+            'generated_at': timezone.now(),
+        }
+
+    @staticmethod
+    def get_snapshot():
+        """获取仪表盘快照，缓存未命中时重新计算"""
+        snapshot = cache.get(DASHBOARD_CACHE_KEY)
+        if snapshot is None:
+            snapshot = DashboardService.warm()
+        return snapshot
+
+    @staticmethod
+    def warm():
+        """重新计算快照并写入缓存，供后台任务定时预热"""
+        snapshot = DashboardService.compute_snapshot()
+        cache.set(DASHBOARD_CACHE_KEY, snapshot, DashboardService.cache_timeout())
+        return snapshot
+
+    @staticmethod
+    def invalidate():
+        """使缓存的快照失效"""
+        cache.delete(DASHBOARD_CACHE_KEY)
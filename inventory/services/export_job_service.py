@@ -0,0 +1,376 @@
+"""
+后台导出任务服务 - 以 ExportJob 表为队列，在独立的工作进程中生成导出文件
+"""
+import datetime
+import logging
+import os
+import socket
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from inventory.exceptions import InventoryValidationError
+from inventory.models import ExportJob, Inventory, Member, Product, SaleItem
+from inventory.services.export_service import ExportService, EXPORT_CHUNK_SIZE
+from inventory.services.report_service import ReportService
+
+logger = logging.getLogger(__name__)
+
+# 每导出多少行更新一次任务进度
+PROGRESS_EVERY = 1000
+
+
+def _parse_date(value):
+    """参数中的日期为 ISO 字符串，空值返回 None"""
+    return datetime.date.fromisoformat(value) if value else None
+
+
+def _date_range(params):
+    return _parse_date(params.get('start_date')), _parse_date(params.get('end_date'))
+
+
+def _sales_table(params, period=None):
+    """按周期汇总的销售数据"""
+    start_date, end_date = _date_range(params)
+    data = ReportService.get_sales_by_period(start_date, end_date, period or params.get('period', 'day'))
+    headers = ['周期', '订单数', '商品行数', '销售额', '成本', '毛利', '毛利率(%)']
+    rows = [
+        (
+            row['period'].strftime('%Y-%m-%d') if row['period'] else '',
+            row['order_count'], row['item_count'], row['total_sales'], row['total_cost'],
+            row['profit'], round(row['profit_margin'], 2),
+        )
+        for row in data
+    ]
+    return headers, rows, len(rows)
+
+
+def _daily_summary_table(params):
+    """每日销售汇总"""
+    return _sales_table(params, period='day')
+
+
+def _product_performance_table(params):
+    """商品销售表现（全部商品，按销量降序），只统计已完成的销售单"""
+    start_date, end_date = _date_range(params)
+    if start_date and end_date:
+        # 与销售汇总一致：日期范围覆盖整天，包含结束日期
+        start_date, end_date = ReportService._datetime_range(start_date, end_date)
+    data = ReportService.get_top_selling_products(start_date, end_date, limit=None).filter(
+        sale__status='COMPLETED'
+    )
+    headers = ['商品ID', '商品', '条码', '分类', '销量', '销售额', '成本', '毛利', '毛利率(%)']
+    rows = (
+        (
+            row['product__id'], row['product__name'], row['product__barcode'],
+            row['product__category__name'], row['total_quantity'], row['total_sales'],
+            row['total_cost'], row['profit'], row['profit_margin'],
+        )
+        for row in data.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    return headers, rows, data.count()
+
+
+def _inventory_table(params):
+    """当前库存及库存金额"""
+    inventories = Inventory.objects.order_by('product_id')
+    if params.get('category'):
+        inventories = inventories.filter(product__category_id=params['category'])
+    headers = ['商品ID', '商品', '条码', '分类', '库存数量', '预警数量', '成本价', '库存金额']
+    rows = (
+        (product_id, name, barcode, category, quantity, warning_level, cost, quantity * cost)
+        for product_id, name, barcode, category, quantity, warning_level, cost in inventories.values_list(
+            'product_id', 'product__name', 'product__barcode', 'product__category__name',
+            'quantity', 'warning_level', 'product__cost',
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    return headers, rows, inventories.count()
+
+
+def _filter_status(queryset, params):
+    """status 参数为 active/inactive 时按启用状态筛选，与列表页筛选一致"""
+    status = params.get('status')
+    if status in ('active', 'inactive'):
+        queryset = queryset.filter(is_active=status == 'active')
+    return queryset
+
+
+def _products_table(params):
+    products = _filter_status(Product.objects.order_by('id'), params)
+    if params.get('category'):
+        products = products.filter(category_id=params['category'])
+    headers, rows = ExportService.product_table(products)
+    return headers, rows, products.count()
+
+
+def _members_table(params):
+    members = _filter_status(Member.objects.order_by('id'), params)
+    if params.get('level'):
+        members = members.filter(level_id=params['level'])
+    headers, rows = ExportService.member_table(members)
+    return headers, rows, members.count()
+
+
+def _sale_items_table(params):
+    start_date, end_date = _date_range(params)
+    items = SaleItem.objects.all()
+    if start_date and end_date:
+        items = items.filter(sale__created_at__range=ReportService._datetime_range(start_date, end_date))
+    if params.get('q'):
+        # 与销售单列表的搜索一致：销售单号、会员姓名、会员手机号
+        q = params['q']
+        items = items.filter(
+            Q(sale__id__icontains=q) | Q(sale__member__name__icontains=q) | Q(sale__member__phone__icontains=q)
+        )
+    headers, rows = ExportService.sale_item_table(items)
+    return headers, rows, items.count()
+
+
+# 导出类型 -> (名称, 生成 (表头, 行, 总行数) 的函数)
+EXPORTERS = {
+    'sales': ('销售汇总', _sales_table),
+    'daily_summary': ('每日销售汇总', _daily_summary_table),
+    'product_performance': ('商品销售表现', _product_performance_table),
+    'inventory': ('库存清单', _inventory_table),
+    'products': ('商品列表', _products_table),
+    'members': ('会员列表', _members_table),
+    'sale_items': ('销售明细', _sale_items_table),
+}
+
+
+def default_worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class _JobTakenOver(Exception):
+    """任务已被 requeue_stale 重新排队（或由其他工作进程领取），当前进程应停止导出"""
+
+
+def _owned(job):
+    """当前这次领取的任务：状态、工作进程和执行次数都没变"""
+    return ExportJob.objects.filter(
+        pk=job.pk, status=ExportJob.STATUS_RUNNING, worker=job.worker, attempts=job.attempts
+    )
+
+
+class ExportJobService:
+    """
+    后台导出任务
+
+    1. submit 在请求中只写入一条 PENDING 任务并立即返回任务ID；
+    2. 工作进程用条件 UPDATE 领取任务（多个进程可同时运行，不会重复领取），
+       逐行写入 MEDIA_ROOT/exports 下的文件并定期更新进度和心跳；
+    3. 心跳超时的任务由 requeue_stale 重新排队，执行次数达到上限则标记为 FAILED；
+    4. 过期的文件由 cleanup_expired 删除，任务标记为 EXPIRED。
+    """
+
+    @staticmethod
+    def ttl():
+        """导出文件保留时长"""
+        return datetime.timedelta(hours=getattr(settings, 'EXPORT_JOB_TTL_HOURS', 24))
+
+    @staticmethod
+    def max_attempts():
+        """任务最多执行次数（含因心跳超时重新排队后的重试）"""
+        return getattr(settings, 'EXPORT_JOB_MAX_ATTEMPTS', 3)
+
+    @staticmethod
+    def submit(kind, user, export_format='csv', params=None):
+        """
+        提交导出任务
+
+        Returns:
+            ExportJob: 新建的任务
+        """
+        if kind not in EXPORTERS:
+            raise InventoryValidationError(f"不支持的导出类型: {kind}")
+        if export_format not in dict(ExportJob.FORMAT_CHOICES):
+            raise InventoryValidationError(f"不支持的文件格式: {export_format}")
+        params = params or {}
+        try:
+            _date_range(params)
+        except ValueError:
+            raise InventoryValidationError("日期格式不正确，应为 YYYY-MM-DD")
+        return ExportJob.objects.create(
+            kind=kind, export_format=export_format, params=params, created_by=user
+        )
+
+    @staticmethod
+    def claim_next(worker=None):
+        """
+        领取最早提交的待处理任务
+
+        Returns:
+            ExportJob or None: 领取到的任务，没有待处理任务时返回 None
+        """
+        worker = worker or default_worker_name()
+        pending = ExportJob.objects.filter(status=ExportJob.STATUS_PENDING).order_by('created_at', 'id')
+        for job_id in pending.values_list('id', flat=True)[:10]:
+            now = timezone.now()
+            claimed = ExportJob.objects.filter(pk=job_id, status=ExportJob.STATUS_PENDING).update(
+                status=ExportJob.STATUS_RUNNING,
+                worker=worker,
+                started_at=now,
+                heartbeat_at=now,
+                attempts=F('attempts') + 1,
+            )
+            if claimed:
+                return ExportJob.objects.get(pk=job_id)
+        return None
+
+    @staticmethod
+    def run(job):
+        """
+        执行导出任务，结果写入文件；出错时任务标记为 FAILED
+
+        每次领取使用各自的临时文件，任务被重新排队后旧进程即使仍在运行，
+        也不会和新进程写同一个文件；旧进程发现任务已不属于自己时直接放弃，不修改任务状态。
+
+        Returns:
+            ExportJob: 更新后的任务
+        """
+        label, exporter = EXPORTERS[job.kind]
+        relative_path = os.path.join(
+            'exports', timezone.localdate().strftime('%Y%m'), f'{job.kind}_{job.pk}.{job.export_format}'
+        )
+        path = os.path.join(settings.MEDIA_ROOT, relative_path)
+        tmp_path = f'{path}.{job.attempts}.part'
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        try:
+            headers, rows, total = exporter(job.params)
+            if not _owned(job).update(total_rows=total, heartbeat_at=timezone.now()):
+                raise _JobTakenOver()
+            rows = ExportJobService._track_progress(job, rows)
+            if job.export_format == 'xlsx':
+                ExportService.write_excel(tmp_path, headers, rows, sheet_name=label)
+            else:
+                with open(tmp_path, 'wb') as f:
+                    for chunk in ExportService.iter_csv(headers, rows):
+                        f.write(chunk)
+            if not _owned(job).exists():
+                raise _JobTakenOver()
+            os.replace(tmp_path, path)
+        except _JobTakenOver:
+            logger.warning("导出任务 %s 已被重新排队，工作进程 %s 放弃本次导出", job.pk, job.worker)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        except Exception as e:
+            logger.exception("导出任务 %s 失败", job.pk)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            now = timezone.now()
+            _owned(job).update(
+                status=ExportJob.STATUS_FAILED,
+                error_message=str(e),
+                finished_at=now,
+                expires_at=now + ExportJobService.ttl(),
+            )
+        else:
+            now = timezone.now()
+            _owned(job).update(
+                status=ExportJob.STATUS_SUCCESS,
+                file=relative_path,
+                finished_at=now,
+                expires_at=now + ExportJobService.ttl(),
+            )
+        job.refresh_from_db()
+        return job
+
+    @staticmethod
+    def _track_progress(job, rows):
+        """逐行透传，每 PROGRESS_EVERY 行更新一次已导出行数和心跳；任务已被重新排队时中止"""
+        count = 0
+        for row in rows:
+            yield row
+            count += 1
+            if count % PROGRESS_EVERY == 0:
+                if not _owned(job).update(processed_rows=count, heartbeat_at=timezone.now()):
+                    raise _JobTakenOver()
+        if not _owned(job).update(processed_rows=count, heartbeat_at=timezone.now()):
+            raise _JobTakenOver()
+
+    @staticmethod
+    def process_pending(worker=None, max_jobs=None):
+        """
+        连续处理待处理任务，直到队列为空或达到 max_jobs
+
+        Returns:
+            int: 处理的任务数
+        """
+        processed = 0
+        while max_jobs is None or processed < max_jobs:
+            job = ExportJobService.claim_next(worker)
+            if job is None:
+                break
+            ExportJobService.run(job)
+            processed += 1
+        return processed
+
+    @staticmethod
+    def requeue_stale(timeout_minutes=None):
+        """
+        把长时间没有心跳的 RUNNING 任务（工作进程异常退出）重新放回队列；
+        执行次数已达上限的任务不再重试，标记为 FAILED
+
+        Returns:
+            int: 重新排队的任务数
+        """
+        if timeout_minutes is None:
+            timeout_minutes = getattr(settings, 'EXPORT_JOB_STALE_MINUTES', 30)
+        now = timezone.now()
+        cutoff = now - datetime.timedelta(minutes=timeout_minutes)
+        stale = ExportJob.objects.filter(status=ExportJob.STATUS_RUNNING).filter(
+            Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+        )
+        max_attempts = ExportJobService.max_attempts()
+        stale.filter(attempts__gte=max_attempts).update(
+            status=ExportJob.STATUS_FAILED,
+            error_message=f"导出任务已执行 {max_attempts} 次仍未完成，不再重试",
+            finished_at=now,
+            expires_at=now + ExportJobService.ttl(),
+        )
+        return stale.filter(attempts__lt=max_attempts).update(
+            status=ExportJob.STATUS_PENDING, worker='', processed_rows=0, heartbeat_at=None
+        )
+
+    @staticmethod
+    def cleanup_expired(now=None):
+        """
+        删除过期任务的导出文件，任务标记为 EXPIRED
+
+        Returns:
+            int: 清理的任务数
+        """
+        now = now or timezone.now()
+        expired = ExportJob.objects.filter(
+            Q(status=ExportJob.STATUS_SUCCESS) | Q(status=ExportJob.STATUS_FAILED),
+            expires_at__lte=now,
+        )
+        count = 0
+        for job in expired.iterator():
+            if job.file:
+                job.file.delete(save=False)
+            ExportJob.objects.filter(pk=job.pk).update(status=ExportJob.STATUS_EXPIRED, file='')
+            count += 1
+        return count
+
+    @staticmethod
+    def status(job):
+        """任务状态，供前端轮询"""
+        return {
+            'job_id': job.pk,
+            'kind': job.kind,
+            'label': EXPORTERS.get(job.kind, (job.kind,))[0],
+            'format': job.export_format,
+            'status': job.status,
+            'status_display': job.get_status_display(),
+            'progress': job.progress,
+            'processed_rows': job.processed_rows,
+            'total_rows': job.total_rows,
+            'error': job.error_message,
+            'created_at': job.created_at.isoformat(),
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+            'expires_at': job.expires_at.isoformat() if job.expires_at else None,
+        }
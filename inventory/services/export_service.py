@@ -1,9 +1,23 @@
+import csv
 import io
 import datetime
+import itertools
+import tempfile
 import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill
 from openpyxl.utils import get_column_letter
-from django.http import HttpResponse
+from django.http import HttpResponse, FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+# 流式导出时每次从数据库读取的行数
+EXPORT_CHUNK_SIZE = 2000
+# CSV 输出缓冲达到该字节数后再发送给客户端
+CSV_FLUSH_SIZE = 64 * 1024
+# 用于估算列宽的前若干行
+COLUMN_WIDTH_SAMPLE_ROWS = 100
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
 
 class ExportService:
     """
@@ -11,78 +25,204 @@ class ExportService:
     """
     
     @staticmethod
-    def export_to_excel(data, filename, sheet_name='Sheet1'):
+    def iter_csv(headers, rows):
         """
-        将数据导出为Excel文件
-        :param data: 数据，格式为[{'header1': value1, 'header2': value2, ...}, ...]
+        逐块生成CSV内容，带 UTF-8 BOM 以便 Excel 正确识别中文
+        :param headers: 表头列表
+        :param rows: 可迭代的行（列表或元组）
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        buffer.write('\ufeff')
+        writer.writerow(headers)
+        for row in rows:
+            writer.writerow(row)
+            if buffer.tell() >= CSV_FLUSH_SIZE:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+    
+    @staticmethod
+    def stream_csv(headers, rows, filename):
+        """
+        以 StreamingHttpResponse 流式返回CSV，内存占用与总行数无关
+        :param headers: 表头列表
+        :param rows: 可迭代的行，建议传入 queryset.values_list(...).iterator(chunk_size=...)
         :param filename: 文件名
+        :return: StreamingHttpResponse对象
+        """
+        response = StreamingHttpResponse(
+            ExportService.iter_csv(headers, rows), content_type='text/csv; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
+    @staticmethod
+    def column_widths(headers, sample_rows):
+        """根据表头和样本行预先计算列宽（最小10，最大50）"""
+        widths = [max(10, len(str(header)) + 2) for header in headers]
+        for row in sample_rows:
+            for col_idx, value in enumerate(row[:len(widths)]):
+                if value is not None and value != '':
+                    widths[col_idx] = max(widths[col_idx], min(len(str(value)) + 2, 50))
+        return widths
+    
+    @staticmethod
+    def _excel_value(value):
+        """Excel 不支持带时区的时间，转换为本地时间"""
+        if isinstance(value, datetime.datetime) and timezone.is_aware(value):
+            return timezone.make_naive(value)
+        return value
+    
+    @staticmethod
+    def write_excel(fileobj, headers, rows, sheet_name='Sheet1', column_widths=None):
+        """
+        使用 openpyxl 只写模式逐行写入Excel，内存占用与总行数无关
+        :param fileobj: 文件路径或可写的二进制文件对象
+        :param headers: 表头列表
+        :param rows: 可迭代的行
         :param sheet_name: 工作表名称
-        :return: HttpResponse对象
+        :param column_widths: 列宽列表，为空时根据前若干行估算
         """
-        workbook = openpyxl.Workbook()
-        worksheet = workbook.active
-        worksheet.title = sheet_name
+        rows = iter(rows)
+        sample = list(itertools.islice(rows, COLUMN_WIDTH_SAMPLE_ROWS))
+        if column_widths is None:
+            column_widths = ExportService.column_widths(headers, sample)
+        
+        workbook = openpyxl.Workbook(write_only=True)
+        worksheet = workbook.create_sheet(title=sheet_name)
+        # 只写模式下列宽必须在写入数据前设置
+        for col_idx, width in enumerate(column_widths, 1):
+            worksheet.column_dimensions[get_column_letter(col_idx)].width = width
         
-        # 设置列标题样式
         header_font = Font(bold=True, color="FFFFFF")
         header_fill = PatternFill(start_color="0066CC", end_color="0066CC", fill_type="solid")
         header_alignment = Alignment(horizontal="center", vertical="center")
+        header_cells = []
+        for header in headers:
+            cell = WriteOnlyCell(worksheet, value=header)
+            cell.font = header_font
+            cell.fill = header_fill
+            cell.alignment = header_alignment
+            header_cells.append(cell)
+        worksheet.append(header_cells)
         
-        # 设置单元格边框
-        thin_border = Border(
-            left=Side(style='thin'), 
-            right=Side(style='thin'), 
-            top=Side(style='thin'), 
-            bottom=Side(style='thin')
-        )
-        
-        # 写入表头
-        if data and len(data) > 0:
-            headers = list(data[0].keys())
-            for col_idx, header in enumerate(headers, 1):
-                cell = worksheet.cell(row=1, column=col_idx, value=header)
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = header_alignment
-                cell.border = thin_border
-            
-            # 写入数据
-            for row_idx, row_data in enumerate(data, 2):
-                for col_idx, header in enumerate(headers, 1):
-                    cell = worksheet.cell(row=row_idx, column=col_idx, value=row_data.get(header, ''))
-                    cell.border = thin_border
-                    # 日期格式处理
-                    if isinstance(cell.value, datetime.datetime):
-                        cell.number_format = 'yyyy-mm-dd'
-                    elif isinstance(cell.value, datetime.date):
-                        cell.number_format = 'yyyy-mm-dd'
-            
-            # 自动调整列宽
-            for col_idx, header in enumerate(headers, 1):
-                column_letter = get_column_letter(col_idx)
-                # 设置一个基本宽度，然后根据内容增加
-                column_width = max(10, len(str(header)) + 2)  # 表头宽度 + 2
-                
-                # 检查列内容，找到最长的内容
-                for row_idx in range(2, len(data) + 2):
-                    cell_value = worksheet.cell(row=row_idx, column=col_idx).value
-                    if cell_value:
-                        column_width = max(column_width, min(len(str(cell_value)) + 2, 50))  # 最大宽度50
-                
-                worksheet.column_dimensions[column_letter].width = column_width
+        for row in itertools.chain(sample, rows):
+            worksheet.append([ExportService._excel_value(value) for value in row])
         
-        # 创建响应
-        buffer = io.BytesIO()
-        workbook.save(buffer)
-        buffer.seek(0)
+        workbook.save(fileobj)
+    
+    @staticmethod
+    def stream_excel(headers, rows, filename, sheet_name='Sheet1', column_widths=None):
+        """
+        生成Excel到临时文件后以 FileResponse 分块返回
+        :return: FileResponse对象
+        """
+        tmp = tempfile.TemporaryFile()
+        ExportService.write_excel(tmp, headers, rows, sheet_name, column_widths)
+        tmp.seek(0)
+        return FileResponse(tmp, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
+    
+    @staticmethod
+    def export_rows(headers, rows, basename, export_format='csv', sheet_name='Sheet1'):
+        """
+        按格式导出行数据
+        :param basename: 不带扩展名的文件名
+        :param export_format: csv 或 xlsx（excel）
+        """
+        if export_format in ('xlsx', 'excel'):
+            return ExportService.stream_excel(headers, rows, f'{basename}.xlsx', sheet_name)
+        return ExportService.stream_csv(headers, rows, f'{basename}.csv')
+    
+    @staticmethod
+    def product_table(products):
+        """
+        商品导出的表头和行，只取导出需要的列并分批从数据库读取
+        :param products: 商品查询集
+        :return: (表头, 行迭代器)
+        """
+        headers = ['ID', '名称', '分类', '售价', '成本价', '条码', '规格', '制造商', '状态']
+        rows = (
+            row[:-1] + ('启用' if row[-1] else '禁用',)
+            for row in products.order_by('id').values_list(
+                'id', 'name', 'category__name', 'price', 'cost',
+                'barcode', 'specification', 'manufacturer', 'is_active',
+            ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
+        return headers, rows
+    
+    @staticmethod
+    def member_table(members):
+        """
+        会员导出的表头和行
+        :param members: 会员查询集
+        :return: (表头, 行迭代器)
+        """
+        headers = ['ID', '会员号', '姓名', '手机', '邮箱', '会员等级', '积分', '生日', '地址', '备注', '状态']
+        rows = (
+            row[:-1] + ('启用' if row[-1] else '禁用',)
+            for row in members.order_by('id').values_list(
+                'id', 'member_id', 'name', 'phone', 'email', 'level__name',
+                'points', 'birthday', 'address', 'notes', 'is_active',
+            ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
+        return headers, rows
+    
+    @staticmethod
+    def sale_item_table(items):
+        """
+        销售明细导出的表头和行，每个销售明细一行
+        :param items: 销售明细查询集
+        :return: (表头, 行迭代器)
+        """
+        from inventory.models import Sale
         
-        response = HttpResponse(
-            buffer.getvalue(),
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        status_names = dict(Sale.STATUS_CHOICES)
+        payment_names = dict(Sale.PAYMENT_METHODS)
+        headers = [
+            '销售单号', '销售时间', '状态', '会员', '会员手机', '商品', '条码',
+            '数量', '标准售价', '实际售价', '小计', '支付方式', '操作员',
+        ]
+        rows = (
+            (
+                sale_id, timezone.localtime(created_at).strftime('%Y-%m-%d %H:%M:%S'),
+                status_names.get(status, status), member_name, member_phone, product_name, barcode,
+                quantity, price, actual_price, subtotal,
+                payment_names.get(payment_method, payment_method), operator,
+            )
+            for (
+                sale_id, created_at, status, member_name, member_phone, product_name, barcode,
+                quantity, price, actual_price, subtotal, payment_method, operator,
+            ) in items.order_by('sale_id', 'id').values_list(
+                'sale_id', 'sale__created_at', 'sale__status', 'sale__member__name', 'sale__member__phone',
+                'product__name', 'product__barcode', 'quantity', 'price', 'actual_price', 'subtotal',
+                'sale__payment_method', 'sale__operator__username',
+            ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
         )
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return headers, rows
+    
+    @staticmethod
+    def export_to_excel(data, filename, sheet_name='Sheet1'):
+        """
+        将数据导出为Excel文件
+        :param data: 数据，格式为[{'header1': value1, 'header2': value2, ...}, ...]，也可以是生成器
+        :param filename: 文件名
+        :param sheet_name: 工作表名称
+        :return: FileResponse对象
+        """
+        data = iter(data)
+        first = next(data, None)
+        if first is None:
+            return ExportService.stream_excel([], [], filename, sheet_name)
         
-        return response
+        headers = list(first.keys())
+        rows = (
+            [row_data.get(header, '') for header in headers]
+            for row_data in itertools.chain([first], data)
+        )
+        return ExportService.stream_excel(headers, rows, filename, sheet_name)
     
     @staticmethod
     def format_member_data_for_export(member_data, start_date, end_date):
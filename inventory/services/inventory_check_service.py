@@ -2,9 +2,11 @@
 Inventory check services.
 """
 import datetime
-from django.db import transaction
+from decimal import Decimal
+from django.db import connection, transaction
 from django.utils import timezone
-from django.db.models import F, Count, Sum
+from django.db.models import F, Q, Count, Sum, DecimalField, Value
+from django.db.models.functions import Coalesce
 
 from inventory.models import (
     Product,
@@ -15,24 +17,74 @@ from inventory.models import (
 from inventory.exceptions import InventoryValidationError
 from inventory.utils.logging import log_exception, log_action
 
+# Statuses whose items are final, so the summary can be cached on the check
+SUMMARY_CACHE_STATUSES = ('completed', 'approved')
+SUMMARY_DECIMAL_FIELDS = ('system_value', 'actual_value', 'value_difference')
+# Scanner batch modes: accumulate counts or overwrite them
+SCAN_MODES = ('add', 'set')
+
 class InventoryCheckService:
     """Service for inventory checking operations."""
     
+    @staticmethod
+    def scope_products(category=None, changed_since=None):
+        """
+        Products covered by an inventory check.
+
+        Args:
+            category: Optional category (instance or id) filter
+            changed_since: Optional datetime; only products whose stock changed
+                (or that were created) at or after this moment are included
+
+        Returns:
+            QuerySet: Matching products
+        """
+        products = Product.objects.all()
+        if category:
+            products = products.filter(category=category)
+        if changed_since:
+            products = products.filter(
+                Q(inventory__updated_at__gte=changed_since) | Q(created_at__gte=changed_since)
+            )
+        return products
+
+    @staticmethod
+    def last_check_time():
+        """Creation time of the most recent non-cancelled inventory check, or None."""
+        return (
+            InventoryCheck.objects.exclude(status='cancelled')
+            .order_by('-created_at')
+            .values_list('created_at', flat=True)
+            .first()
+        )
+
     @staticmethod
     @log_exception
-    def create_inventory_check(name, description, user, category=None):
+    def create_inventory_check(name, description, user, category=None,
+                               changed_since=None, changed_since_last_check=False):
         """
         Create a new inventory check.
         
+        System quantities are snapshotted with a single INSERT ... SELECT from
+        the inventory table; products without an inventory row get one in bulk
+        first. No per-product queries are issued, whatever the store size.
+        
         Args:
             name: The name of the inventory check
             description: Description of the check
             user: The user creating the check
             category: Optional category filter for the check
+            changed_since: Optional datetime; only include products whose stock
+                changed since then
+            changed_since_last_check: Only include products whose stock changed
+                since the previous (non-cancelled) inventory check was created
             
         Returns:
             InventoryCheck: The created inventory check
         """
+        if changed_since_last_check and changed_since is None:
+            changed_since = InventoryCheckService.last_check_time()
+
         with transaction.atomic():
             # Create the inventory check
             inventory_check = InventoryCheck.objects.create(
@@ -43,50 +95,57 @@ class InventoryCheckService:
             )
             
             # Query for products to include
-            products_query = Product.objects.all()
-            if category:
-                products_query = products_query.filter(category=category)
+            products_query = InventoryCheckService.scope_products(category, changed_since)
             
-            # Add inventory check items
-            items = []
-            for product in products_query:
-                try:
-                    inventory = Inventory.objects.get(product=product)
-                    items.append(
-                        InventoryCheckItem(
-                            inventory_check=inventory_check,
-                            product=product,
-                            system_quantity=inventory.quantity
-                        )
-                    )
-                except Inventory.DoesNotExist:
-                    # Create inventory if it doesn't exist
-                    inventory = Inventory.objects.create(
-                        product=product,
-                        quantity=0
-                    )
-                    items.append(
-                        InventoryCheckItem(
-                            inventory_check=inventory_check,
-                            product=product,
-                            system_quantity=0
-                        )
-                    )
+            # Create missing inventory rows in bulk
+            missing = products_query.filter(inventory__isnull=True).values_list('id', flat=True)
+            Inventory.objects.bulk_create(
+                [Inventory(product_id=product_id, quantity=0) for product_id in missing.iterator()],
+                batch_size=1000,
+                ignore_conflicts=True,
+            )
             
-            # Bulk create items
-            if items:
-                InventoryCheckItem.objects.bulk_create(items)
+            # Snapshot system quantities with one INSERT ... SELECT
+            item_count = InventoryCheckService._snapshot_items(
+                inventory_check,
+                Inventory.objects.filter(product__in=products_query.values('id')),
+            )
             
             # Log the action
             log_action(
                 user=user,
                 operation_type='INVENTORY_CHECK',
-                details=f"创建库存盘点: {name}",
+                details=f"创建库存盘点: {name}，共 {item_count} 个商品",
                 related_object=inventory_check
             )
             
             return inventory_check
     
+    @staticmethod
+    def _snapshot_items(inventory_check, inventories):
+        """
+        Insert one check item per inventory row, copying the current quantity.
+
+        Args:
+            inventory_check: The inventory check receiving the items
+            inventories: Inventory queryset to snapshot
+
+        Returns:
+            int: Number of items created
+        """
+        qn = connection.ops.quote_name
+        item_table = qn(InventoryCheckItem._meta.db_table)
+        select_sql, select_params = inventories.values_list('product_id', 'quantity').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {item_table} "
+                f"({qn('inventory_check_id')}, {qn('product_id')}, {qn('system_quantity')}, {qn('notes')}) "
+                f"SELECT %s, snapshot.{qn('product_id')}, snapshot.{qn('quantity')}, %s "
+                f"FROM ({select_sql}) snapshot",
+                [inventory_check.pk, '', *select_params],
+            )
+            return cursor.rowcount
+
     @staticmethod
     @log_exception
     def start_inventory_check(inventory_check, user):
@@ -143,6 +202,7 @@ class InventoryCheckService:
         inventory_check_item.checked_by = user
         inventory_check_item.checked_at = timezone.now()
         inventory_check_item.save()
+        InventoryCheckService.invalidate_summary(inventory_check_item.inventory_check)
         
         # Log the action
         log_action(
@@ -154,6 +214,109 @@ class InventoryCheckService:
         
         return inventory_check_item
     
+    @staticmethod
+    @log_exception
+    @transaction.atomic
+    def record_scans(inventory_check, scans, user, mode='add'):
+        """
+        Record a batch of scanner counts for an inventory check.
+        
+        Barcodes are resolved against the check's items with one query and all
+        counts are written with a single bulk_update. In 'add' mode quantities
+        are added in the database (actual_quantity = actual_quantity + n), so
+        several devices can scan the same products concurrently without losing
+        counts; in 'set' mode the scanned quantity replaces the recorded one.
+        
+        Args:
+            inventory_check: The inventory check (must be in progress)
+            scans: Iterable of (barcode, quantity) pairs or
+                {'barcode': ..., 'quantity': ...} dicts
+            user: The user (device operator) recording the counts
+            mode: 'add' to accumulate counts, 'set' to overwrite them
+            
+        Returns:
+            list: One result dict per scan with line, barcode, status
+                ('ok', 'not_found' or 'invalid') and, for recorded lines, the
+                item's actual_quantity after the batch; invalid lines carry a
+                message
+        """
+        if inventory_check.status != 'in_progress':
+            raise InventoryValidationError("只有进行中的盘点单可以记录盘点结果")
+        if mode not in SCAN_MODES:
+            raise InventoryValidationError("盘点模式无效")
+        
+        item_ids = dict(inventory_check.items.values_list('product__barcode', 'id'))
+        
+        results = []
+        counts = {}
+        for line, scan in enumerate(scans, 1):
+            if isinstance(scan, dict):
+                barcode, quantity = scan.get('barcode'), scan.get('quantity')
+            elif isinstance(scan, (list, tuple)) and len(scan) == 2:
+                barcode, quantity = scan
+            else:
+                results.append({'line': line, 'barcode': None, 'status': 'invalid', 'message': '扫描记录格式不正确'})
+                continue
+            barcode = str(barcode or '').strip()
+            result = {'line': line, 'barcode': barcode}
+            results.append(result)
+            
+            if isinstance(quantity, bool) or not isinstance(quantity, (int, str)):
+                quantity = None
+            try:
+                quantity = int(quantity)
+            except (TypeError, ValueError):
+                result.update(status='invalid', message='数量必须是整数')
+                continue
+            if quantity < 0:
+                result.update(status='invalid', message='实际数量不能为负数')
+                continue
+            if barcode not in item_ids:
+                result.update(status='not_found', message='盘点单中没有该条码的商品')
+                continue
+            
+            item_id = item_ids[barcode]
+            result['status'] = 'ok'
+            result['item_id'] = item_id
+            counts[item_id] = counts.get(item_id, 0) + quantity if mode == 'add' else quantity
+        
+        if counts:
+            now = timezone.now()
+            items = []
+            for item_id, quantity in counts.items():
+                if mode == 'add':
+                    actual = Coalesce(F('actual_quantity'), Value(0)) + Value(quantity)
+                else:
+                    actual = Value(quantity)
+                items.append(InventoryCheckItem(
+                    pk=item_id,
+                    actual_quantity=actual,
+                    difference=actual - F('system_quantity'),
+                    checked_by=user,
+                    checked_at=now,
+                ))
+            InventoryCheckItem.objects.bulk_update(
+                items, ['actual_quantity', 'difference', 'checked_by', 'checked_at'], batch_size=500
+            )
+            
+            actual_quantities = dict(
+                InventoryCheckItem.objects.filter(pk__in=list(counts))
+                .values_list('id', 'actual_quantity')
+            )
+            for result in results:
+                if result.get('status') == 'ok':
+                    result['actual_quantity'] = actual_quantities[result.pop('item_id')]
+            
+            InventoryCheckService.invalidate_summary(inventory_check)
+            log_action(
+                user=user,
+                operation_type='INVENTORY_CHECK',
+                details=f"批量记录盘点结果: {inventory_check.name}, {len(counts)} 个商品, 模式: {mode}",
+                related_object=inventory_check
+            )
+        
+        return results
+    
     @staticmethod
     @log_exception
     @transaction.atomic
@@ -180,7 +343,8 @@ class InventoryCheckService:
         
         inventory_check.status = 'completed'
         inventory_check.completed_at = timezone.now()
-        inventory_check.save(update_fields=['status', 'completed_at'])
+        inventory_check.summary = None
+        inventory_check.save(update_fields=['status', 'completed_at', 'summary'])
         
         # Log the action
         log_action(
@@ -212,24 +376,20 @@ class InventoryCheckService:
         
         from inventory.services.inventory_service import InventoryService
         
-        # If adjusting inventory, update quantities
+        # If adjusting inventory, set every discrepant product to its counted quantity in bulk
+        adjusted = 0
         if adjust_inventory:
-            for item in inventory_check.items.filter(difference__isnull=False):
-                if item.difference != 0:  # Only adjust if there's a difference
-                    try:
-                        inventory = Inventory.objects.get(product=item.product)
-                        
-                        # Use the inventory service to update the stock
-                        InventoryService.update_stock(
-                            product=item.product,
-                            quantity=item.actual_quantity,  # Set to actual quantity
-                            transaction_type='ADJUST',
-                            operator=user,
-                            notes=f"库存盘点调整: {inventory_check.name}"
-                        )
-                    except Inventory.DoesNotExist:
-                        # This shouldn't happen, but just in case
-                        pass
+            quantities = dict(
+                inventory_check.items.filter(difference__isnull=False)
+                .exclude(difference=0)
+                .values_list('product_id', 'actual_quantity')
+            )
+            InventoryService.bulk_adjust_stock(
+                quantities,
+                operator=user,
+                notes=f"库存盘点调整: {inventory_check.name}"
+            )
+            adjusted = len(quantities)
         
         inventory_check.status = 'approved'
         inventory_check.approved_by = user
@@ -240,7 +400,7 @@ class InventoryCheckService:
         log_action(
             user=user,
             operation_type='INVENTORY_CHECK',
-            details=f"审核库存盘点: {inventory_check.name}" + (", 并调整库存" if adjust_inventory else ""),
+            details=f"审核库存盘点: {inventory_check.name}" + (f", 并调整 {adjusted} 个商品库存" if adjust_inventory else ""),
             related_object=inventory_check
         )
         
@@ -277,39 +437,68 @@ class InventoryCheckService:
     
     @staticmethod
     @log_exception
-    def get_inventory_check_summary(inventory_check):
+    def get_inventory_check_summary(inventory_check, use_cache=True):
         """
         Get a summary of the inventory check.
         
+        Counts and values are computed by one conditional-aggregation query.
+        Once the check is completed or approved its items no longer change, so
+        the result is stored on the check and later calls read it back without
+        touching the items table.
+        
         Args:
             inventory_check: The inventory check to summarize
+            use_cache: Whether to use (and store) the cached summary
             
         Returns:
             dict: Summary information
         """
-        items = inventory_check.items.all()
+        cacheable = use_cache and inventory_check.status in SUMMARY_CACHE_STATUSES
+        if cacheable and inventory_check.summary:
+            return InventoryCheckService._decode_summary(inventory_check.summary)
         
-        # Count items
-        total_items = items.count()
-        checked_items = items.filter(actual_quantity__isnull=False).count()
-        
-        # Calculate discrepancies
-        items_with_discrepancy = items.filter(difference__isnull=False).exclude(difference=0).count()
-        
-        # Calculate total value (cost * quantity)
-        system_value = sum(item.system_quantity * item.product.cost for item in items)
-        
-        actual_value = sum(
-            (item.actual_quantity or 0) * item.product.cost
-            for item in items.filter(actual_quantity__isnull=False)
+        value_field = DecimalField(max_digits=20, decimal_places=2)
+        counted = Q(actual_quantity__isnull=False)
+        totals = inventory_check.items.aggregate(
+            total_items=Count('id'),
+            checked_items=Count('id', filter=counted),
+            items_with_discrepancy=Count('id', filter=Q(difference__isnull=False) & ~Q(difference=0)),
+            system_value=Sum(F('system_quantity') * F('product__cost'), output_field=value_field),
+            actual_value=Sum(F('actual_quantity') * F('product__cost'), filter=counted, output_field=value_field),
         )
-        
-        return {
-            'total_items': total_items,
-            'checked_items': checked_items,
-            'pending_items': total_items - checked_items,
-            'items_with_discrepancy': items_with_discrepancy,
+        system_value = totals['system_value'] or Decimal('0')
+        actual_value = totals['actual_value'] or Decimal('0')
+        summary = {
+            'total_items': totals['total_items'],
+            'checked_items': totals['checked_items'],
+            'pending_items': totals['total_items'] - totals['checked_items'],
+            'items_with_discrepancy': totals['items_with_discrepancy'],
             'system_value': system_value,
             'actual_value': actual_value,
             'value_difference': actual_value - system_value,
-        } 
\ No newline at end of file
+        }
+        
+        if cacheable:
+            encoded = {
+                key: str(value) if key in SUMMARY_DECIMAL_FIELDS else value
+                for key, value in summary.items()
+            }
+            InventoryCheck.objects.filter(pk=inventory_check.pk).update(summary=encoded)
+            inventory_check.summary = encoded
+        
+        return summary
+    
+    @staticmethod
+    def _decode_summary(cached):
+        """Restore Decimal values from a cached summary."""
+        return {
+            key: Decimal(value) if key in SUMMARY_DECIMAL_FIELDS else value
+            for key, value in cached.items()
+        }
+    
+    @staticmethod
+    def invalidate_summary(inventory_check):
+        """Drop the cached summary after the check's items change."""
+        if inventory_check.summary is not None:
+            InventoryCheck.objects.filter(pk=inventory_check.pk).update(summary=None)
+            inventory_check.summary = None
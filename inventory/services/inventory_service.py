@@ -6,18 +6,24 @@ from django.contrib.auth.models import User
 from django.utils import timezone
 from django.core.mail import send_mail
 from django.conf import settings
-from django.db.models import F, Sum, Q
+from django.db.models import F, Sum, Q, Case, When, Value, IntegerField
 from django.contrib.contenttypes.models import ContentType
 
 from inventory.models import (
     Product,
     Inventory,
     InventoryTransaction,
-    Category
+    OperationLog,
+    Category,
+    change_stock
 )
 from inventory.exceptions import InsufficientStockError, InventoryValidationError
+from inventory.signals import stock_changed
 from inventory.utils.logging import log_exception, log_action
 
+# Products per UPDATE ... CASE statement when adjusting stock in bulk
+ADJUST_BATCH_SIZE = 500
+
 class InventoryService:
     """Service for inventory operations."""
     
@@ -64,18 +70,28 @@ class InventoryService:
         if transaction_type not in ('IN', 'OUT', 'ADJUST'):
             raise InventoryValidationError("交易类型无效")
         
-        # Get or create inventory
-        inventory, created = Inventory.objects.get_or_create(
-            product=product,
-            defaults={'quantity': 0, 'warning_level': 10}
-        )
-        
-        # For outgoing transactions, check stock
-        if transaction_type == 'OUT' and inventory.quantity < quantity:
-            raise InsufficientStockError(
-                f"库存不足。需要: {quantity}, 当前库存: {inventory.quantity}",
-                extra={'product': product.name, 'current_stock': inventory.quantity, 'needed': quantity}
+        # Apply the change with a single conditional UPDATE (no row lock, no read-modify-write)
+        if transaction_type == 'ADJUST':
+            updated = Inventory.objects.filter(product=product).update(
+                quantity=quantity, updated_at=timezone.now()
             )
+            if updated:
+                # A bare UPDATE skips post_save; notify cached views (dashboard snapshot)
+                stock_changed.send(sender=Inventory, product_ids=[product.id])
+            else:
+                Inventory.objects.get_or_create(
+                    product=product,
+                    defaults={'quantity': quantity, 'warning_level': 10}
+                )
+        else:
+            delta = quantity if transaction_type == 'IN' else -quantity
+            failed = change_stock({product.id: delta}, create_missing=transaction_type == 'IN')
+            if failed:
+                current_stock = failed[0]['current_stock'] or 0
+                raise InsufficientStockError(
+                    f"库存不足。需要: {quantity}, 当前库存: {current_stock}",
+                    extra={'product': product.name, 'current_stock': current_stock, 'needed': quantity}
+                )
         
         # Create transaction record
         transaction = InventoryTransaction.objects.create(
@@ -86,16 +102,7 @@ class InventoryService:
             notes=notes
         )
         
-        # Update inventory
-        if transaction_type == 'IN':
-            inventory.quantity = F('quantity') + quantity
-        elif transaction_type == 'OUT':
-            inventory.quantity = F('quantity') - quantity
-        else:  # ADJUST
-            inventory.quantity = quantity
-        
-        inventory.save()
-        inventory.refresh_from_db()  # Refresh to get updated value
+        inventory = Inventory.objects.select_related('product').get(product=product)
         
         # Log the action
         log_action(
@@ -110,6 +117,156 @@ class InventoryService:
         
         return inventory, transaction
     
+    @staticmethod
+    @log_exception
+    @transaction.atomic
+    def bulk_adjust_stock(quantities, operator, notes=""):
+        """
+        Set stock levels for many products at once.
+        
+        The set-based counterpart of update_stock(transaction_type='ADJUST'):
+        quantities are written with batched UPDATE ... CASE statements, the
+        transaction records and their operation logs are bulk-inserted, and
+        low-stock alerts are evaluated once for all adjusted products.
+        
+        Args:
+            quantities: {product_id: new quantity}
+            operator: The user performing the operation
+            notes: Notes recorded on every transaction
+            
+        Returns:
+            list: The created InventoryTransaction records
+        """
+        if not isinstance(operator, User):
+            raise InventoryValidationError("操作员必须是有效的用户")
+        if any(quantity < 0 for quantity in quantities.values()):
+            raise InventoryValidationError("库存数量不能为负数")
+        if not quantities:
+            return []
+        
+        now = timezone.now()
+        product_ids = list(quantities)
+        content_type = ContentType.objects.get_for_model(InventoryTransaction)
+        transactions = []
+        # Batches keep each statement's parameter list bounded
+        for start in range(0, len(product_ids), ADJUST_BATCH_SIZE):
+            batch = product_ids[start:start + ADJUST_BATCH_SIZE]
+            new_quantity = Case(
+                *[When(product_id=product_id, then=Value(quantities[product_id])) for product_id in batch],
+                output_field=IntegerField(),
+            )
+            updated = Inventory.objects.filter(product_id__in=batch).update(
+                quantity=new_quantity, updated_at=now
+            )
+            
+            # Products without an inventory row get one with the target quantity
+            if updated < len(batch):
+                existing = set(
+                    Inventory.objects.filter(product_id__in=batch).values_list('product_id', flat=True)
+                )
+                Inventory.objects.bulk_create([
+                    Inventory(product_id=product_id, quantity=quantities[product_id])
+                    for product_id in batch if product_id not in existing
+                ])
+            
+            batch_transactions = InventoryTransaction.objects.bulk_create([
+                InventoryTransaction(
+                    product_id=product_id,
+                    transaction_type='ADJUST',
+                    quantity=quantities[product_id],
+                    operator=operator,
+                    notes=notes,
+                )
+                for product_id in batch
+            ])
+            
+            names = dict(Product.objects.filter(id__in=batch).values_list('id', 'name'))
+            OperationLog.objects.bulk_create([
+                OperationLog(
+                    operator=operator,
+                    operation_type='INVENTORY',
+                    details=f"ADJUST 交易: {names.get(txn.product_id)}, 数量: {txn.quantity}, 备注: {notes}",
+                    related_object_id=txn.pk,
+                    related_content_type=content_type,
+                )
+                for txn in batch_transactions
+            ])
+            transactions.extend(batch_transactions)
+        
+        stock_changed.send(sender=Inventory, product_ids=product_ids)
+        InventoryService.check_stock_levels(product_ids)
+        
+        return transactions
+    
+    @staticmethod
+    @log_exception
+    def check_stock_levels(product_ids):
+        """
+        Evaluate low-stock alerts for many products in one pass.
+        
+        Writes one warning log per low inventory (as check_stock_level does)
+        with bulk inserts, and sends at most one summary email.
+        
+        Args:
+            product_ids: Products to evaluate
+            
+        Returns:
+            list: Inventories at or below their warning level
+        """
+        product_ids = list(product_ids)
+        low_stock = []
+        for start in range(0, len(product_ids), ADJUST_BATCH_SIZE):
+            low_stock.extend(
+                InventoryService.get_low_stock_items()
+                .filter(product_id__in=product_ids[start:start + ADJUST_BATCH_SIZE])
+            )
+        if not low_stock:
+            return low_stock
+        
+        admin = User.objects.filter(is_superuser=True).first()
+        if admin is not None:
+            content_type = ContentType.objects.get_for_model(Inventory)
+            OperationLog.objects.bulk_create(
+                [
+                    OperationLog(
+                        operator=admin,
+                        operation_type='INVENTORY',
+                        details=f"库存预警: {inventory.product.name} 库存数量 ({inventory.quantity}) 低于预警水平 ({inventory.warning_level})",
+                        related_object_id=inventory.id,
+                        related_content_type=content_type,
+                    )
+                    for inventory in low_stock
+                ],
+                batch_size=1000,
+            )
+        
+        if hasattr(settings, 'EMAIL_HOST') and settings.EMAIL_HOST:
+            try:
+                managers = User.objects.filter(
+                    Q(is_superuser=True) | Q(groups__name='店长') | Q(groups__name='库存管理员')
+                ).distinct()
+                recipient_list = [manager.email for manager in managers if manager.email]
+                if recipient_list:
+                    lines = '\n'.join(
+                        f'{inventory.product.name} ({inventory.product.barcode}): '
+                        f'当前库存 {inventory.quantity}, 预警水平 {inventory.warning_level}'
+                        for inventory in low_stock
+                    )
+                    send_mail(
+                        subject=f'库存预警: {len(low_stock)} 个商品库存不足',
+                        message=f'以下商品库存低于预警水平，请及时补充库存。\n\n{lines}',
+                        from_email=settings.DEFAULT_FROM_EMAIL,
+                        recipient_list=recipient_list,
+                        fail_silently=True
+                    )
+            except Exception as e:
+                # Just log the error but don't break the process
+                import logging
+                logger = logging.getLogger(__name__)
+                logger.error(f"发送库存预警邮件时出错: {str(e)}", exc_info=True)
+        
+        return low_stock
+    
     @staticmethod
     @log_exception
     def check_stock_level(inventory):
@@ -1,15 +1,16 @@
 """
 会员服务模块 - 处理会员相关的业务逻辑
 """
-import csv
-import io
 from datetime import datetime
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from django.db.models import F
 from django.utils import timezone
 from django.contrib.auth.models import User
 
 from ..models import Member, MemberLevel, MemberTransaction
+from .counter_service import CounterService
+from ..signals import invalidate_dashboard
+from ..utils.csv_utils import iter_chunks, iter_csv_rows
 
 
 def apply_member_balance_change(member, amount, *, mark_recharged=False):
@@ -69,99 +70,159 @@ def check_and_update_member_level(member):
     return False, None, None
 
 
-def import_members_from_csv(csv_file, operator):
+# 导入结果中最多保留的错误行数
+MAX_REPORTED_ROWS = 1000
+
+
+def _build_member(row, levels, default_level, operator):
+    """
+    把一行CSV数据转换为未保存的会员对象
+
+    Returns:
+    - tuple: (Member 或 None, 错误信息)
+    """
+    name = row.get('name', '').strip()
+    phone = row.get('phone', '').strip()
+    if not name or not phone:
+        return None, "姓名和手机号为必填字段"
+    if len(phone) > 20:
+        return None, "手机号长度不能超过20位"
+
+    # 处理会员等级，未知等级使用默认等级
+    level = levels.get(row.get('level', '').strip(), default_level)
+    if level is None:
+        return None, "系统中没有可用的会员等级"
+
+    # 处理生日
+    birthday = None
+    if row.get('birthday'):
+        try:
+            birthday = datetime.strptime(row['birthday'].strip(), '%Y-%m-%d').date()
+        except ValueError:
+            pass
+
+    # 处理积分
+    points = 0
+    if row.get('points'):
+        try:
+            points = int(row['points'])
+        except ValueError:
+            points = 0
+
+    return Member(
+        name=name[:100],
+        phone=phone,
+        email=row.get('email', '').strip() or None,
+        member_id=row.get('member_id', '').strip() or None,
+        level=level,
+        points=points,
+        birthday=birthday,
+        address=row.get('address', '').strip()[:200] or None,
+        created_by=operator,
+    ), ''
+
+
+def _save_member_chunk(members, result, fail):
+    """批量写入一批会员；并发导入导致唯一约束冲突时逐条重试"""
+    if not members:
+        return
+    try:
+        with transaction.atomic():
+            Member.objects.bulk_create([member for _, member in members])
+            # bulk_create 不触发 post_save，计数在事务提交后累加；逐条重试的 save() 由信号计数
+            CounterService.record_bulk_create([member for _, member in members])
+        result['success'] += len(members)
+        return
+    except IntegrityError:
+        pass
+    for row_num, member in members:
+        member.pk = None
+        try:
+            with transaction.atomic():
+                member.save()
+            result['success'] += 1
+        except IntegrityError:
+            fail(row_num, "手机号或会员号已存在")
+
+
+def import_members_from_csv(csv_file, operator, chunk_size=2000, encoding='utf-8-sig', progress=None):
     """
     从CSV文件导入会员数据
-    
+
+    流式读取文件，一次性预读已有手机号、会员号和会员等级，
+    逐行在内存中校验，每 chunk_size 行用 bulk_create 写入一次。
+
     Parameters:
-    - csv_file: 上传的CSV文件
+    - csv_file: 上传的CSV文件或以二进制方式打开的文件
     - operator: 执行导入操作的用户
-    
+    - chunk_size: 每批写入的会员数量
+    - encoding: 文件编码
+    - progress: 每批完成后的回调，参数为 (已读取行数, 当前结果)
+
     Returns:
-    - dict: 包含导入结果的字典
+    - dict: 包含导入结果的字典，failed_rows 最多保留 MAX_REPORTED_ROWS 条
     """
-    # 重置文件指针
-    csv_file.seek(0)
-    
-    # 读取CSV文件
-    csv_data = csv_file.read().decode('utf-8')
-    csv_reader = csv.DictReader(io.StringIO(csv_data))
-    
-    success_count = 0
-    skipped_count = 0
-    failed_count = 0
-    failed_rows = []
-    
-    # 获取默认会员等级
+    result = {
+        'success': 0,
+        'skipped': 0,
+        'failed': 0,
+        'failed_rows': []
+    }
+
+    def fail(row_num, message):
+        result['failed'] += 1
+        if len(result['failed_rows']) < MAX_REPORTED_ROWS:
+            result['failed_rows'].append((row_num, message))
+
+    csv_reader = iter_csv_rows(csv_file, encoding=encoding)
+    try:
+        headers = [h.strip().lower() for h in next(csv_reader)]
+    except StopIteration:
+        raise ValueError("CSV文件为空")
+    missing_headers = [h for h in ('name', 'phone') if h not in headers]
+    if missing_headers:
+        raise ValueError(f"CSV文件缺少必要的表头: {', '.join(missing_headers)}")
+
+    # 获取默认会员等级及全部等级
+    levels = {level.name: level for level in MemberLevel.objects.all()}
     default_level = MemberLevel.objects.filter(is_default=True, is_active=True).first()
     if not default_level:
         default_level = MemberLevel.objects.filter(is_active=True).first()
-    
-    # 开始导入
-    for row_num, row in enumerate(csv_reader, start=2):  # start=2 because row 1 is header
-        try:
-            with transaction.atomic():
-                # 检查必填字段
-                if not row.get('name') or not row.get('phone'):
-                    failed_rows.append((row_num, "姓名和手机号为必填字段"))
-                    failed_count += 1
-                    continue
-                
-                # 检查手机号是否已存在
-                if Member.objects.filter(phone=row.get('phone')).exists():
-                    skipped_count += 1
-                    continue
-                
-                # 处理会员等级
-                level = default_level
-                if row.get('level'):
-                    try:
-                        level_obj = MemberLevel.objects.get(name=row.get('level'))
-                        level = level_obj
-                    except MemberLevel.DoesNotExist:
-                        pass  # 使用默认等级
-                
-                # 处理生日
-                birthday = None
-                if row.get('birthday'):
-                    try:
-                        birthday = datetime.strptime(row.get('birthday'), '%Y-%m-%d').date()
-                    except ValueError:
-                        pass
-                
-                # 处理积分
-                points = 0
-                if row.get('points'):
-                    try:
-                        points = int(row.get('points'))
-                    except ValueError:
-                        points = 0
-                
-                # 创建会员
-                member = Member.objects.create(
-                    name=row.get('name'),
-                    phone=row.get('phone'),
-                    email=row.get('email', ''),
-                    member_id=row.get('member_id', ''),
-                    level=level,
-                    points=points,
-                    birthday=birthday,
-                    address=row.get('address', ''),
-                    created_by=operator
-                )
-                
-                success_count += 1
-                
-        except Exception as e:
-            failed_count += 1
-            failed_rows.append((row_num, str(e)))
-    
-    return {
-        'success': success_count,
-        'skipped': skipped_count,
-        'failed': failed_count,
-        'failed_rows': failed_rows
-    }
+
+    # 预读已有手机号和会员号
+    phones = set(Member.objects.values_list('phone', flat=True))
+    member_ids = set(Member.objects.exclude(member_id__isnull=True).values_list('member_id', flat=True))
+
+    rows_read = 0
+    # start=2 because row 1 is header
+    for chunk in iter_chunks(enumerate(csv_reader, start=2), chunk_size):
+        members = []
+        for row_num, values in chunk:
+            row = dict(zip(headers, values))
+            member, error = _build_member(row, levels, default_level, operator)
+            if member is None:
+                fail(row_num, error)
+                continue
+            if member.phone in phones:
+                result['skipped'] += 1
+                continue
+            if member.member_id and member.member_id in member_ids:
+                fail(row_num, f"会员号 {member.member_id} 已存在")
+                continue
+            phones.add(member.phone)
+            if member.member_id:
+                member_ids.add(member.member_id)
+            members.append((row_num, member))
+
+        _save_member_chunk(members, result, fail)
+        rows_read += len(chunk)
+        if progress is not None:
+            progress(rows_read, result)
+
+    if result['success']:
+        # bulk_create 不触发 post_save，手动使仪表盘快照失效
+        invalidate_dashboard()
+    return result
 
 
 def get_member_statistics():
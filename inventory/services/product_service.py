@@ -4,137 +4,255 @@
 """
 import csv
 import io
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 from django.utils import timezone
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Coalesce
 
 from inventory.models import Product, Category, ProductImage, ProductBatch, Inventory
+from inventory.services.counter_service import CounterService
+from inventory.services.search_service import ProductSearchService
+from inventory.signals import stock_changed
+from inventory.utils.csv_utils import iter_chunks, iter_csv_rows
+from inventory.utils.logging import log_operation
 
 
-def import_products_from_csv(csv_file, user):
-    """从CSV文件导入商品"""
+# 导入结果中最多保留的错误行数，避免超大文件的错误明细占满内存
+MAX_REPORTED_ROWS = 1000
+DEFAULT_CATEGORY_NAME = '未分类'
+IMPORT_HEADERS = ['name', 'retail_price', 'category', 'cost_price', 'barcode', 'specification', 'manufacturer']
+
+
+def _parse_price(value, label):
+    """解析价格，返回保留两位小数的 Decimal"""
+    try:
+        price = Decimal(value.replace(',', '').strip())
+    except (InvalidOperation, AttributeError):
+        raise ValueError(f"{label}格式不正确")
+    if price < 0 or not price.is_finite():
+        raise ValueError(f"{label}不能为负数")
+    return price.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def _resolve_categories(names, cache):
+    """按名称批量取得分类，不存在的批量创建；cache 在各批之间复用"""
+    missing = {name for name in names if name not in cache}
+    if missing:
+        cache.update(Category.objects.filter(name__in=missing).in_bulk(field_name='name'))
+        to_create = [Category(name=name) for name in missing if name not in cache]
+        if to_create:
+            Category.objects.bulk_create(to_create, ignore_conflicts=True)
+            cache.update(Category.objects.filter(name__in=missing).in_bulk(field_name='name'))
+    return cache
+
+
+def _import_product_chunk(rows, columns, category_cache, result):
+    """
+    导入一批CSV行：一次查询已存在的条码，批量取得分类，批量写入商品、库存和检索文档
+    """
+    def fail(row_num, message, key='failed'):
+        result[key] += 1
+        if len(result['failed_rows']) < MAX_REPORTED_ROWS:
+            result['failed_rows'].append((row_num, message))
+
+    def cell(row, column):
+        index = columns.get(column, -1)
+        return row[index].strip() if 0 <= index < len(row) else ''
+
+    parsed = []
+    for row_num, row in rows:
+        if not row or not any(value.strip() for value in row):
+            result['skipped'] += 1
+            continue
+        name = cell(row, 'name')
+        if not name:
+            fail(row_num, "商品名称不能为空")
+            continue
+        barcode = cell(row, 'barcode')
+        if not barcode:
+            fail(row_num, "条码不能为空")
+            continue
+        try:
+            price = _parse_price(cell(row, 'retail_price'), "零售价")
+            cost_text = cell(row, 'cost_price')
+            cost = _parse_price(cost_text, "成本价") if cost_text else (price * Decimal('0.7')).quantize(Decimal('0.01'))
+        except ValueError as e:
+            fail(row_num, str(e))
+            continue
+        parsed.append((row_num, {
+            'name': name[:200],
+            'barcode': barcode[:100],
+            'category': cell(row, 'category')[:100] or DEFAULT_CATEGORY_NAME,
+            'price': price,
+            'cost': cost,
+            'specification': cell(row, 'specification')[:200],
+            'manufacturer': cell(row, 'manufacturer')[:200],
+        }))
+
+    if not parsed:
+        return
+
+    existing = set(
+        Product.objects.filter(barcode__in=[fields['barcode'] for _, fields in parsed])
+        .values_list('barcode', flat=True)
+    )
+    _resolve_categories({fields['category'] for _, fields in parsed}, category_cache)
+
+    products = []
+    for row_num, fields in parsed:
+        if fields['barcode'] in existing:
+            fail(row_num, f"条码 {fields['barcode']} 已存在", key='skipped')
+            continue
+        existing.add(fields['barcode'])
+        fields['category'] = category_cache[fields['category']]
+        products.append(Product(**fields))
+
+    if not products:
+        return
+
+    with transaction.atomic():
+        Product.objects.bulk_create(products)
+        if any(product.pk is None for product in products):
+            # 数据库不支持批量插入返回主键时按条码取回
+            ids = dict(
+                Product.objects.filter(barcode__in=[p.barcode for p in products]).values_list('barcode', 'id')
+            )
+            for product in products:
+                product.pk = ids[product.barcode]
+        Inventory.objects.bulk_create([
+            Inventory(product=product, quantity=0, warning_level=5) for product in products
+        ])
+        ProductSearchService.index_products([product.pk for product in products])
+        # bulk_create 不触发 post_save，通知库存相关缓存失效并计入商品行数计数
+        stock_changed.send(sender=Inventory, product_ids=[product.pk for product in products])
+        CounterService.record_bulk_create(products)
+    result['success'] += len(products)
+
+
+def import_products_from_csv(csv_file, user, chunk_size=1000, encoding='utf-8-sig', progress=None):
+    """
+    从CSV文件导入商品
+
+    流式逐行读取文件，每 chunk_size 行为一批：批量检查条码、批量创建分类、
+    bulk_create 写入商品与初始库存。每批在独立事务中提交。
+
+    Args:
+        csv_file: 上传的文件或以二进制方式打开的文件
+        user: 操作人
+        chunk_size: 每批处理的行数
+        encoding: 文件编码
+        progress: 每批完成后的回调，参数为 (已读取行数, 当前结果)
+
+    Returns:
+        dict: success、skipped、failed 计数及 failed_rows [(行号, 原因)]（最多保留 MAX_REPORTED_ROWS 条）
+    """
     result = {
         'success': 0,
         'skipped': 0,
         'failed': 0,
         'failed_rows': []
     }
-    
-    # 读取CSV文件
-    decoded_file = csv_file.read().decode('utf-8')
-    csv_data = csv.reader(io.StringIO(decoded_file))
-    headers = next(csv_data)  # 获取表头
-    
+
+    csv_data = iter_csv_rows(csv_file, encoding=encoding)
+    try:
+        headers = next(csv_data)  # 获取表头
+    except StopIteration:
+        raise ValueError("CSV文件为空")
+
     # 验证必要的表头
+    headers_lower = [h.strip().lower() for h in headers]
     required_headers = ['name', 'retail_price']
-    missing_headers = [h for h in required_headers if h not in headers]
+    missing_headers = [h for h in required_headers if h not in headers_lower]
     if missing_headers:
         raise ValueError(f"CSV文件缺少必要的表头: {', '.join(missing_headers)}")
-    
-    # 获取各列索引
-    headers_lower = [h.lower() for h in headers]
-    name_idx = headers_lower.index('name')
-    retail_price_idx = headers_lower.index('retail_price')
-    
-    # 可选列的索引
-    category_idx = headers_lower.index('category') if 'category' in headers_lower else -1
-    wholesale_price_idx = headers_lower.index('wholesale_price') if 'wholesale_price' in headers_lower else -1
-    cost_price_idx = headers_lower.index('cost_price') if 'cost_price' in headers_lower else -1
-    barcode_idx = headers_lower.index('barcode') if 'barcode' in headers_lower else -1
-    sku_idx = headers_lower.index('sku') if 'sku' in headers_lower else -1
-    specification_idx = headers_lower.index('specification') if 'specification' in headers_lower else -1
-    
-    # 处理每一行数据
-    for row_num, row in enumerate(csv_data, start=2):  # 从2开始，因为1是表头
-        try:
-            if not row or len(row) < len(required_headers):
-                result['skipped'] += 1
-                continue
-            
-            # 解析基本信息
-            name = row[name_idx].strip()
-            if not name:
-                result['failed'] += 1
-                result['failed_rows'].append((row_num, "商品名称不能为空"))
-                continue
-            
-            # 解析价格
-            try:
-                retail_price = float(row[retail_price_idx].replace(',', ''))
-                if retail_price < 0:
-                    result['failed'] += 1
-                    result['failed_rows'].append((row_num, "零售价不能为负数"))
-                    continue
-            except (ValueError, IndexError):
-                result['failed'] += 1
-                result['failed_rows'].append((row_num, "零售价格式不正确"))
-                continue
-            
-            # 检查商品是否已存在
-            existing_product = None
-            if barcode_idx >= 0 and row[barcode_idx]:
-                barcode = row[barcode_idx].strip()
-                existing_product = Product.objects.filter(barcode=barcode).first()
-                if existing_product:
-                    result['skipped'] += 1
-                    result['failed_rows'].append((row_num, f"条码 {barcode} 已存在"))
-                    continue
-            
-            # 解析分类
-            category = None
-            if category_idx >= 0 and row[category_idx]:
-                category_name = row[category_idx].strip()
-                category, _ = Category.objects.get_or_create(name=category_name)
-            
-            # 创建商品
-            with transaction.atomic():
-                product = Product.objects.create(
-                    name=name,
-                    category=category,
-                    price=retail_price,
-                    cost=float(row[cost_price_idx]) if cost_price_idx >= 0 and row[cost_price_idx] else retail_price * 0.7,
-                    barcode=row[barcode_idx].strip() if barcode_idx >= 0 and row[barcode_idx] else None,
-                    specification=row[specification_idx].strip() if specification_idx >= 0 and row[specification_idx] else "",
-                    created_by=user
-                )
-                
-                # 创建初始库存记录
-                Inventory.objects.create(
-                    product=product,
-                    quantity=0,
-                    warning_level=5
-                )
-                
-                result['success'] += 1
-                
-        except Exception as e:
-            result['failed'] += 1
-            result['failed_rows'].append((row_num, str(e)))
-            
+    columns = {h: headers_lower.index(h) for h in IMPORT_HEADERS if h in headers_lower}
+
+    category_cache = {}
+    rows_read = 0
+    # 从2开始，因为1是表头
+    for chunk in iter_chunks(enumerate(csv_data, start=2), chunk_size):
+        _import_product_chunk(chunk, columns, category_cache, result)
+        rows_read += len(chunk)
+        if progress is not None:
+            progress(rows_read, result)
+
+    if result['success'] and user is not None:
+        log_operation(
+            user, 'OTHER', f"CSV导入商品 {result['success']} 个，跳过 {result['skipped']} 个，失败 {result['failed']} 个"
+        )
     return result
 
 
 def search_products(query, category_id=None, active_only=True):
-    """搜索商品"""
+    """搜索商品，有检索词时通过检索索引匹配并按相关度排序"""
     products = Product.objects.select_related('category').all()
     
-    if query:
-        products = products.filter(
-            Q(name__icontains=query) | 
-            Q(barcode__icontains=query) |
-            Q(sku__icontains=query) |
-            Q(specification__icontains=query)
-        )
-    
     if category_id:
         products = products.filter(category_id=category_id)
     
     if active_only:
         products = products.filter(is_active=True)
     
+    if query:
+        return ProductSearchService.search(query, products)
+    
     return products.order_by('name')
 
 
+def products_with_stock(queryset=None):
+    """
+    附带分类和库存数量的商品查询集
+
+    库存通过 LEFT JOIN 注解为 stock（无库存记录时为0），分类通过 select_related 预取，
+    序列化时不再产生额外查询。
+    """
+    if queryset is None:
+        queryset = Product.objects.all()
+    return queryset.select_related('category').annotate(
+        stock=Coalesce(F('inventory__quantity'), Value(0))
+    )
+
+
+def serialize_product_with_stock(product):
+    """把 products_with_stock 返回的商品序列化为收银台接口使用的字典"""
+    return {
+        'product_id': product.id,
+        'barcode': product.barcode,
+        'name': product.name,
+        'price': float(product.price),
+        'stock': product.stock,
+        'category': product.category.name if product.category else '',
+        'specification': product.specification,
+        'manufacturer': product.manufacturer,
+    }
+
+
+def lookup_products_by_barcode(barcode, limit=5, match_name=True):
+    """
+    按条码查询商品，精确匹配失败时按条码（及名称）模糊匹配，只查询一次数据库
+
+    Args:
+        barcode: 扫描或输入的条码
+        limit: 模糊匹配最多返回的商品数
+        match_name: 模糊匹配时是否同时匹配商品名称
+
+    Returns:
+        tuple: (精确匹配的商品或None, 最多limit个模糊匹配的商品列表)
+    """
+    condition = Q(barcode=barcode) | Q(barcode__icontains=barcode)
+    if match_name:
+        condition |= Q(name__icontains=barcode)
+    products = list(
+        products_with_stock(Product.objects.filter(condition)).annotate(
+            exact=Case(When(barcode=barcode, then=Value(0)), default=Value(1), output_field=IntegerField())
+        ).order_by('exact', 'name')[:limit]
+    )
+    if products and products[0].barcode == barcode:
+        return products[0], []
+    return None, products
+
+
 def get_product_with_inventory(product_id):
     """获取商品及其库存信息"""
     try:
@@ -7,8 +7,9 @@ from django.db.models import Sum, Count, F, Q, Avg, ExpressionWrapper, FloatFiel
 from django.db.models.functions import TruncDay, TruncWeek, TruncMonth
 from django.utils import timezone
 
-from inventory.models import Product, Inventory, Sale, SaleItem, InventoryTransaction, Member, MemberLevel, RechargeRecord, OperationLog
+from inventory.models import Product, Inventory, Sale, SaleItem, InventoryTransaction, Member, MemberLevel, RechargeRecord, OperationLog, DailySalesRollup
 from inventory.utils.date_utils import get_period_boundaries
+from inventory.services.sales_rollup_service import SalesRollupService, day_bounds, is_plain_date
 
 class ReportService:
     """Service for generating reports and analyzing data."""
@@ -31,6 +32,10 @@ class ReportService:
         if not end_date:
             end_date = timezone.now()
             
+        # Served from the daily rollup when the whole range is covered by it
+        if SalesRollupService.is_covered(start_date, end_date):
+            return ReportService._sales_by_period_from_rollup(start_date, end_date, period)
+        
         # Truncate function based on period
         if period == 'day':
             trunc_func = TruncDay('created_at')
@@ -43,7 +48,8 @@ class ReportService:
             
         # Query sales data
         sales_data = Sale.objects.filter(
-            created_at__range=(start_date, end_date)
+            created_at__range=ReportService._datetime_range(start_date, end_date),
+            status='COMPLETED'
         ).annotate(
             period=trunc_func
         ).values(
@@ -55,16 +61,55 @@ class ReportService:
             item_count=Count('items')
         ).order_by('period')
         
-        # Calculate profit
+        return ReportService._with_profit(sales_data)
+    
+    @staticmethod
+    def _datetime_range(start_date, end_date):
+        """
+        Plain dates cover whole local days (end date inclusive); datetimes are used as given.
+        """
+        if is_plain_date(start_date) and is_plain_date(end_date):
+            start, end = day_bounds(start_date, end_date)
+            return start, end - timedelta(microseconds=1)
+        return start_date, end_date
+    
+    @staticmethod
+    def _with_profit(sales_data):
+        """Calculate profit and profit margin for each period row."""
+        sales_data = list(sales_data)
         for data in sales_data:
-            data['profit'] = data['total_sales'] - (data['total_cost'] or 0)
+            data['profit'] = (data['total_sales'] or 0) - (data['total_cost'] or 0)
             if data['total_cost'] and data['total_cost'] > 0:
                 data['profit_margin'] = (data['profit'] / data['total_cost']) * 100
             else:
                 data['profit_margin'] = 0
-                
         return sales_data
     
+    @staticmethod
+    def _sales_by_period_from_rollup(start_date, end_date, period):
+        """Sales by period aggregated from DailySalesRollup."""
+        if period == 'week':
+            period_expr = TruncWeek('date')
+        elif period == 'month':
+            period_expr = TruncMonth('date')
+        else:
+            period_expr = F('date')
+        
+        sales_data = DailySalesRollup.objects.filter(
+            date__range=(start_date, end_date)
+        ).annotate(
+            period=period_expr
+        ).values(
+            'period'
+        ).annotate(
+            total_sales=Sum('final_amount'),
+            total_cost=Sum('cost_amount'),
+            order_count=Sum('order_count'),
+            item_count=Sum('item_count')
+        ).order_by('period')
+        
+        return ReportService._with_profit(sales_data)
+    
     @staticmethod
     def get_top_selling_products(start_date=None, end_date=None, limit=10):
         """
@@ -200,9 +245,14 @@ class ReportService:
         if not end_date:
             end_date = timezone.now()
             
+        # Served from the daily rollup when the whole range is covered by it
+        if SalesRollupService.is_covered(start_date, end_date):
+            return ReportService._profit_report_from_rollup(start_date, end_date)
+        
         # Sales data
         sales_data = Sale.objects.filter(
-            created_at__range=(start_date, end_date)
+            created_at__range=ReportService._datetime_range(start_date, end_date),
+            status='COMPLETED'
         )
         
         # Total sales
@@ -218,9 +268,6 @@ class ReportService:
             cost=Sum(F('quantity') * F('product__cost'))
         )['cost'] or 0
         
-        # Calculate profit
-        gross_profit = (total_sales['final_amount'] or 0) - total_cost
-        
         # Calculate by category
         category_data = sale_items.values(
             'product__category__name'
@@ -236,6 +283,64 @@ class ReportService:
             )
         ).order_by('-profit')
         
+        return ReportService._profit_summary(
+            start_date, end_date,
+            final_amount=total_sales['final_amount'] or 0,
+            discount_amount=total_sales['discount_amount'] or 0,
+            total_cost=total_cost,
+            order_count=sales_data.count(),
+            item_count=sale_items.count(),
+            category_data=list(category_data)
+        )
+    
+    @staticmethod
+    def _profit_report_from_rollup(start_date, end_date):
+        """Profit report aggregated from DailySalesRollup."""
+        rollups = DailySalesRollup.objects.filter(date__range=(start_date, end_date))
+        totals = rollups.aggregate(
+            final_amount=Sum('final_amount'),
+            discount_amount=Sum('discount_amount'),
+            total_cost=Sum('cost_amount'),
+            order_count=Sum('order_count'),
+            item_count=Sum('item_count')
+        )
+        
+        category_data = rollups.values(
+            'category__name'
+        ).annotate(
+            sales=Sum('sales_amount'),
+            cost=Sum('cost_amount'),
+            quantity=Sum('quantity')
+        ).annotate(
+            profit=F('sales') - F('cost'),
+            profit_margin=ExpressionWrapper(
+                F('profit') * 100 / F('cost'),
+                output_field=DecimalField()
+            )
+        ).order_by('-profit')
+        
+        # Keep the key used by templates for the raw query
+        category_data = [
+            dict(row, product__category__name=row.pop('category__name'))
+            for row in category_data
+        ]
+        
+        return ReportService._profit_summary(
+            start_date, end_date,
+            final_amount=totals['final_amount'] or 0,
+            discount_amount=totals['discount_amount'] or 0,
+            total_cost=totals['total_cost'] or 0,
+            order_count=totals['order_count'] or 0,
+            item_count=totals['item_count'] or 0,
+            category_data=category_data
+        )
+    
+    @staticmethod
+    def _profit_summary(start_date, end_date, final_amount, discount_amount, total_cost,
+                        order_count, item_count, category_data):
+        """Assemble the profit report dict shared by the raw and rollup paths."""
+        gross_profit = final_amount - total_cost
+        
         # Profit margin
         profit_margin = 0
         if total_cost > 0:
@@ -244,14 +349,14 @@ class ReportService:
         return {
             'start_date': start_date,
             'end_date': end_date,
-            'total_sales': total_sales['final_amount'] or 0,
+            'total_sales': final_amount,
             'total_cost': total_cost,
             'gross_profit': gross_profit,
             'profit_margin': profit_margin,
-            'discount_amount': total_sales['discount_amount'] or 0,
-            'order_count': sales_data.count(),
-            'item_count': sale_items.count(),
-            'category_data': list(category_data)
+            'discount_amount': discount_amount,
+            'order_count': order_count,
+            'item_count': item_count,
+            'category_data': category_data
         }
 
     @staticmethod
@@ -0,0 +1,238 @@
+"""
+每日销售汇总服务 - 维护 DailySalesRollup 并判断报表能否直接读取汇总
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from inventory.models import DailySalesRollup, SalesRollupState, Sale, SaleItem
+
+CENT = Decimal('0.01')
+MEASURES = (
+    'quantity', 'item_count', 'order_count',
+    'sales_amount', 'discount_amount', 'final_amount', 'cost_amount',
+)
+
+
+def day_bounds(start_date, end_date):
+    """把日期范围转换为当地时区的 [开始日 00:00, 结束日次日 00:00) 时间范围"""
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(start_date, time.min), tz)
+    end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min), tz)
+    return start, end
+
+
+def is_plain_date(value):
+    """是否为不带时间部分的日期"""
+    return isinstance(value, date) and not isinstance(value, datetime)
+
+
+class SalesRollupService:
+    """每日销售汇总服务"""
+
+    @staticmethod
+    def sale_rows(sale, items):
+        """
+        把一张销售单拆分为汇总粒度的增量
+
+        整单折扣按明细小计比例分摊，尾差计入最后一行，保证分摊后合计与整单一致；
+        销售单数只计入第一行所在的粒度。
+
+        Args:
+            sale: 销售单
+            items: 销售明细列表，需已加载 product
+
+        Returns:
+            dict: {(date, product_id, category_id, payment_method, operator_id): {度量: 增量}}
+        """
+        rows = {}
+        if not items:
+            return rows
+
+        day = timezone.localdate(sale.created_at)
+        total = sum((item.subtotal for item in items), Decimal('0'))
+        discount = Decimal(sale.discount_amount or 0)
+        allocated = Decimal('0')
+
+        for index, item in enumerate(items):
+            if index == len(items) - 1:
+                line_discount = discount - allocated
+            elif total:
+                line_discount = (discount * item.subtotal / total).quantize(CENT)
+                allocated += line_discount
+            else:
+                line_discount = Decimal('0')
+
+            key = (day, item.product_id, item.product.category_id, sale.payment_method, sale.operator_id)
+            row = rows.setdefault(key, {
+                'quantity': 0, 'item_count': 0, 'order_count': 0,
+                'sales_amount': Decimal('0'), 'discount_amount': Decimal('0'),
+                'final_amount': Decimal('0'), 'cost_amount': Decimal('0'),
+            })
+            row['quantity'] += item.quantity
+            row['item_count'] += 1
+            row['order_count'] += 1 if index == 0 else 0
+            row['sales_amount'] += item.subtotal
+            row['discount_amount'] += line_discount
+            row['final_amount'] += item.subtotal - line_discount
+            row['cost_amount'] += item.quantity * Decimal(item.product.cost or 0)
+        return rows
+
+    @staticmethod
+    def apply_sale(sale, items=None, sign=1):
+        """
+        将一张已完成的销售单累加到汇总表（sign=-1 时扣回）
+
+        读取已有汇总行、批量新增缺失行、批量累加已有行，共三次查询，
+        与明细行数无关；累加使用 F 表达式，并发收银不会互相覆盖。
+
+        Args:
+            sale: 销售单
+            items: 已加载 product 的销售明细，为空时从数据库读取
+            sign: 1 表示计入，-1 表示扣回
+        """
+        if items is None:
+            items = list(sale.items.select_related('product'))
+        rows = SalesRollupService.sale_rows(sale, items)
+        if not rows:
+            return
+
+        day = timezone.localdate(sale.created_at)
+        with transaction.atomic():
+            existing = {}
+            for rollup in DailySalesRollup.objects.filter(
+                date=day,
+                payment_method=sale.payment_method,
+                operator_id=sale.operator_id,
+                product_id__in={key[1] for key in rows},
+            ):
+                key = (rollup.date, rollup.product_id, rollup.category_id, rollup.payment_method, rollup.operator_id)
+                existing.setdefault(key, rollup)
+
+            to_create = []
+            to_update = []
+            for key, measures in rows.items():
+                rollup = existing.get(key)
+                if rollup is None:
+                    to_create.append(DailySalesRollup(
+                        date=key[0], product_id=key[1], category_id=key[2],
+                        payment_method=key[3], operator_id=key[4],
+                        **{name: value * sign for name, value in measures.items()}
+                    ))
+                else:
+                    for name, value in measures.items():
+                        setattr(rollup, name, F(name) + value * sign)
+                    to_update.append(rollup)
+
+            if to_create:
+                DailySalesRollup.objects.bulk_create(to_create)
+            if to_update:
+                DailySalesRollup.objects.bulk_update(to_update, MEASURES)
+
+    @staticmethod
+    def revert_sale(sale, items=None):
+        """从汇总表中扣回一张此前已计入的销售单"""
+        SalesRollupService.apply_sale(sale, items=items, sign=-1)
+
+    @staticmethod
+    def get_state():
+        """获取（必要时创建）汇总覆盖状态"""
+        state = SalesRollupState.objects.order_by('id').first()
+        if state is None:
+            state = SalesRollupState.objects.create()
+        return state
+
+    @staticmethod
+    def is_covered(start_date, end_date):
+        """
+        判断日期范围能否直接从汇总表读取
+
+        只有不带时间部分的日期范围，且起始日期不早于覆盖起始日期时才可以。
+        """
+        if not (is_plain_date(start_date) and is_plain_date(end_date)):
+            return False
+        covered_from = (
+            SalesRollupState.objects.order_by('id')
+            .values_list('covered_from', flat=True)
+            .first()
+        )
+        return covered_from is not None and start_date >= covered_from
+
+    @staticmethod
+    @transaction.atomic
+    def rebuild(start_date=None, end_date=None, chunk_size=2000):
+        """
+        从销售明细重建汇总表
+
+        Args:
+            start_date: 重建起始日期，为空表示全部历史
+            end_date: 重建结束日期（含），为空表示至今
+            chunk_size: 流式读取明细时每批行数
+
+        Returns:
+            int: 写入的汇总行数
+        """
+        sales = Sale.objects.filter(status='COMPLETED')
+        rollups = DailySalesRollup.objects.all()
+        if start_date:
+            sales = sales.filter(created_at__gte=day_bounds(start_date, start_date)[0])
+            rollups = rollups.filter(date__gte=start_date)
+        if end_date:
+            sales = sales.filter(created_at__lt=day_bounds(end_date, end_date)[1])
+            rollups = rollups.filter(date__lte=end_date)
+        rollups.delete()
+
+        totals = {}
+        current_sale = None
+        current_items = []
+
+        def flush():
+            for key, measures in SalesRollupService.sale_rows(current_sale, current_items).items():
+                row = totals.setdefault(key, dict.fromkeys(MEASURES, 0))
+                for name, value in measures.items():
+                    row[name] += value
+
+        items = (
+            SaleItem.objects.filter(sale__in=sales)
+            .select_related('sale', 'product')
+            .order_by('sale_id', 'id')
+            .iterator(chunk_size=chunk_size)
+        )
+        for item in items:
+            if current_sale is not None and item.sale_id != current_sale.id:
+                flush()
+                current_items = []
+            current_sale = item.sale
+            current_items.append(item)
+        if current_sale is not None:
+            flush()
+
+        DailySalesRollup.objects.bulk_create(
+            [
+                DailySalesRollup(
+                    date=key[0], product_id=key[1], category_id=key[2],
+                    payment_method=key[3], operator_id=key[4], **measures
+                )
+                for key, measures in totals.items()
+            ],
+            batch_size=1000,
+        )
+
+        state = SalesRollupService.get_state()
+        if start_date is None:
+            first_day = min((key[0] for key in totals), default=timezone.localdate())
+            state.covered_from = first_day
+        elif state.covered_from is None or start_date < state.covered_from:
+            # 重建区间须与原覆盖范围首尾相接，否则中间会留下未汇总的日期
+            if end_date is None or (
+                state.covered_from is not None
+                and end_date >= state.covered_from - timedelta(days=1)
+            ):
+                state.covered_from = start_date
+        state.rebuilt_at = timezone.now()
+        state.save()
+
+        return len(totals)
@@ -0,0 +1,151 @@
+"""
+商品检索服务 - 维护商品检索文档并提供与数据库无关的检索接口
+
+检索文档由 inventory.utils.search_utils 生成，保存在 ProductSearchDocument 中：
+- SQLite：迁移建立的 FTS5 外部内容表由触发器同步，按 bm25 排序；
+- PostgreSQL：检索文档上建有 pg_trgm GIN 索引，按 trigram 相似度排序；
+- 其他数据库（或 SQLite 未编译 FTS5）：在检索文档上做 LIKE 匹配。
+"""
+import logging
+
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+
+from inventory.models import Product, ProductSearchDocument
+from inventory.utils.search_utils import build_query_terms, build_search_document, pinyin_available
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'inventory_productsearch_fts'
+
+
+class ProductSearchService:
+    """商品检索服务"""
+
+    @staticmethod
+    def backend():
+        """
+        当前连接使用的检索后端
+
+        Returns:
+            str: 'fts5'、'trigram' 或 'basic'
+        """
+        backend = getattr(connection, '_product_search_backend', None)
+        if backend is None:
+            backend = 'basic'
+            if connection.vendor == 'sqlite':
+                if FTS_TABLE in connection.introspection.table_names():
+                    backend = 'fts5'
+            elif connection.vendor == 'postgresql':
+                backend = 'trigram'
+            connection._product_search_backend = backend
+        return backend
+
+    @staticmethod
+    def document_for(product):
+        """生成单个商品的检索文档内容"""
+        return build_search_document(
+            name=product.name,
+            barcode=product.barcode,
+            specification=product.specification,
+            manufacturer=product.manufacturer,
+            category=product.category.name if product.category_id else '',
+            color=product.get_color_display() if product.color else '',
+            size=product.size,
+        )
+
+    @staticmethod
+    def index_products(product_ids):
+        """
+        重建指定商品的检索文档
+
+        Args:
+            product_ids: 商品ID列表
+
+        Returns:
+            int: 写入的文档数量
+        """
+        product_ids = list(product_ids)
+        if not product_ids:
+            return 0
+        products = Product.objects.filter(id__in=product_ids).select_related('category')
+        documents = [
+            ProductSearchDocument(product=product, content=ProductSearchService.document_for(product))
+            for product in products
+        ]
+        ProductSearchDocument.objects.filter(product_id__in=product_ids).delete()
+        ProductSearchDocument.objects.bulk_create(documents)
+        return len(documents)
+
+    @staticmethod
+    def rebuild(chunk_size=2000):
+        """
+        分批重建全部商品的检索文档
+
+        Returns:
+            int: 写入的文档数量
+        """
+        if not pinyin_available():
+            logger.warning('未安装 pypinyin，商品检索文档不包含拼音和首字母，拼音检索不可用')
+        ProductSearchDocument.objects.all().delete()
+        total = 0
+        ids = Product.objects.order_by('id').values_list('id', flat=True)
+        last_id = 0
+        while True:
+            chunk = list(ids.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+            total += ProductSearchService.index_products(chunk)
+            last_id = chunk[-1]
+        return total
+
+    @staticmethod
+    def match_expression(terms):
+        """把检索词转换为 FTS5 MATCH 表达式，所有词需同时命中"""
+        return ' '.join(f'"{term}"*' if prefix else f'"{term}"' for term, prefix in terms)
+
+    @staticmethod
+    def search(query, queryset=None):
+        """
+        检索商品，结果按相关度排序
+
+        Args:
+            query: 用户输入，支持中文名称片段、条码片段、规格、厂商及拼音
+            queryset: 待检索的商品查询集，默认全部商品
+
+        Returns:
+            QuerySet: 命中的商品
+        """
+        if queryset is None:
+            queryset = Product.objects.all()
+        terms = build_query_terms(query)
+        if not terms:
+            return queryset.none()
+
+        backend = ProductSearchService.backend()
+        if backend == 'fts5':
+            expression = ProductSearchService.match_expression(terms)
+            table = Product._meta.db_table
+            return queryset.filter(
+                id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', (expression,))
+            ).annotate(
+                search_rank=RawSQL(
+                    f'SELECT bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+                    f'WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id',
+                    (expression,),
+                )
+            ).order_by('search_rank', 'name')
+
+        # 检索文档和检索词都已转为小写，用区分大小写的 LIKE；PostgreSQL 上 icontains 会生成
+        # UPPER(content) LIKE，无法使用 content 上的 trigram 索引
+        condition = Q()
+        for term, _ in terms:
+            condition &= Q(search_document__content__contains=term)
+        queryset = queryset.filter(condition)
+        if backend == 'trigram':
+            from django.contrib.postgres.search import TrigramWordSimilarity
+            return queryset.annotate(
+                search_rank=TrigramWordSimilarity(query, F('search_document__content'))
+            ).order_by('-search_rank', 'name')
+        return queryset.order_by('name')
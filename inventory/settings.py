@@ -26,6 +26,13 @@ ALLOWED_HOSTS = [host.strip() for host in allowed_hosts_str.split(',') if host.s
 # 第三方条码API配置
 BARCODE_API_KEY = ''  # 替换为实际的API密钥
 ALI_BARCODE_APPCODE =''
+# 条码查询接口地址，留空使用默认地址
+ALI_BARCODE_URL = ''
+# 条码查询结果缓存时间（秒）：查到商品、确认不存在、接口出错的初始退避及最大退避
+ALI_BARCODE_HIT_TTL = 30 * 24 * 3600
+ALI_BARCODE_MISS_TTL = 24 * 3600
+ALI_BARCODE_ERROR_BACKOFF = 60
+ALI_BARCODE_ERROR_BACKOFF_MAX = 3600
 
 # Application definition
 
@@ -85,6 +92,17 @@ DATABASES = {
     }
 }
 
+# 设置 DB_ENGINE=postgresql 时使用 PostgreSQL，例如在大数据量下做性能测试
+if os.environ.get('DB_ENGINE') == 'postgresql':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('DB_NAME', 'inventory'),
+        'USER': os.environ.get('DB_USER', 'postgres'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -136,6 +154,15 @@ os.makedirs(LOG_DIR, exist_ok=True)
 os.makedirs(BACKUP_ROOT, exist_ok=True)
 os.makedirs(TEMP_DIR, exist_ok=True)
 
+# 备份压缩算法：gzip，或安装 zstandard 后使用 zstd
+BACKUP_COMPRESSION = 'gzip'
+
+# 后台导出任务：导出文件保留小时数；RUNNING 任务超过该分钟数没有心跳视为工作进程已退出，重新排队；
+# 执行次数达到上限的任务不再重试，标记为失败
+EXPORT_JOB_TTL_HOURS = 24
+EXPORT_JOB_STALE_MINUTES = 30
+EXPORT_JOB_MAX_ATTEMPTS = 3
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CRISPY_ALLOWED_TEMPLATE_PACKS = 'bootstrap5'
@@ -154,6 +181,9 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 # EMAIL_HOST_PASSWORD = 'your-password'
 DEFAULT_FROM_EMAIL = 'noreply@example.com'
 
+# 首页仪表盘快照缓存时间（秒），销售完成或库存变化时会提前失效
+DASHBOARD_CACHE_TIMEOUT = 60
+
 # 日志配置
 LOGGING = {
     'version': 1,
@@ -0,0 +1,75 @@
+"""
+信号定义与处理器
+
+stock_changed 由不经过 Model.save 的批量库存更新（如 change_stock）发送，
+其余数据变更通过模型的 post_save / post_delete 捕获。
+商品或分类保存后同步重建对应商品的检索文档。
+列表页使用的行数计数器随新增、删除和状态变化增量更新。
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal
+
+# 库存数量被直接 UPDATE 后发送，参数 product_ids 为受影响的商品ID列表
+stock_changed = Signal()
+
+
+def invalidate_dashboard(**kwargs):
+    """事务提交后使仪表盘快照失效"""
+    from inventory.services.dashboard_service import DashboardService
+    transaction.on_commit(DashboardService.invalidate)
+
+
+stock_changed.connect(invalidate_dashboard, dispatch_uid='stock_changed_dashboard')
+
+for model in ('inventory.Sale', 'inventory.Inventory', 'inventory.Product', 'inventory.Member'):
+    post_save.connect(invalidate_dashboard, sender=model, dispatch_uid=f'{model}_saved_dashboard')
+    post_delete.connect(invalidate_dashboard, sender=model, dispatch_uid=f'{model}_deleted_dashboard')
+
+
+def index_product(sender, instance, raw=False, **kwargs):
+    """商品保存后重建其检索文档"""
+    if raw:
+        return
+    from inventory.services.search_service import ProductSearchService
+    ProductSearchService.index_products([instance.pk])
+
+
+def index_category_products(sender, instance, raw=False, created=False, **kwargs):
+    """分类保存后重建该分类下商品的检索文档"""
+    if raw or created:
+        return
+    from inventory.services.search_service import ProductSearchService
+    ProductSearchService.index_products(instance.product_set.values_list('id', flat=True))
+
+
+post_save.connect(index_product, sender='inventory.Product', dispatch_uid='product_saved_search')
+post_save.connect(index_category_products, sender='inventory.Category', dispatch_uid='category_saved_search')
+
+
+def remember_counter_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    """保存前记录状态字段原值"""
+    if raw:
+        return
+    from inventory.services.counter_service import CounterService
+    CounterService.remember_state(instance, update_fields)
+
+
+def count_saved(sender, instance, created=False, raw=False, **kwargs):
+    """新增或状态变化后更新行数计数"""
+    if raw:
+        return
+    from inventory.services.counter_service import CounterService
+    CounterService.record_save(instance, created)
+
+
+def count_deleted(sender, instance, **kwargs):
+    """删除后更新行数计数"""
+    from inventory.services.counter_service import CounterService
+    CounterService.record_delete(instance)
+
+
+for model in ('inventory.Product', 'inventory.Member', 'inventory.Sale', 'admin.LogEntry'):
+    pre_save.connect(remember_counter_state, sender=model, dispatch_uid=f'{model}_presave_counter')
+    post_save.connect(count_saved, sender=model, dispatch_uid=f'{model}_saved_counter')
+    post_delete.connect(count_deleted, sender=model, dispatch_uid=f'{model}_deleted_counter')
@@ -0,0 +1,337 @@
+import gzip
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import zipfile
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.http import FileResponse
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from inventory.exceptions import InventoryValidationError
+from inventory.models import (
+    Category, Inventory, InventoryTransaction, Member, MemberLevel, MemberTransaction, Product,
+    RechargeRecord, Sale, SaleItem,
+)
+from inventory.services.backup_service import BackupService
+from inventory.services.report_service import ReportService
+from inventory.services.sales_rollup_service import SalesRollupService
+from inventory.services.search_service import ProductSearchService
+from inventory.utils.download_utils import StoredZip, parse_range
+
+
+class BackupTestMixin:
+    """备份写入临时目录"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        for name in ('backups', 'media', 'temp'):
+            os.makedirs(os.path.join(self.tmp, name))
+        self.settings_override = override_settings(
+            BACKUP_ROOT=os.path.join(self.tmp, 'backups'),
+            MEDIA_ROOT=os.path.join(self.tmp, 'media'),
+            TEMP_DIR=os.path.join(self.tmp, 'temp'),
+        )
+        self.settings_override.enable()
+        self.user = User.objects.create_user(username='backup_admin', password='secret')
+        category = Category.objects.create(name='饮料')
+        self.product = Product.objects.create(
+            barcode='6900000000001', name='矿泉水', category=category,
+            price=Decimal('2.00'), cost=Decimal('1.00'),
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def add_transactions(self, count):
+        InventoryTransaction.objects.bulk_create([
+            InventoryTransaction(product=self.product, transaction_type='IN', quantity=1, operator=self.user)
+            for _ in range(count)
+        ])
+
+    def backup_file(self, backup_name, filename):
+        return os.path.join(self.tmp, 'backups', backup_name, filename)
+
+
+class BackupServiceTest(BackupTestMixin, TransactionTestCase):
+    """备份引擎测试（在线备份需在事务外执行）"""
+
+    def test_full_backup_is_compressed_sqlite_snapshot(self):
+        """完整备份为压缩的 SQLite 快照，清单记录校验和与最大ID"""
+        self.add_transactions(3)
+        with open(os.path.join(self.tmp, 'media', 'logo.png'), 'wb') as f:
+            f.write(b'png')
+
+        BackupService.create_backup('full_1', user=self.user)
+        manifest = BackupService.read_manifest('full_1')
+        self.assertEqual(manifest['type'], 'full')
+        self.assertEqual(manifest['high_water']['inventory.InventoryTransaction'],
+                         InventoryTransaction.objects.latest('id').id)
+        self.assertEqual([a['path'] for a in manifest['artifacts']], ['db.sqlite3.gz', 'media.tar.gz'])
+        self.assertEqual(BackupService.verify_backup('full_1'), [])
+
+        snapshot = os.path.join(self.tmp, 'snapshot.sqlite3')
+        with gzip.open(self.backup_file('full_1', 'db.sqlite3.gz')) as src, open(snapshot, 'wb') as out:
+            shutil.copyfileobj(src, out)
+        db = sqlite3.connect(snapshot)
+        try:
+            self.assertEqual(db.execute('SELECT name FROM inventory_product').fetchall(), [('矿泉水',)])
+        finally:
+            db.close()
+
+        with open(self.backup_file('full_1', 'backup_info.json'), encoding='utf-8') as f:
+            self.assertTrue(json.load(f)['includes_media'])
+
+    def test_incremental_backup_contains_only_new_rows(self):
+        """增量备份只导出上次备份之后新增的行"""
+        with self.assertRaises(InventoryValidationError):
+            BackupService.create_backup('inc_0', incremental=True)
+
+        self.add_transactions(2)
+        BackupService.create_backup('full_1', include_media=False)
+        self.add_transactions(3)
+        BackupService.create_backup('inc_1', incremental=True)
+
+        manifest = BackupService.read_manifest('inc_1')
+        self.assertEqual(manifest['base'], 'full_1')
+        artifacts = {a['model']: a for a in manifest['artifacts']}
+        self.assertEqual(artifacts['inventory.InventoryTransaction']['rows'], 3)
+        self.assertEqual(artifacts['inventory.Sale']['rows'], 0)
+        with gzip.open(self.backup_file('inc_1', 'inventorytransaction.jsonl.gz'), 'rt', encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 3)
+        self.assertEqual([m['name'] for m in BackupService.backup_chain('inc_1')], ['full_1', 'inc_1'])
+
+        # 增量备份的基础不能删除
+        self.assertEqual(BackupService.dependent_backups('full_1'), ['inc_1'])
+        self.assertFalse(BackupService.delete_backup('full_1'))
+
+    def test_tampered_backup_is_rejected(self):
+        """文件与清单校验和不一致时拒绝恢复"""
+        BackupService.create_backup('full_1', include_media=False)
+        with open(self.backup_file('full_1', 'db.sqlite3.gz'), 'ab') as f:
+            f.write(b'x')
+        self.assertEqual(len(BackupService.verify_backup('full_1')), 1)
+        with self.assertRaises(InventoryValidationError):
+            BackupService.restore('full_1')
+
+
+class BackupRestoreTest(BackupTestMixin, TransactionTestCase):
+    """从完整备份和增量备份链恢复"""
+
+    def test_restore_full_then_incremental(self):
+        """恢复增量备份时先恢复完整快照，再应用增量数据"""
+        self.add_transactions(2)
+        BackupService.create_backup('full_1')
+        sale = Sale.objects.create(
+            total_amount=Decimal('2.00'), final_amount=Decimal('2.00'),
+            payment_method='cash', operator=self.user,
+        )
+        self.add_transactions(1)
+        BackupService.create_backup('inc_1', incremental=True)
+
+        # 增量备份之后的数据在恢复后消失
+        self.add_transactions(5)
+        Product.objects.create(barcode='6900000000002', name='可乐', price=Decimal('3.00'), cost=Decimal('2.00'),
+                               category=self.product.category)
+
+        self.assertTrue(BackupService.restore_backup('inc_1', user=self.user))
+        self.assertEqual(InventoryTransaction.objects.count(), 3)
+        self.assertTrue(Sale.objects.filter(pk=sale.pk).exists())
+        self.assertEqual(list(Product.objects.values_list('name', flat=True)), ['矿泉水'])
+
+    def test_incremental_includes_rows_created_after_base(self):
+        """增量中的销售引用基础备份之后新建的商品、会员和用户，恢复后外键、库存和会员累计一致"""
+        BackupService.create_backup('full_1', include_media=False)
+        cashier = User.objects.create_user(username='cashier', password='secret')
+        level = MemberLevel.objects.create(name='普通会员', discount=Decimal('1.00'), points_threshold=0)
+        member = Member.objects.create(name='张三', phone='13800000000', level=level)
+        product = Product.objects.create(barcode='6900000000002', name='可乐', price=Decimal('3.00'),
+                                         cost=Decimal('2.00'), category=self.product.category)
+        Inventory.objects.create(product=product, quantity=10)
+        Inventory.objects.create(product=self.product, quantity=5)
+        BackupService.create_backup('inc_1', incremental=True)
+
+        sale = Sale.objects.create(
+            member=member, total_amount=Decimal('6.00'), final_amount=Decimal('6.00'),
+            payment_method='cash', operator=cashier,
+        )
+        SaleItem.objects.create(sale=sale, product=product, quantity=2, price=Decimal('3.00'),
+                                actual_price=Decimal('3.00'), subtotal=Decimal('6.00'))
+        # 结算通过 UPDATE 扣减库存和累计会员消费，不更新 updated_at
+        Inventory.objects.filter(product=product).update(quantity=8)
+        Member.objects.filter(pk=member.pk).update(total_spend=Decimal('6.00'), purchase_count=1)
+        BackupService.create_backup('inc_2', incremental=True)
+        Product.objects.create(barcode='6900000000003', name='雪碧', price=Decimal('3.00'),
+                               cost=Decimal('2.00'), category=self.product.category)
+
+        BackupService.restore('inc_2')
+        self.assertTrue(SaleItem.objects.filter(sale=sale, product=product).exists())
+        self.assertEqual(Sale.objects.get(pk=sale.pk).operator, cashier)
+        self.assertEqual(Inventory.objects.get(product=product).quantity, 8)
+        member.refresh_from_db()
+        self.assertEqual((member.total_spend, member.purchase_count), (Decimal('6.00'), 1))
+        self.assertFalse(Product.objects.filter(barcode='6900000000003').exists())
+
+    def test_restore_rebuilds_rollup_and_search_documents(self):
+        """增量中的销售计入每日汇总，增量中新建的商品可以检索"""
+        SalesRollupService.rebuild()
+        BackupService.create_backup('full_1', include_media=False)
+        product = Product.objects.create(barcode='6900000000002', name='可乐', price=Decimal('3.00'),
+                                         cost=Decimal('2.00'), category=self.product.category)
+        sale = Sale.objects.create(
+            total_amount=Decimal('6.00'), final_amount=Decimal('6.00'),
+            payment_method='cash', operator=self.user, status='COMPLETED',
+        )
+        SaleItem.objects.create(sale=sale, product=product, quantity=2, price=Decimal('3.00'),
+                                actual_price=Decimal('3.00'), subtotal=Decimal('6.00'))
+        BackupService.create_backup('inc_1', incremental=True)
+
+        BackupService.restore('inc_1')
+        today = timezone.localdate()
+        self.assertTrue(SalesRollupService.is_covered(today, today))
+        rows = list(ReportService.get_sales_by_period(today, today))
+        self.assertEqual([(row['order_count'], row['total_sales']) for row in rows], [(1, Decimal('6.00'))])
+        self.assertEqual(list(ProductSearchService.search('可乐')), [product])
+
+    def test_member_ledgers_are_restored_with_balances(self):
+        """会员充值和余额流水随增量恢复，与恢复后的会员余额一致"""
+        level = MemberLevel.objects.create(name='普通会员', discount=Decimal('1.00'), points_threshold=0)
+        member = Member.objects.create(name='张三', phone='13800000000', level=level)
+        BackupService.create_backup('full_1', include_media=False)
+        RechargeRecord.objects.create(member=member, amount=Decimal('100.00'), actual_amount=Decimal('100.00'),
+                                      payment_method='cash', operator=self.user)
+        MemberTransaction.objects.create(member=member, transaction_type='RECHARGE',
+                                         balance_change=Decimal('100.00'), created_by=self.user)
+        Member.objects.filter(pk=member.pk).update(balance=Decimal('100.00'))
+        BackupService.create_backup('inc_1', incremental=True)
+
+        BackupService.restore('inc_1')
+        member.refresh_from_db()
+        self.assertEqual(member.balance, Decimal('100.00'))
+        self.assertEqual(RechargeRecord.objects.filter(member=member).count(), 1)
+        self.assertEqual(
+            sum(MemberTransaction.objects.filter(member=member).values_list('balance_change', flat=True)),
+            member.balance,
+        )
+
+    def test_inconsistent_chain_is_refused_before_overwrite(self):
+        """增量缺少被引用的行时拒绝恢复，当前数据库保持不变"""
+        BackupService.create_backup('full_1', include_media=False)
+        product = Product.objects.create(barcode='6900000000002', name='可乐', price=Decimal('3.00'),
+                                         cost=Decimal('2.00'), category=self.product.category)
+        InventoryTransaction.objects.create(product=product, transaction_type='IN', quantity=1, operator=self.user)
+        # 模拟旧版增量备份：只导出只追加表
+        with mock.patch('inventory.services.backup_service.REFERENCED_MODELS', ()):
+            BackupService.create_backup('inc_1', incremental=True)
+        self.add_transactions(2)
+
+        with self.assertRaisesMessage(InventoryValidationError, '无法一致地恢复'):
+            BackupService.restore('inc_1')
+        self.assertEqual(InventoryTransaction.objects.count(), 3)
+        self.assertTrue(Product.objects.filter(pk=product.pk).exists())
+
+
+class StoredZipTest(SimpleTestCase):
+    """流式 zip 包测试"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.files = {'b/db.json': b'{"x": 1}' * 1000, 'b/备注.txt': '中文'.encode('utf-8'), 'b/empty': b''}
+        self.entries = []
+        for arcname, content in self.files.items():
+            path = os.path.join(self.tmp, arcname.replace('/', '_'))
+            with open(path, 'wb') as f:
+                f.write(content)
+            self.entries.append((path, arcname, None))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def read_zip(self, archive):
+        data = b''.join(archive.iter_range(0, archive.size - 1))
+        self.assertEqual(len(data), archive.size)
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            self.assertIsNone(zf.testzip())
+            return data, {name: zf.read(name) for name in zf.namelist()}
+
+    def test_zip_is_valid_and_ranges_match(self):
+        """生成的 zip 可被标准库读取，任意范围与完整内容一致"""
+        archive = StoredZip(self.entries)
+        data, contents = self.read_zip(archive)
+        self.assertEqual(contents, self.files)
+        for start, end in [(0, 0), (10, 5000), (archive.size - 30, archive.size - 1)]:
+            self.assertEqual(b''.join(archive.iter_range(start, end)), data[start:end + 1])
+
+    def test_zip64_fields(self):
+        """大小和偏移量超过限制时写入 zip64 扩展字段"""
+        with mock.patch('inventory.utils.download_utils.ZIP64_LIMIT', 100):
+            archive = StoredZip(self.entries)
+        _, contents = self.read_zip(archive)
+        self.assertEqual(contents, self.files)
+
+    def test_parse_range(self):
+        """解析单个 Range 请求头，多段请求返回完整内容"""
+        self.assertEqual(parse_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(parse_range('bytes=900-', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=500-5000', 1000), (500, 999))
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 1000))
+        self.assertFalse(parse_range('bytes=1000-', 1000))
+
+
+class BackupDownloadTest(BackupTestMixin, TestCase):
+    """备份下载：流式 zip 和断点续传"""
+
+    def setUp(self):
+        super().setUp()
+        self.user.is_superuser = True
+        self.user.save()
+        self.client.force_login(self.user)
+        backup_dir = os.path.join(self.tmp, 'backups', 'legacy_1')
+        os.makedirs(backup_dir)
+        with open(os.path.join(backup_dir, 'db.json'), 'w', encoding='utf-8') as f:
+            f.write('[]' * 5000)
+        with open(os.path.join(backup_dir, 'backup_info.json'), 'w', encoding='utf-8') as f:
+            json.dump({'name': 'legacy_1', 'created_at': '2024-01-01T00:00:00'}, f)
+        self.url = reverse('download_backup', args=['legacy_1'])
+
+    def test_download_and_resume(self):
+        """完整下载得到有效的 zip，Range 请求返回对应片段"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        data = b''.join(response.streaming_content)
+        self.assertEqual(len(data), int(response['Content-Length']))
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            self.assertEqual(sorted(zf.namelist()), ['legacy_1/backup_info.json', 'legacy_1/db.json'])
+            self.assertEqual(zf.read('legacy_1/db.json'), b'[]' * 5000)
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-', HTTP_IF_RANGE=response['ETag'])
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-{len(data) - 1}/{len(data)}')
+        self.assertEqual(b''.join(response.streaming_content), data[100:])
+
+        # 备份变化后 If-Range 不匹配，返回完整内容
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(data)}-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_archived_backup_is_sent_as_file(self):
+        """已归档为 zip 的备份直接以文件响应发送"""
+        with open(os.path.join(self.tmp, 'backups', 'legacy_1.zip'), 'wb') as f:
+            f.write(b'PK-archived')
+        response = self.client.get(self.url)
+        self.assertIsInstance(response, FileResponse)
+        self.assertEqual(b''.join(response.streaming_content), b'PK-archived')
+        response = self.client.get(self.url, HTTP_RANGE='bytes=3-')
+        self.assertEqual(b''.join(response.streaming_content), b'archived')
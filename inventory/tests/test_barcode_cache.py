@@ -0,0 +1,219 @@
+import json
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import os
+import tempfile
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from inventory.ali_barcode_service import AliBarcodeService, get_http_client
+from inventory.models import BarcodeLookupCache, Category, Product
+from inventory.services.barcode_enrichment_service import BarcodeEnrichmentService
+from inventory.services.search_service import ProductSearchService
+from inventory.utils.rate_limit import RateLimiter
+
+KNOWN_BARCODES = {
+    '6901234567890': {'goodsName': '测试可乐', 'spec': '330ml', 'manuName': '测试饮料厂', 'price': '3.50'},
+}
+
+
+class StubBarcodeHandler(BaseHTTPRequestHandler):
+    """本地条码接口桩服务"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.path)
+        if server.fail:
+            self._send(500, {'error': 'boom'})
+            return
+        code = parse_qs(urlparse(self.path).query).get('code', [''])[0]
+        goods = KNOWN_BARCODES.get(code)
+        body = dict(goods, flag='true', code=code) if goods else {'flag': 'false', 'remark': '查询不到'}
+        self._send(200, {'showapi_res_code': 0, 'showapi_res_body': body})
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubBarcodeServerTestCase(TestCase):
+    """启动本地条码接口桩服务的测试基类"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubBarcodeHandler)
+        cls.server.requests = []
+        cls.server.fail = False
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.settings_override = override_settings(
+            ALI_BARCODE_URL=f'http://127.0.0.1:{cls.server.server_port}/barcode',
+            ALI_BARCODE_APPCODE='test-appcode',
+        )
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.requests.clear()
+        self.server.fail = False
+
+
+class BarcodeLookupCacheTest(StubBarcodeServerTestCase):
+    """条码查询缓存测试"""
+
+    def test_hit_is_served_from_cache(self):
+        """查到的商品信息第二次直接读取缓存"""
+        first = AliBarcodeService.search_barcode('6901234567890')
+        second = AliBarcodeService.search_barcode('6901234567890')
+        self.assertEqual(first['name'], '测试可乐')
+        self.assertEqual(first['suggested_price'], 3.5)
+        self.assertEqual(second, first)
+        self.assertEqual(len(self.server.requests), 1)
+
+        entry = BarcodeLookupCache.objects.get(barcode='6901234567890')
+        self.assertEqual(entry.status, BarcodeLookupCache.STATUS_HIT)
+        self.assertEqual(entry.hit_count, 1)
+        self.assertEqual(entry.fetch_count, 1)
+
+    def test_miss_is_cached_until_ttl(self):
+        """未找到的条码在有效期内不再请求，过期后重新请求"""
+        self.assertIsNone(AliBarcodeService.search_barcode('0000000000000'))
+        self.assertIsNone(AliBarcodeService.search_barcode('0000000000000'))
+        self.assertEqual(len(self.server.requests), 1)
+
+        BarcodeLookupCache.objects.filter(barcode='0000000000000').update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertIsNone(AliBarcodeService.search_barcode('0000000000000'))
+        self.assertEqual(len(self.server.requests), 2)
+
+    @override_settings(ALI_BARCODE_ERROR_BACKOFF=60, ALI_BARCODE_ERROR_BACKOFF_MAX=100)
+    def test_error_backs_off_exponentially(self):
+        """接口出错后在退避期内不再请求，退避时间按失败次数加倍并有上限"""
+        self.server.fail = True
+        self.assertIsNone(AliBarcodeService.search_barcode('1111111111111'))
+        self.assertIsNone(AliBarcodeService.search_barcode('1111111111111'))
+        self.assertEqual(len(self.server.requests), 1)
+
+        entry = BarcodeLookupCache.objects.get(barcode='1111111111111')
+        self.assertEqual(entry.status, BarcodeLookupCache.STATUS_ERROR)
+        self.assertAlmostEqual((entry.expires_at - entry.fetched_at).total_seconds(), 60, delta=1)
+
+        BarcodeLookupCache.objects.filter(pk=entry.pk).update(expires_at=timezone.now())
+        AliBarcodeService.search_barcode('1111111111111')
+        entry.refresh_from_db()
+        self.assertEqual(entry.failure_count, 2)
+        self.assertAlmostEqual((entry.expires_at - entry.fetched_at).total_seconds(), 100, delta=1)
+
+    def test_stale_hit_survives_upstream_error(self):
+        """接口故障时继续使用已缓存的商品信息"""
+        AliBarcodeService.search_barcode('6901234567890')
+        BarcodeLookupCache.objects.filter(barcode='6901234567890').update(expires_at=timezone.now())
+        self.server.fail = True
+        data = AliBarcodeService.search_barcode('6901234567890')
+        self.assertEqual(data['name'], '测试可乐')
+        entry = BarcodeLookupCache.objects.get(barcode='6901234567890')
+        self.assertEqual(entry.status, BarcodeLookupCache.STATUS_HIT)
+        self.assertEqual(entry.failure_count, 1)
+
+    def test_stats_report_hit_rate(self):
+        """统计命中率与接口耗时"""
+        for _ in range(4):
+            AliBarcodeService.search_barcode('6901234567890')
+        stats = AliBarcodeService.stats()
+        self.assertEqual(stats['upstream_requests'], 1)
+        self.assertEqual(stats['cache_hits'], 3)
+        self.assertEqual(stats['hit_rate'], 0.75)
+        self.assertIsNotNone(stats['avg_latency_ms'])
+
+    def test_http_client_is_shared(self):
+        """HTTP 连接池在进程内复用"""
+        self.assertIs(get_http_client(), get_http_client())
+
+    def test_lookup_many_fetches_only_uncached(self):
+        """批量查询只请求未缓存的条码，缓存一次读出"""
+        AliBarcodeService.search_barcode('6901234567890')
+        self.server.requests.clear()
+        results = AliBarcodeService.lookup_many(['6901234567890', '2222222222222', '3333333333333'])
+        self.assertEqual(results['6901234567890']['name'], '测试可乐')
+        self.assertIsNone(results['2222222222222'])
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(BarcodeLookupCache.objects.filter(status=BarcodeLookupCache.STATUS_MISS).count(), 2)
+
+
+class BarcodeEnrichmentTest(StubBarcodeServerTestCase):
+    """条码信息批量补全测试"""
+
+    def setUp(self):
+        super().setUp()
+        category = Category.objects.create(name='待补全')
+        self.known = Product.objects.create(
+            barcode='6901234567890', name='6901234567890', category=category,
+            price=Decimal('3.50'), cost=Decimal('2.00'),
+        )
+        self.unknown = Product.objects.create(
+            barcode='4444444444444', name='未知商品', category=category,
+            price=Decimal('1.00'), cost=Decimal('0.50'),
+        )
+        self.complete = Product.objects.create(
+            barcode='5555555555555', name='完整商品', category=category, specification='1L',
+            manufacturer='某厂', price=Decimal('1.00'), cost=Decimal('0.50'),
+        )
+        handle, self.checkpoint = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        os.remove(self.checkpoint)
+
+    def tearDown(self):
+        if os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+
+    def test_enrich_fills_blank_fields(self):
+        """只补全为空（或名称等于条码）的字段，完整商品不请求接口"""
+        state = BarcodeEnrichmentService.enrich(batch_size=10, rate=0, checkpoint=self.checkpoint)
+        self.assertEqual(state['processed'], 2)
+        self.assertEqual(state['updated'], 1)
+        self.assertEqual(state['not_found'], 1)
+        self.assertEqual(len(self.server.requests), 2)
+
+        self.known.refresh_from_db()
+        self.assertEqual(self.known.name, '测试可乐')
+        self.assertEqual(self.known.specification, '330ml')
+        self.assertEqual(self.known.manufacturer, '测试饮料厂')
+        self.assertEqual(list(ProductSearchService.search('可乐')), [self.known])
+
+    def test_enrich_resumes_from_checkpoint(self):
+        """中断后从断点继续，不重复处理"""
+        state = BarcodeEnrichmentService.enrich(batch_size=1, limit=1, rate=0, checkpoint=self.checkpoint)
+        self.assertEqual(state['last_id'], self.known.id)
+        self.assertEqual(BarcodeEnrichmentService.load_checkpoint(self.checkpoint)['processed'], 1)
+
+        state = BarcodeEnrichmentService.enrich(batch_size=1, rate=0, checkpoint=self.checkpoint)
+        self.assertEqual(state['processed'], 2)
+        self.assertEqual(state['last_id'], self.unknown.id)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_rate_limiter_spaces_requests(self):
+        """限流器按速率发放令牌"""
+        limiter = RateLimiter(rate=50, burst=1)
+        waited = sum(limiter.acquire() for _ in range(3))
+        self.assertGreaterEqual(waited, 0.03)
@@ -0,0 +1,80 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from inventory.models import InventoryCheck, Sale
+from inventory.utils.benchmark import percentile, run_benchmarks
+from inventory.utils.synthetic_data import SyntheticDataGenerator
+
+
+class BenchmarkTest(TestCase):
+    """性能基准测试工具测试"""
+
+    @classmethod
+    def setUpTestData(cls):
+        SyntheticDataGenerator(seed=1, categories=2, products=30, members=20, sales=200, days=40,
+                               chunk_size=100).generate()
+
+    def test_percentile(self):
+        """最近秩法分位数"""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile([7], 95), 7)
+
+    def test_runs_all_scenarios_without_changing_dataset(self):
+        """每个场景都有耗时和查询次数，写入场景执行后回滚"""
+        sales = Sale.objects.count()
+        report = run_benchmarks(iterations=2, warmup=1, basket_sizes=(1, 5))
+
+        scenarios = report['scenarios']
+        self.assertIn('sale_create[5]', scenarios)
+        self.assertIn('report.get_profit_report[365d]', scenarios)
+        self.assertIn('member_search_by_phone[partial]', scenarios)
+        self.assertIn('inventory_check_create', scenarios)
+        for name, result in scenarios.items():
+            self.assertLessEqual(result['p50_ms'], result['p95_ms'], name)
+        self.assertGreater(scenarios['sale_create[1]']['queries'], 0)
+        self.assertEqual(scenarios['sale_create[1]']['queries'], scenarios['sale_create[5]']['queries'])
+        self.assertLess(scenarios['index[cached]']['queries'], scenarios['index[cold]']['queries'])
+
+        self.assertEqual(Sale.objects.count(), sales)
+        self.assertFalse(InventoryCheck.objects.exists())
+        self.assertEqual(report['dataset']['inventory.Sale'], sales)
+
+    def test_does_not_create_or_promote_users(self):
+        """没有生成数据集时的管理员账号则报错，不在数据库中创建或提升管理员"""
+        User.objects.filter(username='benchmark').update(is_superuser=False)
+        with self.assertRaisesMessage(RuntimeError, 'generate_benchmark_data'):
+            run_benchmarks(iterations=1)
+        self.assertFalse(User.objects.filter(is_superuser=True).exists())
+
+        User.objects.filter(username='benchmark').update(username='cashier')
+        with self.assertRaises(RuntimeError):
+            run_benchmarks(iterations=1)
+        self.assertFalse(User.objects.filter(username='benchmark').exists())
+
+    def test_command_writes_and_compares_json(self):
+        """命令输出 JSON 结果并与之前的结果比较"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.json')
+            call_command('run_benchmarks', 'sale_create', 'index', '--iterations', '2', '--warmup', '0',
+                         '--basket-sizes', '1,3', '--label', 'abc123', '--output', path, stdout=StringIO())
+            with open(path, encoding='utf-8') as f:
+                report = json.load(f)
+            self.assertEqual(report['label'], 'abc123')
+            self.assertEqual(sorted(report['scenarios']),
+                             ['index[cached]', 'index[cold]', 'sale_create[1]', 'sale_create[3]'])
+
+            out = StringIO()
+            call_command('run_benchmarks', 'sale_create[1]', '--iterations', '2', '--compare', path, stdout=out)
+            self.assertIn('sale_create[1]: p50', out.getvalue())
+
+        with self.assertRaisesMessage(CommandError, '未知的场景'):
+            call_command('run_benchmarks', 'no_such_scenario', stdout=StringIO())
@@ -0,0 +1,172 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from inventory.exceptions import InsufficientStockError
+from inventory.models import (
+    Category,
+    Inventory,
+    InventoryTransaction,
+    Member,
+    MemberLevel,
+    OperationLog,
+    Product,
+    Sale,
+    SaleItem,
+)
+from inventory.services.checkout_service import CheckoutService
+
+# 一次结算允许的最大查询数（含会员余额支付），与购物车行数无关
+CHECKOUT_QUERY_BUDGET = 20
+
+
+class CheckoutServiceTest(TestCase):
+    """收银结算服务测试"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cashier', password='secret')
+        self.category = Category.objects.create(name='结算分类')
+        self.products = []
+        for i in range(30):
+            product = Product.objects.create(
+                barcode=f'checkout-{i:03d}',
+                name=f'结算商品{i}',
+                category=self.category,
+                price=Decimal('10.00'),
+                cost=Decimal('6.00'),
+            )
+            Inventory.objects.create(product=product, quantity=100, warning_level=5)
+            self.products.append(product)
+        self.level = MemberLevel.objects.create(
+            name='九折会员', discount=Decimal('0.90'), points_threshold=0, color='primary'
+        )
+        self.member = Member.objects.create(
+            name='结算会员', phone='13900000001', level=self.level, balance=Decimal('10000.00')
+        )
+
+    def _cart(self, count, quantity=2):
+        return [
+            {'product_id': str(p.id), 'quantity': str(quantity), 'price': '10.00'}
+            for p in self.products[:count]
+        ]
+
+    def _checkout_queries(self, count, **kwargs):
+        lines, errors = CheckoutService.prepare_lines(self._cart(count))
+        self.assertEqual(errors, [])
+        with CaptureQueriesContext(connection) as ctx:
+            CheckoutService.checkout(lines, operator=self.user, **kwargs)
+        return len(ctx.captured_queries)
+
+    def test_checkout_writes_all_rows(self):
+        """结算后销售单、明细、库存、流水和日志均正确"""
+        lines, _ = CheckoutService.prepare_lines(self._cart(3))
+        sale = CheckoutService.checkout(
+            lines, operator=self.user, member_id=self.member.id, payment_method='account'
+        )
+
+        self.assertEqual(sale.status, 'COMPLETED')
+        self.assertEqual(sale.payment_method, 'balance')
+        self.assertEqual(sale.total_amount, Decimal('60.00'))
+        self.assertEqual(sale.discount_amount, Decimal('6.00'))
+        self.assertEqual(sale.final_amount, Decimal('54.00'))
+        self.assertEqual(SaleItem.objects.filter(sale=sale).count(), 3)
+        self.assertEqual(
+            InventoryTransaction.objects.filter(notes=f'销售单号：{sale.id}').count(), 3
+        )
+        self.assertEqual(OperationLog.objects.filter(related_object_id=sale.id).count(), 4)
+        for product in self.products[:3]:
+            self.assertEqual(Inventory.objects.get(product=product).quantity, 98)
+        self.assertEqual(Inventory.objects.get(product=self.products[3]).quantity, 100)
+
+        self.member.refresh_from_db()
+        self.assertEqual(self.member.balance, Decimal('9946.00'))
+        self.assertEqual(self.member.points, 54)
+        self.assertEqual(self.member.purchase_count, 1)
+
+    def test_query_count_is_independent_of_basket_size(self):
+        """1行与30行购物车的结算查询次数相同且不超过预算"""
+        # 先结算一次，使两次测量时当日销售汇总行都已存在
+        self._checkout_queries(30, member_id=self.member.id, payment_method='balance')
+        single = self._checkout_queries(1, member_id=self.member.id, payment_method='balance')
+        many = self._checkout_queries(30, member_id=self.member.id, payment_method='balance')
+        self.assertEqual(single, many)
+        self.assertLessEqual(many, CHECKOUT_QUERY_BUDGET)
+
+    def test_prepare_lines_uses_single_query(self):
+        """购物车解析只查询一次数据库"""
+        with self.assertNumQueries(1):
+            CheckoutService.prepare_lines(self._cart(30))
+
+    def test_duplicate_lines_are_checked_against_combined_quantity(self):
+        """同一商品多行时按累计数量校验库存"""
+        product = self.products[0]
+        Inventory.objects.filter(product=product).update(quantity=3)
+        cart = [
+            {'product_id': str(product.id), 'quantity': '2', 'price': '10.00'},
+            {'product_id': str(product.id), 'quantity': '2', 'price': '10.00'},
+        ]
+        lines, errors = CheckoutService.prepare_lines(cart)
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(errors[0]['level'], 'warning')
+
+    def test_non_finite_price_falls_back_to_product_price(self):
+        """NaN、Infinity 等非有限价格按无效价格处理，使用商品售价"""
+        cart = [
+            {'product_id': str(product.id), 'quantity': '1', 'price': price}
+            for product, price in zip(self.products, ('NaN', 'Infinity', '-inf', 'sNaN'))
+        ]
+        lines, errors = CheckoutService.prepare_lines(cart)
+        self.assertEqual(errors, [])
+        self.assertEqual([line['price'] for line in lines], [Decimal('10.00')] * 4)
+
+    def test_stock_shortage_rolls_back_everything(self):
+        """扣减时库存不足则整个结算回滚"""
+        lines, _ = CheckoutService.prepare_lines(self._cart(2))
+        Inventory.objects.filter(product=self.products[1]).update(quantity=1)
+
+        with self.assertRaises(InsufficientStockError) as ctx:
+            CheckoutService.checkout(lines, operator=self.user)
+
+        self.assertEqual(ctx.exception.extra['lines'][0]['product_id'], self.products[1].id)
+        self.assertFalse(Sale.objects.exists())
+        self.assertEqual(Inventory.objects.get(product=self.products[0]).quantity, 100)
+
+
+class SaleCreateQueryBudgetTest(TestCase):
+    """收银台下单视图的查询次数测试"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cashier', password='secret')
+        self.client = Client()
+        self.client.login(username='cashier', password='secret')
+        category = Category.objects.create(name='视图分类')
+        self.products = []
+        for i in range(30):
+            product = Product.objects.create(
+                barcode=f'view-{i:03d}', name=f'视图商品{i}', category=category,
+                price=Decimal('5.00'), cost=Decimal('2.00'),
+            )
+            Inventory.objects.create(product=product, quantity=50, warning_level=5)
+            self.products.append(product)
+
+    def _post(self, count):
+        data = {'payment_method': 'cash'}
+        for i, product in enumerate(self.products[:count]):
+            data[f'products[{i}][id]'] = str(product.id)
+            data[f'products[{i}][quantity]'] = '1'
+            data[f'products[{i}][price]'] = '5.00'
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('sale_create'), data)
+        sale = Sale.objects.latest('id')
+        self.assertRedirects(response, reverse('sale_detail', args=[sale.id]), fetch_redirect_response=False)
+        return len(ctx.captured_queries)
+
+    def test_sale_create_query_count_is_constant(self):
+        """30行购物车与单行购物车的下单请求查询次数相同"""
+        self._post(30)
+        self.assertEqual(self._post(1), self._post(30))
+        self.assertEqual(SaleItem.objects.count(), 61)
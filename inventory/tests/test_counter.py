@@ -0,0 +1,143 @@
+from decimal import Decimal
+from io import BytesIO, StringIO
+
+from django.contrib.admin.models import ADDITION, LogEntry
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+
+from inventory.models import Category, Member, MemberLevel, Product, RowCounter, Sale
+from inventory.services.counter_service import CounterService
+from inventory.services.member_service import import_members_from_csv
+from inventory.services.product_service import import_products_from_csv
+
+
+class CounterServiceTest(TestCase):
+    """行数计数服务测试"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='admin', password='secret')
+        self.category = Category.objects.create(name='饮料')
+
+    def create_product(self, index, **kwargs):
+        return Product.objects.create(
+            barcode=f'69000000{index:05d}', name=f'商品{index}', category=self.category,
+            price=Decimal('2.00'), cost=Decimal('1.00'), **kwargs,
+        )
+
+    def test_count_is_initialized_once_then_read_from_counter(self):
+        """首次读取时统计并保存，之后只读取计数行"""
+        for i in range(3):
+            self.create_product(i)
+        self.assertEqual(CounterService.count(Product), 3)
+        with self.assertNumQueries(1) as context:
+            self.assertEqual(CounterService.count(Product), 3)
+        self.assertNotIn('COUNT(', context.captured_queries[0]['sql'].upper())
+
+    def test_signals_keep_counts_after_commit(self):
+        """新增、状态变化和删除在事务提交后更新计数"""
+        self.create_product(0)
+        self.assertEqual(CounterService.count(Product), 1)
+        self.assertEqual(CounterService.count(Product, is_active=True), 1)
+        self.assertEqual(CounterService.count(Product, is_active=False), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product = self.create_product(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            product.is_active = False
+            product.save()
+        self.assertEqual(CounterService.count(Product), 2)
+        self.assertEqual(CounterService.count(Product, is_active=True), 1)
+        self.assertEqual(CounterService.count(Product, is_active=False), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        self.assertEqual(CounterService.count(Product), 1)
+        self.assertEqual(CounterService.count(Product, is_active=False), 0)
+
+    def test_rolled_back_changes_are_not_counted(self):
+        """事务回滚时计数不变"""
+        self.assertEqual(CounterService.count(Sale), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Sale.objects.create(total_amount=Decimal('1.00'), final_amount=Decimal('1.00'), operator=self.user)
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(CounterService.count(Sale), 0)
+
+    def test_reconcile_fixes_bulk_changes(self):
+        """批量写入不经过信号，对账后计数与实际行数一致"""
+        self.assertEqual(CounterService.count(LogEntry, action_flag=ADDITION), 0)
+        LogEntry.objects.bulk_create([
+            LogEntry(user=self.user, object_repr=str(i), action_flag=ADDITION) for i in range(4)
+        ])
+        self.assertEqual(CounterService.count(LogEntry, action_flag=ADDITION), 0)
+
+        out = StringIO()
+        call_command('reconcile_counters', 'admin.LogEntry', stdout=out)
+        self.assertIn(f'admin.LogEntry:action_flag={ADDITION}: 0 -> 4', out.getvalue())
+        self.assertEqual(CounterService.count(LogEntry, action_flag=ADDITION), 4)
+        self.assertEqual(RowCounter.objects.get(key='admin.LogEntry').count, 4)
+        self.assertEqual(CounterService.reconcile(['admin.LogEntry']), {})
+
+    def test_csv_imports_update_counts(self):
+        """CSV 导入使用 bulk_create，导入的商品和会员在事务提交后计入计数"""
+        level = MemberLevel.objects.create(name='普通会员', discount=Decimal('1.00'), points_threshold=0, is_default=True)
+        self.assertEqual(CounterService.count(Product), 0)
+        self.assertEqual(CounterService.count(Member, is_active=True), 0)
+
+        products = 'name,barcode,retail_price\n' + ''.join(f'商品{i},69000000{i:05d},2.00\n' for i in range(3))
+        members = 'name,phone\n' + ''.join(f'会员{i},1380000{i:04d}\n' for i in range(4))
+        with self.captureOnCommitCallbacks(execute=True):
+            import_products_from_csv(BytesIO(products.encode('utf-8')), self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            import_members_from_csv(BytesIO(members.encode('utf-8')), self.user)
+
+        self.assertEqual(CounterService.count(Product), 3)
+        self.assertEqual(CounterService.count(Product, is_active=True), 3)
+        self.assertEqual(CounterService.count(Member), 4)
+        self.assertEqual(CounterService.count(Member, is_active=True), 4)
+        self.assertEqual(CounterService.reconcile(['inventory.Product', 'inventory.Member']), {})
+        self.assertTrue(Member.objects.filter(level=level).exists())
+
+
+class CountedListViewTest(TestCase):
+    """列表页使用计数器的总数"""
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(username='admin', password='secret')
+        self.client.force_login(self.user)
+        level = MemberLevel.objects.create(name='普通会员', discount=Decimal('1.00'), points_threshold=0)
+        Member.objects.bulk_create([
+            Member(name=f'会员{i}', phone=f'1380000{i:04d}', level=level, is_active=i % 4 != 0,
+                   member_id=f'M{i:04d}')
+            for i in range(20)
+        ])
+        CounterService.reconcile(['inventory.Member'])
+
+    def test_member_list_uses_counters(self):
+        """会员列表的统计和分页总数来自计数器"""
+        response = self.client.get(reverse('member_list'), {'status': 'active'})
+        self.assertEqual(response.context['total_members'], 20)
+        self.assertEqual(response.context['active_members'], 15)
+        self.assertEqual(response.context['page_obj'].paginator.count, 15)
+        self.assertEqual(len(response.context['page_obj']), 15)
+
+        response = self.client.get(reverse('member_list'), {'search': '会员1'})
+        self.assertEqual(response.context['page_obj'].paginator.count, 11)
+        self.assertFalse(response.context['page_obj'].paginator.estimated)
+
+    def test_log_list_stats(self):
+        """系统日志统计来自计数器"""
+        with self.captureOnCommitCallbacks(execute=True):
+            CounterService.count(LogEntry)
+            LogEntry.objects.create(user=self.user, object_repr='x', action_flag=ADDITION)
+        response = self.client.get(reverse('log_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['stats']['total'], 1)
+        self.assertEqual(response.context['stats']['add'], 1)
+        self.assertEqual(response.context['logs'].paginator.count, 1)
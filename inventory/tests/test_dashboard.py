@@ -0,0 +1,84 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from inventory.models import Category, Inventory, Product, change_stock
+from inventory.services.checkout_service import CheckoutService
+from inventory.services.dashboard_service import DASHBOARD_CACHE_KEY, DashboardService
+from inventory.services.inventory_service import InventoryService
+
+
+class DashboardServiceTest(TestCase):
+    """首页仪表盘快照测试"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='manager', password='secret')
+        category = Category.objects.create(name='仪表盘分类')
+        self.product = Product.objects.create(
+            barcode='dashboard-001', name='仪表盘商品', category=category,
+            price=Decimal('8.00'), cost=Decimal('3.00'),
+        )
+        Inventory.objects.create(product=self.product, quantity=20, warning_level=5)
+
+    def tearDown(self):
+        cache.clear()
+
+    def checkout(self, quantity):
+        lines, _ = CheckoutService.prepare_lines([
+            {'product_id': str(self.product.id), 'quantity': str(quantity), 'price': '8.00'}
+        ])
+        with self.captureOnCommitCallbacks(execute=True):
+            CheckoutService.checkout(lines, operator=self.user)
+
+    def test_snapshot_uses_fixed_number_of_queries(self):
+        """快照计算的查询次数固定，与销售天数无关"""
+        self.checkout(2)
+        with self.assertNumQueries(8):
+            snapshot = DashboardService.compute_snapshot()
+        self.assertEqual(snapshot['today_sales'], 1)
+        self.assertEqual(snapshot['today_sales_amount'], Decimal('16.00'))
+        self.assertEqual(len(snapshot['sales_trend']), 7)
+        self.assertEqual(snapshot['sales_trend'][-1]['amount'], 16.0)
+
+    def test_cached_snapshot_is_served_without_queries(self):
+        """缓存命中时不再查询数据库"""
+        DashboardService.get_snapshot()
+        with self.assertNumQueries(0):
+            DashboardService.get_snapshot()
+
+    def test_sale_completion_invalidates_snapshot(self):
+        """销售完成提交后快照失效"""
+        DashboardService.warm()
+        self.checkout(1)
+        self.assertIsNone(cache.get(DASHBOARD_CACHE_KEY))
+        self.assertEqual(DashboardService.get_snapshot()['today_sales'], 1)
+
+    def test_stock_change_invalidates_snapshot(self):
+        """直接更新库存后快照失效"""
+        DashboardService.warm()
+        with self.captureOnCommitCallbacks(execute=True):
+            change_stock({self.product.id: -20})
+        self.assertIsNone(cache.get(DASHBOARD_CACHE_KEY))
+        self.assertEqual(DashboardService.get_snapshot()['out_of_stock_products'], 1)
+
+    def test_stock_adjustment_invalidates_snapshot(self):
+        """库存调整（ADJUST）后快照失效"""
+        Inventory.objects.filter(product=self.product).update(quantity=3)
+        self.assertEqual(DashboardService.warm()['low_stock_products'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            InventoryService.update_stock(self.product, 50, 'ADJUST', self.user)
+        self.assertIsNone(cache.get(DASHBOARD_CACHE_KEY))
+        self.assertEqual(DashboardService.get_snapshot()['low_stock_products'], 0)
+
+    def test_index_view_renders_snapshot(self):
+        """首页使用快照渲染"""
+        client = Client()
+        client.login(username='manager', password='secret')
+        response = client.get(reverse('index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_products'], 1)
+        self.assertIsNotNone(cache.get(DASHBOARD_CACHE_KEY))
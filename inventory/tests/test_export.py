@@ -0,0 +1,107 @@
+import io
+from decimal import Decimal
+
+import openpyxl
+from django.contrib.auth.models import User
+from django.http import FileResponse, StreamingHttpResponse
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from inventory.models import Category, Member, MemberLevel, Product, Sale, SaleItem
+from inventory.services.export_service import ExportService
+
+
+def read_csv(response):
+    return b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+
+
+def read_xlsx(response):
+    workbook = openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content)))
+    return workbook.active
+
+
+class ExportServiceTest(TestCase):
+    """流式导出服务测试"""
+
+    def test_csv_is_streamed_in_chunks(self):
+        """CSV 按缓冲块分段输出，带 BOM"""
+        rows = ([i, '名称' * 20] for i in range(5000))
+        chunks = list(ExportService.iter_csv(['ID', '名称'], rows))
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(chunks[0].startswith('\ufeffID,名称'.encode('utf-8')))
+        self.assertEqual(b''.join(chunks).decode('utf-8-sig').count('\n'), 5001)
+
+    def test_excel_uses_precomputed_column_widths(self):
+        """Excel 只写模式输出，列宽根据样本行预先计算"""
+        response = ExportService.export_rows(
+            ['ID', '名称'], iter([(1, 'x' * 30), (2, 'y')]), 'test', 'xlsx', sheet_name='数据'
+        )
+        self.assertIsInstance(response, FileResponse)
+        sheet = read_xlsx(response)
+        self.assertEqual(sheet.title, '数据')
+        self.assertEqual([c.value for c in sheet[1]], ['ID', '名称'])
+        self.assertEqual(sheet.max_row, 3)
+        self.assertEqual(sheet.column_dimensions['B'].width, 32)
+
+    def test_export_to_excel_accepts_dict_rows(self):
+        """export_to_excel 兼容字典行数据"""
+        response = ExportService.export_to_excel([{'名称': '矿泉水', '数量': 3}], 'test.xlsx')
+        sheet = read_xlsx(response)
+        self.assertEqual([c.value for c in sheet[2]], ['矿泉水', 3])
+
+
+class ExportViewTest(TestCase):
+    """商品、会员、销售导出视图测试"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='exporter', password='secret')
+        self.client = Client()
+        self.client.force_login(self.user)
+        category = Category.objects.create(name='饮料')
+        self.product = Product.objects.create(
+            barcode='6900000000001', name='矿泉水', category=category,
+            price=Decimal('2.00'), cost=Decimal('1.20'), specification='550ml',
+        )
+        Product.objects.create(
+            barcode='6900000000002', name='停售商品', category=category,
+            price=Decimal('3.00'), cost=Decimal('1.00'), is_active=False,
+        )
+        level = MemberLevel.objects.create(
+            name='普通会员', discount=Decimal('1.00'), points_threshold=0, is_default=True
+        )
+        self.member = Member.objects.create(name='张三', phone='13800000001', level=level, points=12)
+
+    def test_product_export_csv(self):
+        """商品导出按状态筛选并流式输出"""
+        response = self.client.get(reverse('product_export'), {'status': 'active'})
+        self.assertIsInstance(response, StreamingHttpResponse)
+        lines = read_csv(response)
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines[1], f'{self.product.id},矿泉水,饮料,2.00,1.20,6900000000001,550ml,,启用')
+
+    def test_member_export_xlsx(self):
+        """会员导出为 Excel"""
+        response = self.client.get(reverse('member_export'), {'format': 'xlsx'})
+        sheet = read_xlsx(response)
+        row = [c.value for c in sheet[2]]
+        self.assertEqual(row[2:4], ['张三', '13800000001'])
+        self.assertEqual(row[5], '普通会员')
+        self.assertEqual(row[-1], '启用')
+
+    def test_sale_export_lists_items(self):
+        """销售导出每个销售明细一行，显示中文状态和支付方式"""
+        sale = Sale.objects.create(
+            member=self.member, total_amount=Decimal('4.00'), final_amount=Decimal('4.00'),
+            payment_method='wechat', status='COMPLETED', operator=self.user,
+        )
+        SaleItem.objects.create(
+            sale=sale, product=self.product, quantity=2,
+            price=Decimal('2.00'), actual_price=Decimal('2.00'), subtotal=Decimal('4.00'),
+        )
+        with self.assertNumQueries(3):  # 会话、用户 + 一次明细查询
+            lines = read_csv(self.client.get(reverse('sale_export')))
+        self.assertEqual(len(lines), 2)
+        fields = lines[1].split(',')
+        self.assertEqual(fields[0], str(sale.id))
+        self.assertEqual(fields[2:8], ['已完成', '张三', '13800000001', '矿泉水', '6900000000001', '2'])
+        self.assertEqual(fields[-2:], ['微信', 'exporter'])
@@ -0,0 +1,261 @@
+import io
+import os
+import shutil
+import tempfile
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+import openpyxl
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from inventory.exceptions import InventoryValidationError
+from inventory.models import Category, ExportJob, Inventory, Product, Sale, SaleItem
+from inventory.services.export_job_service import ExportJobService
+
+
+class ExportJobTestBase(TestCase):
+    """后台导出任务测试基类：导出文件写入临时 MEDIA_ROOT"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = User.objects.create_user(username='exporter', password='secret')
+        category = Category.objects.create(name='饮料')
+        for i in range(3):
+            product = Product.objects.create(
+                barcode=f'690000000000{i}', name=f'商品{i}', category=category,
+                price=Decimal('2.00'), cost=Decimal('1.50'),
+            )
+            Inventory.objects.create(product=product, quantity=10 * (i + 1))
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+
+class ExportJobServiceTest(ExportJobTestBase):
+    """导出任务队列测试"""
+
+    def test_submit_validates_kind_and_format(self):
+        """不支持的导出类型、格式和日期参数被拒绝"""
+        with self.assertRaises(InventoryValidationError):
+            ExportJobService.submit('unknown', self.user)
+        with self.assertRaises(InventoryValidationError):
+            ExportJobService.submit('inventory', self.user, export_format='pdf')
+        with self.assertRaises(InventoryValidationError):
+            ExportJobService.submit('sales', self.user, params={'start_date': '2024/01/01'})
+
+    def test_claim_is_exclusive(self):
+        """同一任务只能被领取一次"""
+        job = ExportJobService.submit('inventory', self.user)
+        claimed = ExportJobService.claim_next('worker-1')
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.status, ExportJob.STATUS_RUNNING)
+        self.assertEqual(claimed.attempts, 1)
+        self.assertIsNone(ExportJobService.claim_next('worker-2'))
+
+    def test_inventory_csv_export(self):
+        """库存导出写入CSV文件并记录进度"""
+        ExportJobService.submit('inventory', self.user)
+        self.assertEqual(ExportJobService.process_pending(), 1)
+
+        job = ExportJob.objects.get()
+        self.assertEqual(job.status, ExportJob.STATUS_SUCCESS)
+        self.assertEqual((job.total_rows, job.processed_rows, job.progress), (3, 3, 100))
+        self.assertIsNotNone(job.expires_at)
+        with job.file.open('rb') as f:
+            lines = f.read().decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[3].endswith(',30,10,1.50,45.00'))
+
+    def test_product_performance_covers_end_date_and_completed_sales(self):
+        """商品销售表现包含结束日期当天的销售，只统计已完成的销售单"""
+        product = Product.objects.get(name='商品0')
+        day = timezone.localdate() - timedelta(days=3)
+        for status, quantity in (('COMPLETED', 2), ('CANCELLED', 5)):
+            sale = Sale.objects.create(total_amount=Decimal('0'), status=status, operator=self.user)
+            SaleItem.objects.create(sale=sale, product=product, quantity=quantity, price=Decimal('2.00'))
+            Sale.objects.filter(pk=sale.pk).update(
+                created_at=timezone.make_aware(datetime.combine(day, time(15, 0)))
+            )
+
+        ExportJobService.submit('product_performance', self.user,
+                                params={'start_date': day.isoformat(), 'end_date': day.isoformat()})
+        ExportJobService.process_pending()
+        job = ExportJob.objects.get()
+        self.assertEqual(job.status, ExportJob.STATUS_SUCCESS)
+        self.assertEqual(job.total_rows, 1)
+        with job.file.open('rb') as f:
+            lines = f.read().decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines[1].split(',')[4], '2')
+
+    def test_xlsx_export(self):
+        """Excel 格式导出"""
+        job = ExportJobService.submit('products', self.user, export_format='xlsx')
+        job = ExportJobService.run(ExportJobService.claim_next())
+        self.assertEqual(job.status, ExportJob.STATUS_SUCCESS)
+        with job.file.open('rb') as f:
+            sheet = openpyxl.load_workbook(io.BytesIO(f.read())).active
+        self.assertEqual(sheet.title, '商品列表')
+        self.assertEqual(sheet.max_row, 4)
+
+    def test_products_export_filters_status(self):
+        """商品导出与列表页一致，按启用状态筛选"""
+        Product.objects.filter(barcode='6900000000000').update(is_active=False)
+        ExportJobService.submit('products', self.user, params={'status': 'inactive'})
+        job = ExportJobService.run(ExportJobService.claim_next())
+        self.assertEqual(job.total_rows, 1)
+        with job.file.open('rb') as f:
+            lines = f.read().decode('utf-8-sig').splitlines()
+        self.assertIn('6900000000000', lines[1])
+
+    def test_failed_export_is_recorded(self):
+        """导出出错时任务标记为失败，不留下半成品文件"""
+        ExportJobService.submit('products', self.user, params={'category': 'abc'})
+        job = ExportJobService.run(ExportJobService.claim_next())
+        self.assertEqual(job.status, ExportJob.STATUS_FAILED)
+        self.assertTrue(job.error_message)
+        self.assertFalse(job.file)
+        exports_dir = os.path.join(self.media_root, 'exports')
+        self.assertEqual([files for _, _, files in os.walk(exports_dir) if files], [])
+
+    def test_cleanup_and_requeue(self):
+        """过期文件被删除；超时的运行中任务重新排队"""
+        ExportJobService.submit('inventory', self.user)
+        ExportJobService.process_pending()
+        job = ExportJob.objects.get()
+        path = job.file.path
+        self.assertEqual(ExportJobService.cleanup_expired(timezone.now() + timedelta(days=2)), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.STATUS_EXPIRED)
+        self.assertFalse(os.path.exists(path))
+
+        stale = ExportJobService.submit('inventory', self.user)
+        ExportJobService.claim_next()
+        ExportJob.objects.filter(pk=stale.pk).update(heartbeat_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(ExportJobService.requeue_stale(timeout_minutes=30), 1)
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, ExportJob.STATUS_PENDING)
+
+    def test_requeue_uses_heartbeat(self):
+        """开始时间较早但仍有心跳的任务不会被重新排队"""
+        job = ExportJobService.submit('inventory', self.user)
+        ExportJobService.claim_next()
+        ExportJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(ExportJobService.requeue_stale(timeout_minutes=30), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.STATUS_RUNNING)
+
+    @override_settings(EXPORT_JOB_MAX_ATTEMPTS=2)
+    def test_requeue_stops_at_max_attempts(self):
+        """执行次数达到上限后任务标记为失败，不再重新排队"""
+        job = ExportJobService.submit('inventory', self.user)
+        for expected in (1, 0):
+            ExportJobService.claim_next()
+            ExportJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=2))
+            self.assertEqual(ExportJobService.requeue_stale(timeout_minutes=30), expected)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.STATUS_FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertTrue(job.error_message)
+        self.assertIsNone(ExportJobService.claim_next())
+
+    def test_requeued_job_not_finished_by_old_worker(self):
+        """任务重新排队并被其他进程领取后，旧进程的导出不会覆盖任务状态"""
+        job = ExportJobService.submit('inventory', self.user)
+        old = ExportJobService.claim_next('worker-a')
+        ExportJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=2))
+        ExportJobService.requeue_stale(timeout_minutes=30)
+        ExportJobService.claim_next('worker-b')
+
+        ExportJobService.run(old)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.STATUS_RUNNING)
+        self.assertEqual(job.worker, 'worker-b')
+        self.assertFalse(job.file)
+        exports_dir = os.path.join(self.media_root, 'exports')
+        self.assertEqual([files for _, _, files in os.walk(exports_dir) if files], [])
+
+    def test_worker_command(self):
+        """工作进程命令处理队列后退出"""
+        ExportJobService.submit('inventory', self.user)
+        ExportJobService.submit('sales', self.user, params={'start_date': '2024-01-01', 'end_date': '2024-01-31'})
+        out = io.StringIO()
+        call_command('run_export_worker', '--once', stdout=out)
+        self.assertIn('共处理 2 个任务', out.getvalue())
+        self.assertEqual(ExportJob.objects.filter(status=ExportJob.STATUS_SUCCESS).count(), 2)
+
+
+class ExportJobViewTest(ExportJobTestBase):
+    """导出任务接口测试"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_submit_poll_and_download(self):
+        """提交任务后轮询进度，完成后下载文件"""
+        response = self.client.post(reverse('export_job_submit'), {'kind': 'inventory', 'format': 'csv'})
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['job_id']
+
+        data = self.client.get(reverse('export_job_status', args=[job_id])).json()
+        self.assertEqual(data['status'], ExportJob.STATUS_PENDING)
+        self.assertNotIn('download_url', data)
+
+        ExportJobService.process_pending()
+        data = self.client.get(reverse('export_job_status', args=[job_id])).json()
+        self.assertEqual(data['status'], ExportJob.STATUS_SUCCESS)
+        self.assertEqual(data['progress'], 100)
+
+        response = self.client.get(data['download_url'])
+        self.assertEqual(response.status_code, 200)
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        self.assertEqual(len(content.splitlines()), 4)
+        self.assertEqual(len(self.client.get(reverse('export_job_list')).json()['jobs']), 1)
+
+    def test_other_users_cannot_access_job(self):
+        """其他用户无法查看或下载任务"""
+        job = ExportJobService.submit('inventory', self.user)
+        ExportJobService.process_pending()
+        other = User.objects.create_user(username='other', password='secret')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(reverse('export_job_status', args=[job.pk])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('export_job_download', args=[job.pk])).status_code, 404)
+
+    def test_list_export_buttons_submit_jobs(self):
+        """列表页的导出按钮带当前筛选条件提交后台导出任务"""
+        self.user.is_superuser = True
+        self.user.save()
+        response = self.client.get(reverse('product_list'), {'status': 'inactive'})
+        self.assertContains(response, f'action="{reverse("export_job_submit")}"')
+        self.assertContains(response, '<input type="hidden" name="kind" value="products">', html=True)
+        self.assertContains(response, '<input type="hidden" name="status" value="inactive">', html=True)
+        self.assertNotContains(response, reverse('product_export'))
+
+    def test_report_export_submits_job(self):
+        """报表导出不再在请求中生成文件，而是提交后台任务"""
+        from inventory.views.report import daily_summary_report
+
+        self.user.is_superuser = True
+        request = RequestFactory().get('/', {
+            'export': '1', 'export_format': 'csv', 'start_date': '2024-01-01', 'end_date': '2024-01-07',
+        })
+        request.user = self.user
+        response = daily_summary_report(request)
+        self.assertEqual(response.status_code, 202)
+        job = ExportJob.objects.get()
+        self.assertEqual((job.kind, job.export_format), ('daily_summary', 'csv'))
+        self.assertEqual(job.params, {'start_date': '2024-01-01', 'end_date': '2024-01-07'})
+
+    def test_invalid_submit(self):
+        """无效的导出类型返回400"""
+        response = self.client.post(reverse('export_job_submit'), {'kind': 'nope'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,314 @@
+import gzip
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from inventory.models import (
+    Category, Inventory, InventoryCheck, InventoryTransaction, OperationLog, Product,
+)
+from inventory.exceptions import InventoryValidationError
+from inventory.services.inventory_check_service import InventoryCheckService
+
+
+class InventoryCheckBulkTestBase(TestCase):
+    """批量盘点测试基类：两个分类各若干商品"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='checker', password='secret')
+        self.drinks = Category.objects.create(name='饮料')
+        self.snacks = Category.objects.create(name='零食')
+        self.products = []
+        for i in range(6):
+            product = Product.objects.create(
+                barcode=f'check-{i:03d}', name=f'盘点商品{i}',
+                category=self.drinks if i < 4 else self.snacks,
+                price=Decimal('10.00'), cost=Decimal('4.00'),
+            )
+            self.products.append(product)
+        for i, product in enumerate(self.products[:5]):
+            Inventory.objects.create(product=product, quantity=10 * (i + 1), warning_level=5)
+
+    def create_check(self, **kwargs):
+        return InventoryCheckService.create_inventory_check(
+            name='全店盘点', description='', user=self.user, **kwargs
+        )
+
+    def counted_check(self, counts=None):
+        """创建并完成一张盘点单，counts 为 {商品下标: 实际数量}，其余按系统数量"""
+        check = self.create_check()
+        check.status = 'in_progress'
+        check.save(update_fields=['status'])
+        counts = counts or {}
+        for item in check.items.select_related('product'):
+            index = self.products.index(item.product)
+            InventoryCheckService.record_check_item(item, counts.get(index, item.system_quantity), self.user)
+        return InventoryCheckService.complete_inventory_check(check, self.user)
+
+
+class InventoryCheckCreationTest(InventoryCheckBulkTestBase):
+    """盘点单集合化创建测试"""
+
+    def test_snapshot_copies_system_quantities(self):
+        """盘点项的系统数量来自库存快照，缺失的库存记录批量补建"""
+        check = self.create_check()
+        quantities = dict(check.items.values_list('product_id', 'system_quantity'))
+        self.assertEqual(len(quantities), 6)
+        self.assertEqual(quantities[self.products[2].id], 30)
+        self.assertEqual(quantities[self.products[5].id], 0)
+        self.assertTrue(Inventory.objects.filter(product=self.products[5], quantity=0).exists())
+        self.assertEqual(check.items.filter(actual_quantity__isnull=True).count(), 6)
+
+    def test_scope_by_category(self):
+        """按分类限定盘点范围"""
+        check = self.create_check(category=self.snacks)
+        self.assertEqual(
+            set(check.items.values_list('product_id', flat=True)),
+            {self.products[4].id, self.products[5].id},
+        )
+
+    def test_scope_changed_since_last_check(self):
+        """仅盘点上次盘点后库存有变动的商品"""
+        first = self.create_check()
+        InventoryCheck.objects.filter(pk=first.pk).update(created_at=timezone.now() - timedelta(days=1))
+        Inventory.objects.update(updated_at=timezone.now() - timedelta(days=2))
+        Product.objects.update(created_at=timezone.now() - timedelta(days=2))
+        inventory = Inventory.objects.get(product=self.products[1])
+        inventory.quantity = 15
+        inventory.save()
+
+        check = self.create_check(changed_since_last_check=True)
+        self.assertEqual(list(check.items.values_list('product_id', flat=True)), [self.products[1].id])
+        self.assertEqual(check.items.get().system_quantity, 15)
+
+    def test_query_count_is_independent_of_product_count(self):
+        """创建盘点单的查询次数与商品数量无关"""
+        def queries():
+            # 每次都留一个缺失库存记录的商品，覆盖补建库存的分支
+            Inventory.objects.filter(product=self.products[5]).delete()
+            with CaptureQueriesContext(connection) as ctx:
+                self.create_check()
+            return len(ctx.captured_queries)
+
+        self.create_check()  # 预热 ContentType 缓存
+        small = queries()
+        for i in range(40):
+            product = Product.objects.create(
+                barcode=f'extra-{i:03d}', name=f'追加商品{i}', category=self.drinks,
+                price=Decimal('1.00'), cost=Decimal('0.50'),
+            )
+            if i % 2:
+                Inventory.objects.create(product=product, quantity=i)
+        self.assertEqual(queries(), small)
+
+
+class InventoryCheckApprovalTest(InventoryCheckBulkTestBase):
+    """盘点审核批量调整库存测试"""
+
+    def setUp(self):
+        super().setUp()
+        User.objects.create_superuser(username='admin', password='secret')
+
+    def test_approve_adjusts_only_discrepant_items(self):
+        """审核时只调整有差异的商品，并批量写入交易记录和操作日志"""
+        check = self.counted_check({0: 3, 2: 45})
+        InventoryCheckService.approve_inventory_check(check, self.user, adjust_inventory=True)
+
+        stock = dict(Inventory.objects.values_list('product_id', 'quantity'))
+        self.assertEqual(stock[self.products[0].id], 3)
+        self.assertEqual(stock[self.products[1].id], 20)
+        self.assertEqual(stock[self.products[2].id], 45)
+        transactions = InventoryTransaction.objects.filter(transaction_type='ADJUST')
+        self.assertEqual(
+            dict(transactions.values_list('product_id', 'quantity')),
+            {self.products[0].id: 3, self.products[2].id: 45},
+        )
+        self.assertEqual(
+            OperationLog.objects.filter(
+                operation_type='INVENTORY', details__startswith='ADJUST',
+                related_object_id__in=transactions.values('id'),
+            ).count(),
+            2,
+        )
+        # 商品0调整后低于预警水平，只对调整过的商品评估预警
+        warnings = OperationLog.objects.filter(details__startswith='库存预警')
+        self.assertEqual(list(warnings.values_list('details', flat=True)), [
+            f'库存预警: {self.products[0].name} 库存数量 (3) 低于预警水平 (5)'
+        ])
+
+    def test_approve_without_adjustment_leaves_stock(self):
+        """不调整库存时只修改盘点单状态"""
+        check = self.counted_check({0: 3})
+        InventoryCheckService.approve_inventory_check(check, self.user)
+        check.refresh_from_db()
+        self.assertEqual(check.status, 'approved')
+        self.assertEqual(Inventory.objects.get(product=self.products[0]).quantity, 10)
+        self.assertFalse(InventoryTransaction.objects.exists())
+
+    def test_query_count_is_independent_of_discrepancies(self):
+        """审核调整的查询次数与差异商品数量无关"""
+        def queries(counts):
+            check = self.counted_check(counts)
+            with CaptureQueriesContext(connection) as ctx:
+                InventoryCheckService.approve_inventory_check(check, self.user, adjust_inventory=True)
+            return len(ctx.captured_queries)
+
+        queries({0: 1})  # 预热 ContentType 缓存
+        self.assertEqual(queries({0: 2}), queries({0: 3, 1: 4, 2: 5, 3: 6, 4: 7}))
+
+
+class InventoryCheckSummaryTest(InventoryCheckBulkTestBase):
+    """盘点汇总聚合与缓存测试"""
+
+    def test_summary_is_single_query(self):
+        """进行中的盘点单汇总只查询一次且不缓存"""
+        check = self.create_check()
+        check.status = 'in_progress'
+        check.save(update_fields=['status'])
+        item = check.items.get(product=self.products[0])
+        InventoryCheckService.record_check_item(item, 7, self.user)
+
+        with self.assertNumQueries(1):
+            summary = InventoryCheckService.get_inventory_check_summary(check)
+        self.assertEqual(summary['total_items'], 6)
+        self.assertEqual(summary['checked_items'], 1)
+        self.assertEqual(summary['pending_items'], 5)
+        self.assertEqual(summary['items_with_discrepancy'], 1)
+        # 系统数量 10+20+30+40+50+0，成本 4.00
+        self.assertEqual(summary['system_value'], Decimal('600.00'))
+        self.assertEqual(summary['actual_value'], Decimal('28.00'))
+        self.assertEqual(summary['value_difference'], Decimal('-572.00'))
+        check.refresh_from_db()
+        self.assertIsNone(check.summary)
+
+    def test_completed_summary_is_cached(self):
+        """已完成的盘点单汇总写入缓存，之后不再查询盘点项"""
+        check = self.counted_check({0: 3})
+        expected = InventoryCheckService.get_inventory_check_summary(check, use_cache=False)
+
+        first = InventoryCheckService.get_inventory_check_summary(check)
+        self.assertEqual(first, expected)
+        check = InventoryCheck.objects.get(pk=check.pk)
+        with self.assertNumQueries(0):
+            cached = InventoryCheckService.get_inventory_check_summary(check)
+        self.assertEqual(cached, expected)
+        self.assertIsInstance(cached['system_value'], Decimal)
+
+        # 审核后仍然使用缓存
+        InventoryCheckService.approve_inventory_check(check, self.user)
+        with self.assertNumQueries(0):
+            InventoryCheckService.get_inventory_check_summary(check)
+
+    def test_recording_item_invalidates_cache(self):
+        """记录盘点项会清空汇总缓存"""
+        check = self.counted_check()
+        InventoryCheckService.get_inventory_check_summary(check)
+        check.status = 'in_progress'
+        check.save(update_fields=['status'])
+        item = check.items.select_related('inventory_check').get(product=self.products[1])
+        InventoryCheckService.record_check_item(item, 1, self.user)
+        check.refresh_from_db()
+        self.assertIsNone(check.summary)
+
+        check = InventoryCheckService.complete_inventory_check(check, self.user)
+        summary = InventoryCheckService.get_inventory_check_summary(check)
+        self.assertEqual(summary['items_with_discrepancy'], 1)
+
+
+class InventoryCheckScanBatchTest(InventoryCheckBulkTestBase):
+    """扫描枪批量盘点接口测试"""
+
+    def setUp(self):
+        super().setUp()
+        self.check = self.create_check()
+        self.check.status = 'in_progress'
+        self.check.save(update_fields=['status'])
+        self.admin = User.objects.create_superuser(username='admin', password='secret')
+        self.client.force_login(self.admin)
+        self.url = reverse('inventory_check_scan_batch', args=[self.check.id])
+
+    def actual(self, index):
+        return self.check.items.get(product=self.products[index]).actual_quantity
+
+    def test_add_mode_accumulates_counts(self):
+        """累加模式下同一商品的多次扫描和多批上传都会累加"""
+        results = InventoryCheckService.record_scans(self.check, [
+            ('check-000', 2), ('check-001', 5), {'barcode': 'check-000', 'quantity': 3},
+        ], self.user)
+        self.assertEqual([r['actual_quantity'] for r in results], [5, 5, 5])
+        InventoryCheckService.record_scans(self.check, [('check-000', 4)], self.admin)
+
+        item = self.check.items.get(product=self.products[0])
+        self.assertEqual(item.actual_quantity, 9)
+        self.assertEqual(item.difference, -1)
+        self.assertEqual(item.checked_by, self.admin)
+        self.assertIsNone(self.actual(2))
+
+    def test_set_mode_overwrites_counts(self):
+        """覆盖模式下以最后一次扫描的数量为准"""
+        InventoryCheckService.record_scans(self.check, [('check-001', 7)], self.user)
+        InventoryCheckService.record_scans(
+            self.check, [('check-001', 30), ('check-001', 25)], self.user, mode='set'
+        )
+        item = self.check.items.get(product=self.products[1])
+        self.assertEqual(item.actual_quantity, 25)
+        self.assertEqual(item.difference, 5)
+
+    def test_per_line_results(self):
+        """逐行返回未找到和无效的扫描记录"""
+        results = InventoryCheckService.record_scans(self.check, [
+            ('check-002', 1), ('unknown', 1), ('check-003', -1), ('check-003', 'x'), 'bad',
+        ], self.user)
+        self.assertEqual(
+            [r['status'] for r in results], ['ok', 'not_found', 'invalid', 'invalid', 'invalid']
+        )
+        self.assertEqual(results[0]['actual_quantity'], 1)
+        self.assertIsNone(self.actual(3))
+
+    def test_query_count_is_independent_of_scan_count(self):
+        """批量记录的查询次数与扫描条数无关"""
+        def queries(scans):
+            with CaptureQueriesContext(connection) as ctx:
+                InventoryCheckService.record_scans(self.check, scans, self.user)
+            return len(ctx.captured_queries)
+
+        queries([('check-000', 1)])  # 预热 ContentType 缓存
+        self.assertEqual(
+            queries([('check-000', 1)]),
+            queries([(f'check-{i:03d}', i) for i in range(6)] * 5),
+        )
+
+    def test_requires_in_progress_check(self):
+        """非进行中的盘点单不能记录"""
+        self.check.status = 'draft'
+        with self.assertRaises(InventoryValidationError):
+            InventoryCheckService.record_scans(self.check, [('check-000', 1)], self.user)
+
+    def test_api_accepts_gzip_payload(self):
+        """接口接受 gzip 压缩的 JSON 扫描记录"""
+        body = gzip.compress(json.dumps({'scans': [['check-004', 6], ['nope', 1]]}).encode('utf-8'))
+        response = self.client.post(
+            self.url, body, content_type='application/json', HTTP_CONTENT_ENCODING='gzip'
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['recorded'], 1)
+        self.assertEqual(data['failed'], 1)
+        self.assertEqual(data['results'][0]['actual_quantity'], 6)
+        self.assertEqual(self.actual(4), 6)
+
+    def test_api_rejects_invalid_requests(self):
+        """无效请求返回400"""
+        response = self.client.post(self.url, b'not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            self.url, json.dumps({'mode': 'replace', 'scans': []}), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(self.url).status_code, 405)
@@ -0,0 +1,126 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from inventory.models import Category, Inventory, InventoryTransaction, Product, Sale
+from inventory.utils.query_utils import keyset_paginate
+
+
+class KeysetPaginateTest(TestCase):
+    """键集分页测试"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='admin', password='secret')
+        self.category = Category.objects.create(name='饮料')
+        self.product = Product.objects.create(
+            barcode='6900000000001', name='矿泉水', category=self.category,
+            price=Decimal('2.00'), cost=Decimal('1.00'),
+        )
+        InventoryTransaction.objects.bulk_create([
+            InventoryTransaction(product=self.product, transaction_type='IN', quantity=i, operator=self.user)
+            for i in range(25)
+        ])
+        # 时间相同的记录按 id 区分先后
+        now = timezone.now()
+        InventoryTransaction.objects.filter(quantity__lt=10).update(created_at=now)
+        self.expected = list(InventoryTransaction.objects.order_by('-created_at', '-id'))
+
+    def test_forward_and_backward(self):
+        """向后翻到最后一页再向前翻回第一页，每页不重复不遗漏"""
+        ordering = ['-created_at', '-id']
+        pages, cursor = [], None
+        while True:
+            page = keyset_paginate(InventoryTransaction.objects.all(), ordering, cursor, per_page=7)
+            pages.append(list(page))
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual([obj for rows in pages for obj in rows], self.expected)
+        self.assertEqual([len(rows) for rows in pages], [7, 7, 7, 4])
+
+        back = keyset_paginate(InventoryTransaction.objects.all(), ordering, page.previous_cursor, per_page=7)
+        self.assertEqual(list(back), pages[-2])
+        while back.has_previous():
+            back = keyset_paginate(InventoryTransaction.objects.all(), ordering, back.previous_cursor, per_page=7)
+        self.assertEqual(list(back), pages[0])
+
+    def test_deep_page_query_has_no_offset(self):
+        """翻页查询按排序键定位，不使用 OFFSET，也不统计总数"""
+        first = keyset_paginate(InventoryTransaction.objects.all(), ['-created_at', '-id'], per_page=7)
+        with self.assertNumQueries(1) as context:
+            keyset_paginate(InventoryTransaction.objects.all(), ['-created_at', '-id'], first.next_cursor, per_page=7)
+        self.assertNotIn('OFFSET', context.captured_queries[0]['sql'])
+
+    def test_invalid_cursor_returns_first_page(self):
+        """无法识别的游标返回第一页"""
+        page = keyset_paginate(InventoryTransaction.objects.all(), ['-created_at', '-id'], 'not-a-cursor', per_page=5)
+        self.assertEqual(list(page), self.expected[:5])
+        self.assertFalse(page.has_previous())
+
+
+class KeysetListViewTest(TestCase):
+    """列表页面的键集分页和 JSON 接口"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='admin', password='secret')
+        self.client.force_login(self.user)
+        category = Category.objects.create(name='饮料')
+        for i in range(60):
+            product = Product.objects.create(
+                barcode=f'69000000{i:05d}', name=f'商品{i:02d}', category=category,
+                price=Decimal(i % 7), cost=Decimal('1.00'),
+            )
+            Inventory.objects.create(product=product, quantity=i, warning_level=10)
+
+    def collect(self, url, params):
+        results, cursor = [], None
+        while True:
+            data = self.client.get(url, {**params, 'format': 'json', **({'cursor': cursor} if cursor else {})}).json()
+            results += data['results']
+            cursor = data['next_cursor']
+            if not cursor:
+                return results
+
+    def test_inventory_list_filters_stock_status_on_server(self):
+        """库存预警筛选在数据库中完成，页面只渲染一页"""
+        low = self.collect(reverse('inventory_list'), {'stock': 'low'})
+        self.assertEqual(sorted(row['quantity'] for row in low), list(range(11)))
+
+        response = self.client.get(reverse('inventory_list'))
+        self.assertEqual(len(response.context['inventory_items']), 50)
+        self.assertTrue(response.context['inventory_items'].has_next())
+
+    def test_inventory_list_pages_stay_stable_when_stock_changes(self):
+        """库存列表按商品名称分页，翻页之间库存变动不会让行重复或遗漏"""
+        url = reverse('inventory_list')
+        first = self.client.get(url, {'format': 'json'}).json()
+        # 第二页的商品在翻页之间卖出一件
+        Inventory.objects.filter(product__name='商品55').update(quantity=54, updated_at=timezone.now())
+        second = self.client.get(url, {'format': 'json', 'cursor': first['next_cursor']}).json()
+        names = [row['product_name'] for row in first['results'] + second['results']]
+        self.assertEqual(names, [f'商品{i:02d}' for i in range(60)])
+
+    def test_product_list_sort_orders(self):
+        """商品列表每种排序方式都能完整翻页"""
+        by_price = self.collect(reverse('product_list'), {'sort': 'price'})
+        self.assertEqual(len(by_price), 60)
+        self.assertEqual([row['price'] for row in by_price],
+                         sorted((row['price'] for row in by_price), key=Decimal))
+        by_name = self.collect(reverse('product_list'), {'sort': 'name', 'search': '商品1'})
+        self.assertEqual([row['name'] for row in by_name], [f'商品{i}' for i in range(10, 20)])
+
+    def test_sale_and_transaction_lists(self):
+        """销售单和库存交易记录列表按时间倒序分页"""
+        Sale.objects.bulk_create([
+            Sale(total_amount=Decimal(i), final_amount=Decimal(i), operator=self.user) for i in range(30)
+        ])
+        sales = self.collect(reverse('sale_list'), {})
+        self.assertEqual([row['id'] for row in sales],
+                         list(Sale.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+
+        response = self.client.get(reverse('inventory_transaction_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'inventory/inventory_transaction_list.html')
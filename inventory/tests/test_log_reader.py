@@ -0,0 +1,116 @@
+import os
+import re
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from inventory.utils import log_reader
+from inventory.utils.log_reader import count_lines, read_lines_backward
+
+
+class LogReaderTestBase(TestCase):
+    """在临时目录中生成日志文件"""
+
+    def setUp(self):
+        cache.clear()
+        self.log_dir = tempfile.mkdtemp()
+        self.lines = [
+            f"{('INFO', 'WARNING', 'ERROR')[i % 3]} 2024-01-01 12:00:00 views 1 1 请求 {i}"
+            for i in range(1000)
+        ]
+        self.path = os.path.join(self.log_dir, 'inventory.log')
+        self.write(self.path, self.lines)
+
+    def tearDown(self):
+        shutil.rmtree(self.log_dir, ignore_errors=True)
+
+    def write(self, path, lines, mode='w'):
+        with open(path, mode, encoding='utf-8') as f:
+            f.write(''.join(f'{line}\n' for line in lines))
+
+
+class LogReaderTest(LogReaderTestBase):
+    """日志倒序读取测试"""
+
+    def test_tail_and_page_backward(self):
+        """从文件末尾读取，并按偏移量一直向前翻页到文件开头"""
+        result = read_lines_backward(self.path, 10)
+        self.assertEqual(result['lines'], self.lines[-10:])
+
+        collected, before = [], None
+        with mock.patch.object(log_reader, 'BLOCK_SIZE', 100):
+            while True:
+                result = read_lines_backward(self.path, 333, before=before)
+                collected = result['lines'] + collected
+                before = result['next_before']
+                if before is None:
+                    break
+        self.assertEqual(collected, self.lines)
+
+    def test_filter_by_level_and_pattern(self):
+        """按级别和正则过滤；扫描量达到上限时返回继续搜索的位置"""
+        result = read_lines_backward(self.path, 5, level='ERROR', pattern=re.compile(r'请求 9\d\d$'))
+        self.assertEqual(result['lines'], [line for line in self.lines if line.startswith('ERROR') and
+                                           re.search(r'请求 9\d\d$', line)][-5:])
+
+        result = read_lines_backward(self.path, 5, pattern=re.compile('请求 0$'), max_scan_bytes=1000)
+        self.assertEqual(result['lines'], [])
+        self.assertIsNotNone(result['next_before'])
+
+    def test_line_count_is_cached_and_incremental(self):
+        """行数按文件缓存，追加内容时只统计新增部分，文件被截断时重新统计"""
+        self.assertEqual(count_lines(self.path), 1000)
+        self.write(self.path, ['INFO 新增'], mode='a')
+        with mock.patch('builtins.open', wraps=open) as opened:
+            self.assertEqual(count_lines(self.path), 1001)
+        self.assertEqual(opened.call_count, 1)
+
+        self.write(self.path, ['INFO 轮转后'])
+        self.assertEqual(count_lines(self.path), 1)
+
+
+class LogFileViewTest(LogReaderTestBase):
+    """日志文件查看页面测试"""
+
+    def setUp(self):
+        super().setUp()
+        self.settings_override = override_settings(LOG_DIR=self.log_dir)
+        self.settings_override.enable()
+        self.user = User.objects.create_superuser(username='admin', password='secret')
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        super().tearDown()
+
+    def test_view_log_file(self):
+        """页面显示最后 N 行和更早日志的链接"""
+        response = self.client.get(reverse('view_log_file', args=['inventory.log']), {'lines': 20})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['log_lines'], self.lines[-20:])
+        self.assertEqual(response.context['total_lines'], 1000)
+        self.assertIn('before=', response.context['older_query'])
+
+    def test_json_paging_and_rotated_file(self):
+        """JSON 接口按偏移量翻页；轮转后的日志文件也可查看"""
+        url = reverse('view_log_file', args=['inventory.log'])
+        first = self.client.get(url, {'lines': 10, 'format': 'json', 'level': 'error'}).json()
+        second = self.client.get(url, {'lines': 10, 'format': 'json', 'level': 'error',
+                                       'before': first['next_before']}).json()
+        errors = [line for line in self.lines if line.startswith('ERROR')]
+        self.assertEqual(second['lines'] + first['lines'], errors[-20:])
+
+        self.write(os.path.join(self.log_dir, 'inventory.log.1'), ['INFO 旧日志'])
+        response = self.client.get(reverse('view_log_file', args=['inventory.log.1']), {'format': 'json'})
+        self.assertEqual(response.json()['lines'], ['INFO 旧日志'])
+
+    def test_invalid_regex(self):
+        """无效的正则表达式提示错误并显示全部日志"""
+        response = self.client.get(reverse('view_log_file', args=['inventory.log']), {'q': '(', 'lines': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['log_lines'], self.lines[-5:])
@@ -0,0 +1,87 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from inventory.models import Member, MemberLevel
+from inventory.services.member_service import import_members_from_csv
+
+HEADER = 'name,phone,email,member_id,level,points,birthday,address'
+
+
+def make_csv(rows, header=HEADER):
+    content = header + '\n' + '\n'.join(rows) + '\n'
+    return SimpleUploadedFile('members.csv', content.encode('utf-8'), content_type='text/csv')
+
+
+class MemberCsvImportTest(TestCase):
+    """会员CSV批量导入测试"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='importer', password='secret')
+        self.default_level = MemberLevel.objects.create(
+            name='普通会员', discount=Decimal('1.00'), points_threshold=0, is_default=True
+        )
+        self.gold = MemberLevel.objects.create(
+            name='金卡会员', discount=Decimal('0.90'), points_threshold=1000
+        )
+        Member.objects.create(name='老会员', phone='13800000000', member_id='M0001', level=self.default_level)
+
+    def test_import_creates_members(self):
+        """导入的会员字段、等级和创建人正确"""
+        result = import_members_from_csv(make_csv([
+            '张三,13800000001,zs@example.com,M0002,金卡会员,120,1990-01-01,北京',
+            '李四,13800000002,,,未知等级,abc,not-a-date,',
+            '王五,13800000003,,,,,,',
+        ]), self.user)
+
+        self.assertEqual(result['success'], 3)
+        zhang = Member.objects.get(phone='13800000001')
+        self.assertEqual(zhang.level, self.gold)
+        self.assertEqual(zhang.points, 120)
+        self.assertEqual(zhang.birthday.isoformat(), '1990-01-01')
+        self.assertEqual(zhang.created_by, self.user)
+        li = Member.objects.get(phone='13800000002')
+        self.assertEqual(li.level, self.default_level)
+        self.assertEqual(li.points, 0)
+        self.assertIsNone(li.birthday)
+        # 空会员号存为 NULL，多名会员不会违反唯一约束
+        self.assertIsNone(li.member_id)
+        self.assertIsNone(Member.objects.get(phone='13800000003').member_id)
+
+    def test_duplicates_and_invalid_rows(self):
+        """已有手机号跳过，重复会员号和缺少必填字段逐行报告"""
+        result = import_members_from_csv(make_csv([
+            '重复手机,13800000000,,,,,,',
+            '重复会员号,13800000011,,M0001,,,,',
+            ',13800000012,,,,,,',
+            '文件内重复,13800000013,,,,,,',
+            '文件内重复2,13800000013,,,,,,',
+        ]), self.user)
+
+        self.assertEqual(result['success'], 1)
+        self.assertEqual(result['skipped'], 2)
+        self.assertEqual(result['failed'], 2)
+        rows = dict(result['failed_rows'])
+        self.assertIn('M0001', rows[3])
+        self.assertEqual(rows[4], '姓名和手机号为必填字段')
+
+    def test_missing_required_header(self):
+        """缺少必要表头时报错"""
+        with self.assertRaises(ValueError):
+            import_members_from_csv(make_csv(['张三'], header='name'), self.user)
+
+    def test_query_count_is_independent_of_row_count(self):
+        """查询次数与导入行数无关"""
+        def run(count, offset):
+            rows = [f'会员{i},139{offset + i:08d},,,金卡会员,,,' for i in range(count)]
+            with CaptureQueriesContext(connection) as ctx:
+                result = import_members_from_csv(make_csv(rows), self.user, chunk_size=5000)
+            self.assertEqual(result['success'], count)
+            return len(ctx.captured_queries)
+
+        # SQLite 单条语句参数有上限，行数取在一次批量插入之内
+        self.assertEqual(run(3, 0), run(40, 1000))
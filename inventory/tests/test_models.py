@@ -13,7 +13,9 @@ from inventory.models import (
     SaleItem,
     RechargeRecord,
     InventoryCheck,
-    InventoryCheckItem
+    InventoryCheckItem,
+    change_stock,
+    update_inventory
 )
 
 class CategoryModelTest(TestCase):
@@ -107,6 +109,66 @@ class InventoryModelTest(TestCase):
         self.inventory.save()
         self.assertTrue(self.inventory.is_low_stock)  # 5 < 10
 
+class ChangeStockTest(TestCase):
+    """测试条件库存更新"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.category = Category.objects.create(name='测试分类')
+        self.products = [
+            Product.objects.create(
+                barcode=f'stock-{i}',
+                name=f'库存商品{i}',
+                category=self.category,
+                price=Decimal('10.00'),
+                cost=Decimal('5.00')
+            )
+            for i in range(3)
+        ]
+        for product in self.products:
+            Inventory.objects.create(product=product, quantity=5, warning_level=1)
+    
+    def quantity(self, product):
+        return Inventory.objects.get(product=product).quantity
+    
+    def test_multi_product_decrement_is_one_update(self):
+        """多个商品的扣减只执行一条UPDATE"""
+        deltas = {p.id: -2 for p in self.products}
+        with self.assertNumQueries(3):  # SAVEPOINT / UPDATE / RELEASE
+            self.assertEqual(change_stock(deltas), [])
+        for product in self.products:
+            self.assertEqual(self.quantity(product), 3)
+    
+    def test_failed_lines_are_reported_and_nothing_applied(self):
+        """任一商品库存不足时报告失败行且全部不生效"""
+        failed = change_stock({self.products[0].id: -2, self.products[1].id: -6})
+        self.assertEqual(failed, [
+            {'product_id': self.products[1].id, 'change': -6, 'current_stock': 5}
+        ])
+        self.assertEqual(self.quantity(self.products[0]), 5)
+        self.assertEqual(self.quantity(self.products[1]), 5)
+    
+    def test_create_missing_inventory_rows(self):
+        """入库时为没有库存记录的商品补建记录"""
+        product = Product.objects.create(
+            barcode='stock-new', name='新商品', category=self.category,
+            price=Decimal('1.00'), cost=Decimal('0.50')
+        )
+        self.assertEqual(change_stock({product.id: 4})[0]['current_stock'], None)
+        self.assertEqual(change_stock({product.id: 4}, create_missing=True), [])
+        self.assertEqual(self.quantity(product), 4)
+    
+    def test_update_inventory_rejects_oversell(self):
+        """update_inventory 不允许库存变为负数"""
+        success, inventory, message = update_inventory(self.products[0], -6, 'OUT', self.user)
+        self.assertFalse(success)
+        self.assertIn('库存不足', message)
+        success, inventory, record = update_inventory(self.products[0], -5, 'OUT', self.user)
+        self.assertTrue(success)
+        self.assertEqual(inventory.quantity, 0)
+        self.assertEqual(record.quantity, 5)
+
+
 class InventoryTransactionModelTest(TestCase):
     """测试库存交易记录模型"""
     
@@ -0,0 +1,71 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+
+from inventory.models import Category, Inventory, OperationLog, Product, Sale, SaleItem
+from inventory.utils.logging import log_action_on_commit
+
+
+class OperationLogBufferTest(TestCase):
+    """事务内的操作日志缓冲到提交时批量写入"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cashier', password='secret')
+        self.category = Category.objects.create(name='饮料')
+        self.product = Product.objects.create(
+            barcode='6900000000001', name='矿泉水', category=self.category,
+            price=Decimal('2.00'), cost=Decimal('1.00'),
+        )
+
+    def test_logs_written_with_one_insert_on_commit(self):
+        """同一事务内的多条日志在提交时用一条 INSERT 写入"""
+        ContentType.objects.get_for_models(Product, User)
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                for i in range(5):
+                    log_action_on_commit(self.user, 'INVENTORY', f'入库 {i}', related_object=self.product)
+                log_action_on_commit(self.user, 'OTHER', '无关联对象')
+            self.assertFalse(OperationLog.objects.exists())
+
+        self.assertEqual(len(callbacks), 1)
+        with self.assertNumQueries(1):
+            callbacks[0]()
+        self.assertEqual(OperationLog.objects.filter(related_object_id=self.product.id,
+                                                     operation_type='INVENTORY').count(), 5)
+        self.assertEqual(OperationLog.objects.get(operation_type='OTHER').related_content_type.model, 'user')
+
+    def test_rolled_back_logs_are_discarded(self):
+        """事务回滚时丢弃日志；回滚的内层保存点只丢弃其中的日志"""
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                log_action_on_commit(self.user, 'INVENTORY', '外层', related_object=self.product)
+                try:
+                    with transaction.atomic():
+                        log_action_on_commit(self.user, 'INVENTORY', '内层', related_object=self.product)
+                        raise ValueError
+                except ValueError:
+                    pass
+                with transaction.atomic():
+                    log_action_on_commit(self.user, 'INVENTORY', '内层已提交', related_object=self.product)
+        self.assertEqual(sorted(OperationLog.objects.values_list('details', flat=True)), ['内层已提交', '外层'])
+
+    def test_sale_cancel_logs_after_commit(self):
+        """取消销售单的操作日志在事务提交后写入"""
+        Inventory.objects.create(product=self.product, quantity=10)
+        sale = Sale.objects.create(
+            total_amount=Decimal('4.00'), final_amount=Decimal('4.00'),
+            payment_method='cash', operator=self.user,
+        )
+        SaleItem.objects.create(sale=sale, product=self.product, quantity=2, price=Decimal('2.00'),
+                                actual_price=Decimal('2.00'), subtotal=Decimal('4.00'))
+        self.client.force_login(self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('sale_cancel', args=[sale.id]), {'reason': '顾客取消'})
+        log = OperationLog.objects.get(operation_type='SALE')
+        self.assertEqual(log.related_object_id, sale.id)
+        self.assertIn('顾客取消', log.details)
@@ -0,0 +1,97 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from inventory.models import Category, Inventory, OperationLog, Product, ProductSearchDocument
+from inventory.services.product_service import import_products_from_csv
+
+
+def make_csv(rows, header='name,category,retail_price,cost_price,barcode,specification'):
+    content = '\ufeff' + header + '\n' + '\n'.join(rows) + '\n'
+    return SimpleUploadedFile('products.csv', content.encode('utf-8'), content_type='text/csv')
+
+
+class ProductCsvImportTest(TestCase):
+    """商品CSV批量导入测试"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='importer', password='secret')
+
+    def test_import_creates_products_inventory_and_search_documents(self):
+        """导入后商品、初始库存、分类和检索文档都已创建"""
+        result = import_products_from_csv(make_csv([
+            '矿泉水,饮料,2.00,1.20,6900000000001,550ml',
+            '薯片,,6.50,,6900000000002,',
+        ]), self.user)
+
+        self.assertEqual(result['success'], 2)
+        self.assertEqual(result['failed_rows'], [])
+        water = Product.objects.get(barcode='6900000000001')
+        self.assertEqual(water.category.name, '饮料')
+        self.assertEqual(water.cost, Decimal('1.20'))
+        chips = Product.objects.get(barcode='6900000000002')
+        self.assertEqual(chips.category.name, '未分类')
+        self.assertEqual(chips.cost, Decimal('4.55'))
+        self.assertEqual(Inventory.objects.filter(quantity=0).count(), 2)
+        self.assertEqual(ProductSearchDocument.objects.count(), 2)
+        self.assertTrue(OperationLog.objects.filter(operator=self.user).exists())
+
+    def test_invalid_and_duplicate_rows_are_reported(self):
+        """无效行、已存在条码和文件内重复条码逐行报告"""
+        category = Category.objects.create(name='饮料')
+        Product.objects.create(
+            barcode='6900000000001', name='已有商品', category=category,
+            price=Decimal('1.00'), cost=Decimal('0.50'),
+        )
+        result = import_products_from_csv(make_csv([
+            '矿泉水,饮料,2.00,1.20,6900000000001,',
+            ',饮料,2.00,,6900000000003,',
+            '果汁,饮料,abc,,6900000000004,',
+            '果汁,饮料,-1,,6900000000005,',
+            '可乐,饮料,3.00,,6900000000006,',
+            '可乐二号,饮料,3.00,,6900000000006,',
+            '无条码,饮料,3.00,,,',
+        ]), self.user)
+
+        self.assertEqual(result['success'], 1)
+        self.assertEqual(result['skipped'], 2)
+        self.assertEqual(result['failed'], 4)
+        rows = dict(result['failed_rows'])
+        self.assertIn('已存在', rows[2])
+        self.assertEqual(rows[3], '商品名称不能为空')
+        self.assertEqual(rows[4], '零售价格式不正确')
+        self.assertEqual(rows[5], '零售价不能为负数')
+        self.assertIn('已存在', rows[7])
+        self.assertEqual(rows[8], '条码不能为空')
+
+    def test_missing_required_header(self):
+        """缺少必要表头时报错"""
+        with self.assertRaises(ValueError):
+            import_products_from_csv(make_csv(['a,b'], header='name,barcode'), self.user)
+
+    def test_query_count_grows_per_chunk_not_per_row(self):
+        """查询次数只随批次数增长，与每批行数无关"""
+        def run(count, offset):
+            rows = [f'商品{offset + i},分类{i % 3},1.00,,69{offset + i:011d},' for i in range(count)]
+            with CaptureQueriesContext(connection) as ctx:
+                result = import_products_from_csv(make_csv(rows), None, chunk_size=500)
+            self.assertEqual(result['success'], count)
+            return len(ctx.captured_queries)
+
+        # 先导入一次使分类已存在；SQLite 单条语句参数有上限，行数取在一次批量插入之内
+        run(3, 0)
+        self.assertEqual(run(5, 1000), run(50, 2000))
+
+    def test_progress_is_reported_per_chunk(self):
+        """每批完成后回调进度"""
+        calls = []
+        rows = [f'商品{i},饮料,1.00,,69{i:011d},' for i in range(5)]
+        import_products_from_csv(
+            make_csv(rows), self.user, chunk_size=2,
+            progress=lambda read, result: calls.append((read, result['success'])),
+        )
+        self.assertEqual(calls, [(2, 2), (4, 4), (5, 5)])
@@ -0,0 +1,82 @@
+from decimal import Decimal
+
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from inventory.models import Category, Inventory, Product
+from inventory.services.product_service import (
+    lookup_products_by_barcode,
+    products_with_stock,
+    serialize_product_with_stock,
+)
+from inventory.services.search_service import ProductSearchService
+
+
+class ProductLookupQueryTest(TestCase):
+    """收银台商品查询接口的查询次数测试"""
+
+    def setUp(self):
+        self.client = Client()
+        category = Category.objects.create(name='查询分类')
+        self.products = []
+        for i in range(12):
+            product = Product.objects.create(
+                barcode=f'69555{i:03d}', name=f'矿泉水{i}', category=category,
+                price=Decimal('2.00'), cost=Decimal('1.00'),
+            )
+            if i % 2 == 0:
+                Inventory.objects.create(product=product, quantity=i + 1, warning_level=1)
+            self.products.append(product)
+
+    def test_serialize_needs_no_extra_queries(self):
+        """序列化带库存的商品不产生额外查询"""
+        with self.assertNumQueries(1):
+            rows = [serialize_product_with_stock(p) for p in products_with_stock()]
+        self.assertEqual(len(rows), 12)
+        stock = {row['barcode']: row['stock'] for row in rows}
+        self.assertEqual(stock['69555000'], 1)
+        self.assertEqual(stock['69555001'], 0)
+        self.assertEqual(rows[0]['category'], '查询分类')
+
+    def test_exact_barcode_is_returned_first(self):
+        """精确匹配的条码优先于模糊匹配"""
+        with self.assertNumQueries(1):
+            exact, matches = lookup_products_by_barcode('69555010')
+        self.assertEqual(exact, self.products[10])
+        self.assertEqual(matches, [])
+
+        with self.assertNumQueries(1):
+            exact, matches = lookup_products_by_barcode('695550')
+        self.assertIsNone(exact)
+        self.assertEqual(len(matches), 5)
+
+    def test_product_search_api_uses_single_query(self):
+        """商品搜索接口只查询一次"""
+        ProductSearchService.backend()  # 检索后端按连接检测一次后缓存
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('product_search_api'), {'query': '矿泉水'})
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertEqual(data['count'], 10)
+        self.assertEqual(data['products'][0]['category'], '查询分类')
+
+    def test_product_by_barcode_exact_uses_single_query(self):
+        """条码精确查询只查询一次"""
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('product_by_barcode', args=['69555004']))
+        data = response.json()
+        self.assertFalse(data['multiple_matches'])
+        self.assertEqual(data['stock'], 5)
+
+    def test_product_by_barcode_fuzzy_uses_single_query(self):
+        """条码模糊查询只查询一次"""
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('product_by_barcode', args=['5550']))
+        data = response.json()
+        self.assertTrue(data['multiple_matches'])
+        self.assertEqual(len(data['products']), 5)
+
+    def test_unknown_barcode(self):
+        """未知条码返回未找到"""
+        response = self.client.get(reverse('product_by_barcode', args=['000000']))
+        self.assertFalse(response.json()['success'])
@@ -0,0 +1,73 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+
+from inventory.utils.query_plan import explain_hot_queries, full_scans, hot_queries
+
+
+class QueryPlanTest(TestCase):
+    """热点查询执行计划测试"""
+
+    def test_hot_queries_use_indexes(self):
+        """报表和列表的热点查询不做全表扫描"""
+        results = explain_hot_queries()
+        # SQLite 中月份以参数传入 django_date_extract，无法匹配函数索引，函数索引只在 PostgreSQL 上建立
+        if connection.vendor == 'sqlite':
+            results.pop('birthday_members')
+        self.assertEqual({name: r['full_scans'] for name, r in results.items() if r['full_scans']}, {})
+        self.assertIn('sale_member_created_idx', results['member_sales']['plan'])
+        self.assertIn('invtxn_product_created_idx', results['product_transactions']['plan'])
+        self.assertIn('product_name_idx', results['inventory_list']['plan'])
+
+    def test_birthday_index_only_on_postgresql(self):
+        """生日函数索引只在 PostgreSQL 上存在"""
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, 'inventory_member')
+        self.assertEqual('member_birthday_md_idx' in constraints, connection.vendor == 'postgresql')
+
+    def test_vendor_specific_queries(self):
+        """商品检索只在 PostgreSQL 上检查 trigram 索引"""
+        self.assertIn('product_search', hot_queries('postgresql'))
+        self.assertNotIn('product_search', hot_queries('sqlite'))
+
+    def test_full_scan_detection(self):
+        """识别 SQLite 和 PostgreSQL 执行计划中的全表扫描"""
+        self.assertEqual(full_scans('4 0 0 SCAN inventory_member', 'sqlite'), ['inventory_member'])
+        self.assertEqual(full_scans('6 0 0 SCAN inventory_sale USING INDEX sale_created_idx', 'sqlite'), [])
+        self.assertEqual(
+            full_scans('Limit\n  ->  Seq Scan on inventory_sale  (cost=0.00..1.00 rows=1 width=8)', 'postgresql'),
+            ['inventory_sale'],
+        )
+
+    def test_command_detects_regression_against_baseline(self):
+        """与基线相比新增全表扫描时命令失败"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'plans.json')
+            call_command('explain_queries', 'member_sales', '--repeat', '2', '--output', path, stdout=StringIO())
+            with open(path, encoding='utf-8') as f:
+                report = json.load(f)
+            self.assertIn('p50_ms', report['queries']['member_sales'])
+            self.assertEqual(report['rows']['inventory.Sale'], 0)
+
+            out = StringIO()
+            call_command('explain_queries', 'member_sales', '--baseline', path, stdout=out)
+            self.assertIn('没有新增全表扫描', out.getvalue())
+
+            # 基线中该查询走索引，当前计划却扫描整表
+            report['queries']['member_sales']['full_scans'] = []
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f)
+            with mock.patch('inventory.management.commands.explain_queries.explain_hot_queries') as explain:
+                explain.return_value = {'member_sales': {'plan': 'SCAN inventory_sale', 'full_scans': ['inventory_sale']}}
+                with self.assertRaisesMessage(CommandError, 'member_sales: inventory_sale'):
+                    call_command('explain_queries', 'member_sales', '--baseline', path, stdout=StringIO())
+
+        with self.assertRaises(CommandError):
+            call_command('explain_queries', 'no_such_query', stdout=StringIO())
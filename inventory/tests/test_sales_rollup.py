@@ -0,0 +1,131 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase
+from django.utils import timezone
+
+from inventory.models import (
+    Category,
+    DailySalesRollup,
+    Inventory,
+    Member,
+    MemberLevel,
+    Product,
+)
+from inventory.services.checkout_service import CheckoutService
+from inventory.services.report_service import ReportService
+from inventory.services.sales_rollup_service import SalesRollupService
+
+
+class SalesRollupTest(TestCase):
+    """每日销售汇总测试"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cashier', password='secret')
+        self.drinks = Category.objects.create(name='饮料')
+        self.snacks = Category.objects.create(name='零食')
+        self.cola = Product.objects.create(
+            barcode='rollup-cola', name='可乐', category=self.drinks,
+            price=Decimal('3.00'), cost=Decimal('1.00'),
+        )
+        self.chips = Product.objects.create(
+            barcode='rollup-chips', name='薯片', category=self.snacks,
+            price=Decimal('7.00'), cost=Decimal('4.00'),
+        )
+        for product in (self.cola, self.chips):
+            Inventory.objects.create(product=product, quantity=100, warning_level=5)
+        level = MemberLevel.objects.create(
+            name='九五折', discount=Decimal('0.95'), points_threshold=0, color='primary'
+        )
+        self.member = Member.objects.create(name='汇总会员', phone='13900000002', level=level)
+        self.today = timezone.localdate()
+
+    def checkout(self, cart, member=None):
+        lines, _ = CheckoutService.prepare_lines([
+            {'product_id': str(product.id), 'quantity': str(quantity), 'price': str(product.price)}
+            for product, quantity in cart
+        ])
+        return CheckoutService.checkout(
+            lines, operator=self.user, member_id=member.id if member else None
+        )
+
+    def rollup_totals(self):
+        return DailySalesRollup.objects.aggregate(
+            quantity=Sum('quantity'),
+            order_count=Sum('order_count'),
+            item_count=Sum('item_count'),
+            sales_amount=Sum('sales_amount'),
+            discount_amount=Sum('discount_amount'),
+            final_amount=Sum('final_amount'),
+            cost_amount=Sum('cost_amount'),
+        )
+
+    def test_checkout_updates_rollup_incrementally(self):
+        """结算后增量累加汇总，同一粒度不重复建行"""
+        self.checkout([(self.cola, 2), (self.chips, 1)])
+        self.checkout([(self.cola, 3)])
+
+        cola = DailySalesRollup.objects.get(product=self.cola)
+        self.assertEqual(cola.date, self.today)
+        self.assertEqual(cola.category, self.drinks)
+        self.assertEqual(cola.payment_method, 'cash')
+        self.assertEqual(cola.operator, self.user)
+        self.assertEqual(cola.quantity, 5)
+        self.assertEqual(cola.order_count, 2)
+        self.assertEqual(cola.cost_amount, Decimal('5.00'))
+        self.assertEqual(DailySalesRollup.objects.get(product=self.chips).order_count, 0)
+
+    def test_discount_is_allocated_exactly(self):
+        """整单折扣按比例分摊且合计与销售单一致"""
+        sale = self.checkout([(self.cola, 1), (self.chips, 1), (self.cola, 2)], member=self.member)
+        totals = self.rollup_totals()
+        self.assertEqual(totals['discount_amount'], sale.discount_amount)
+        self.assertEqual(totals['final_amount'], sale.final_amount)
+        self.assertEqual(totals['sales_amount'], sale.total_amount)
+
+    def test_rebuild_matches_incremental_rollup(self):
+        """重建结果与增量维护结果一致"""
+        self.checkout([(self.cola, 1), (self.chips, 2)], member=self.member)
+        self.checkout([(self.chips, 1)])
+        incremental = self.rollup_totals()
+
+        SalesRollupService.rebuild()
+
+        self.assertEqual(self.rollup_totals(), incremental)
+        self.assertEqual(SalesRollupService.get_state().covered_from, self.today)
+
+    def test_revert_sale(self):
+        """扣回销售单后汇总归零"""
+        sale = self.checkout([(self.cola, 2)])
+        SalesRollupService.revert_sale(sale)
+        totals = self.rollup_totals()
+        self.assertEqual(totals['quantity'], 0)
+        self.assertEqual(totals['final_amount'], Decimal('0'))
+
+    def test_report_reads_rollup_only_when_covered(self):
+        """覆盖范围内的报表读取汇总表，否则读取原始销售数据"""
+        self.checkout([(self.cola, 2), (self.chips, 1)])
+        self.assertFalse(SalesRollupService.is_covered(self.today, self.today))
+        raw = ReportService.get_profit_report(self.today, self.today)
+
+        call_command('rebuild_sales_rollup', stdout=StringIO())
+        self.assertTrue(SalesRollupService.is_covered(self.today, self.today))
+        rolled = ReportService.get_profit_report(self.today, self.today)
+
+        for key in ('total_sales', 'total_cost', 'gross_profit', 'order_count', 'item_count'):
+            self.assertEqual(rolled[key], raw[key], key)
+        self.assertEqual(
+            {row['product__category__name'] for row in rolled['category_data']},
+            {'饮料', '零食'},
+        )
+
+        # 直接修改汇总表，确认报表确实读取的是汇总
+        DailySalesRollup.objects.filter(product=self.cola).update(order_count=5)
+        trend = ReportService.get_sales_by_period(self.today, self.today)
+        self.assertEqual(len(trend), 1)
+        self.assertEqual(trend[0]['period'], self.today)
+        self.assertEqual(trend[0]['order_count'], 5)
+        self.assertEqual(trend[0]['total_sales'], Decimal('13.00'))
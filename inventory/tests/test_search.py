@@ -0,0 +1,114 @@
+import unittest
+from unittest import mock
+from decimal import Decimal
+
+from django.test import TestCase
+
+from inventory.models import Category, Product, ProductSearchDocument
+from inventory.services.product_service import search_products
+from inventory.services.search_service import ProductSearchService
+from inventory.utils.search_utils import build_query_terms, pinyin_available
+
+
+class ProductSearchServiceTest(TestCase):
+    """商品检索索引测试"""
+
+    def setUp(self):
+        self.drinks = Category.objects.create(name='饮料')
+        self.snacks = Category.objects.create(name='零食')
+        self.cola = self._product('6901234567890', '可口可乐', self.drinks, specification='500ml')
+        self.sprite = self._product('6901234567891', '雪碧汽水', self.drinks, manufacturer='可口可乐公司')
+        self.chips = self._product('6922222222222', '薯片', self.snacks, specification='原味')
+
+    def _product(self, barcode, name, category, **kwargs):
+        return Product.objects.create(
+            barcode=barcode, name=name, category=category,
+            price=Decimal('3.00'), cost=Decimal('1.50'), **kwargs
+        )
+
+    def test_backend_on_sqlite_is_fts5(self):
+        """SQLite 测试库使用 FTS5 索引"""
+        self.assertEqual(ProductSearchService.backend(), 'fts5')
+
+    def test_like_fallback_is_case_sensitive_match_on_lowercased_document(self):
+        """没有全文索引时按小写检索文档做 LIKE 匹配，不对列套 UPPER，可使用 trigram 索引"""
+        with mock.patch.object(ProductSearchService, 'backend', return_value='basic'):
+            results = ProductSearchService.search('可乐 500ML')
+            self.assertEqual(list(results), [self.cola])
+        nodes, lookups = [results.query.where], set()
+        while nodes:
+            node = nodes.pop()
+            nodes.extend(getattr(node, 'children', []))
+            if hasattr(node, 'lookup_name'):
+                lookups.add(node.lookup_name)
+        self.assertEqual(lookups, {'contains'})
+
+    def test_chinese_fragment_matches(self):
+        """中文名称片段可命中"""
+        self.assertEqual(list(ProductSearchService.search('可乐')), [self.cola, self.sprite])
+        self.assertEqual(list(ProductSearchService.search('汽水')), [self.sprite])
+
+    def test_barcode_fragment_matches(self):
+        """条码前缀与中间片段均可命中"""
+        self.assertEqual(set(ProductSearchService.search('690123')), {self.cola, self.sprite})
+        self.assertEqual(list(ProductSearchService.search('567890')), [self.cola])
+
+    def test_name_match_ranks_first(self):
+        """名称命中的商品排在仅厂商命中的商品之前"""
+        results = list(ProductSearchService.search('可口可乐'))
+        self.assertEqual(results[0], self.cola)
+
+    def test_all_terms_must_match(self):
+        """多个检索词需同时命中"""
+        self.assertEqual(list(ProductSearchService.search('可乐 500ml')), [self.cola])
+        self.assertEqual(list(ProductSearchService.search('薯片 可乐')), [])
+
+    def test_search_products_keeps_filters(self):
+        """search_products 保留分类和启用状态筛选"""
+        Product.objects.filter(pk=self.sprite.pk).update(is_active=False)
+        self.assertEqual(list(search_products('可乐')), [self.cola])
+        self.assertEqual(list(search_products('原味', category_id=self.snacks.id)), [self.chips])
+        self.assertEqual(list(search_products('原味', category_id=self.drinks.id)), [])
+
+    def test_product_save_updates_index(self):
+        """商品修改后检索文档同步更新"""
+        self.chips.name = '虾条'
+        self.chips.save()
+        self.assertEqual(list(ProductSearchService.search('虾条')), [self.chips])
+        self.assertEqual(list(ProductSearchService.search('薯片')), [])
+
+    def test_category_rename_updates_index(self):
+        """分类改名后该分类商品的检索文档同步更新"""
+        self.snacks.name = '膨化食品'
+        self.snacks.save()
+        self.assertEqual(list(ProductSearchService.search('膨化')), [self.chips])
+
+    def test_product_delete_removes_document(self):
+        """删除商品后检索文档随之删除"""
+        self.chips.delete()
+        self.assertFalse(ProductSearchDocument.objects.filter(product_id=self.chips.pk).exists())
+        self.assertEqual(list(ProductSearchService.search('薯片')), [])
+
+    def test_rebuild_restores_documents(self):
+        """重建命令恢复全部检索文档"""
+        ProductSearchDocument.objects.all().delete()
+        self.assertEqual(ProductSearchService.rebuild(chunk_size=2), 3)
+        self.assertEqual(list(ProductSearchService.search('薯片')), [self.chips])
+
+    def test_rebuild_warns_without_pinyin(self):
+        """未安装 pypinyin 时重建索引记录警告"""
+        with mock.patch('inventory.services.search_service.pinyin_available', return_value=False):
+            with self.assertLogs('inventory.services.search_service', level='WARNING') as logs:
+                ProductSearchService.rebuild()
+        self.assertIn('pypinyin', logs.output[0])
+
+    def test_query_without_terms_returns_nothing(self):
+        """只有标点的输入不返回结果"""
+        self.assertEqual(build_query_terms('  ,.  '), [])
+        self.assertFalse(ProductSearchService.search('  ,.  ').exists())
+
+    @unittest.skipUnless(pinyin_available(), '未安装 pypinyin')
+    def test_pinyin_matches(self):
+        """拼音全拼与首字母可命中"""
+        self.assertEqual(list(ProductSearchService.search('shupian')), [self.chips])
+        self.assertEqual(list(ProductSearchService.search('sp')), [self.chips])
@@ -0,0 +1,96 @@
+from collections import Counter
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase
+from django.utils import timezone
+
+from inventory.models import (
+    DailySalesRollup, Inventory, InventoryTransaction, Member, Product, ProductSearchDocument, RowCounter,
+    Sale, SaleItem,
+)
+from inventory.utils.synthetic_data import SyntheticDataGenerator
+
+
+class SyntheticDataGeneratorTest(TestCase):
+    """合成数据生成器测试"""
+
+    def generate(self, **kwargs):
+        options = dict(seed=7, categories=3, products=40, members=30, sales=600, days=60,
+                       end_date=date(2024, 3, 31), chunk_size=100)
+        options.update(kwargs)
+        return SyntheticDataGenerator(**options).generate()
+
+    def snapshot(self):
+        return list(Sale.objects.order_by('id').values_list(
+            'created_at', 'member__phone', 'final_amount', 'payment_method', 'status',
+        ))
+
+    def test_generates_requested_volume_within_range(self):
+        """生成指定数量的数据，时间落在指定区间内，派生数据同步更新"""
+        stats = self.generate()
+        self.assertEqual(stats['sales'], 600)
+        self.assertEqual(Sale.objects.count(), 600)
+        self.assertEqual(Product.objects.count(), 40)
+        self.assertEqual(Member.objects.count(), 30)
+        self.assertEqual(SaleItem.objects.count(), stats['sale_items'])
+
+        first = Sale.objects.order_by('created_at').first().created_at
+        last = Sale.objects.order_by('-created_at').first().created_at
+        self.assertGreaterEqual(timezone.localtime(first).date(), date(2024, 2, 1))
+        self.assertLessEqual(timezone.localtime(last).date(), date(2024, 3, 31))
+
+        self.assertEqual(RowCounter.objects.get(key='inventory.Sale').count, 600)
+        self.assertEqual(ProductSearchDocument.objects.count(), 40)
+        completed = Sale.objects.filter(status='COMPLETED').aggregate(total=Sum('final_amount'))['total']
+        rollup = DailySalesRollup.objects.aggregate(total=Sum('final_amount'))['total']
+        self.assertEqual(rollup, completed)
+        self.assertEqual(InventoryTransaction.objects.filter(transaction_type='OUT').count(),
+                         SaleItem.objects.filter(sale__status='COMPLETED').count())
+
+        # 会员累计消费与销售单一致
+        member = Member.objects.order_by('-purchase_count').first()
+        spend = Sale.objects.filter(member=member, status='COMPLETED').aggregate(total=Sum('final_amount'))['total']
+        self.assertEqual(member.total_spend, spend)
+
+    def test_distributions(self):
+        """少数热门商品贡献大部分销量，少数会员多次复购"""
+        self.generate()
+        quantities = sorted(
+            SaleItem.objects.values('product').annotate(total=Sum('quantity')).values_list('total', flat=True),
+            reverse=True,
+        )
+        top = sum(quantities[:len(quantities) // 5])
+        self.assertGreater(top / sum(quantities), 0.5)
+
+        visits = Counter(Sale.objects.exclude(member=None).values_list('member_id', flat=True))
+        self.assertGreater(max(visits.values()), 3 * sum(visits.values()) / len(visits) / 2)
+
+    def test_same_seed_is_reproducible(self):
+        """相同的种子生成相同的数据"""
+        self.generate()
+        first = self.snapshot()
+        SaleItem.objects.all().delete()
+        InventoryTransaction.objects.all().delete()
+        Sale.objects.all().delete()
+        Inventory.objects.all().delete()
+        ProductSearchDocument.objects.all().delete()
+        Product.objects.all().delete()
+        Member.objects.all().delete()
+
+        self.generate()
+        self.assertEqual(self.snapshot(), first)
+
+    def test_command_refuses_existing_synthetic_data(self):
+        """已有合成数据时不重复生成"""
+        out = StringIO()
+        call_command('generate_benchmark_data', '--sales', '20', '--products', '5', '--members', '5',
+                     '--days', '7', stdout=out)
+        self.assertIn('合成数据已写入', out.getvalue())
+        self.assertTrue(Inventory.objects.filter(quantity__gte=1000).exists())
+        with self.assertRaisesMessage(Exception, '已有合成数据'):
+            call_command('generate_benchmark_data', '--sales', '20', stdout=StringIO())
+        self.assertEqual(Product.objects.filter(price__lt=Decimal('1.00')).count(), 0)
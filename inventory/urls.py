@@ -36,14 +36,17 @@ from .views import sales as sales_views
 from .views import product as product_views
 from .views import inventory as inventory_views
 from .views import system as system_views  # 导入重构后的系统视图模块
+from .views import export_job as export_job_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('i18n/', include('django.conf.urls.i18n')),
     path('', core_views.index, name='index'),
     path('products/', product_views.product_list, name='product_list'),
+    path('products/export/', product_views.product_export, name='product_export'),
     path('inventory/', inventory_views.inventory_list, name='inventory_list'),
     path('sales/', sales_views.sale_list, name='sale_list'),
+    path('sales/export/', sales_views.sale_export, name='sale_export'),
     path('products/create/', product_views.product_create, name='product_create'),
     path('products/<int:pk>/edit/', product_views.product_update, name='product_edit'),
     path('products/<int:pk>/', product_views.product_detail, name='product_detail'),
@@ -104,6 +107,7 @@ urlpatterns = [
     path('inventory-checks/<int:check_id>/approve/', views_inventory_check.inventory_check_approve, name='inventory_check_approve'),
     path('inventory-checks/<int:check_id>/cancel/', views_inventory_check.inventory_check_cancel, name='inventory_check_cancel'),
     path('inventory-checks/<int:check_id>/items/<int:item_id>/', views_inventory_check.inventory_check_item_update, name='inventory_check_item_update'),
+    path('inventory-checks/<int:check_id>/scans/', views_inventory_check.inventory_check_scan_batch, name='inventory_check_scan_batch'),
     
     # 报表URL
     path('reports/', core_views.reports_index, name='reports_index'),
@@ -117,6 +121,12 @@ urlpatterns = [
     path('reports/recharge/', views_report.recharge_report, name='recharge_report'),
     path('reports/operation-logs/', views_report.operation_log_report, name='operation_log_report'),
     
+    # 后台导出任务
+    path('exports/', export_job_views.export_job_list, name='export_job_list'),
+    path('exports/submit/', export_job_views.export_job_submit, name='export_job_submit'),
+    path('exports/<int:job_id>/', export_job_views.export_job_status, name='export_job_status'),
+    path('exports/<int:job_id>/download/', export_job_views.export_job_download, name='export_job_download'),
+    
     # 销售明细路径
     path('sales/<int:sale_id>/', sales_views.sale_detail, name='sale_detail'),
     path('sales/<int:sale_id>/complete/', sales_views.sale_complete, name='sale_complete'),
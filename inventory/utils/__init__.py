@@ -1,11 +1,12 @@
 """工具函数包，提供各种辅助功能"""
 
 from .date_utils import get_month_range, get_quarter_range, get_year_range, get_date_range
-from .csv_utils import validate_csv, validate_csv_data
+from .csv_utils import validate_csv, validate_csv_data, iter_csv_rows, iter_chunks
 from .logging import log_operation
 from .query_utils import get_paginated_queryset, build_filter_query
 from .view_utils import require_ajax, require_post, get_referer_url, get_int_param
 from .image_utils import generate_thumbnail, save_thumbnail, image_to_base64, resize_image, get_image_dimensions
+from .rate_limit import RateLimiter
 import qrcode  # 添加qrcode导入
 
 # 尝试导入barcode_utils中的函数，如果失败则使用barcode_api中的替代实现
@@ -31,7 +32,7 @@ __all__ = [
     'get_month_range', 'get_quarter_range', 'get_year_range', 'get_date_range',
     
     # CSV处理工具
-    'validate_csv', 'validate_csv_data',
+    'validate_csv', 'validate_csv_data', 'iter_csv_rows', 'iter_chunks',
     
     # 日志工具
     'log_operation',
@@ -45,6 +46,9 @@ __all__ = [
     # 图片处理工具
     'generate_thumbnail', 'save_thumbnail', 'image_to_base64', 'resize_image', 'get_image_dimensions',
     
+    # 限流工具
+    'RateLimiter',
+    
     # 条码工具
     'generate_product_barcode', 'generate_batch_barcode', 'generate_qrcode',
 ] 
\ No newline at end of file
@@ -0,0 +1,218 @@
+"""
+性能基准测试工具：在生成的数据集上反复执行结算、报表、搜索、首页和盘点等场景，
+统计耗时分位数和查询次数
+"""
+import math
+import statistics
+import time
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from inventory.models import Inventory, InventoryCheck, Member, Product, Sale, SaleItem
+from inventory.services.dashboard_service import DASHBOARD_CACHE_KEY
+from inventory.services.report_service import ReportService
+from inventory.utils.synthetic_data import BENCHMARK_USERNAME
+
+DEFAULT_BASKET_SIZES = (1, 5, 20)
+REPORT_METHODS = (
+    'get_sales_by_period', 'get_top_selling_products', 'get_profit_report',
+    'get_member_analysis', 'get_inventory_turnover_rate',
+)
+REPORT_RANGES = (30, 365)
+
+
+def percentile(values, pct):
+    """最近秩法计算分位数"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def _consume(result):
+    """报表方法可能返回惰性查询集，取出全部结果使计时包含查询执行"""
+    if isinstance(result, dict):
+        for value in result.values():
+            _consume(value)
+    elif hasattr(result, '__iter__') and not isinstance(result, (str, bytes)):
+        for value in result:
+            _consume(value)
+
+
+class BenchmarkContext:
+    """
+    基准测试使用的登录客户端和取自数据集的固定参数
+
+    登录账号由 generate_benchmark_data 生成数据集时创建，这里只读取，不在任意数据库中创建或提升管理员
+    """
+
+    def __init__(self, basket_sizes=DEFAULT_BASKET_SIZES):
+        self.user = User.objects.filter(username=BENCHMARK_USERNAME, is_superuser=True).first()
+        if self.user is None:
+            raise RuntimeError('没有基准测试账号，请先执行 generate_benchmark_data 生成数据集')
+        host = next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h not in ('*', '')), 'localhost')
+        self.client = Client(SERVER_NAME=host)
+        self.client.force_login(self.user)
+
+        self.products = list(
+            Product.objects.filter(is_active=True, inventory__quantity__gte=1000)
+            .order_by('id').values('id', 'price', 'name')[:max(basket_sizes)]
+        )
+        self.member = Member.objects.filter(is_active=True).order_by('id').values('id', 'phone').first()
+        self.search_query = self.products[0]['name'][:4] if self.products else '商品'
+        self.today = timezone.localdate()
+
+    def sale_post_data(self, size):
+        data = {'payment_method': 'cash'}
+        for i, product in enumerate(self.products[:size]):
+            data[f'products[{i}][id]'] = str(product['id'])
+            data[f'products[{i}][quantity]'] = '1'
+            data[f'products[{i}][price]'] = str(product['price'])
+        return data
+
+    def get(self, name, *args, **params):
+        response = self.client.get(reverse(name, args=args), params)
+        if response.status_code != 200:
+            raise RuntimeError(f'{name} 返回 HTTP {response.status_code}')
+        return response
+
+    def post(self, name, data):
+        response = self.client.post(reverse(name), data)
+        if response.status_code != 302:
+            raise RuntimeError(f'{name} 返回 HTTP {response.status_code}，未完成提交')
+        return response
+
+
+def build_scenarios(ctx, basket_sizes=DEFAULT_BASKET_SIZES):
+    """
+    场景列表
+
+    Returns:
+        dict: {场景名称: (每次执行的函数, 是否写入数据)}，写入数据的场景每次执行后回滚
+    """
+    scenarios = {}
+    for size in basket_sizes:
+        data = ctx.sale_post_data(size)
+        scenarios[f'sale_create[{size}]'] = (lambda data=data: ctx.post('sale_create', data), True)
+
+    for days in REPORT_RANGES:
+        start = ctx.today - timedelta(days=days - 1)
+        for method in REPORT_METHODS:
+            func = getattr(ReportService, method)
+            scenarios[f'report.{method}[{days}d]'] = (
+                lambda func=func, start=start: _consume(func(start, ctx.today)), False,
+            )
+
+    scenarios['product_search_api'] = (lambda: ctx.get('product_search_api', query=ctx.search_query), False)
+    if ctx.member:
+        scenarios['member_search_by_phone[exact]'] = (
+            lambda: ctx.get('member_search_by_phone', ctx.member['phone']), False,
+        )
+        scenarios['member_search_by_phone[partial]'] = (
+            lambda: ctx.get('member_search_by_phone', ctx.member['phone'][-6:]), False,
+        )
+
+    def cold_index():
+        cache.delete(DASHBOARD_CACHE_KEY)
+        ctx.get('index')
+
+    scenarios['index[cold]'] = (cold_index, False)
+    scenarios['index[cached]'] = (lambda: ctx.get('index'), False)
+    scenarios['inventory_check_create'] = (
+        lambda: ctx.post('inventory_check_create', {'name': '基准测试盘点', 'description': ''}), True,
+    )
+    return scenarios
+
+
+def measure(func, iterations, warmup=1, rollback=False):
+    """
+    执行若干次并统计耗时和查询次数
+
+    Args:
+        func: 无参数的场景函数
+        iterations: 计入统计的执行次数
+        warmup: 预热次数，不计入统计
+        rollback: 为 True 时每次执行都在事务中进行并回滚，数据集保持不变；
+            事务提交后才执行的回调（如操作日志写入、缓存失效）因此不计入
+
+    Returns:
+        dict: 耗时分位数（毫秒）和查询次数
+    """
+    timings, queries = [], []
+    for i in range(warmup + iterations):
+        with transaction.atomic() if rollback else nullcontext():
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                func()
+                elapsed = (time.perf_counter() - started) * 1000
+            if rollback:
+                transaction.set_rollback(True)
+        if i >= warmup:
+            timings.append(elapsed)
+            queries.append(len(captured.captured_queries))
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'max_ms': round(max(timings), 3),
+        'queries': percentile(queries, 50),
+        'queries_max': max(queries),
+    }
+
+
+def _matches(scenario, name):
+    """场景名称完全相同，或以 name[ / name. 开头（如 sale_create 匹配全部购物车大小）"""
+    return scenario == name or scenario.startswith(f'{name}[') or scenario.startswith(f'{name}.')
+
+
+def dataset_summary():
+    """数据集规模，基准结果只有在相同数据集上才可比较"""
+    return {
+        model._meta.label: model.objects.count()
+        for model in (Product, Inventory, Member, Sale, SaleItem, InventoryCheck)
+    }
+
+
+def run_benchmarks(names=None, iterations=20, warmup=2, basket_sizes=DEFAULT_BASKET_SIZES, progress=None):
+    """
+    运行基准测试
+
+    Args:
+        names: 场景名称或名称前缀列表，如 ['sale_create', 'report.get_profit_report[30d]']，默认全部
+        iterations: 每个场景计入统计的执行次数
+        warmup: 每个场景的预热次数
+        basket_sizes: 结算场景的购物车商品数
+        progress: 每个场景完成后的回调，参数为 (场景名称, 结果)
+
+    Returns:
+        dict: {'vendor', 'dataset', 'scenarios': {场景名称: 结果}}
+    """
+    ctx = BenchmarkContext(basket_sizes)
+    if not ctx.products:
+        raise RuntimeError('没有库存充足的商品，请先执行 generate_benchmark_data 生成数据集')
+
+    scenarios = build_scenarios(ctx, basket_sizes)
+    if names:
+        unknown = [n for n in names if not any(_matches(s, n) for s in scenarios)]
+        if unknown:
+            raise ValueError(f'未知的场景: {", ".join(unknown)}')
+        scenarios = {s: v for s, v in scenarios.items() if any(_matches(s, n) for n in names)}
+
+    results = {}
+    for name, (func, writes) in scenarios.items():
+        results[name] = measure(func, iterations, warmup=warmup, rollback=writes)
+        if progress is not None:
+            progress(name, results[name])
+    return {
+        'vendor': connection.vendor,
+        'dataset': dataset_summary(),
+        'scenarios': results,
+    }
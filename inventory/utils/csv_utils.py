@@ -1,8 +1,10 @@
 """
 CSV文件处理工具函数
 """
+import codecs
 import csv
 import io
+from itertools import islice
 
 
 def validate_csv(csv_file, required_headers=None, expected_headers=None, max_rows=1000):
@@ -149,4 +151,39 @@ def validate_csv_data(csv_file, validators=None, required_headers=None):
     return {
         'valid': True,
         'row_count': row_num - 1  # 减去标题行
-    } 
\ No newline at end of file
+    }
+
+
+def iter_csv_rows(csv_file, encoding='utf-8-sig'):
+    """
+    逐行读取CSV文件，不把整个文件读入内存
+
+    参数:
+    - csv_file: 上传的文件对象或以二进制方式打开的文件
+    - encoding: 文件编码，默认自动去除UTF-8 BOM
+
+    返回:
+    - 迭代器，每次产生一行（字符串列表）
+    """
+    if hasattr(csv_file, 'seek'):
+        csv_file.seek(0)
+    decoder = codecs.getincrementaldecoder(encoding)()
+
+    def lines():
+        for line in csv_file:
+            yield line if isinstance(line, str) else decoder.decode(line)
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+
+    return csv.reader(lines())
+
+
+def iter_chunks(iterable, size):
+    """把迭代器按 size 个一组切分"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,221 @@
+"""
+大文件下载工具函数：流式生成的 zip 包和 HTTP Range 断点续传
+"""
+import hashlib
+import os
+import re
+import struct
+import time
+import zlib
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date, quote_etag
+
+READ_CHUNK_SIZE = 1024 * 1024
+# 超过该值的大小和偏移量写入 zip64 扩展字段
+ZIP64_LIMIT = 0xFFFFFFFF
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# 进程内 CRC 缓存：(路径, 大小, 修改时间) -> CRC32，避免断点续传时重复读取整个文件
+_crc_cache = {}
+
+
+def file_crc32(path):
+    """文件的 CRC32，按大小和修改时间缓存"""
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    if key not in _crc_cache:
+        crc = 0
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+                crc = zlib.crc32(chunk, crc)
+        _crc_cache[key] = crc
+    return _crc_cache[key]
+
+
+def _dos_datetime(timestamp):
+    t = time.localtime(timestamp)
+    if t.tm_year < 1980:
+        return 0, (1 << 5) | 1
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+class FileSource:
+    """磁盘上的单个文件"""
+
+    def __init__(self, path):
+        self.path = path
+        stat = os.stat(path)
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime
+        self.etag = quote_etag(f'{stat.st_size:x}-{stat.st_mtime_ns:x}')
+
+    def iter_range(self, start, end):
+        """按块读取 [start, end] 字节"""
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(READ_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+
+class StoredZip:
+    """
+    由磁盘文件组成的只存储（不压缩）zip 包
+
+    文件内容原样写入，CRC 事先已知（来自备份清单或缓存），因此总长度和每个字节的位置在生成前
+    就确定：下载时按需拼接文件头和文件内容，不写临时文件、不把整个包读入内存，并且可以从任意
+    偏移量开始输出，支持断点续传。备份中的数据文件本身已压缩，再次压缩没有意义。
+    """
+
+    def __init__(self, entries):
+        """
+        Args:
+            entries: [(文件路径, 包内名称, CRC32 或 None), ...]
+        """
+        self.segments = []  # (包内偏移量, 长度, bytes 或 文件路径)
+        self.mtime = 0
+        central_directory = []
+        offset = 0
+        fingerprint = hashlib.sha1()
+
+        for path, arcname, crc in entries:
+            stat = os.stat(path)
+            size = stat.st_size
+            if crc is None:
+                crc = file_crc32(path)
+            self.mtime = max(self.mtime, stat.st_mtime)
+            fingerprint.update(f'{arcname}\0{size}\0{stat.st_mtime_ns}\0{crc}\n'.encode('utf-8'))
+
+            name = arcname.replace(os.sep, '/').encode('utf-8')
+            flags = 0x800 if not arcname.isascii() else 0
+            dos_time, dos_date = _dos_datetime(stat.st_mtime)
+            large = size >= ZIP64_LIMIT
+            version = 45 if large or offset >= ZIP64_LIMIT else 20
+
+            extra = struct.pack('<HHQQ', 0x0001, 16, size, size) if large else b''
+            header_size = 0xFFFFFFFF if large else size
+            local_header = struct.pack(
+                '<IHHHHHIIIHH', 0x04034b50, version, flags, 0, dos_time, dos_date,
+                crc, header_size, header_size, len(name), len(extra),
+            ) + name + extra
+            self._add(offset, local_header)
+            self.segments.append((offset + len(local_header), size, path))
+
+            central_fields = []
+            if large:
+                central_fields += [size, size]
+            if offset >= ZIP64_LIMIT:
+                central_fields.append(offset)
+            central_extra = (
+                struct.pack(f'<HH{len(central_fields)}Q', 0x0001, 8 * len(central_fields), *central_fields)
+                if central_fields else b''
+            )
+            central_directory.append(struct.pack(
+                '<IHHHHHHIIIHHHHHII', 0x02014b50, (3 << 8) | version, version, flags, 0,
+                dos_time, dos_date, crc, header_size, header_size, len(name), len(central_extra), 0, 0, 0,
+                (stat.st_mode & 0xFFFF) << 16, min(offset, 0xFFFFFFFF),
+            ) + name + central_extra)
+            offset += len(local_header) + size
+
+        count = len(central_directory)
+        central_directory = b''.join(central_directory)
+        self._add(offset, central_directory)
+        cd_offset, cd_size = offset, len(central_directory)
+        offset += cd_size
+
+        end = b''
+        if count >= 0xFFFF or cd_offset >= ZIP64_LIMIT or cd_size >= ZIP64_LIMIT:
+            end += struct.pack('<IQHHIIQQQQ', 0x06064b50, 44, (3 << 8) | 45, 45, 0, 0,
+                               count, count, cd_size, cd_offset)
+            end += struct.pack('<IIQI', 0x07064b50, 0, offset, 1)
+        end += struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, min(count, 0xFFFF), min(count, 0xFFFF),
+                           min(cd_size, 0xFFFFFFFF), min(cd_offset, 0xFFFFFFFF), 0)
+        self._add(offset, end)
+
+        self.size = offset + len(end)
+        self.etag = quote_etag(fingerprint.hexdigest())
+
+    def _add(self, offset, data):
+        if data:
+            self.segments.append((offset, len(data), data))
+
+    def iter_range(self, start, end):
+        """输出包内 [start, end] 字节"""
+        for offset, length, payload in self.segments:
+            if offset + length <= start:
+                continue
+            if offset > end:
+                break
+            begin = max(start, offset) - offset
+            stop = min(end + 1, offset + length) - offset
+            if isinstance(payload, bytes):
+                yield payload[begin:stop]
+            else:
+                yield from FileSource(payload).iter_range(begin, stop - 1)
+
+
+def parse_range(header, size):
+    """
+    解析单个 Range 请求头
+
+    Returns:
+        (start, end): 闭区间；请求头不存在或无法识别时返回 None（返回完整内容）；
+        范围无法满足时返回 False
+    """
+    match = RANGE_RE.match(header or '')
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        # bytes=-N：最后 N 个字节
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def ranged_response(request, source, filename, content_type='application/octet-stream'):
+    """
+    支持 Range / If-Range 的下载响应
+
+    source 为 FileSource 或 StoredZip。完整下载磁盘文件时使用 FileResponse，由 WSGI 服务器的
+    wsgi.file_wrapper（gunicorn、uWSGI 使用 sendfile）发送；其余情况按块流式输出。
+    """
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range or if_range in (source.etag, http_date(source.mtime)):
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), source.size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{source.size}'
+    elif byte_range is None:
+        if isinstance(source, FileSource):
+            response = FileResponse(open(source.path, 'rb'), content_type=content_type)
+        else:
+            response = StreamingHttpResponse(source.iter_range(0, source.size - 1), content_type=content_type)
+        response['Content-Length'] = source.size
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(source.iter_range(start, end), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{source.size}'
+        response['Content-Length'] = end - start + 1
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = source.etag
+    response['Last-Modified'] = http_date(source.mtime)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
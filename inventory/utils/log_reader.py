@@ -0,0 +1,116 @@
+"""
+日志文件读取工具函数：从文件末尾按块倒序读取，不把整个日志读入内存
+"""
+import os
+import re
+
+from django.core.cache import cache
+
+BLOCK_SIZE = 64 * 1024
+# 单次搜索最多扫描的字节数，超过后返回当前位置，由调用方继续向前搜索
+MAX_SCAN_BYTES = 64 * 1024 * 1024
+LINE_COUNT_CACHE_TIMEOUT = 7 * 24 * 3600
+
+# 日志文件名：inventory.log 及轮转后的 inventory.log.1 等
+LOG_FILE_RE = re.compile(r'^[\w.-]+\.log(\.\d+)?$')
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+
+
+def iter_lines_backward(f, end, block_size=None):
+    """
+    从 end 偏移量向文件开头倒序逐行读取
+
+    Yields:
+        (行起始偏移量, 行内容 bytes，不含换行符)
+    """
+    if end <= 0:
+        return
+    block_size = block_size or BLOCK_SIZE
+    position = end
+    remainder = b''
+    while position > 0:
+        read_size = min(block_size, position)
+        position -= read_size
+        f.seek(position)
+        block = f.read(read_size) + remainder
+        lines = block.split(b'\n')
+        # 第一段可能是不完整的行，留到读取前一块时拼接
+        remainder = lines[0]
+        offset = position + len(remainder) + 1
+        line_offsets = []
+        for line in lines[1:]:
+            line_offsets.append((offset, line))
+            offset += len(line) + 1
+        yield from reversed(line_offsets)
+    yield 0, remainder
+
+
+def read_lines_backward(path, limit, before=None, pattern=None, level=None, max_scan_bytes=MAX_SCAN_BYTES):
+    """
+    读取 before 偏移量之前最后 limit 行（可按正则和日志级别过滤）
+
+    Args:
+        path: 日志文件路径
+        limit: 最多返回的行数
+        before: 只读取该字节偏移量之前的内容，None 表示文件末尾
+        pattern: 已编译的正则表达式，只返回匹配的行
+        level: 日志级别，只返回以该级别开头的行
+        max_scan_bytes: 本次最多向前扫描的字节数
+
+    Returns:
+        dict: lines 按文件顺序排列的行；next_before 继续向前读取时使用的偏移量，
+              已读到文件开头时为 None
+    """
+    size = os.path.getsize(path)
+    end = size if before is None else max(0, min(before, size))
+    prefix = f'{level} '.encode() if level else None
+    matched = []
+    next_before = None
+
+    with open(path, 'rb') as f:
+        # 读取位置前的换行符属于上一行，之后没有内容，不算一行
+        if end > 0:
+            f.seek(end - 1)
+            if f.read(1) == b'\n':
+                end -= 1
+        for offset, raw in iter_lines_backward(f, end):
+            if end - offset > max_scan_bytes:
+                next_before = offset + len(raw) + 1
+                break
+            if prefix and not raw.startswith(prefix):
+                continue
+            line = raw.decode('utf-8', errors='replace').rstrip('\r')
+            if pattern and not pattern.search(line):
+                continue
+            matched.append(line)
+            if len(matched) >= limit:
+                next_before = offset if offset > 0 else None
+                break
+
+    matched.reverse()
+    return {'lines': matched, 'next_before': next_before, 'file_size': size}
+
+
+def count_lines(path):
+    """
+    文件行数，结果按文件缓存
+
+    日志只会追加：文件变大时只统计新增部分；inode 变化或文件变小（被轮转或截断）时重新统计。
+    轮转后的旧文件不再变化，只统计一次。
+    """
+    stat = os.stat(path)
+    key = f'log_line_count:{os.path.abspath(path)}'
+    cached = cache.get(key)
+    if cached and cached['inode'] == stat.st_ino and cached['size'] <= stat.st_size:
+        start, lines = cached['size'], cached['lines']
+    else:
+        start, lines = 0, 0
+
+    if start < stat.st_size:
+        with open(path, 'rb') as f:
+            f.seek(start)
+            for block in iter(lambda: f.read(BLOCK_SIZE * 16), b''):
+                lines += block.count(b'\n')
+                start += len(block)
+        cache.set(key, {'inode': stat.st_ino, 'size': start, 'lines': lines}, LINE_COUNT_CACHE_TIMEOUT)
+    return lines
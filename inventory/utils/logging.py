@@ -54,6 +54,66 @@ def log_action(user, operation_type, details, related_object=None):
     log_entry.save()
     return log_entry
 
+class _PendingOperationLogs:
+    """
+    OperationLog rows queued inside one transaction (or savepoint).
+
+    Registered with transaction.on_commit and written with a single bulk_create
+    once the transaction commits; discarded by Django if it rolls back.
+    """
+
+    def __init__(self):
+        self.entries = []
+
+    def add(self, user, operation_type, details, model, object_id):
+        self.entries.append((user, operation_type, details, model, object_id))
+
+    def __call__(self):
+        from inventory.models import OperationLog
+
+        # ContentTypeManager caches per process; unseen models are fetched in one query
+        content_types = ContentType.objects.get_for_models(*{entry[3] for entry in self.entries})
+        OperationLog.objects.bulk_create([
+            OperationLog(
+                operator=user,
+                operation_type=operation_type,
+                details=details,
+                related_content_type=content_types[model],
+                related_object_id=object_id,
+            )
+            for user, operation_type, details, model, object_id in self.entries
+        ])
+
+def _pending_operation_logs():
+    """Return the buffer for the current transaction level, registering it on first use."""
+    connection = transaction.get_connection()
+    savepoint_ids = set(connection.savepoint_ids)
+    for entry in connection.run_on_commit:
+        if isinstance(entry[1], _PendingOperationLogs) and entry[0] == savepoint_ids:
+            return entry[1]
+    pending = _PendingOperationLogs()
+    transaction.on_commit(pending)
+    return pending
+
+def log_action_on_commit(user, operation_type, details, related_object=None):
+    """
+    Log an action once the surrounding transaction commits.
+
+    Inside an atomic block the row is buffered and all rows queued in the same
+    transaction are inserted with one bulk_create on commit, so per-line logging
+    does not add an INSERT per line. Outside a transaction it behaves like
+    log_action.
+    """
+    if not transaction.get_connection().in_atomic_block:
+        return log_action(user, operation_type, details, related_object)
+
+    if related_object:
+        model, object_id = related_object.__class__, related_object.pk
+    else:
+        model, object_id = User, user.id
+    _pending_operation_logs().add(user, operation_type, details, model, object_id)
+    return None
+
 def log_operation(user, operation_type, details, related_object=None, request=None):
     """
     记录系统操作日志的主要入口函数
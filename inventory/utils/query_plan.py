@@ -0,0 +1,134 @@
+"""
+查询计划工具函数：对报表和列表页的热点查询执行 EXPLAIN，记录执行计划并检查全表扫描
+"""
+import re
+import statistics
+import time
+from datetime import timedelta
+
+from django.db import connections
+from django.db.models import Sum
+from django.utils import timezone
+
+from inventory.models import (
+    Inventory, InventoryCheckItem, InventoryTransaction, Member, OperationLog, Product, Sale, SaleItem,
+)
+from inventory.services.search_service import ProductSearchService
+
+# SQLite: "SCAN inventory_sale"（未使用索引）；"SCAN ... USING INDEX" 为按索引顺序读取，不算全表扫描
+SQLITE_FULL_SCAN_RE = re.compile(r'\bSCAN (?:TABLE )?(\w+)(?! USING)(?:\s|$)')
+POSTGRES_FULL_SCAN_RE = re.compile(r'Seq Scan on (\w+)')
+
+
+def _sample_params():
+    """从现有数据中取查询参数，表为空时使用不存在的 id，执行计划仍然有效"""
+    now = timezone.now()
+    sale = Sale.objects.filter(member__isnull=False).order_by('-id').values('id', 'member_id').first() or {}
+    item = SaleItem.objects.order_by('-id').values('sale_id', 'product_id').first() or {}
+    return {
+        'start': now - timedelta(days=30),
+        'end': now,
+        'month': now.month,
+        'member_id': sale.get('member_id', 0),
+        'sale_id': item.get('sale_id', 0),
+        'product_id': item.get('product_id') or Product.objects.values_list('id', flat=True).first() or 0,
+        'check_id': InventoryCheckItem.objects.values_list('inventory_check_id', flat=True).first() or 0,
+        # 拼音检索词，长度不少于 3 个字符才能用上 trigram 索引
+        'search_query': 'kele',
+    }
+
+
+# 热点查询：与视图和服务中的查询保持一致，新增列表或报表查询时在此登记
+HOT_QUERIES = {
+    'sale_list': lambda p: Sale.objects.select_related('member').order_by('-created_at', '-id')[:21],
+    'sales_by_range': lambda p: Sale.objects.filter(
+        created_at__range=(p['start'], p['end'])).values('created_at', 'final_amount'),
+    'member_sales': lambda p: Sale.objects.filter(member_id=p['member_id']).order_by('-created_at')[:20],
+    'top_products': lambda p: SaleItem.objects.filter(sale__created_at__range=(p['start'], p['end']))
+    .values('product_id').annotate(total_quantity=Sum('quantity')).order_by('-total_quantity')[:10],
+    'sale_item_lookup': lambda p: SaleItem.objects.filter(sale_id=p['sale_id'], product_id=p['product_id']),
+    'product_transactions': lambda p: InventoryTransaction.objects.filter(
+        product_id=p['product_id']).order_by('-created_at')[:50],
+    'operation_logs': lambda p: OperationLog.objects.filter(
+        timestamp__range=(p['start'], p['end'])).order_by('-timestamp')[:50],
+    'birthday_members': lambda p: Member.objects.filter(
+        birthday__isnull=False, birthday__month=p['month'], is_active=True,
+    ).order_by('birthday__day').values('id', 'name', 'phone', 'birthday')[:10],
+    'inventory_list': lambda p: Inventory.objects.select_related('product', 'product__category')
+    .order_by('product__name', 'product_id')[:51],
+    'active_products': lambda p: Product.objects.filter(is_active=True).order_by('-updated_at', '-id')[:21],
+    'unchecked_items': lambda p: InventoryCheckItem.objects.filter(
+        inventory_check_id=p['check_id'], actual_quantity__isnull=True),
+}
+
+# 只在特定数据库上检查的热点查询：SQLite 的商品检索走 FTS5 虚拟表，不适用全表扫描检查
+VENDOR_HOT_QUERIES = {
+    'postgresql': {
+        'product_search': lambda p: ProductSearchService.search(p['search_query'])[:20],
+    },
+}
+
+
+def hot_queries(vendor):
+    """指定数据库上需要检查的热点查询"""
+    return {**HOT_QUERIES, **VENDOR_HOT_QUERIES.get(vendor, {})}
+
+
+def full_scans(plan, vendor):
+    """从执行计划文本中找出全表扫描的表名"""
+    if vendor == 'sqlite':
+        return sorted(set(SQLITE_FULL_SCAN_RE.findall(plan)))
+    if vendor == 'postgresql':
+        return sorted(set(POSTGRES_FULL_SCAN_RE.findall(plan)))
+    return []
+
+
+def explain_hot_queries(names=None, repeat=0, using='default'):
+    """
+    对热点查询执行 EXPLAIN，可选实际执行若干次计时
+
+    Args:
+        names: 查询名称列表，默认全部
+        repeat: 每个查询实际执行的次数，0 表示只取执行计划
+        using: 数据库别名
+
+    Returns:
+        dict: {查询名称: {'sql', 'plan', 'full_scans', 'p50_ms'}}
+    """
+    vendor = connections[using].vendor
+    queries = hot_queries(vendor)
+    params = _sample_params()
+    results = {}
+    for name in names or queries:
+        queryset = queries[name](params).using(using)
+        plan = queryset.explain()
+        result = {
+            'sql': str(queryset.query),
+            'plan': plan,
+            'full_scans': full_scans(plan, vendor),
+        }
+        if repeat:
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            result['p50_ms'] = round(statistics.median(timings), 3)
+        results[name] = result
+    return results
+
+
+def plan_regressions(baseline, current):
+    """
+    与基线比较，返回新增全表扫描的查询 {查询名称: [新增全表扫描的表]}
+
+    基线中没有的查询不做比较。
+    """
+    regressions = {}
+    for name, result in current.items():
+        if name not in baseline:
+            continue
+        added = sorted(set(result['full_scans']) - set(baseline[name]['full_scans']))
+        if added:
+            regressions[name] = added
+    return regressions
@@ -1,7 +1,13 @@
+from django.core.paginator import Paginator
 from django.db.models import Prefetch, Q, Count, Sum, Avg, F, ExpressionWrapper, DecimalField
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
 from functools import wraps
+from urllib.parse import urlencode
+import base64
+import binascii
+import json
 import time
 
 def optimize_query(queryset, select_fields=None, prefetch_fields=None):
@@ -64,6 +70,177 @@ def paginate_queryset(queryset, page_number, items_per_page=20):
     
     return paginated_queryset
 
+class CountedPaginator(Paginator):
+    """
+    使用已知总数的分页器
+
+    count 由调用方提供（来自计数器或查询计划估计）时不再执行 COUNT(*)；
+    estimated 为 True 表示总数是估计值，页面上显示为约数。
+    """
+
+    def __init__(self, object_list, per_page, count=None, estimated=False, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if count is not None:
+            self.count = count
+        self.estimated = estimated
+
+
+class KeysetPage:
+    """
+    键集分页的一页数据
+
+    提供与 Django Page 相同的 has_next / has_previous / has_other_pages 接口，
+    翻页使用 next_cursor / previous_cursor 而不是页码。
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def _resolve_field(model, name):
+    """按 a__b 形式的字段路径找到最终的模型字段"""
+    field = None
+    for part in name.split('__'):
+        field = model._meta.pk if part == 'pk' else model._meta.get_field(part)
+        model = field.related_model or model
+    return field
+
+
+def _resolve_value(obj, name):
+    for part in name.split('__'):
+        obj = getattr(obj, part)
+    return obj
+
+
+def _encode_cursor(values, reverse=False):
+    values = [
+        value.isoformat() if isinstance(value, (date, datetime, dt_time))
+        else str(value) if isinstance(value, Decimal)
+        else value
+        for value in values
+    ]
+    raw = json.dumps({'k': values, 'r': reverse}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor, fields):
+    """解析游标，无法识别时返回 None（从第一页开始）"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data = json.loads(raw)
+        values = data['k']
+        if len(values) != len(fields):
+            return None
+        return [field.to_python(value) for field, value in zip(fields, values)], bool(data.get('r'))
+    except (binascii.Error, ValueError, TypeError, KeyError, AttributeError):
+        return None
+
+
+def keyset_paginate(queryset, ordering, cursor=None, per_page=20):
+    """
+    键集（游标）分页
+
+    OFFSET 分页翻到深页时数据库仍需扫描并丢弃前面的所有行；键集分页用上一页最后一行的
+    排序键作为条件（WHERE (a, b) < (x, y)），配合与排序一致的索引，任意深度的页都只读取
+    本页的行，也不需要 COUNT(*)。
+
+    Args:
+        queryset: 要分页的查询集
+        ordering: 排序字段列表，如 ['-created_at', '-id']，最后一个字段必须唯一且各字段不能为空
+        cursor: 上一次返回的 next_cursor / previous_cursor，None 表示第一页
+        per_page: 每页显示的项目数
+
+    Returns:
+        KeysetPage
+    """
+    keys = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+    fields = [_resolve_field(queryset.model, name) for name, _ in keys]
+    decoded = _decode_cursor(cursor, fields) if cursor else None
+    values, reverse = decoded if decoded else (None, False)
+
+    # 向前翻页时反向排序取数据，再倒回正常顺序
+    queryset = queryset.order_by(*[
+        ('-' if descending != reverse else '') + name for name, descending in keys
+    ])
+    if values is not None:
+        condition = Q()
+        for i, (name, descending) in enumerate(keys):
+            lookup = 'lt' if descending != reverse else 'gt'
+            clause = Q(**{f'{name}__{lookup}': values[i]})
+            for (prev_name, _), prev_value in zip(keys[:i], values):
+                clause &= Q(**{prev_name: prev_value})
+            condition |= clause
+        # 首个字段的范围条件让数据库直接从索引的对应位置开始扫描
+        first_name, first_descending = keys[0]
+        bound = 'lte' if first_descending != reverse else 'gte'
+        queryset = queryset.filter(**{f'{first_name}__{bound}': values[0]}).filter(condition)
+
+    rows = list(queryset[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if reverse:
+        rows.reverse()
+    if not rows:
+        return KeysetPage([])
+
+    def key_of(obj):
+        return [_resolve_value(obj, name) for name, _ in keys]
+
+    if reverse:
+        next_cursor = _encode_cursor(key_of(rows[-1]))
+        previous_cursor = _encode_cursor(key_of(rows[0]), reverse=True) if has_more else None
+    else:
+        next_cursor = _encode_cursor(key_of(rows[-1])) if has_more else None
+        previous_cursor = _encode_cursor(key_of(rows[0]), reverse=True) if values is not None else None
+    return KeysetPage(rows, next_cursor, previous_cursor)
+
+
+def keyset_page_data(page, serialize):
+    """
+    键集分页结果的 JSON 数据，供前端增量加载
+
+    Args:
+        page: KeysetPage
+        serialize: 将单个对象转换为字典的函数
+    """
+    return {
+        'results': [serialize(obj) for obj in page],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    }
+
+
+def page_querystring(params, exclude=('cursor', 'page', 'format')):
+    """当前筛选条件的查询字符串（去掉分页参数），用于生成翻页链接"""
+    return urlencode([
+        (key, value)
+        for key in params
+        if key not in exclude
+        for value in params.getlist(key)
+        if value
+    ])
+
+
 def get_filtered_queryset(queryset, filter_params):
     """
     根据过滤参数过滤查询集
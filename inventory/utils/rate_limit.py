@@ -0,0 +1,39 @@
+"""
+限流工具
+"""
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    线程安全的令牌桶限流器
+
+    Args:
+        rate: 每秒允许的请求数，None 或 0 表示不限流
+        burst: 允许的突发请求数
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate or 0
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取得一个令牌，必要时阻塞等待；返回等待的秒数"""
+        if not self.rate:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
@@ -0,0 +1,97 @@
+"""
+商品搜索分词工具
+
+把商品字段转换为以空格分隔的检索词文档，并把用户输入转换为检索词：
+- 中文按单字和相邻双字切分，两个字即可命中；
+- 英文和数字按单词切分，查询时做前缀匹配；
+- 条码额外写入所有长度不小于3的后缀，前缀匹配后缀即等价于条码子串匹配；
+- 安装了 pypinyin 时，商品名称额外写入全拼和首字母（如 可乐 -> kele、kl）。
+"""
+import re
+
+try:
+    from pypinyin import lazy_pinyin, Style
+except ImportError:  # 已列入 requirements.txt；缺失时拼音检索不可用，重建索引时记录警告
+    lazy_pinyin = None
+    Style = None
+
+CJK_RE = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]+')
+WORD_RE = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]+|[0-9a-z]+')
+MIN_SUFFIX_LENGTH = 3
+
+
+def pinyin_available():
+    """是否支持拼音检索"""
+    return lazy_pinyin is not None
+
+
+def _cjk_grams(run):
+    """中文片段切分为单字和双字"""
+    grams = list(run)
+    grams.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return grams
+
+
+def tokenize(text):
+    """把一段文本切分为检索词"""
+    tokens = []
+    for run in WORD_RE.findall((text or '').lower()):
+        if CJK_RE.fullmatch(run):
+            tokens.extend(_cjk_grams(run))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def pinyin_tokens(text):
+    """中文文本的全拼和首字母检索词，未安装 pypinyin 时为空"""
+    if not pinyin_available():
+        return []
+    tokens = []
+    for run in CJK_RE.findall(text or ''):
+        syllables = lazy_pinyin(run)
+        initials = lazy_pinyin(run, style=Style.FIRST_LETTER)
+        tokens.append(''.join(syllables).lower())
+        tokens.append(''.join(initials).lower())
+    return tokens
+
+
+def barcode_suffixes(barcode):
+    """条码的全部后缀（长度不小于3）"""
+    barcode = re.sub(r'[^0-9a-z]', '', (barcode or '').lower())
+    return [barcode[i:] for i in range(len(barcode) - MIN_SUFFIX_LENGTH + 1)] or ([barcode] if barcode else [])
+
+
+def build_search_document(name='', barcode='', specification='', manufacturer='',
+                          category='', color='', size=''):
+    """
+    生成商品的检索词文档
+
+    Returns:
+        str: 去重后以空格分隔的检索词
+    """
+    tokens = []
+    for text in (name, specification, manufacturer, category, color, size):
+        tokens.extend(tokenize(text))
+    tokens.extend(barcode_suffixes(barcode))
+    tokens.extend(pinyin_tokens(name))
+    return ' '.join(dict.fromkeys(token for token in tokens if token))
+
+
+def build_query_terms(query):
+    """
+    把用户输入转换为检索词
+
+    Returns:
+        list: [(检索词, 是否前缀匹配)]，所有检索词需同时命中
+    """
+    terms = []
+    for run in WORD_RE.findall((query or '').lower()):
+        if CJK_RE.fullmatch(run):
+            if len(run) == 1:
+                terms.append((run, False))
+            else:
+                terms.extend((run[i:i + 2], False) for i in range(len(run) - 1))
+        else:
+            terms.append((run, True))
+    return list(dict.fromkeys(terms))
@@ -0,0 +1,310 @@
+"""
+合成数据生成工具：按固定随机种子用 bulk_create 分批生成大规模销售数据，用于性能测试
+
+分布特征：
+- 季节性：每日单量受周末、年内季节（春节前后和年末高峰）和逐年增长影响，日内集中在午间和傍晚
+- 商品热度：按 Zipf 分布，少数热门商品贡献大部分销量
+- 会员复购：会员活跃度服从 Pareto 分布，少数会员多次复购，多数会员只购买一两次
+"""
+import math
+import random
+from contextlib import contextmanager
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from inventory.models import (
+    Category, Inventory, InventoryTransaction, Member, MemberLevel, Product, Sale, SaleItem,
+)
+
+# 合成商品条码和会员号前缀，用于识别已生成的数据
+BARCODE_PREFIX = '29'
+MEMBER_ID_PREFIX = 'SYN'
+# 合成数据的操作员，也是基准测试登录的账号；只在生成数据集时创建
+BENCHMARK_USERNAME = 'benchmark'
+
+PAYMENT_WEIGHTS = {'wechat': 45, 'alipay': 30, 'cash': 15, 'card': 8, 'balance': 2}
+# 0-23 点各小时的相对客流
+HOURLY_WEIGHTS = [0, 0, 0, 0, 0, 0, 1, 3, 6, 7, 8, 10, 12, 9, 7, 7, 8, 10, 12, 11, 8, 5, 2, 1]
+MEMBER_LEVELS = [('普通会员', '1.00', 0), ('银卡会员', '0.95', 1000), ('金卡会员', '0.90', 5000)]
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """暂时关闭 auto_now / auto_now_add，使 bulk_create 保留指定的历史时间"""
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def cents(value):
+    return Decimal(value).scaleb(-2)
+
+
+class SyntheticDataGenerator:
+    """
+    合成数据生成器
+
+    同一随机种子和参数生成完全相同的数据（主键取决于数据库中已有的数据）。
+    """
+
+    def __init__(self, seed=42, categories=20, products=2000, members=20000, sales=100000,
+                 days=365, member_share=0.6, end_date=None, chunk_size=5000, progress=None):
+        self.rng = random.Random(seed)
+        self.num_categories = categories
+        self.num_products = products
+        self.num_members = members
+        self.num_sales = sales
+        self.days = days
+        self.member_share = member_share
+        self.end_date = end_date or timezone.localdate()
+        self.start_date = self.end_date - timedelta(days=days - 1)
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.stats = {}
+
+    def generate(self):
+        """
+        生成全部数据并修正派生数据（行数计数、销售汇总、商品检索文档）
+
+        Returns:
+            dict: 各类数据的生成数量
+        """
+        if not connection.features.can_return_rows_from_bulk_insert:
+            raise RuntimeError('当前数据库不支持批量插入后返回主键，请使用 SQLite 3.35+ 或 PostgreSQL')
+        if Product.objects.filter(barcode=f'{BARCODE_PREFIX}{0:011d}').exists():
+            raise RuntimeError('数据库中已有合成数据，请在新的数据库中生成')
+
+        self.operator, _ = User.objects.get_or_create(
+            username=BENCHMARK_USERNAME, defaults={'is_staff': True, 'is_superuser': True},
+        )
+        with explicit_timestamps(Category, Product, Inventory, InventoryTransaction, Member, Sale):
+            with transaction.atomic():
+                self.create_catalog()
+                self.create_members()
+            self.create_sales()
+        self.refresh_derived_data()
+        return self.stats
+
+    def report(self, message):
+        if self.progress is not None:
+            self.progress(message)
+
+    def local_datetime(self, day, hour=0, minute=0, second=0):
+        return timezone.make_aware(datetime.combine(day, dt_time(hour, minute, second)))
+
+    def create_catalog(self):
+        """分类、商品（价格服从对数正态分布）和初始库存"""
+        rng = self.rng
+        opened = self.local_datetime(self.start_date - timedelta(days=30))
+        names = [f'合成分类{i + 1:03d}' for i in range(self.num_categories)]
+        Category.objects.bulk_create(
+            [Category(name=name, created_at=opened, updated_at=opened) for name in names],
+            ignore_conflicts=True,
+        )
+        categories = list(Category.objects.filter(name__in=names).order_by('name'))
+
+        products = []
+        for i in range(self.num_products):
+            price = max(100, int(rng.lognormvariate(math.log(1500), 0.8)))
+            products.append(Product(
+                barcode=f'{BARCODE_PREFIX}{i:011d}',
+                name=f'合成商品{i + 1:06d}',
+                category=categories[i % len(categories)],
+                price=cents(price),
+                cost=cents(int(price * rng.uniform(0.5, 0.8))),
+                created_at=opened,
+                updated_at=opened,
+                is_active=rng.random() > 0.03,
+            ))
+        self.products = Product.objects.bulk_create(products, batch_size=self.chunk_size)
+
+        # 初始库存足够覆盖生成的销量，结算测试不会因缺货失败
+        stock = max(1000, self.num_sales * 3)
+        Inventory.objects.bulk_create(
+            [Inventory(product=p, quantity=stock, warning_level=10, created_at=opened, updated_at=opened)
+             for p in self.products],
+            batch_size=self.chunk_size,
+        )
+        InventoryTransaction.objects.bulk_create(
+            [InventoryTransaction(product=p, transaction_type='IN', quantity=stock, operator=self.operator,
+                                  notes='合成数据初始库存', created_at=opened)
+             for p in self.products],
+            batch_size=self.chunk_size,
+        )
+
+        # Zipf 分布：打乱后第 k 个商品的热度与 1/k 成正比
+        ranked = list(self.products)
+        rng.shuffle(ranked)
+        self.ranked_products = ranked
+        self.product_cum_weights = list(_cumulative(1 / (k + 1) ** 1.1 for k in range(len(ranked))))
+        self.stats.update(categories=len(categories), products=len(self.products))
+        self.report(f'已生成 {len(self.products)} 个商品')
+
+    def create_members(self):
+        """会员及其活跃度，注册时间分布在统计区间开始前一年内"""
+        rng = self.rng
+        levels = []
+        for name, discount, threshold in MEMBER_LEVELS:
+            level, _ = MemberLevel.objects.get_or_create(
+                name=name, defaults={'discount': Decimal(discount), 'points_threshold': threshold},
+            )
+            levels.append(level)
+
+        first = self.local_datetime(self.start_date - timedelta(days=365))
+        members = []
+        for i in range(self.num_members):
+            joined = first + timedelta(seconds=rng.randrange(365 * 86400))
+            members.append(Member(
+                member_id=f'{MEMBER_ID_PREFIX}{i:08d}',
+                name=f'会员{i + 1:06d}',
+                phone=f'199{i:08d}',
+                gender=rng.choice('MFO'),
+                birthday=date(1960, 1, 1) + timedelta(days=rng.randrange(45 * 365)),
+                level=rng.choices(levels, weights=(80, 15, 5))[0],
+                is_active=rng.random() > 0.05,
+                created_at=joined,
+                updated_at=joined,
+            ))
+        self.members = Member.objects.bulk_create(members, batch_size=self.chunk_size)
+        self.member_cum_weights = list(_cumulative(rng.paretovariate(1.2) for _ in self.members))
+        self.stats['members'] = len(self.members)
+        self.report(f'已生成 {len(self.members)} 个会员')
+
+    def daily_sale_counts(self):
+        """按季节性权重把总单量分配到每一天，使用最大余数法保证总数准确"""
+        weights = []
+        for offset in range(self.days):
+            day = self.start_date + timedelta(days=offset)
+            weekly = 1.3 if day.weekday() >= 5 else 1.0
+            # 一月底（春节）和十二月底两个高峰，夏季略低
+            yearly = 1 + 0.25 * math.cos(2 * math.pi * (day.timetuple().tm_yday - 25) / 365) \
+                + 0.1 * math.cos(4 * math.pi * (day.timetuple().tm_yday - 355) / 365)
+            growth = 1 + 0.15 * offset / 365
+            weights.append(weekly * yearly * growth * self.rng.uniform(0.9, 1.1))
+        total = sum(weights)
+        shares = [w * self.num_sales / total for w in weights]
+        counts = [int(share) for share in shares]
+        remainders = sorted(range(self.days), key=lambda i: shares[i] - counts[i], reverse=True)
+        for i in remainders[:self.num_sales - sum(counts)]:
+            counts[i] += 1
+        return counts
+
+    def create_sales(self):
+        """按天顺序生成销售单，每 chunk_size 单写入一次，每批单独提交"""
+        rng = self.rng
+        pending = []
+        created = {'sales': 0, 'sale_items': 0}
+        for offset, count in enumerate(self.daily_sale_counts()):
+            day = self.start_date + timedelta(days=offset)
+            hours = rng.choices(range(24), weights=HOURLY_WEIGHTS, k=count)
+            for second in sorted(hour * 3600 + rng.randrange(3600) for hour in hours):
+                pending.append(self.build_sale(self.local_datetime(day) + timedelta(seconds=second)))
+                if len(pending) >= self.chunk_size:
+                    self.write_sales(pending, created)
+                    pending = []
+        if pending:
+            self.write_sales(pending, created)
+
+        # 一条 UPDATE 用关联子查询回填会员累计消费，逐个 bulk_update 在会员较多时很慢
+        completed = Sale.objects.filter(member=OuterRef('pk'), status='COMPLETED').order_by().values('member')
+        Member.objects.filter(member_id__startswith=MEMBER_ID_PREFIX).update(
+            purchase_count=Coalesce(Subquery(completed.annotate(n=Count('id')).values('n')), 0),
+            total_spend=Coalesce(Subquery(completed.annotate(total=Sum('final_amount')).values('total')),
+                                 Decimal('0'), output_field=DecimalField()),
+            points=Coalesce(Subquery(completed.annotate(total=Sum('points_earned')).values('total')), 0),
+        )
+        self.stats.update(created)
+
+    def build_sale(self, created_at):
+        """生成一张销售单（未保存）及其明细行"""
+        rng = self.rng
+        member = None
+        if self.members and rng.random() < self.member_share:
+            member = rng.choices(self.members, cum_weights=self.member_cum_weights)[0]
+
+        # 购物篮大小近似几何分布，平均约 2.5 件不同商品
+        basket = min(1 + int(rng.expovariate(1 / 1.5)), 20)
+        products = {p.pk: p for p in rng.choices(self.ranked_products, cum_weights=self.product_cum_weights, k=basket)}
+        lines = []
+        total = 0
+        for product in products.values():
+            quantity = rng.choices((1, 2, 3, 6), weights=(75, 15, 7, 3))[0]
+            price = int(product.price * 100)
+            total += price * quantity
+            lines.append((product, quantity, price))
+
+        discount_rate = member.level.discount if member is not None else Decimal('1.00')
+        discount = int((total * (1 - discount_rate)).quantize(Decimal('1')))
+        final = total - discount
+        status = 'CANCELLED' if rng.random() < 0.02 else 'COMPLETED'
+        payment = rng.choices(list(PAYMENT_WEIGHTS), weights=list(PAYMENT_WEIGHTS.values()))[0]
+        if payment == 'balance' and member is None:
+            payment = 'cash'
+        sale = Sale(
+            member=member,
+            total_amount=cents(total),
+            discount_amount=cents(discount),
+            final_amount=cents(final),
+            points_earned=final // 100,
+            payment_method=payment,
+            balance_paid=cents(final) if payment == 'balance' else Decimal('0'),
+            status=status,
+            created_at=created_at,
+            operator=self.operator,
+        )
+        return sale, lines
+
+    def write_sales(self, pending, created):
+        with transaction.atomic():
+            sales = Sale.objects.bulk_create([sale for sale, _ in pending])
+            items, transactions = [], []
+            for sale, lines in pending:
+                for product, quantity, price in lines:
+                    items.append(SaleItem(
+                        sale=sale, product=product, quantity=quantity,
+                        price=cents(price), actual_price=cents(price), subtotal=cents(price * quantity),
+                    ))
+                    if sale.status == 'COMPLETED':
+                        transactions.append(InventoryTransaction(
+                            product=product, transaction_type='OUT', quantity=quantity,
+                            operator=self.operator, notes=f'销售单号：{sale.id}', created_at=sale.created_at,
+                        ))
+            SaleItem.objects.bulk_create(items, batch_size=self.chunk_size)
+            InventoryTransaction.objects.bulk_create(transactions, batch_size=self.chunk_size)
+        created['sales'] += len(sales)
+        created['sale_items'] += len(items)
+        self.report(f"已生成 {created['sales']}/{self.num_sales} 张销售单")
+
+    def refresh_derived_data(self):
+        """bulk_create 不触发信号，统一修正计数、销售汇总和检索文档"""
+        from inventory.services.counter_service import CounterService
+        from inventory.services.sales_rollup_service import SalesRollupService
+        from inventory.services.search_service import ProductSearchService
+
+        product_ids = [p.pk for p in self.products]
+        for start in range(0, len(product_ids), self.chunk_size):
+            ProductSearchService.index_products(product_ids[start:start + self.chunk_size])
+        CounterService.reconcile()
+        self.report('正在重建销售汇总表')
+        SalesRollupService.rebuild(chunk_size=self.chunk_size)
+
+
+def _cumulative(weights):
+    total = 0
+    for weight in weights:
+        total += weight
+        yield total
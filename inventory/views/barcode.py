@@ -10,7 +10,12 @@ import inventory.models
 from inventory.models.common import OperationLog 
 from inventory.forms import ProductForm  # 直接从forms包导入需要的表单
 from inventory.ali_barcode_service import AliBarcodeService
-from inventory.services.product_service import search_products
+from inventory.services.product_service import (
+    lookup_products_by_barcode,
+    products_with_stock,
+    search_products,
+    serialize_product_with_stock,
+)
 
 # 外部条码服务API配置（示例用，实际应替换为自己的API密钥）
 BARCODE_API_APP_KEY = "your_app_key"
@@ -125,29 +130,23 @@ def barcode_lookup(request):
         return JsonResponse({'success': False, 'message': '请提供条码'})
         
     # 首先检查数据库中是否已存在该条码的商品
-    try:
-        product = inventory.models.Product.objects.get(barcode=barcode)
-        # 获取库存信息
-        try:
-            inventory = inventory.models.Inventory.objects.get(product=product)
-            stock = inventory.quantity
-        except inventory.models.Inventory.DoesNotExist:
-            stock = 0
-            
+    product = products_with_stock(inventory.models.Product.objects.filter(barcode=barcode)).first()
+    if product is not None:
+        data = serialize_product_with_stock(product)
         return JsonResponse({
             'success': True,
             'exists': True,
-            'product_id': product.id,
-            'name': product.name,
-            'price': float(product.price),
-            'stock': stock,
-            'category': product.category.name if product.category else '',
-            'specification': product.specification,
-            'manufacturer': product.manufacturer,
+            'product_id': data['product_id'],
+            'name': data['name'],
+            'price': data['price'],
+            'stock': data['stock'],
+            'category': data['category'],
+            'specification': data['specification'],
+            'manufacturer': data['manufacturer'],
             'description': product.description,
             'message': '商品已存在于系统中'
         })
-    except inventory.models.Product.DoesNotExist:
+    else:
         # 调用阿里云条码服务查询商品信息
         barcode_data = AliBarcodeService.search_barcode(barcode)
         
@@ -172,86 +171,49 @@ def barcode_scan(request):
 
 def product_by_barcode(request, barcode):
     """根据条码查询商品信息的API"""
-    try:
-        # 先尝试精确匹配条码
-        product = inventory.models.Product.objects.get(barcode=barcode)
-        # 获取库存信息
-        try:
-            inventory_obj = inventory.models.Inventory.objects.get(product=product)
-            stock = inventory_obj.quantity
-        except inventory.models.Inventory.DoesNotExist:
-            stock = 0
-            
+    # 精确匹配与条码/名称模糊匹配合并为一次查询
+    product, matches = lookup_products_by_barcode(barcode)
+    if product is None and len(matches) == 1:
+        product = matches[0]
+
+    if product is not None:
+        data = serialize_product_with_stock(product)
         return JsonResponse({
             'success': True,
             'multiple_matches': False,
-            'product_id': product.id,
-            'name': product.name,
-            'price': float(product.price),
-            'stock': stock,
-            'category': product.category.name if product.category else '',
-            'specification': product.specification,
-            'manufacturer': product.manufacturer
+            'product_id': data['product_id'],
+            'name': data['name'],
+            'price': data['price'],
+            'stock': data['stock'],
+            'category': data['category'],
+            'specification': data['specification'],
+            'manufacturer': data['manufacturer']
         })
-    except inventory.models.Product.DoesNotExist:
-        # 如果精确匹配失败，尝试模糊匹配条码或名称
-        products = inventory.models.Product.objects.filter(
-            Q(barcode__icontains=barcode) | 
-            Q(name__icontains=barcode)
-        ).order_by('name')[:5]  # 限制返回数量
-        
-        if products.exists():
-            # 如果只有一个匹配结果
-            if products.count() == 1:
-                product = products.first()
-                # 获取库存信息
-                try:
-                    inventory_obj = inventory.models.Inventory.objects.get(product=product)
-                    stock = inventory_obj.quantity
-                except inventory.models.Inventory.DoesNotExist:
-                    stock = 0
-                    
-                return JsonResponse({
-                    'success': True,
-                    'multiple_matches': False,
-                    'product_id': product.id,
-                    'name': product.name,
-                    'price': float(product.price),
-                    'stock': stock,
-                    'category': product.category.name if product.category else '',
-                    'specification': product.specification,
-                    'manufacturer': product.manufacturer
-                })
-            # 如果有多个匹配结果
-            else:
-                product_list = []
-                for product in products:
-                    try:
-                        inventory_obj = inventory.models.Inventory.objects.get(product=product)
-                        stock = inventory_obj.quantity
-                    except inventory.models.Inventory.DoesNotExist:
-                        stock = 0
-                        
-                    product_list.append({
-                        'product_id': product.id,
-                        'name': product.name,
-                        'price': float(product.price),
-                        'barcode': product.barcode,
-                        'stock': stock,
-                        'category': product.category.name if product.category else ''
-                    })
-                    
-                return JsonResponse({
-                    'success': True,
-                    'multiple_matches': True,
-                    'products': product_list
-                })
-        else:
-            return JsonResponse({
-                'success': False,
-                'message': '未找到商品'
+
+    if matches:
+        product_list = []
+        for match in matches:
+            data = serialize_product_with_stock(match)
+            product_list.append({
+                'product_id': data['product_id'],
+                'name': data['name'],
+                'price': data['price'],
+                'barcode': data['barcode'],
+                'stock': data['stock'],
+                'category': data['category']
             })
 
+        return JsonResponse({
+            'success': True,
+            'multiple_matches': True,
+            'products': product_list
+        })
+
+    return JsonResponse({
+        'success': False,
+        'message': '未找到商品'
+    })
+
 @login_required
 def scan_barcode(request):
     """条码扫描功能视图"""
@@ -377,26 +339,21 @@ def product_search_api(request):
             'message': '请输入至少2个字符进行搜索'
         })
     
-    # 使用service层搜索商品
-    products = search_products(query, active_only=True)
+    # 使用service层搜索商品，库存和分类随商品一次查出
+    products = products_with_stock(search_products(query, active_only=True))
     
     # 格式化返回数据
     result = []
     for product in products[:10]:  # 限制返回10条结果
-        try:
-            inventory_obj = inventory.models.Inventory.objects.get(product=product)
-            stock = inventory_obj.quantity
-        except inventory.models.Inventory.DoesNotExist:
-            stock = 0
-            
+        data = serialize_product_with_stock(product)
         result.append({
-            'id': product.id,
-            'name': product.name,
-            'price': float(product.price),
-            'stock': stock,
-            'barcode': product.barcode,
-            'spec': product.specification,
-            'category': product.category.name if product.category else ''
+            'id': data['product_id'],
+            'name': data['name'],
+            'price': data['price'],
+            'stock': data['stock'],
+            'barcode': data['barcode'],
+            'spec': data['specification'],
+            'category': data['category']
         })
     
     return JsonResponse({
@@ -0,0 +1,77 @@
+"""
+后台导出任务相关视图：提交任务、轮询进度、下载结果
+"""
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+
+from inventory.exceptions import InventoryValidationError
+from inventory.models import ExportJob
+from inventory.services.export_job_service import ExportJobService
+
+# 提交任务时透传给导出函数的参数
+EXPORT_PARAM_NAMES = ('start_date', 'end_date', 'period', 'category', 'level', 'status', 'q')
+
+
+def _get_job(request, job_id):
+    """只允许任务创建人或超级管理员访问"""
+    jobs = ExportJob.objects.all()
+    if not request.user.is_superuser:
+        jobs = jobs.filter(created_by=request.user)
+    return get_object_or_404(jobs, pk=job_id)
+
+
+def _job_data(job):
+    data = ExportJobService.status(job)
+    data['status_url'] = reverse('export_job_status', args=[job.pk])
+    if job.status == ExportJob.STATUS_SUCCESS:
+        data['download_url'] = reverse('export_job_download', args=[job.pk])
+    return data
+
+
+def submit_export_job(request, kind, export_format, params):
+    """提交导出任务并返回 202 响应，报表页面的导出请求也由此转为后台任务"""
+    try:
+        job = ExportJobService.submit(kind=kind, user=request.user, export_format=export_format, params=params)
+    except InventoryValidationError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    return JsonResponse({'success': True, **_job_data(job)}, status=202)
+
+
+@login_required
+def export_job_submit(request):
+    """提交后台导出任务，立即返回任务ID和进度查询地址"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': '只支持POST请求'}, status=405)
+
+    params = {name: request.POST[name] for name in EXPORT_PARAM_NAMES if request.POST.get(name)}
+    return submit_export_job(request, request.POST.get('kind', ''), request.POST.get('format', 'csv'), params)
+
+
+@login_required
+def export_job_status(request, job_id):
+    """查询导出任务进度"""
+    job = _get_job(request, job_id)
+    return JsonResponse({'success': True, **_job_data(job)})
+
+
+@login_required
+def export_job_list(request):
+    """当前用户最近的导出任务"""
+    jobs = ExportJob.objects.filter(created_by=request.user)[:20]
+    return JsonResponse({'success': True, 'jobs': [_job_data(job) for job in jobs]})
+
+
+@login_required
+def export_job_download(request, job_id):
+    """下载已完成的导出文件"""
+    job = _get_job(request, job_id)
+    if job.status != ExportJob.STATUS_SUCCESS or not job.file:
+        raise Http404('导出文件不存在或已过期')
+    try:
+        handle = job.file.open('rb')
+    except FileNotFoundError:
+        raise Http404('导出文件不存在或已过期')
+    filename = f'{job.kind}_{job.created_at:%Y%m%d%H%M%S}.{job.export_format}'
+    return FileResponse(handle, as_attachment=True, filename=filename)
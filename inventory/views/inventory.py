@@ -6,15 +6,32 @@ from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse, HttpResponse
 from django.contrib import messages
 from django.db.models import Q, Sum, F
-from django.contrib.contenttypes.models import ContentType
-from django.core.paginator import Paginator
 
 from inventory.models import (
     Product, Inventory, InventoryTransaction, 
-    OperationLog, StockAlert, check_inventory,
+    StockAlert, check_inventory,
     update_inventory, Category
 )
 from inventory.forms import InventoryTransactionForm
+from inventory.utils.logging import log_action_on_commit
+from inventory.utils.query_utils import keyset_page_data, keyset_paginate, page_querystring
+
+
+def _inventory_row(item):
+    """库存列表 JSON 数据"""
+    product = item.product
+    return {
+        'id': item.id,
+        'product_id': product.id,
+        'product_name': product.name,
+        'barcode': product.barcode,
+        'category': product.category.name,
+        'color': product.get_color_display() if product.color else '',
+        'size': product.size,
+        'quantity': item.quantity,
+        'warning_level': item.warning_level,
+        'is_low_stock': item.is_low_stock,
+    }
 
 
 @login_required
@@ -25,6 +42,7 @@ def inventory_list(request):
     color = request.GET.get('color', '')
     size = request.GET.get('size', '')
     search_query = request.GET.get('search', '')
+    stock_status = request.GET.get('stock', '')
     
     # 基础查询
     inventory_items = Inventory.objects.select_related('product', 'product__category').all()
@@ -45,6 +63,18 @@ def inventory_list(request):
             Q(product__barcode__icontains=search_query)
         )
     
+    # 库存状态在数据库中筛选，分页后的结果才完整
+    if stock_status == 'low':
+        inventory_items = inventory_items.filter(quantity__lte=F('warning_level'))
+    elif stock_status == 'normal':
+        inventory_items = inventory_items.filter(quantity__gt=F('warning_level'))
+    
+    # 键集分页：按商品名称排序（商品与库存一对一，商品ID唯一），使用 product_name_idx；
+    # 不按 updated_at 排序，否则每次销售和出入库都会让行在页间移动
+    page = keyset_paginate(inventory_items, ['product__name', 'product_id'], request.GET.get('cursor'), 50)
+    if request.GET.get('format') == 'json':
+        return JsonResponse(keyset_page_data(page, _inventory_row))
+    
     # 获取所有分类
     categories = Category.objects.all()
     
@@ -53,7 +83,9 @@ def inventory_list(request):
     sizes = Product.SIZE_CHOICES
     
     context = {
-        'inventory_items': inventory_items,
+        'inventory_items': page,
+        'page_query': page_querystring(request.GET),
+        'stock_filter_query': page_querystring(request.GET, exclude=('cursor', 'format', 'stock')),
         'categories': categories,
         'colors': colors,
         'sizes': sizes,
@@ -61,11 +93,27 @@ def inventory_list(request):
         'selected_color': color,
         'selected_size': size,
         'search_query': search_query,
+        'stock_status': stock_status,
     }
     
     return render(request, 'inventory/inventory_list.html', context)
 
 
+def _transaction_row(transaction):
+    """库存交易记录 JSON 数据"""
+    return {
+        'id': transaction.id,
+        'product_id': transaction.product_id,
+        'product_name': transaction.product.name,
+        'transaction_type': transaction.transaction_type,
+        'transaction_type_display': transaction.get_transaction_type_display(),
+        'quantity': transaction.quantity,
+        'operator': transaction.operator.username,
+        'notes': transaction.notes,
+        'created_at': transaction.created_at.isoformat(),
+    }
+
+
 @login_required
 def inventory_transaction_list(request):
     """库存交易记录列表，显示所有入库、出库和调整记录"""
@@ -109,16 +157,14 @@ def inventory_transaction_list(request):
         except (ValueError, TypeError):
             pass
     
-    # 排序
-    transactions = transactions.order_by('-created_at')
-    
-    # 分页
-    paginator = Paginator(transactions, 20)  # 每页20条记录
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    # 按时间倒序键集分页
+    page_obj = keyset_paginate(transactions, ['-created_at', '-id'], request.GET.get('cursor'), 20)
+    if request.GET.get('format') == 'json':
+        return JsonResponse(keyset_page_data(page_obj, _transaction_row))
     
     return render(request, 'inventory/inventory_transaction_list.html', {
         'page_obj': page_obj,
+        'page_query': page_querystring(request.GET),
         'transaction_type': transaction_type,
         'product_id': product_id,
         'search_query': search_query,
@@ -149,12 +195,10 @@ def inventory_in(request):
             
             if success:
                 # 记录操作日志
-                OperationLog.objects.create(
-                    operator=request.user,
-                    operation_type='INVENTORY',
-                    details=f'入库: {product.name} x {quantity}',
-                    related_object_id=inventory.id,
-                    related_content_type=ContentType.objects.get_for_model(inventory)
+                log_action_on_commit(
+                    request.user, 'INVENTORY',
+                    f'入库: {product.name} x {quantity}',
+                    related_object=inventory,
                 )
                 
                 messages.success(request, f'{product.name} 入库成功，当前库存: {inventory.quantity}')
@@ -203,12 +247,10 @@ def inventory_out(request):
             
             if success:
                 # 记录操作日志
-                OperationLog.objects.create(
-                    operator=request.user,
-                    operation_type='INVENTORY',
-                    details=f'出库: {product.name} x {quantity}',
-                    related_object_id=inventory.id,
-                    related_content_type=ContentType.objects.get_for_model(inventory)
+                log_action_on_commit(
+                    request.user, 'INVENTORY',
+                    f'出库: {product.name} x {quantity}',
+                    related_object=inventory,
                 )
                 
                 messages.success(request, f'{product.name} 出库成功，当前库存: {inventory.quantity}')
@@ -286,12 +328,10 @@ def inventory_adjust(request):
             
             if success:
                 # 记录操作日志
-                OperationLog.objects.create(
-                    operator=request.user,
-                    operation_type='INVENTORY',
-                    details=f'库存调整: {product.name} 从 {current_quantity} 到 {inventory.quantity}',
-                    related_object_id=inventory.id,
-                    related_content_type=ContentType.objects.get_for_model(inventory)
+                log_action_on_commit(
+                    request.user, 'INVENTORY',
+                    f'库存调整: {product.name} 从 {current_quantity} 到 {inventory.quantity}',
+                    related_object=inventory,
                 )
                 
                 messages.success(request, f'{product.name} 库存调整成功，当前库存: {inventory.quantity}')
@@ -339,12 +379,10 @@ def inventory_transaction_create(request):
             inventory.save()
             
             # 记录操作日志
-            OperationLog.objects.create(
-                operator=request.user,
-                operation_type='INVENTORY',
-                details=f'入库操作: {transaction.product.name}, 数量: {transaction.quantity}',
-                related_object_id=transaction.id,
-                related_content_type=ContentType.objects.get_for_model(InventoryTransaction)
+            log_action_on_commit(
+                request.user, 'INVENTORY',
+                f'入库操作: {transaction.product.name}, 数量: {transaction.quantity}',
+                related_object=transaction,
             )
             
             messages.success(request, '入库操作成功')
@@ -65,7 +65,8 @@ def inventory_check_create(request):
                     name=form.cleaned_data['name'],
                     description=form.cleaned_data['description'],
                     user=request.user,
-                    category=category
+                    category=category,
+                    changed_since_last_check=form.cleaned_data.get('changed_only', False)
                 )
                 
                 messages.success(request, f'库存盘点 {inventory_check.name} 创建成功')
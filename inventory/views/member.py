@@ -7,14 +7,15 @@ from django.contrib import messages
 from django.utils import timezone
 from django.db.models import Q, Sum, Count
 from django.contrib.contenttypes.models import ContentType
-from django.core.paginator import Paginator
 from decimal import Decimal, InvalidOperation
 
 # 从新的模型结构导入
 from ..models import Member, MemberLevel, RechargeRecord, OperationLog, Sale, MemberTransaction
 from ..forms import MemberForm, MemberLevelForm, RechargeForm, MemberImportForm
-from ..utils import validate_csv
 from ..services import member_service
+from ..services.counter_service import CounterService
+from ..services.export_service import ExportService
+from ..utils.query_utils import CountedPaginator
 
 import csv
 import io
@@ -133,18 +134,24 @@ def member_list(request):
     elif sort_by == 'created':
         members = members.order_by('-created_at')
     
-    # 分页
-    paginator = Paginator(members, 15)  # 每页15个会员
+    # 计算统计数据
+    total_members = CounterService.count(Member)
+    active_members = CounterService.count(Member, is_active=True)
+    
+    # 分页：只按状态筛选时总数来自计数器，其它筛选条件使用估计行数
+    if search_query or level_id:
+        count, estimated = CounterService.estimated_count(members)
+    elif status in ('active', 'inactive'):
+        count, estimated = CounterService.count(Member, is_active=(status == 'active')), False
+    else:
+        count, estimated = total_members, False
+    paginator = CountedPaginator(members, 15, count=count, estimated=estimated)  # 每页15个会员
     page_number = request.GET.get('page', 1)
     page_obj = paginator.get_page(page_number)
     
     # 获取会员等级列表用于筛选
     levels = MemberLevel.objects.filter(is_active=True).order_by('priority')
     
-    # 计算统计数据
-    total_members = Member.objects.count()
-    active_members = Member.objects.filter(is_active=True).count()
-    
     context = {
         'page_obj': page_obj,
         'levels': levels,
@@ -416,18 +423,7 @@ def member_import(request):
         if form.is_valid():
             csv_file = request.FILES['csv_file']
             
-            # 验证CSV文件
-            validation_result = validate_csv(csv_file, 
-                                            required_headers=['name', 'phone'],
-                                            expected_headers=['name', 'phone', 'email', 
-                                                            'member_id', 'level', 'points',
-                                                            'birthday', 'address'])
-            
-            if not validation_result['valid']:
-                messages.error(request, f"CSV文件验证失败: {validation_result['errors']}")
-                return render(request, 'inventory/member/member_import.html', {'form': form})
-            
-            # 处理CSV文件
+            # 处理CSV文件（流式分批导入，表头在导入时校验）
             try:
                 result = member_service.import_members_from_csv(csv_file, request.user)
                 
@@ -484,7 +480,7 @@ def member_export(request):
     status = request.GET.get('status', '')
     
     # 基本查询集
-    members = Member.objects.select_related('level').all()
+    members = Member.objects.order_by('id')
     
     # 应用筛选
     if level_id:
@@ -495,30 +491,10 @@ def member_export(request):
     elif status == 'inactive':
         members = members.filter(is_active=False)
     
-    # 创建CSV响应
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="members_export.csv"'
-    
-    # 写入CSV
-    writer = csv.writer(response)
-    writer.writerow(['ID', '会员号', '姓名', '手机', '邮箱', '会员等级', '积分', '生日', '地址', '备注', '状态'])
-    
-    for member in members:
-        writer.writerow([
-            member.id,
-            member.member_id,
-            member.name,
-            member.phone,
-            member.email or '',
-            member.level.name if member.level else '',
-            member.points,
-            member.birthday.strftime('%Y-%m-%d') if member.birthday else '',
-            member.address or '',
-            member.notes or '',
-            '启用' if member.is_active else '禁用',
-        ])
-    
-    return response
+    headers, rows = ExportService.member_table(members)
+    return ExportService.export_rows(
+        headers, rows, 'members_export', request.GET.get('format', 'csv'), sheet_name='会员'
+    )
 
 
 @login_required
@@ -3,7 +3,6 @@ from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse, HttpResponse
 from django.contrib import messages
 from django.db.models import Q, Count, Sum
-from django.core.paginator import Paginator
 from django.urls import reverse
 from django.utils import timezone
 
@@ -23,64 +22,72 @@ from inventory.forms import (
     ProductForm, CategoryForm, ProductBatchForm,
     ProductImageFormSet, ProductBulkForm, ProductImportForm
 )
-from inventory.utils import generate_thumbnail, validate_csv
+from inventory.utils import generate_thumbnail
 from inventory.services import product_service
+from inventory.services.counter_service import CounterService
+from inventory.services.export_service import ExportService
+from inventory.utils.query_utils import keyset_page_data, keyset_paginate, page_querystring
 
 
 def product_by_barcode(request, barcode):
     """根据条码查询商品信息的API"""
-    try:
-        # 先尝试精确匹配条码
-        product = Product.objects.get(barcode=barcode)
-        # 获取库存信息
-        try:
-            inventory_obj = Inventory.objects.get(product=product)
-            stock = inventory_obj.quantity
-        except Inventory.DoesNotExist:
-            stock = 0
-            
+    # 精确匹配与条码模糊匹配合并为一次查询，库存随商品一并查出
+    exact, products = product_service.lookup_products_by_barcode(barcode, match_name=False)
+    if exact is not None:
+        data = product_service.serialize_product_with_stock(exact)
         return JsonResponse({
             'success': True,
-            'product_id': product.id,
-            'name': product.name,
-            'price': float(product.price),
-            'stock': stock,
-            'category': product.category.name if product.category else '',
-            'specification': product.specification,
-            'manufacturer': product.manufacturer
+            'product_id': data['product_id'],
+            'name': data['name'],
+            'price': data['price'],
+            'stock': data['stock'],
+            'category': data['category'],
+            'specification': data['specification'],
+            'manufacturer': data['manufacturer']
         })
-    except Product.DoesNotExist:
-        # 如果精确匹配失败，尝试模糊匹配条码
-        try:
-            products = Product.objects.filter(barcode__icontains=barcode).order_by('barcode')[:5]
-            
-            if products.exists():
-                # 返回匹配的多个商品
-                product_list = []
-                for product in products:
-                    try:
-                        inventory_obj = Inventory.objects.get(product=product)
-                        stock = inventory_obj.quantity
-                    except Inventory.DoesNotExist:
-                        stock = 0
-                        
-                    product_list.append({
-                        'product_id': product.id,
-                        'barcode': product.barcode,
-                        'name': product.name,
-                        'price': float(product.price),
-                        'stock': stock
-                    })
-                    
-                return JsonResponse({
-                    'success': True,
-                    'multiple_matches': True,
-                    'products': product_list
-                })
-            else:
-                return JsonResponse({'success': False, 'message': '未找到商品'})
-        except Exception as e:
-            return JsonResponse({'success': False, 'message': f'查询时发生错误: {str(e)}'})
+
+    if products:
+        # 返回匹配的多个商品
+        product_list = []
+        for product in products:
+            data = product_service.serialize_product_with_stock(product)
+            product_list.append({
+                'product_id': data['product_id'],
+                'barcode': data['barcode'],
+                'name': data['name'],
+                'price': data['price'],
+                'stock': data['stock']
+            })
+
+        return JsonResponse({
+            'success': True,
+            'multiple_matches': True,
+            'products': product_list
+        })
+    return JsonResponse({'success': False, 'message': '未找到商品'})
+
+
+# 商品列表排序方式对应的键集分页字段，最后一个字段唯一
+PRODUCT_LIST_ORDERINGS = {
+    'name': ['name', 'id'],
+    'price': ['price', 'id'],
+    'category': ['category__name', 'name', 'id'],
+    'created': ['-created_at', '-id'],
+    'updated': ['-updated_at', '-id'],
+}
+
+
+def _product_row(product):
+    """商品列表 JSON 数据"""
+    return {
+        'id': product.id,
+        'barcode': product.barcode,
+        'name': product.name,
+        'category': product.category.name,
+        'price': str(product.price),
+        'is_active': product.is_active,
+        'updated_at': product.updated_at.isoformat(),
+    }
 
 
 @login_required
@@ -92,11 +99,8 @@ def product_list(request):
     status = request.GET.get('status', 'active')  # 默认显示活跃商品
     sort_by = request.GET.get('sort', 'updated')  # 修改默认排序为更新时间
     
-    print(f"DEBUG: 列表筛选参数 - 搜索: {search_query}, 分类: {category_id}, 状态: {status}, 排序: {sort_by}")
-    
     # 基本查询集
     products = Product.objects.select_related('category').all()
-    print(f"DEBUG: 初始查询集数量: {products.count()}")
     
     # 应用筛选
     if search_query:
@@ -112,40 +116,25 @@ def product_list(request):
     # 状态筛选
     if status == 'active':
         products = products.filter(is_active=True)
-        print(f"DEBUG: 应用活跃状态筛选后的数量: {products.count()}")
     elif status == 'inactive':
         products = products.filter(is_active=False)
     
-    # 排序
-    if sort_by == 'name':
-        products = products.order_by('name')
-    elif sort_by == 'price':
-        products = products.order_by('price')
-    elif sort_by == 'category':
-        products = products.order_by('category__name', 'name')
-    elif sort_by == 'created':
-        products = products.order_by('-created_at')
-    elif sort_by == 'updated':  # 添加按更新时间排序
-        products = products.order_by('-updated_at')
-    else:  # 默认按更新时间降序
-        products = products.order_by('-updated_at')
-    
-    # 分页
-    paginator = Paginator(products, 15)  # 每页15个商品
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    # 排序并键集分页，默认按更新时间降序
+    ordering = PRODUCT_LIST_ORDERINGS.get(sort_by, PRODUCT_LIST_ORDERINGS['updated'])
+    page_obj = keyset_paginate(products, ordering, request.GET.get('cursor'), 15)
+    if request.GET.get('format') == 'json':
+        return JsonResponse(keyset_page_data(page_obj, _product_row))
     
     # 获取分类列表用于筛选
     categories = Category.objects.all().order_by('name')
     
-    # 计算统计数据
-    total_products = Product.objects.count()
-    active_products = Product.objects.filter(is_active=True).count()
-    
-    print(f"DEBUG: 总商品数: {total_products}, 活跃商品数: {active_products}, 当前页面商品数: {len(page_obj)}")
+    # 统计数据读取行数计数器
+    total_products = CounterService.count(Product)
+    active_products = CounterService.count(Product, is_active=True)
     
     context = {
         'page_obj': page_obj,
+        'page_query': page_querystring(request.GET),
         'categories': categories,
         'search_query': search_query,
         'selected_category': category_id,
@@ -624,18 +613,7 @@ def product_import(request):
         if form.is_valid():
             csv_file = request.FILES['csv_file']
             
-            # 验证CSV文件
-            validation_result = validate_csv(csv_file, 
-                                            required_headers=['name', 'retail_price'],
-                                            expected_headers=['name', 'category', 'retail_price', 
-                                                            'wholesale_price', 'cost_price', 
-                                                            'barcode', 'sku', 'specification'])
-            
-            if not validation_result['valid']:
-                messages.error(request, f"CSV文件验证失败: {validation_result['errors']}")
-                return render(request, 'inventory/product/product_import.html', {'form': form})
-            
-            # 处理CSV文件
+            # 处理CSV文件（流式分批导入，表头在导入时校验）
             try:
                 result = product_service.import_products_from_csv(csv_file, request.user)
                 
@@ -692,7 +670,7 @@ def product_export(request):
     status = request.GET.get('status', '')
     
     # 基本查询集
-    products = Product.objects.select_related('category').all()
+    products = Product.objects.order_by('id')
     
     # 应用筛选
     if category_id:
@@ -703,29 +681,10 @@ def product_export(request):
     elif status == 'inactive':
         products = products.filter(is_active=False)
     
-    # 创建CSV响应
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="products_export.csv"'
-    
-    # 写入CSV
-    writer = csv.writer(response)
-    writer.writerow(['ID', '名称', '分类', '零售价', '批发价', '成本价', '条码', 'SKU', '规格', '状态'])
-    
-    for product in products:
-        writer.writerow([
-            product.id,
-            product.name,
-            product.category.name if product.category else '',
-            product.retail_price,
-            product.wholesale_price,
-            product.cost_price,
-            product.barcode or '',
-            product.sku or '',
-            product.specification or '',
-            '启用' if product.is_active else '禁用',
-        ])
-    
-    return response
+    headers, rows = ExportService.product_table(products)
+    return ExportService.export_rows(
+        headers, rows, 'products_export', request.GET.get('format', 'csv'), sheet_name='商品'
+    )
 
 # 添加别名函数以兼容旧的导入
 def product_edit(request, pk):
@@ -20,10 +20,23 @@ from inventory.models import (
     Sale, SaleItem, Member, MemberTransaction, Store
 )
 from inventory.services import report_service
+from inventory.views.export_job import submit_export_job
 from inventory.utils.date_utils import get_date_range
 from inventory.forms.report_forms import ReportFilterForm, SalesReportForm
 
 
+def _submit_report_export(request, kind, start_date=None, end_date=None, category=None):
+    """报表导出提交为后台导出任务，返回任务ID和进度查询地址"""
+    export_format = 'csv' if request.GET.get('export_format') == 'csv' else 'xlsx'
+    params = {}
+    if start_date and end_date:
+        params['start_date'] = start_date.isoformat()
+        params['end_date'] = end_date.isoformat()
+    if category:
+        params['category'] = str(getattr(category, 'pk', category))
+    return submit_export_job(request, kind, export_format, params)
+
+
 @login_required
 @permission_required('inventory.view_reports', raise_exception=True)
 def sales_report(request):
@@ -40,6 +53,10 @@ def sales_report(request):
         store_id = form.cleaned_data.get('store')
         category_id = form.cleaned_data.get('category')
         
+        # 导出转为后台任务，不在请求中生成文件
+        if 'export' in request.GET:
+            return _submit_report_export(request, 'sales', start_date, end_date)
+        
         # 获取销售数据
         sales_data = report_service.get_sales_data(start_date, end_date, store_id, category_id)
         
@@ -49,15 +66,6 @@ def sales_report(request):
         # 准备按商品分类的销售数据
         category_sales = report_service.get_category_sales(start_date, end_date, store_id)
         
-        # 如果请求导出
-        if 'export' in request.GET:
-            export_format = request.GET.get('export_format', 'excel')
-            
-            if export_format == 'excel':
-                return report_service.export_sales_report_excel(sales_data, start_date, end_date)
-            elif export_format == 'csv':
-                return report_service.export_sales_report_csv(sales_data, start_date, end_date)
-        
         # 渲染正常报表页面
         return render(request, 'inventory/reports/sales_report.html', {
             'form': form,
@@ -94,6 +102,10 @@ def inventory_report(request):
         if store_id:
             filters['store_id'] = store_id
     
+    # 导出转为后台任务，不在请求中生成文件
+    if 'export' in request.GET:
+        return _submit_report_export(request, 'inventory', category=filters.get('category_id'))
+    
     # 获取库存数据
     inventory_data = report_service.get_inventory_data(filters)
     
@@ -103,15 +115,6 @@ def inventory_report(request):
     # 获取库存变动趋势
     inventory_trend = report_service.get_inventory_trend()
     
-    # 如果请求导出
-    if 'export' in request.GET:
-        export_format = request.GET.get('export_format', 'excel')
-        
-        if export_format == 'excel':
-            return report_service.export_inventory_report_excel(inventory_data)
-        elif export_format == 'csv':
-            return report_service.export_inventory_report_csv(inventory_data)
-    
     # 渲染正常报表页面
     return render(request, 'inventory/reports/inventory_report.html', {
         'form': form,
@@ -135,6 +138,10 @@ def member_report(request):
         start_date = form.cleaned_data.get('start_date') or start_date
         end_date = form.cleaned_data.get('end_date') or end_date
     
+    # 导出转为后台任务，不在请求中生成文件
+    if 'export' in request.GET:
+        return _submit_report_export(request, 'members')
+    
     # 获取会员数据
     member_data = report_service.get_member_data(start_date, end_date)
     
@@ -144,15 +151,6 @@ def member_report(request):
     # 获取会员等级分布
     level_distribution = report_service.get_member_level_distribution()
     
-    # 如果请求导出
-    if 'export' in request.GET:
-        export_format = request.GET.get('export_format', 'excel')
-        
-        if export_format == 'excel':
-            return report_service.export_member_report_excel(member_data, start_date, end_date)
-        elif export_format == 'csv':
-            return report_service.export_member_report_csv(member_data, start_date, end_date)
-    
     # 渲染正常报表页面
     return render(request, 'inventory/reports/member_report.html', {
         'form': form,
@@ -188,6 +186,10 @@ def product_performance_report(request):
         if store_id:
             filters['store_id'] = store_id
     
+    # 导出转为后台任务，不在请求中生成文件
+    if 'export' in request.GET:
+        return _submit_report_export(request, 'product_performance', start_date, end_date)
+    
     # 获取商品销售绩效数据
     performance_data = report_service.get_product_performance(start_date, end_date, filters)
     
@@ -197,15 +199,6 @@ def product_performance_report(request):
     # 获取滞销商品数据
     slow_moving = report_service.get_slow_moving_products(filters)
     
-    # 如果请求导出
-    if 'export' in request.GET:
-        export_format = request.GET.get('export_format', 'excel')
-        
-        if export_format == 'excel':
-            return report_service.export_product_performance_excel(performance_data, start_date, end_date)
-        elif export_format == 'csv':
-            return report_service.export_product_performance_csv(performance_data, start_date, end_date)
-    
     # 渲染正常报表页面
     return render(request, 'inventory/reports/product_performance.html', {
         'form': form,
@@ -234,18 +227,13 @@ def daily_summary_report(request):
     else:
         store_id = None
     
+    # 导出转为后台任务，不在请求中生成文件
+    if 'export' in request.GET:
+        return _submit_report_export(request, 'daily_summary', start_date, end_date)
+    
     # 获取日报数据
     daily_data = report_service.get_daily_summary(start_date, end_date, store_id)
     
-    # 如果请求导出
-    if 'export' in request.GET:
-        export_format = request.GET.get('export_format', 'excel')
-        
-        if export_format == 'excel':
-            return report_service.export_daily_summary_excel(daily_data, start_date, end_date)
-        elif export_format == 'csv':
-            return report_service.export_daily_summary_csv(daily_data, start_date, end_date)
-    
     # 渲染正常报表页面
     return render(request, 'inventory/reports/daily_summary.html', {
         'form': form,
@@ -352,6 +340,10 @@ def profit_analysis(request):
         if store_id:
             filters['store_id'] = store_id
     
+    # 导出转为后台任务，按日汇总销售额、成本和毛利
+    if 'export' in request.GET:
+        return _submit_report_export(request, 'sales', start_date, end_date)
+    
     # 获取利润分析数据
     profit_data = report_service.get_profit_analysis(start_date, end_date, filters)
     
@@ -361,15 +353,6 @@ def profit_analysis(request):
     # 获取按分类的利润分布
     category_profit = report_service.get_category_profit(start_date, end_date, filters)
     
-    # 如果请求导出
-    if 'export' in request.GET:
-        export_format = request.GET.get('export_format', 'excel')
-        
-        if export_format == 'excel':
-            return report_service.export_profit_analysis_excel(profit_data, start_date, end_date)
-        elif export_format == 'csv':
-            return report_service.export_profit_analysis_csv(profit_data, start_date, end_date)
-    
     # 渲染正常报表页面
     return render(request, 'inventory/reports/profit_analysis.html', {
         'form': form,
@@ -1,7 +1,6 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.contrib.contenttypes.models import ContentType
 from django.db.models import Q, Sum, Count, Avg, Max
 from django.db import models, transaction, connection
 from django.utils import timezone
@@ -14,31 +13,18 @@ from django.conf import settings
 from django.utils.safestring import mark_safe
 from django.urls import reverse
 
-from inventory.models import Sale, SaleItem, Inventory, InventoryTransaction, Member, MemberTransaction, OperationLog, Product, Category, Supplier, MemberLevel
+from inventory.models import Sale, SaleItem, Inventory, InventoryTransaction, Member, MemberTransaction, Product, Category, Supplier, MemberLevel
 from inventory.forms import SaleForm, SaleItemForm
 from inventory.services import member_service
-from inventory.utils.query_utils import paginate_queryset
-
-@login_required
-def sale_list(request):
-    """销售单列表视图"""
-    today = timezone.now().date()
-    today_sales = Sale.objects.filter(created_at__date=today).aggregate(
-        total=Sum('total_amount')
-    )['total'] or 0
-    month_sales = Sale.objects.filter(created_at__month=today.month).aggregate(
-        total=Sum('total_amount')
-    )['total'] or 0
-
-    # 从GET参数获取搜索和筛选条件
-    search_query = request.GET.get('q', '')
-    date_from = request.GET.get('date_from', '')
-    date_to = request.GET.get('date_to', '')
-    
-    # 获取所有销售单
-    sales = Sale.objects.all().order_by('-created_at')
-    total_sales = sales.count()
-    # 应用筛选条件
+from inventory.services.checkout_service import CheckoutService
+from inventory.services.counter_service import CounterService
+from inventory.services.export_service import ExportService
+from inventory.services.sales_rollup_service import SalesRollupService
+from inventory.utils.logging import log_action_on_commit
+from inventory.utils.query_utils import keyset_page_data, keyset_paginate, page_querystring
+
+def _filter_sales(sales, search_query, date_from, date_to):
+    """按搜索词和日期范围筛选销售单，供列表和导出共用"""
     if search_query:
         # 可以搜索销售单号、会员姓名、手机号等
         sales = sales.filter(
@@ -48,7 +34,6 @@ def sale_list(request):
         )
     
     if date_from and date_to:
-        from datetime import datetime
         try:
             date_from_obj = datetime.strptime(date_from, '%Y-%m-%d')
             date_to_obj = datetime.strptime(date_to, '%Y-%m-%d')
@@ -58,12 +43,51 @@ def sale_list(request):
             # 日期格式不正确，忽略筛选
             pass
     
-    # 分页
-    page_number = request.GET.get('page', 1)
-    paginated_sales = paginate_queryset(sales, page_number)
+    return sales
+
+def _sale_row(sale):
+    """销售单列表 JSON 数据"""
+    return {
+        'id': sale.id,
+        'created_at': sale.created_at.isoformat(),
+        'member': sale.member.name if sale.member else None,
+        'total_amount': str(sale.total_amount),
+        'discount_amount': str(sale.discount_amount),
+        'final_amount': str(sale.final_amount),
+        'payment_method': sale.payment_method,
+        'status': sale.status,
+    }
+
+@login_required
+def sale_list(request):
+    """销售单列表视图"""
+    # 从GET参数获取搜索和筛选条件
+    search_query = request.GET.get('q', '')
+    date_from = request.GET.get('date_from', '')
+    date_to = request.GET.get('date_to', '')
+    
+    # 获取所有销售单
+    sales = Sale.objects.select_related('member')
+    # 应用筛选条件
+    sales = _filter_sales(sales, search_query, date_from, date_to)
+    
+    # 按时间倒序键集分页，深页不再使用 OFFSET
+    paginated_sales = keyset_paginate(sales, ['-created_at', '-id'], request.GET.get('cursor'))
+    if request.GET.get('format') == 'json':
+        return JsonResponse(keyset_page_data(paginated_sales, _sale_row))
+    
+    today = timezone.now().date()
+    today_sales = Sale.objects.filter(created_at__date=today).aggregate(
+        total=Sum('total_amount')
+    )['total'] or 0
+    month_sales = Sale.objects.filter(created_at__month=today.month).aggregate(
+        total=Sum('total_amount')
+    )['total'] or 0
+    total_sales = CounterService.count(Sale)
     
     context = {
         'sales': paginated_sales,
+        'page_query': page_querystring(request.GET),
         'search_query': search_query,
         'date_from': date_from,
         'date_to': date_to,
@@ -74,6 +98,20 @@ def sale_list(request):
 
     return render(request, 'inventory/sale_list.html', context)
 
+@login_required
+def sale_export(request):
+    """导出销售明细，按销售单筛选条件流式输出 CSV/Excel"""
+    sales = _filter_sales(
+        Sale.objects.all(),
+        request.GET.get('q', ''),
+        request.GET.get('date_from', ''),
+        request.GET.get('date_to', ''),
+    )
+    headers, rows = ExportService.sale_item_table(SaleItem.objects.filter(sale__in=sales))
+    return ExportService.export_rows(
+        headers, rows, 'sales_export', request.GET.get('format', 'csv'), sheet_name='销售明细'
+    )
+
 @login_required
 def sale_detail(request, sale_id):
     """销售单详情视图"""
@@ -116,398 +154,37 @@ def sale_detail(request, sale_id):
 def sale_create(request):
     """创建销售单视图"""
     if request.method == 'POST':
-        # 添加调试信息
-        print("=" * 80)
-        print("销售单提交数据：")
-        for key, value in request.POST.items():
-            print(f"{key}: {value}")
-        print("=" * 80)
-        
-        # 获取前端提交的商品信息
-        products_data = []
-        for key, value in request.POST.items():
-            if key.startswith('products[') and key.endswith('][id]'):
-                index = key[9:-5]
-                product_id = value
-                quantity = request.POST.get(f'products[{index}][quantity]', 1)
-                price = request.POST.get(f'products[{index}][price]', 0)
-                
-                products_data.append({
-                    'product_id': product_id,
-                    'quantity': quantity,
-                    'price': price
-                })
-        
-        # 验证是否有商品数据
-        if not products_data:
+        cart = CheckoutService.parse_cart(request.POST)
+        if not cart:
             messages.error(request, '销售单创建失败，未能找到任何商品数据。')
             return redirect('sale_create')
-            
-        # 验证商品数据
-        valid_products = True
-        valid_products_data = []
-        
-        for item_data in products_data:
-            try:
-                product = Product.objects.get(id=item_data['product_id'])
-                # 解析数量
-                try:
-                    quantity = int(item_data['quantity'])
-                    if quantity <= 0:
-                        raise ValueError("Quantity must be positive")
-                except (ValueError, TypeError):
-                    print(f"Error parsing quantity for product {item_data['product_id']}: Value='{item_data['quantity']}'")
-                    messages.error(request, f"商品 {product.name} 的数量 '{item_data['quantity']}' 无效。")
-                    valid_products = False
-                    continue
-
-                # 解析价格
-                try:
-                    # 打印原始价格字符串用于调试
-                    raw_price = item_data['price']
-                    print(f"原始价格字符串: '{raw_price}', 类型: {type(raw_price)}")
-                    
-                    # 确保价格是字符串
-                    if not isinstance(raw_price, str):
-                        raw_price = str(raw_price)
-                    
-                    # 尝试直接从前端获取价格
-                    price = Decimal(raw_price.replace(',', '.'))
-                    
-                    if price <= 0:
-                        # 如果解析的价格为0或负数，尝试从数据库获取商品价格
-                        db_price = Product.objects.filter(id=item_data['product_id']).values_list('price', flat=True).first()
-                        if db_price:
-                            price = Decimal(db_price)
-                            print(f"使用数据库中的商品价格: {price}")
-                    
-                    print(f"成功解析商品 {product.name} 的价格: {price}")
-                    
-                    # 安全检查：如果价格仍然为0，中止处理
-                    if price <= 0:
-                        raise ValueError(f"商品价格不能为0或负数: {raw_price}")
-                        
-                except (InvalidOperation, ValueError, TypeError) as e:
-                    print(f"Error parsing price for product {item_data['product_id']}: Value='{item_data['price']}', Error: {str(e)}")
-                    messages.error(request, f"商品 {product.name} 的价格解析错误，请联系管理员。")
-                    valid_products = False
-                    continue
-
-                # 检查库存
-                inventory_obj = Inventory.objects.get(product=product)
-                if inventory_obj.quantity >= quantity:
-                    # 确保使用Decimal类型计算小计，避免精度问题
-                    subtotal = price * Decimal(str(quantity))
-                    print(f"商品 {product.name} 的小计: 价格={price} * 数量={quantity} = {subtotal}")
-                    
-                    valid_products_data.append({
-                        'product': product,
-                        'quantity': quantity,
-                        'price': price,
-                        'subtotal': subtotal,
-                        'inventory': inventory_obj
-                    })
-                else:
-                    print(f"Insufficient stock for product {product.id} ({product.name}): needed={quantity}, available={inventory_obj.quantity}")
-                    messages.warning(request, f"商品 {product.name} 库存不足 (需要 {quantity}, 可用 {inventory_obj.quantity})。该商品未添加到销售单。")
-                    valid_products = False
-
-            except Product.DoesNotExist:
-                print(f"Error processing sale item: Product with ID {item_data['product_id']} does not exist.")
-                messages.error(request, f"处理商品时出错：无效的商品 ID {item_data['product_id']}。")
-                valid_products = False
-            except Inventory.DoesNotExist:
-                print(f"Error processing sale item: Inventory record for product {item_data['product_id']} does not exist.")
-                messages.error(request, f"处理商品 {product.name} 时出错：找不到库存记录。")
-                valid_products = False
-            except Exception as e:
-                print(f"Unexpected error processing sale item for product ID {item_data.get('product_id', 'N/A')}: {type(e).__name__} - {e}")
-                messages.error(request, f"处理商品 ID {item_data.get('product_id', 'N/A')} 时发生意外错误。请联系管理员。")
-                valid_products = False
-        
-        # 如果没有有效商品，返回错误
-        if not valid_products_data:
+
+        # 一次查询加载全部商品与库存，无效或库存不足的行跳过并提示
+        lines, errors = CheckoutService.prepare_lines(cart)
+        for error in errors:
+            getattr(messages, error['level'])(request, error['message'])
+
+        if not lines:
             messages.error(request, '销售单创建失败，未能添加任何有效商品。')
             return redirect('sale_create')
-            
-        # 再次确认所有商品价格都有效
-        for i, item in enumerate(valid_products_data):
-            if item['price'] <= 0 or item['subtotal'] <= 0:
-                print(f"警告：商品{i+1} {item['product'].name} 价格或小计为0，尝试从数据库重新获取价格")
-                db_price = Product.objects.filter(id=item['product'].id).values_list('price', flat=True).first() or Decimal('0')
-                if db_price > 0:
-                    item['price'] = Decimal(db_price)
-                    item['subtotal'] = item['price'] * Decimal(str(item['quantity']))
-                    print(f"已更新商品 {item['product'].name} 的价格: {item['price']}, 小计: {item['subtotal']}")
-            
-        # 计算总金额
-        total_amount_calculated = sum(item['subtotal'] for item in valid_products_data)
-        print(f"后端计算的总金额: {total_amount_calculated}, 商品数量: {len(valid_products_data)}")
-        
-        # 验证计算是否正确
-        if total_amount_calculated == 0 and valid_products_data:
-            print("警告：后端计算的总金额为0，但有有效商品，检查每个商品的金额:")
-            for i, item in enumerate(valid_products_data):
-                print(f"商品{i+1}: {item['product'].name}, 价格={item['price']}, 数量={item['quantity']}, 小计={item['subtotal']}")
-        
-        # 获取前端提交的金额数据作为参考
-        try:
-            total_amount_frontend = Decimal(request.POST.get('total_amount', '0.00'))
-            discount_amount_frontend = Decimal(request.POST.get('discount_amount', '0.00'))
-            final_amount_frontend = Decimal(request.POST.get('final_amount', '0.00'))
-            print(f"前端提交的金额 - 总金额: {total_amount_frontend}, 折扣: {discount_amount_frontend}, 最终金额: {final_amount_frontend}")
-            
-            # 决定使用哪个总金额
-            if total_amount_calculated > 0:
-                # 如果后端计算有效，优先使用后端计算的金额
-                total_amount = total_amount_calculated
-                
-                # 重新计算折扣和最终金额，只有当有会员时才应用折扣
-                member_id = request.POST.get('member')
-                discount_rate = Decimal('1.0')  # 默认无折扣
-                
-                if member_id:
-                    try:
-                        member = Member.objects.get(id=member_id)
-                        if member.level and member.level.discount is not None:
-                            discount_rate = Decimal(str(member.level.discount))
-                        print(f"会员折扣: 会员ID={member_id}, 折扣率={discount_rate}")
-                    except Member.DoesNotExist:
-                        print(f"找不到ID为{member_id}的会员，不应用折扣")
-                else:
-                    print("无会员信息，不应用折扣")
-                
-                discount_amount = total_amount * (Decimal('1.0') - discount_rate)
-                final_amount = total_amount - discount_amount
-                
-                print(f"使用后端计算的金额: 总金额={total_amount}, 折扣率={discount_rate}, 折扣金额={discount_amount}, 最终金额={final_amount}")
-            elif total_amount_frontend > 0:
-                # 如果后端计算无效但前端有值，使用前端数据
-                total_amount = total_amount_frontend
-                discount_amount = discount_amount_frontend
-                final_amount = final_amount_frontend
-                print(f"使用前端提交的金额: 总金额={total_amount}, 折扣金额={discount_amount}, 最终金额={final_amount}")
-            else:
-                # 两者都无效，使用商品数据库价格重新计算
-                print("警告：前端和后端计算的金额都无效，尝试使用数据库价格")
-                db_total = Decimal('0.00')
-                
-                # 尝试从数据库获取每个商品的价格
-                for item in valid_products_data:
-                    product_id = item['product'].id
-                    quantity = item['quantity']
-                    db_price = Product.objects.filter(id=product_id).values_list('price', flat=True).first() or Decimal('0')
-                    
-                    if db_price > 0:
-                        item_total = db_price * Decimal(str(quantity))
-                        db_total += item_total
-                        print(f"使用数据库价格: 商品ID={product_id}, 价格={db_price}, 数量={quantity}, 小计={item_total}")
-                
-                total_amount = db_total
-                discount_amount = Decimal('0.00')
-                final_amount = total_amount
-                print(f"使用数据库价格计算的总金额: {total_amount}")
-                
-        except (InvalidOperation, ValueError, TypeError) as e:
-            print(f"解析金额时出错: {e}，尝试使用数据库中的商品价格")
-            # 尝试从数据库获取商品价格重新计算
-            db_total = Decimal('0.00')
-            for item in valid_products_data:
-                product_id = item['product'].id
-                quantity = item['quantity']
-                db_price = Product.objects.filter(id=product_id).values_list('price', flat=True).first() or Decimal('0')
-                
-                if db_price > 0:
-                    item_total = db_price * Decimal(str(quantity))
-                    db_total += item_total
-                    # 更新商品数据
-                    item['price'] = db_price
-                    item['subtotal'] = item_total
-                    
-            total_amount = db_total
-            discount_amount = Decimal('0.00')
-            final_amount = total_amount
-            print(f"使用数据库价格计算的总金额: {total_amount}")
-        
-        # 最终安全检查，确保总金额大于0
-        if total_amount <= 0 and valid_products_data:
-            print("警告：计算的总金额仍然为0或负数，使用固定价格作为最后的保障")
-            # 使用855.33作为固定价格，这只是一个保底措施
-            total_amount = Decimal('855.33')
-            discount_amount = Decimal('0.00')
-            final_amount = total_amount
-        
+
         form = SaleForm(request.POST)
         if form.is_valid():
-            # 创建销售单，但暂不保存
-            sale = form.save(commit=False)
-            sale.operator = request.user
-            
-            # 设置金额
-            sale.total_amount = total_amount
-            sale.discount_amount = discount_amount
-            sale.final_amount = final_amount
-            
-            # 处理会员关联
-            member_id = request.POST.get('member')
-            if member_id:
-                try:
-                    member = Member.objects.get(id=member_id)
-                    sale.member = member
-                except Member.DoesNotExist:
-                    pass
-            
-            # 设置支付方式。旧前端曾提交 account，后端统一按账户余额处理。
-            payment_method = request.POST.get('payment_method', 'cash')
-            if payment_method == 'account':
-                payment_method = 'balance'
-            sale.payment_method = payment_method
-
-            # 收银台是一次性下单并结算，直接标记为已完成
-            sale.status = 'COMPLETED'
-
-            # 设置积分（实付金额的整数部分）
-            sale.points_earned = int(sale.final_amount) if sale.final_amount is not None else 0
-            
-            # 使用事务处理，确保所有操作要么全部成功，要么全部失败
             try:
-                with transaction.atomic():
-                    if sale.member_id:
-                        sale.member = Member.objects.select_for_update().get(pk=sale.member_id)
-
-                    if sale.payment_method == 'balance':
-                        if not sale.member_id:
-                            raise ValueError('余额支付需要选择会员')
-                        if sale.member.balance < sale.final_amount:
-                            raise ValueError('会员余额不足')
-                        sale.balance_paid = sale.final_amount
-
-                    # 保存销售单基本信息。放在事务内，后续库存或余额失败时不会留下空销售单。
-                    sale.save()
-
-                    if sale.payment_method == 'balance':
-                        member_service.apply_member_balance_change(sale.member, -sale.final_amount)
-                        MemberTransaction.objects.create(
-                            member=sale.member,
-                            transaction_type='PURCHASE',
-                            balance_change=-sale.final_amount,
-                            points_change=0,
-                            description=f'销售单 #{sale.id} 余额支付',
-                            created_by=request.user,
-                            related_object_id=sale.id,
-                            related_object_type='Sale'
-                        )
-
-                    # 添加商品项并更新库存
-                    for item_data in valid_products_data:
-                        # 手动创建SaleItem，避免触发连锁更新
-                        sale_item = SaleItem(
-                            sale=sale,
-                            product=item_data['product'],
-                            quantity=item_data['quantity'],
-                            price=item_data['price'],
-                            actual_price=item_data['price'],
-                            subtotal=item_data['subtotal']
-                        )
-                        
-                        # 确保小计已设置
-                        if not sale_item.subtotal or sale_item.subtotal == 0:
-                            sale_item.subtotal = sale_item.price * sale_item.quantity
-                            print(f"重新计算小计: {sale_item.price} * {sale_item.quantity} = {sale_item.subtotal}")
-                        
-                        # 保存SaleItem到数据库
-                        models.Model.save(sale_item)
-                        
-                        # 打印保存后的数据，确认数据正确
-                        print(f"保存的SaleItem - ID: {sale_item.id}, 商品: {sale_item.product.name}, "
-                              f"价格: {sale_item.price}, 数量: {sale_item.quantity}, 小计: {sale_item.subtotal}")
-                        
-                        # 直接使用SQL更新记录，确保价格正确
-                        with connection.cursor() as cursor:
-                            cursor.execute(
-                                "UPDATE inventory_saleitem SET price = %s, actual_price = %s, subtotal = %s WHERE id = %s",
-                                [str(item_data['price']), str(item_data['price']), str(item_data['subtotal']), sale_item.id]
-                            )
-                            print(f"直接执行SQL更新SaleItem记录: id={sale_item.id}, price={item_data['price']}, subtotal={item_data['subtotal']}")
-                        
-                        # 强制重新加载销售项
-                        sale_item = SaleItem.objects.get(id=sale_item.id)
-                        print(f"重新加载后的SaleItem - ID: {sale_item.id}, 价格: {sale_item.price}, 小计: {sale_item.subtotal}")
-                        
-                        # 在事务内锁定并复查库存，避免并发收银同时通过事务外库存校验后超卖。
-                        inventory_obj = Inventory.objects.select_for_update().get(product=item_data['product'])
-                        if inventory_obj.quantity < item_data['quantity']:
-                            raise ValueError(
-                                f"商品 {item_data['product'].name} 库存不足 "
-                                f"(需要 {item_data['quantity']}, 可用 {inventory_obj.quantity})"
-                            )
-                        inventory_obj.quantity -= item_data['quantity']
-                        inventory_obj.save()
-                        
-                        # 创建库存交易记录
-                        InventoryTransaction.objects.create(
-                            product=item_data['product'],
-                            transaction_type='OUT',
-                            quantity=item_data['quantity'],
-                            operator=request.user,
-                            notes=f'销售单号：{sale.id}'
-                        )
-                        
-                        # 记录操作日志
-                        OperationLog.objects.create(
-                            operator=request.user,
-                            operation_type='SALE',
-                            details=f'销售商品 {item_data["product"].name} 数量 {item_data["quantity"]}',
-                            related_object_id=sale.id,
-                            related_content_type=ContentType.objects.get_for_model(Sale)
-                        )
-                    
-                    # 如果有会员，更新会员积分和消费记录
-                    if sale.member:
-                        sale.member.points += sale.points_earned
-                        sale.member.purchase_count += 1
-                        sale.member.total_spend += sale.final_amount
-                        sale.member.save(update_fields=['points', 'purchase_count', 'total_spend', 'updated_at'])
-                    
-                    # 记录完成销售操作日志
-                    OperationLog.objects.create(
-                        operator=request.user,
-                        operation_type='SALE',
-                        details=f'完成销售单 #{sale.id}，总金额: {sale.final_amount}，支付方式: {sale.get_payment_method_display()}',
-                        related_object_id=sale.id,
-                        related_content_type=ContentType.objects.get_for_model(Sale)
-                    )
-                    
-                    # 最后确保销售单金额正确
-                    with connection.cursor() as cursor:
-                        # 将Decimal转换为字符串，避免数据类型问题
-                        total_str = str(total_amount)
-                        discount_str = str(discount_amount)
-                        final_str = str(final_amount)
-                        points = int(final_amount) if final_amount else 0
-                        
-                        print(f"更新销售单最终金额: total={total_str}, discount={discount_str}, final={final_str}, points={points}")
-                        
-                        cursor.execute(
-                            "UPDATE inventory_sale SET total_amount = %s, discount_amount = %s, final_amount = %s, points_earned = %s WHERE id = %s",
-                            [total_str, discount_str, final_str, points, sale.id]
-                        )
-                        print(f"直接执行SQL更新Sale记录: id={sale.id}, total={total_str}, discount={discount_str}, final={final_str}")
-                
-                # 从数据库重新获取销售单，确保显示正确的金额
-                refreshed_sale = get_object_or_404(Sale, pk=sale.id)
-                print(f"刷新后的销售单金额: total={refreshed_sale.total_amount}, discount={refreshed_sale.discount_amount}, final={refreshed_sale.final_amount}")
-                
-                # 交易成功，显示成功消息
-                messages.success(request, '销售单创建成功')
-                return redirect('sale_detail', sale_id=sale.id)
-                
+                sale = CheckoutService.checkout(
+                    lines,
+                    operator=request.user,
+                    member_id=request.POST.get('member') or None,
+                    payment_method=request.POST.get('payment_method', 'cash'),
+                    remark=form.cleaned_data.get('remark', ''),
+                )
             except Exception as e:
-                # 出现任何异常，回滚事务
-                print(f"创建销售单时发生错误: {type(e).__name__} - {e}")
+                # 事务已整体回滚，不会留下空销售单或扣减了一半的库存
                 messages.error(request, f'创建销售单时发生错误: {str(e)}')
-                # 由于使用了事务，所有数据库操作都会自动回滚
                 return redirect('sale_create')
+
+            messages.success(request, '销售单创建成功')
+            return redirect('sale_detail', sale_id=sale.id)
         else:
             # 表单验证失败
             for field, errors in form.errors.items():
@@ -575,12 +252,10 @@ def sale_item_create(request, sale_id):
                     )
 
                     # 记录操作日志
-                    OperationLog.objects.create(
-                        operator=request.user,
-                        operation_type='SALE',
-                        details=f'销售商品 {sale_item.product.name} 数量 {sale_item.quantity}',
-                        related_object_id=sale.id,
-                        related_content_type=ContentType.objects.get_for_model(Sale)
+                    log_action_on_commit(
+                        request.user, 'SALE',
+                        f'销售商品 {sale_item.product.name} 数量 {sale_item.quantity}',
+                        related_object=sale,
                     )
 
                 messages.success(request, '商品添加成功')
@@ -675,6 +350,7 @@ def sale_complete(request, sale_id):
 
                     sale.status = 'COMPLETED'
                     sale.save()
+                    SalesRollupService.apply_sale(sale)
 
                     if balance_amount > 0:
                         member_service.apply_member_balance_change(member, -balance_amount)
@@ -696,12 +372,10 @@ def sale_complete(request, sale_id):
                         member.save(update_fields=['points', 'purchase_count', 'total_spend', 'updated_at'])
 
                     # 记录操作日志
-                    OperationLog.objects.create(
-                        operator=request.user,
-                        operation_type='SALE',
-                        details=f'完成销售单 #{sale.id}，总金额: {sale.final_amount}，支付方式: {sale.get_payment_method_display()}',
-                        related_object_id=sale.id,
-                        related_content_type=ContentType.objects.get_for_model(Sale)
+                    log_action_on_commit(
+                        request.user, 'SALE',
+                        f'完成销售单 #{sale.id}，总金额: {sale.final_amount}，支付方式: {sale.get_payment_method_display()}',
+                        related_object=sale,
                     )
 
                 messages.success(request, '销售单已完成')
@@ -765,12 +439,10 @@ def sale_cancel(request, sale_id):
             sale.save()
 
             # 记录操作日志
-            OperationLog.objects.create(
-                operator=request.user,
-                operation_type='SALE',
-                details=f'取消销售单 #{sale.id}，原因: {reason}',
-                related_object_id=sale.id,
-                related_content_type=ContentType.objects.get_for_model(Sale)
+            log_action_on_commit(
+                request.user, 'SALE',
+                f'取消销售单 #{sale.id}，原因: {reason}',
+                related_object=sale,
             )
         
         messages.success(request, '销售单已取消')
@@ -804,12 +476,10 @@ def sale_delete_item(request, sale_id, item_id):
     )
     
     # 记录操作日志
-    OperationLog.objects.create(
-        operator=request.user,
-        operation_type='SALE',
-        details=f'从销售单 #{sale.id} 中删除商品 {item.product.name}',
-        related_object_id=sale.id,
-        related_content_type=ContentType.objects.get_for_model(Sale)
+    log_action_on_commit(
+        request.user, 'SALE',
+        f'从销售单 #{sale.id} 中删除商品 {item.product.name}',
+        related_object=sale,
     )
     
     # 删除商品并更新销售单总额
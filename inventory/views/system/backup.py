@@ -19,12 +19,12 @@ import time
 import shutil
 import logging
 import re
-import zipfile
 from datetime import datetime
 
 from inventory.permissions.decorators import permission_required
 from inventory.utils.logging import log_view_access
 from inventory.services.backup_service import BackupService
+from inventory.utils.download_utils import FileSource, StoredZip, ranged_response
 
 # 获取logger
 logger = logging.getLogger(__name__)
@@ -89,6 +89,7 @@ def backup_list(request):
                         'created_at': datetime.fromisoformat(backup_info.get('created_at', '')),
                         'created_by': backup_info.get('created_by', '未知'),
                         'size': get_dir_size_display(backup_dir),
+                        'type': backup_info.get('type', 'full'),
                     })
             except Exception as e:
                 logger.error(f"读取备份信息失败: {str(e)}")
@@ -123,46 +124,18 @@ def create_backup(request):
             messages.error(request, f"备份 {backup_name} 已存在")
             return render(request, 'inventory/system/create_backup.html', {'suggested_name': suggested_name})
         
-        # 创建备份目录
-        os.makedirs(backup_dir, exist_ok=True)
+        backup_media = request.POST.get('backup_media') == 'on'
+        incremental = request.POST.get('backup_type') == 'incremental'
         
         try:
-            # 备份数据库
-            db_file = os.path.join(backup_dir, 'db.json')
-            management.call_command('dumpdata', '--exclude', 'auth.permission', '--exclude', 'contenttypes', 
-                                  '--exclude', 'sessions.session', '--indent', '4', 
-                                  '--output', db_file)
-            
-            # 备份媒体文件
-            backup_media = request.POST.get('backup_media') == 'on'
-            if backup_media and os.path.exists(settings.MEDIA_ROOT):
-                media_dir = os.path.join(backup_dir, 'media')
-                os.makedirs(media_dir, exist_ok=True)
-                
-                # 复制媒体文件
-                for item in os.listdir(settings.MEDIA_ROOT):
-                    src_path = os.path.join(settings.MEDIA_ROOT, item)
-                    dst_path = os.path.join(media_dir, item)
-                    if os.path.isdir(src_path):
-                        shutil.copytree(src_path, dst_path)
-                    else:
-                        shutil.copy2(src_path, dst_path)
-            
-            # 备份描述
-            backup_description = request.POST.get('backup_description', '').strip()
-            
-            # 保存备份信息
-            backup_info = {
-                'name': backup_name,
-                'created_at': now.isoformat(),
-                'created_by': request.user.username,
-                'description': backup_description,
-                'includes_media': backup_media,
-            }
-            
-            backup_info_file = os.path.join(backup_dir, 'backup_info.json')
-            with open(backup_info_file, 'w', encoding='utf-8') as f:
-                json.dump(backup_info, f, indent=4, ensure_ascii=False)
+            # 完整备份使用数据库在线备份并压缩；增量备份只导出上次备份后新增的销售、库存流水和日志
+            BackupService.create_backup(
+                backup_name=backup_name,
+                user=request.user,
+                incremental=incremental,
+                include_media=backup_media,
+                description=request.POST.get('backup_description', '').strip(),
+            )
             
             # 记录日志
             LogEntry.objects.create(
@@ -171,17 +144,14 @@ def create_backup(request):
                 content_type_id=None,  # 自定义日志，无关联内容类型（id=0 会违反外键约束）
                 object_id=backup_name,
                 object_repr=f'备份: {backup_name}',
-                change_message=f'创建了系统备份 {backup_name}' + (' 包含媒体文件' if backup_media else '')
+                change_message=f'创建了系统{"增量" if incremental else ""}备份 {backup_name}' + (' 包含媒体文件' if backup_media and not incremental else '')
             )
             
             messages.success(request, f"成功创建备份: {backup_name}")
             return redirect('backup_list')
             
         except Exception as e:
-            # 备份失败，清理备份目录
-            if os.path.exists(backup_dir):
-                shutil.rmtree(backup_dir)
-            
+            # 备份失败时服务层已清理备份目录
             messages.error(request, f"创建备份失败: {str(e)}")
             logger.error(f"创建备份失败: {str(e)}")
             return render(request, 'inventory/system/create_backup.html', {'suggested_name': suggested_name})
@@ -221,43 +191,9 @@ def restore_backup(request, backup_name):
             })
         
         try:
-            # 恢复数据库
-            db_file = os.path.join(backup_dir, 'db.json')
-            if not os.path.exists(db_file):
-                messages.error(request, f"备份文件 {db_file} 不存在")
-                return redirect('backup_list')
-            
-            # 先清空数据库再加载快照；loaddata 只会 upsert，不能删除备份后新增的数据。
-            with transaction.atomic():
-                management.call_command('flush', '--noinput', verbosity=0)
-                management.call_command('loaddata', db_file, verbosity=0)
-            
-            # 恢复媒体文件
-            restore_media = request.POST.get('restore_media') == 'on'
-            if restore_media and backup_info.get('includes_media', False):
-                media_dir = os.path.join(backup_dir, 'media')
-                if os.path.exists(media_dir):
-                    # 清空现有媒体目录
-                    if os.path.exists(settings.MEDIA_ROOT):
-                        for item in os.listdir(settings.MEDIA_ROOT):
-                            item_path = os.path.join(settings.MEDIA_ROOT, item)
-                            if os.path.isdir(item_path):
-                                shutil.rmtree(item_path)
-                            else:
-                                os.remove(item_path)
-                    
-                    # 复制备份中的媒体文件
-                    for item in os.listdir(media_dir):
-                        src_path = os.path.join(media_dir, item)
-                        dst_path = os.path.join(settings.MEDIA_ROOT, item)
-                        if os.path.isdir(src_path):
-                            if os.path.exists(dst_path):
-                                shutil.rmtree(dst_path)
-                            shutil.copytree(src_path, dst_path)
-                        else:
-                            if os.path.exists(dst_path):
-                                os.remove(dst_path)
-                            shutil.copy2(src_path, dst_path)
+            # 校验备份文件后，依次恢复完整备份和之后的增量备份
+            restore_media = request.POST.get('restore_media') == 'on' and backup_info.get('includes_media', False)
+            BackupService.restore(backup_name, restore_media=restore_media)
             
             # 恢复快照后，执行恢复的用户可能已不存在于当前数据库。
             restored_user = get_user_model().objects.filter(pk=request.user.pk).first()
@@ -311,6 +247,11 @@ def delete_backup(request, backup_name):
             messages.error(request, "请确认您要删除备份")
             return render(request, 'inventory/system/delete_backup.html', {'backup_name': backup_name})
         
+        dependents = BackupService.dependent_backups(backup_name)
+        if dependents:
+            messages.error(request, f"备份 {backup_name} 是增量备份 {', '.join(dependents)} 的基础，请先删除这些增量备份")
+            return render(request, 'inventory/system/delete_backup.html', {'backup_name': backup_name})
+        
         try:
             # 删除备份目录
             shutil.rmtree(backup_dir)
@@ -346,47 +287,35 @@ def download_backup(request, backup_name):
         messages.error(request, "无效的备份名称")
         return redirect('backup_list')
 
-    if not os.path.exists(backup_dir):
+    # 已归档为 zip 的备份直接发送文件；否则按需拼接成 zip 流式输出，都支持断点续传
+    archive = f"{backup_dir}.zip"
+    if not os.path.isfile(archive) and not os.path.isdir(backup_dir):
         messages.error(request, f"备份 {backup_name} 不存在")
         return redirect('backup_list')
     
-    # 创建临时ZIP文件
-    temp_file = os.path.join(settings.TEMP_DIR, f"{backup_name}.zip")
-    
     try:
-        # 创建ZIP文件
-        with zipfile.ZipFile(temp_file, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # 添加备份文件
-            for root, dirs, files in os.walk(backup_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    zipf.write(file_path, os.path.relpath(file_path, os.path.dirname(backup_dir)))
-        
-        # 打开文件供下载
-        with open(temp_file, 'rb') as f:
-            response = HttpResponse(f.read(), content_type='application/zip')
-            response['Content-Disposition'] = f'attachment; filename="{backup_name}.zip"'
-            
-            # 记录日志
-            LogEntry.objects.create(
-                user=request.user,
-                action_flag=1,  # 添加
-                content_type_id=None,  # 自定义日志，无关联内容类型（id=0 会违反外键约束）
-                object_id=backup_name,
-                object_repr=f'下载备份: {backup_name}',
-                change_message=f'下载了系统备份 {backup_name}'
-            )
-            
-            return response
-            
-    except Exception as e:
+        if os.path.isfile(archive):
+            source = FileSource(archive)
+        else:
+            source = StoredZip(BackupService.archive_entries(backup_name))
+        response = ranged_response(request, source, f"{backup_name}.zip", content_type='application/zip')
+    except OSError as e:
         messages.error(request, f"下载备份失败: {str(e)}")
         logger.error(f"下载备份失败: {str(e)}")
         return redirect('backup_list')
-    finally:
-        # 清理临时文件
-        if os.path.exists(temp_file):
-            os.remove(temp_file)
+    
+    # 断点续传的后续请求不重复记录日志
+    if response.status_code == 200:
+        LogEntry.objects.create(
+            user=request.user,
+            action_flag=1,  # 添加
+            content_type_id=None,  # 自定义日志，无关联内容类型（id=0 会违反外键约束）
+            object_id=backup_name,
+            object_repr=f'下载备份: {backup_name}',
+            change_message=f'下载了系统备份 {backup_name}'
+        )
+    
+    return response
 
 @login_required
 @log_view_access('OTHER')
@@ -15,6 +15,7 @@ import logging
 
 from inventory.permissions.decorators import permission_required
 from inventory.utils.logging import log_view_access
+from inventory.utils.log_reader import count_lines, read_lines_backward
 
 # 获取logger
 logger = logging.getLogger(__name__)
@@ -98,9 +99,8 @@ def system_info(request):
     log_entries = 0
     if os.path.exists(log_file):
         log_size_mb = round(os.path.getsize(log_file) / (1024 * 1024), 2)
-        # 统计日志条目数（简单近似）
-        with open(log_file, 'r') as f:
-            log_entries = sum(1 for _ in f)
+        # 统计日志行数（按文件缓存，只统计新追加的部分）
+        log_entries = count_lines(log_file)
     
     # 组合所有信息
     context = {
@@ -202,14 +202,12 @@ def system_maintenance(request):
             log_file = os.path.join(settings.BASE_DIR, 'logs', 'inventory.log')
             if os.path.exists(log_file):
                 try:
-                    # 读取最后10000行
-                    with open(log_file, 'r') as f:
-                        lines = f.readlines()
-                        last_lines = lines[-10000:] if len(lines) > 10000 else lines
+                    # 从文件末尾倒序读取最后10000行
+                    last_lines = read_lines_backward(log_file, 10000)['lines']
                     
                     # 重写日志文件
-                    with open(log_file, 'w') as f:
-                        f.writelines(last_lines)
+                    with open(log_file, 'w', encoding='utf-8') as f:
+                        f.writelines(f'{line}\n' for line in last_lines)
                     
                     messages.success(request, '日志文件已清理')
                 except Exception as e:
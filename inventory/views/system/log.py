@@ -4,11 +4,10 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.paginator import Paginator
-from django.contrib.admin.models import LogEntry
+from django.contrib.admin.models import ADDITION, CHANGE, DELETION, LogEntry
 from django.db.models import Q
-from django.utils.html import escape
-from django.http import FileResponse
+from django.http import FileResponse, JsonResponse
+from django.conf import settings
 from django.utils import timezone
 import os
 import logging
@@ -16,10 +15,22 @@ import re
 from datetime import datetime, timedelta
 
 from inventory.permissions.decorators import permission_required
+from inventory.services.counter_service import CounterService
 from inventory.utils.logging import log_view_access
+from inventory.utils.log_reader import LOG_FILE_RE, LOG_LEVELS, count_lines, read_lines_backward
+from inventory.utils.query_utils import CountedPaginator
 
 logger = logging.getLogger(__name__)
 
+# 查看日志时单页最多显示的行数
+MAX_LOG_LINES = 5000
+
+
+def get_log_dir():
+    """日志文件目录"""
+    return getattr(settings, 'LOG_DIR', os.path.join(settings.BASE_DIR, 'logs'))
+
+
 @login_required
 @permission_required('is_superuser')
 @log_view_access('OTHER')
@@ -60,27 +71,33 @@ def log_list(request):
         except ValueError:
             messages.error(request, "结束日期格式无效")
     
-    # 分页
+    # 准备统计数据，读取行数计数器
+    stats = {
+        'total': CounterService.count(LogEntry),
+        'add': CounterService.count(LogEntry, action_flag=ADDITION),
+        'change': CounterService.count(LogEntry, action_flag=CHANGE),
+        'delete': CounterService.count(LogEntry, action_flag=DELETION),
+    }
+    
+    # 分页：无筛选或只按操作类型筛选时总数来自计数器，其它筛选条件使用估计行数
+    if search_query or date_from or date_to:
+        count, estimated = CounterService.estimated_count(query)
+    elif action_type:
+        count, estimated = CounterService.count(LogEntry, action_flag=int(action_type)), False
+    else:
+        count, estimated = stats['total'], False
     page_size = int(request.GET.get('page_size', 50))
-    paginator = Paginator(query.order_by('-action_time'), page_size)
+    paginator = CountedPaginator(query.order_by('-action_time'), page_size, count=count, estimated=estimated)
     page_number = request.GET.get('page', 1)
     logs = paginator.get_page(page_number)
     
-    # 准备统计数据
-    stats = {
-        'total': LogEntry.objects.count(),
-        'add': LogEntry.objects.filter(action_flag=1).count(),
-        'change': LogEntry.objects.filter(action_flag=2).count(),
-        'delete': LogEntry.objects.filter(action_flag=3).count(),
-    }
-    
     # 准备文件日志数据
     log_files = []
-    log_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 'logs')
+    log_dir = get_log_dir()
     
     if os.path.exists(log_dir):
         for file_name in os.listdir(log_dir):
-            if file_name.endswith('.log'):
+            if LOG_FILE_RE.match(file_name):
                 file_path = os.path.join(log_dir, file_name)
                 try:
                     size = os.path.getsize(file_path)
@@ -179,12 +196,11 @@ def clear_logs(request):
 @login_required
 @permission_required('is_superuser')
 def view_log_file(request, file_name):
-    """查看日志文件内容"""
-    log_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 'logs')
-    file_path = os.path.join(log_dir, file_name)
+    """查看日志文件内容：从文件末尾倒序读取，按字节偏移量向前翻页，支持正则和级别过滤"""
+    file_path = os.path.join(get_log_dir(), file_name)
     
     # 安全检查，确保文件名是一个有效的日志文件名
-    if not re.match(r'^[\w.-]+\.log$', file_name) or '..' in file_name:
+    if not LOG_FILE_RE.match(file_name) or '..' in file_name:
         messages.error(request, "无效的日志文件名")
         return redirect('log_list')
     
@@ -195,47 +211,73 @@ def view_log_file(request, file_name):
     # 获取行数限制
     lines = request.GET.get('lines', 500)
     try:
-        lines = int(lines)
+        lines = min(max(int(lines), 1), MAX_LOG_LINES)
     except ValueError:
         lines = 500
     
-    # 获取文件内容（尾部的指定行数）
+    # 向前翻页的位置（字节偏移量）
     try:
-        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-            # 读取所有行并反转
-            all_lines = f.readlines()
-            total_lines = len(all_lines)
-            
-            # 获取最后的 lines 行
-            if lines >= total_lines:
-                content = ''.join(all_lines)
-            else:
-                content = ''.join(all_lines[-lines:])
-            
-            # 转换内容为安全HTML
-            content = escape(content)
-            
-            return render(request, 'inventory/system/view_log_file.html', {
-                'file_name': file_name,
-                'content': content,
-                'lines': lines,
-                'total_lines': total_lines,
-            })
-            
-    except Exception as e:
+        before = int(request.GET['before'])
+    except (KeyError, ValueError):
+        before = None
+    
+    level = request.GET.get('level', '').upper()
+    if level not in LOG_LEVELS:
+        level = ''
+    
+    search_query = request.GET.get('q', '').strip()[:200]
+    pattern = None
+    if search_query:
+        try:
+            pattern = re.compile(search_query, re.IGNORECASE)
+        except re.error as e:
+            messages.error(request, f"无效的正则表达式: {e}")
+            search_query = ''
+    
+    try:
+        result = read_lines_backward(file_path, lines, before=before, pattern=pattern, level=level or None)
+        total_lines = count_lines(file_path)
+    except OSError as e:
         messages.error(request, f"读取日志文件失败: {str(e)}")
         logger.error(f"读取日志文件失败: {str(e)}")
         return redirect('log_list')
+    
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'success': True,
+            'lines': result['lines'],
+            'next_before': result['next_before'],
+            'file_size': result['file_size'],
+            'total_lines': total_lines,
+        })
+    
+    older_query = request.GET.copy()
+    older_query['before'] = result['next_before']
+    older_query.pop('format', None)
+    
+    return render(request, 'inventory/system/view_log_file.html', {
+        'file_name': file_name,
+        'log_lines': result['lines'],
+        'next_before': result['next_before'],
+        'older_query': older_query.urlencode(),
+        'file_size': result['file_size'],
+        'lines': lines,
+        'max_lines': MAX_LOG_LINES,
+        'total_lines': total_lines,
+        'search_query': search_query,
+        'level': level,
+        'log_levels': LOG_LEVELS,
+    })
 
 @login_required
 @permission_required('is_superuser')
 def download_log_file(request, file_name):
     """下载日志文件"""
-    log_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 'logs')
+    log_dir = get_log_dir()
     file_path = os.path.join(log_dir, file_name)
     
     # 安全检查，确保文件名是一个有效的日志文件名
-    if not re.match(r'^[\w.-]+\.log$', file_name) or '..' in file_name:
+    if not LOG_FILE_RE.match(file_name) or '..' in file_name:
         messages.error(request, "无效的日志文件名")
         return redirect('log_list')
     
@@ -267,11 +309,11 @@ def download_log_file(request, file_name):
 @permission_required('is_superuser')
 def delete_log_file(request, file_name):
     """删除日志文件"""
-    log_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 'logs')
+    log_dir = get_log_dir()
     file_path = os.path.join(log_dir, file_name)
     
     # 安全检查，确保文件名是一个有效的日志文件名
-    if not re.match(r'^[\w.-]+\.log$', file_name) or '..' in file_name:
+    if not LOG_FILE_RE.match(file_name) or '..' in file_name:
         messages.error(request, "无效的日志文件名")
         return redirect('log_list')
     
@@ -2,6 +2,7 @@
 Inventory checking views.
 """
 import json
+import zlib
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse, HttpResponse
@@ -17,10 +18,15 @@ from inventory.models import (
     Inventory, OperationLog
 )
 from inventory.forms import InventoryCheckForm, InventoryCheckItemForm, InventoryCheckApproveForm
+from inventory.exceptions import InventoryValidationError
 from inventory.services.inventory_check_service import InventoryCheckService
 from inventory.utils.logging import log_view_access
 from inventory.permissions.decorators import permission_required
 
+# 扫描枪批量上传：单次最多的扫描记录数和解压后的最大字节数
+MAX_SCANS_PER_BATCH = 5000
+MAX_SCAN_PAYLOAD_BYTES = 2 * 1024 * 1024
+
 @login_required
 @log_view_access('INVENTORY_CHECK')
 @permission_required('perform_inventory_check')
@@ -65,7 +71,8 @@ def inventory_check_create(request):
                     name=form.cleaned_data['name'],
                     description=form.cleaned_data['description'],
                     user=request.user,
-                    category=category
+                    category=category,
+                    changed_since_last_check=form.cleaned_data.get('changed_only', False)
                 )
                 
                 messages.success(request, f'库存盘点 {inventory_check.name} 创建成功')
@@ -231,4 +238,64 @@ def inventory_check_cancel(request, check_id):
     except Exception as e:
         messages.error(request, f'取消库存盘点时出错: {str(e)}')
     
-    return redirect('inventory_check_detail', check_id=check_id) 
\ No newline at end of file
+    return redirect('inventory_check_detail', check_id=check_id) 
+
+
+def _read_scan_payload(request):
+    """读取扫描上传的 JSON 请求体，支持 Content-Encoding: gzip/deflate 压缩"""
+    body = request.body
+    encoding = request.headers.get('Content-Encoding', '').lower()
+    if encoding in ('gzip', 'deflate'):
+        # wbits=47 自动识别 gzip 与 zlib 头；限制解压大小防止压缩炸弹
+        decompressor = zlib.decompressobj(wbits=47)
+        body = decompressor.decompress(body, MAX_SCAN_PAYLOAD_BYTES)
+        if decompressor.unconsumed_tail:
+            raise ValueError('请求数据过大')
+    elif encoding not in ('', 'identity'):
+        raise ValueError(f'不支持的压缩格式: {encoding}')
+    return json.loads(body.decode('utf-8'))
+
+
+@login_required
+@log_view_access('INVENTORY_CHECK')
+@permission_required('perform_inventory_check')
+def inventory_check_scan_batch(request, check_id):
+    """
+    扫描枪批量上传盘点结果的API
+
+    POST JSON: {"mode": "add" | "set", "scans": [[条码, 数量], ...]}
+    scans 也可以是 {"barcode": ..., "quantity": ...} 列表。mode 默认 add，
+    多台设备的计数会累加；离线缓存的扫描记录可以一次上传，按行返回处理结果。
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': '只支持POST请求'}, status=405)
+    
+    inventory_check = get_object_or_404(InventoryCheck, id=check_id)
+    
+    try:
+        payload = _read_scan_payload(request)
+    except (ValueError, zlib.error) as e:
+        return JsonResponse({'success': False, 'message': f'请求数据无效: {str(e)}'}, status=400)
+    
+    scans = payload.get('scans') if isinstance(payload, dict) else None
+    if not isinstance(scans, list):
+        return JsonResponse({'success': False, 'message': '缺少扫描记录 scans'}, status=400)
+    if len(scans) > MAX_SCANS_PER_BATCH:
+        return JsonResponse(
+            {'success': False, 'message': f'单次最多上传 {MAX_SCANS_PER_BATCH} 条扫描记录'}, status=400
+        )
+    
+    mode = payload.get('mode', 'add')
+    try:
+        results = InventoryCheckService.record_scans(inventory_check, scans, request.user, mode=mode)
+    except InventoryValidationError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    
+    recorded = sum(1 for result in results if result['status'] == 'ok')
+    return JsonResponse({
+        'success': True,
+        'mode': mode,
+        'recorded': recorded,
+        'failed': len(results) - recorded,
+        'results': results,
+    })